@@ -1,6 +1,8 @@
 """
-This file shows how to split an input stream into two, using tee-element, and the attaching two different
-processing pipelines to the split streams for image processing.
+This file shows how to split an input stream, using tee-element, in order to compare several tracker
+configurations on the same detections. The primary detector runs only once: its detections are copied into
+the metadata of every tracker branch, so that each tracker works on its own copy of the object metadata.
+The tracking results of the branches are written to a JSON file for comparison.
 
 PGIE_CLASS_ID_VEHICLE = 0
 PGIE_CLASS_ID_BICYCLE = 1
@@ -23,17 +25,21 @@ python3 gst-tracking-parallel.py -i /opt/nvidia/deepstream/deepstream/samples/st
 In order to process a file and dump a dot-file of the pipeline (you need to install graphviz):
 
 python3 gst-tracking-parallel.py -i /opt/nvidia/deepstream/deepstream/samples/streams/sample_1080p_h264.mp4 -d
+
+In order to compare three tracker configurations:
+
+python3 gst-tracking-parallel.py -i /opt/nvidia/deepstream/deepstream/samples/streams/sample_1080p_h264.mp4 \
+    -t tracker_config_1.txt tracker_config_2.txt tracker_config_3.txt
 """
 
 from collections import namedtuple
-from operator import attrgetter
 import argparse
 import configparser
 import os
 import sys
 import signal
 import pyds
-from helpers import gsthelpers
+from helpers import gsthelpers, metafanout, osdmeta, trajectorystore
 import gi
 
 gi.require_version("Gst", "1.0")
@@ -45,10 +51,13 @@ PGIE_CLASS_ID_PERSON = 2
 PGIE_CLASS_ID_ROADSIGN = 3
 past_tracking_meta = [0]
 
-MetaObject = namedtuple(
-    "MetaObject",
-    ["left", "top", "height", "width", "area", "bottom", "id", "text", "class_id"],
-)
+# Past-frame tracking meta is collected into a trajectory store per tracker branch, which is written to
+# TRAJECTORY_FILE when the pipeline stops
+TRAJECTORY_FILE = "trajectories_{branch}.npz"
+
+# Tracking results of the branches are written to COMPARISON_FILE when the pipeline stops
+COMPARISON_FILE = "tracker_comparison.json"
+
 ColorObject = namedtuple("ColorObject", ["red", "green", "blue", "alpha"])
 
 ColorList = {
@@ -58,200 +67,81 @@ ColorList = {
     PGIE_CLASS_ID_ROADSIGN: ColorObject(red=1.0, green=0.0, blue=1.0, alpha=1.0),
 }
 
+# Classes counted on the frame info line
+CLASS_NAMES = {
+    PGIE_CLASS_ID_VEHICLE: "Vehicles",
+    PGIE_CLASS_ID_PERSON: "Persons",
+    PGIE_CLASS_ID_BICYCLE: "Bicycles",
+    PGIE_CLASS_ID_ROADSIGN: "Road Signs",
+}
+
 
 def osd_sink_pad_buffer_probe(pad, info, u_data):
-    frame_number = 0
-    obj_counter = {
-        PGIE_CLASS_ID_VEHICLE: 0,
-        PGIE_CLASS_ID_PERSON: 0,
-        PGIE_CLASS_ID_BICYCLE: 0,
-        PGIE_CLASS_ID_ROADSIGN: 0,
-    }
-    num_rects = 0
     gst_buffer = info.get_buffer()
     if not gst_buffer:
         print("Unable to get GstBuffer ")
         return
 
     batch_meta = pyds.gst_buffer_get_nvds_batch_meta(hash(gst_buffer))
-    l_frame = batch_meta.frame_meta_list
-    meta_list = []
-
-    while l_frame is not None:
-        try:
-            frame_meta = pyds.NvDsFrameMeta.cast(l_frame.data)
-        except StopIteration:
-            break
-
-        frame_number = frame_meta.frame_num
-        num_rects = frame_meta.num_obj_meta
-        l_obj = frame_meta.obj_meta_list
-
-        while l_obj is not None:
-            try:
-                obj_meta = pyds.NvDsObjectMeta.cast(l_obj.data)
-            except StopIteration:
-                break
-
-            obj_counter[obj_meta.class_id] += 1
-
-            obj = MetaObject(
-                left=obj_meta.tracker_bbox_info.org_bbox_coords.left,
-                top=obj_meta.tracker_bbox_info.org_bbox_coords.top,
-                height=obj_meta.tracker_bbox_info.org_bbox_coords.height,
-                width=obj_meta.tracker_bbox_info.org_bbox_coords.width,
-                area=obj_meta.tracker_bbox_info.org_bbox_coords.height
-                * obj_meta.tracker_bbox_info.org_bbox_coords.width,
-                bottom=obj_meta.tracker_bbox_info.org_bbox_coords.top
-                + obj_meta.tracker_bbox_info.org_bbox_coords.height,
-                id=obj_meta.object_id,
-                text=f"ID: {obj_meta.object_id:04d}, Class: {pyds.get_string(obj_meta.text_params.display_text)}",
-                class_id=obj_meta.class_id,
-            )
-            meta_list.append(obj)
-
-            obj_meta.text_params.display_text = ""
-            obj_meta.text_params.set_bg_clr = 0
-            obj_meta.rect_params.border_width = 0
-
-            try:
-                l_obj = l_obj.next
-            except StopIteration:
-                break
-
-        meta_list_sorted = sorted(meta_list, key=attrgetter("bottom"))
-        max_labels = 10  # Define a suitable number for max_labels
-        num_objects = len(meta_list_sorted)
-        num_meta_objects = (num_objects + max_labels - 1) // max_labels
-
-        # Create a single display_meta for the frame counter and object counts
-        display_meta_main = pyds.nvds_acquire_display_meta_from_pool(batch_meta)
-        display_meta_main.num_labels = 1
-        py_nvosd_text_params = display_meta_main.text_params[0]
-        py_nvosd_text_params.display_text = (
-            f"Frame Number={frame_number:05d}, Number of Objects={num_rects:04d}, "
-            f"Vehicles={obj_counter[PGIE_CLASS_ID_VEHICLE]:04d}, "
-            f"Persons={obj_counter[PGIE_CLASS_ID_PERSON]:04d}, "
-            f"Bicycles={obj_counter[PGIE_CLASS_ID_BICYCLE]:04d}, "
-            f"Road Signs={obj_counter[PGIE_CLASS_ID_ROADSIGN]:04d}"
-        )
-        py_nvosd_text_params.x_offset = 10
-        py_nvosd_text_params.y_offset = 12
-        py_nvosd_text_params.font_params.font_name = "Serif"
-        py_nvosd_text_params.font_params.font_size = 10
-        py_nvosd_text_params.font_params.font_color.set(1.0, 1.0, 1.0, 1.0)
-        py_nvosd_text_params.set_bg_clr = 1
-        py_nvosd_text_params.text_bg_clr.set(0.0, 0.0, 0.0, 1.0)
-        pyds.nvds_add_display_meta_to_frame(frame_meta, display_meta_main)
-
-        for i in range(num_meta_objects):
-            display_meta = pyds.nvds_acquire_display_meta_from_pool(batch_meta)
-            display_meta.num_labels = 0
-
-            start_idx = i * max_labels
-            end_idx = min((i + 1) * max_labels, num_objects)
-
-            for j, idx in enumerate(range(start_idx, end_idx)):
-                x = int(meta_list_sorted[idx].left)
-                y = int(meta_list_sorted[idx].top) - 15
-
-                if x < 0 or y < 0:
-                    continue
-
-                display_meta.text_params[
-                    display_meta.num_labels
-                ].display_text = meta_list_sorted[idx].text
-                display_meta.text_params[display_meta.num_labels].x_offset = x
-                display_meta.text_params[display_meta.num_labels].y_offset = y
-                display_meta.text_params[
-                    display_meta.num_labels
-                ].font_params.font_name = "Serif"
-                display_meta.text_params[
-                    display_meta.num_labels
-                ].font_params.font_size = 10
-                display_meta.text_params[
-                    display_meta.num_labels
-                ].font_params.font_color.set(1.0, 1.0, 1.0, 1.0)
-                display_meta.text_params[display_meta.num_labels].set_bg_clr = 1
-                display_meta.text_params[display_meta.num_labels].text_bg_clr.set(
-                    0.45, 0.20, 0.50, 0.75
-                )
-                display_meta.num_labels += 1
-
-            display_meta.num_rects = end_idx - start_idx
-            for j, idx in enumerate(range(start_idx, end_idx)):
-                red = ColorList[meta_list_sorted[idx].class_id].red
-                green = ColorList[meta_list_sorted[idx].class_id].green
-                blue = ColorList[meta_list_sorted[idx].class_id].blue
-                alpha = ColorList[meta_list_sorted[idx].class_id].alpha
-
-                display_meta.rect_params[j].left = meta_list_sorted[idx].left
-                display_meta.rect_params[j].top = meta_list_sorted[idx].top
-                display_meta.rect_params[j].width = meta_list_sorted[idx].width
-                display_meta.rect_params[j].height = meta_list_sorted[idx].height
-                display_meta.rect_params[j].border_width = 2
-                display_meta.rect_params[j].border_color.red = red
-                display_meta.rect_params[j].border_color.green = green
-                display_meta.rect_params[j].border_color.blue = blue
-                display_meta.rect_params[j].border_color.alpha = alpha
-                display_meta.rect_params[j].has_bg_color = 0
-
-            pyds.nvds_add_display_meta_to_frame(frame_meta, display_meta)
-
-        try:
-            l_frame = l_frame.next
-        except StopIteration:
-            break
+    # u_data is the Branch of the osd, its drawer draws objects further away from the camera first
+    u_data.drawer.process_batch(batch_meta)
+    u_data.comparison.add_batch(u_data.index, batch_meta)
 
     # Past tracking meta data
     if past_tracking_meta[0] == 1:
-        l_user = batch_meta.batch_user_meta_list
-        while l_user is not None:
-            try:
-                user_meta = pyds.NvDsUserMeta.cast(l_user.data)
-            except StopIteration:
-                break
-            if (
-                user_meta
-                and user_meta.base_meta.meta_type
-                == pyds.NvDsMetaType.NVDS_TRACKER_PAST_FRAME_META
-            ):
-                try:
-                    pPastFrameObjBatch = pyds.NvDsPastFrameObjBatch.cast(
-                        user_meta.user_meta_data
-                    )
-                except StopIteration:
-                    break
-                for trackobj in pyds.NvDsPastFrameObjBatch.list(pPastFrameObjBatch):
-                    print("streamId=", trackobj.streamID)
-                    print("surfaceStreamID=", trackobj.surfaceStreamID)
-                    for pastframeobj in pyds.NvDsPastFrameObjStream.list(trackobj):
-                        print("numobj=", pastframeobj.numObj)
-                        print("uniqueId=", pastframeobj.uniqueId)
-                        print("classId=", pastframeobj.classId)
-                        print("objLabel=", pastframeobj.objLabel)
-                        for objlist in pyds.NvDsPastFrameObjList.list(pastframeobj):
-                            print("frameNum:", objlist.frameNum)
-                            print("tBbox.left:", objlist.tBbox.left)
-                            print("tBbox.width:", objlist.tBbox.width)
-                            print("tBbox.top:", objlist.tBbox.top)
-                            print("tBbox.right:", objlist.tBbox.height)
-                            print("confidence:", objlist.confidence)
-                            print("age:", objlist.age)
-            try:
-                l_user = l_user.next
-            except StopIteration:
-                break
+        u_data.trajectory_store.add_past_frame_meta(batch_meta)
 
     return Gst.PadProbeReturn.OK
 
 
+def detector_src_pad_buffer_probe(pad, info, u_data):
+    gst_buffer = info.get_buffer()
+    if gst_buffer:
+        # u_data is the metafanout.MetaFanOut, it keeps the detections for the other branches
+        u_data.record(pyds.gst_buffer_get_nvds_batch_meta(hash(gst_buffer)))
+    return Gst.PadProbeReturn.OK
+
+
+def muxer_src_pad_buffer_probe(pad, info, u_data):
+    gst_buffer = info.get_buffer()
+    if gst_buffer:
+        # u_data is the metafanout.MetaFanOut, it adds the detections of the source branch
+        u_data.inject(pyds.gst_buffer_get_nvds_batch_meta(hash(gst_buffer)))
+    return Gst.PadProbeReturn.OK
+
+
+Branch = namedtuple("Branch", ["index", "drawer", "comparison", "trajectory_store"])
+
+
+def configure_tracker(tracker, config_file: str):
+    """
+    Sets the properties of a tracker from the [tracker] section of a configuration file.
+
+    :param tracker: the nvtracker element
+    :param config_file: path to the configuration file
+    :return: nothing
+    """
+    tracker_config = configparser.ConfigParser()
+    if not tracker_config.read(config_file):
+        raise RuntimeError(f"Tracker configuration file '{config_file}' does not exist")
+
+    for key in tracker_config["tracker"]:
+        if key in ("ll-lib-file", "ll-config-file"):
+            tracker.set_property(key, tracker_config.get("tracker", key))
+        else:
+            tracker.set_property(key, tracker_config.getint("tracker", key))
+
+
 class Player(object):
     """
     A simple Player-class that processes files with h264 encoded video content.
     """
 
-    def __init__(self, dump_dot_file=False):
+    def __init__(self, tracker_configs, dump_dot_file=False):
+        """
+        :param tracker_configs: tracker configuration files, one tracker branch is created for each
+        :param dump_dot_file: dump a dot file of the pipeline
+        """
 
         # Initialize gst
         Gst.init(None)
@@ -274,59 +164,20 @@ class Player(object):
         self.video_queue = gsthelpers.create_element("queue", "video-queue")
         self.h264_parser = gsthelpers.create_element("h264parse", "h264-parser")
         self.h264_decoder = gsthelpers.create_element("nvv4l2decoder", "h264-decoder")
-        self.stream_muxer_1 = gsthelpers.create_element("nvstreammux", "stream-muxer-1")
-        self.stream_muxer_2 = gsthelpers.create_element("nvstreammux", "stream-muxer-2")
         self.tee = gsthelpers.create_element("tee", "tee")
-        # Processing branch 1
-        self.primary_inference_1 = gsthelpers.create_element(
-            "nvinfer", "primary-1-inference"
-        )
-        self.secondary1_inference_1 = gsthelpers.create_element(
-            "nvinfer", "secondary1-inference-1"
-        )
-        self.secondary2_inference_1 = gsthelpers.create_element(
-            "nvinfer", "secondary2-inference-1"
-        )
-        self.secondary3_inference_1 = gsthelpers.create_element(
-            "nvinfer", "secondary3-inference-1"
-        )
-        self.tracker_1 = gsthelpers.create_element("nvtracker", "tracker-1")
-        # Processing branch 2
-        self.primary_inference_2 = gsthelpers.create_element(
-            "nvinfer", "primary-2-inference"
-        )
-        self.secondary1_inference_2 = gsthelpers.create_element(
-            "nvinfer", "secondary1-inference-2"
-        )
-        self.secondary2_inference_2 = gsthelpers.create_element(
-            "nvinfer", "secondary2-inference-2"
-        )
-        self.secondary3_inference_2 = gsthelpers.create_element(
-            "nvinfer", "secondary3-inference-2"
+        # Inference, only in the first branch
+        self.primary_inference = gsthelpers.create_element(
+            "nvinfer", "primary-inference"
         )
-        self.tracker_2 = gsthelpers.create_element("nvtracker", "tracker-2")
-        # Video sink branch 1
-        self.video_converter_1 = gsthelpers.create_element(
-            "nvvideoconvert", "video-converter-1"
+        self.secondary1_inference = gsthelpers.create_element(
+            "nvinfer", "secondary1-inference"
         )
-        self.osd_1 = gsthelpers.create_element("nvdsosd", "nvidia-bounding-box-draw-1")
-        self.videosink_queue_1 = gsthelpers.create_element("queue", "videosink-queue-1")
-        self.video_sink_1 = gsthelpers.create_element(
-            "nveglglessink", "nvvideo-renderer-1"
+        self.secondary2_inference = gsthelpers.create_element(
+            "nvinfer", "secondary2-inference"
         )
-        # Video sink branch 2
-        self.video_converter_2 = gsthelpers.create_element(
-            "nvvideoconvert", "video-converter-2"
+        self.secondary3_inference = gsthelpers.create_element(
+            "nvinfer", "secondary3-inference"
         )
-        self.osd_2 = gsthelpers.create_element("nvdsosd", "nvidia-bounding-box-draw-2")
-        self.videosink_queue_2 = gsthelpers.create_element("queue", "videosink-queue-2")
-        self.video_sink_2 = gsthelpers.create_element(
-            "nveglglessink", "nvvideo-renderer-2"
-        )
-
-        # Processing queues
-        self.queue_1 = gsthelpers.create_element("queue", "queue-1")
-        self.queue_2 = gsthelpers.create_element("queue", "queue-2")
 
         # Add elements to the pipeline
         self.pipeline.add(self.source)
@@ -335,144 +186,33 @@ class Player(object):
         self.pipeline.add(self.h264_parser)
         self.pipeline.add(self.h264_decoder)
         self.pipeline.add(self.tee)
-        self.pipeline.add(self.stream_muxer_1)
-        self.pipeline.add(self.stream_muxer_2)
-        self.pipeline.add(self.primary_inference_1)
-        self.pipeline.add(self.secondary1_inference_1)
-        self.pipeline.add(self.secondary2_inference_1)
-        self.pipeline.add(self.secondary3_inference_1)
-        self.pipeline.add(self.tracker_1)
-        self.pipeline.add(self.primary_inference_2)
-        self.pipeline.add(self.secondary1_inference_2)
-        self.pipeline.add(self.secondary2_inference_2)
-        self.pipeline.add(self.secondary3_inference_2)
-        self.pipeline.add(self.tracker_2)
-        # Video sink branch 1
-        self.pipeline.add(self.video_converter_1)
-        self.pipeline.add(self.osd_1)
-        self.pipeline.add(self.videosink_queue_1)
-        self.pipeline.add(self.video_sink_1)
-        # Video sink branch 2
-        self.pipeline.add(self.video_converter_2)
-        self.pipeline.add(self.osd_2)
-        self.pipeline.add(self.videosink_queue_2)
-        self.pipeline.add(self.video_sink_2)
-        # Processing queues
-        self.pipeline.add(self.queue_1)
-        self.pipeline.add(self.queue_2)
-
-        # Set properties for the streammux
-        self.stream_muxer_1.set_property("width", 1920)
-        self.stream_muxer_1.set_property("height", 1080)
-        self.stream_muxer_1.set_property("batch-size", 1)
-        self.stream_muxer_1.set_property("batched-push-timeout", 4000000)
-        self.stream_muxer_2.set_property("width", 1920)
-        self.stream_muxer_2.set_property("height", 1080)
-        self.stream_muxer_2.set_property("batch-size", 1)
-        self.stream_muxer_2.set_property("batched-push-timeout", 4000000)
-
-        # Set properties for the inference engines in processing branch 1
-        self.primary_inference_1.set_property("config-file-path", "pgie_config_1.txt")
-        self.secondary1_inference_1.set_property(
-            "config-file-path", "sgie1_config_1.txt"
-        )
-        self.secondary2_inference_1.set_property(
-            "config-file-path", "sgie2_config_1.txt"
-        )
-        self.secondary3_inference_1.set_property(
-            "config-file-path", "sgie3_config_1.txt"
-        )
-
-        # Set properties for the inference engines in processing branch 2
-        self.primary_inference_2.set_property("config-file-path", "pgie_config_2.txt")
-        self.secondary1_inference_2.set_property(
-            "config-file-path", "sgie1_config_2.txt"
-        )
-        self.secondary2_inference_2.set_property(
-            "config-file-path", "sgie2_config_2.txt"
-        )
-        self.secondary3_inference_2.set_property(
-            "config-file-path", "sgie3_config_2.txt"
-        )
+        self.pipeline.add(self.primary_inference)
+        self.pipeline.add(self.secondary1_inference)
+        self.pipeline.add(self.secondary2_inference)
+        self.pipeline.add(self.secondary3_inference)
 
-        # Set properties for the tracker_1
-        tracker_config = configparser.ConfigParser()
-        tracker_config.read("tracker_config_1.txt")
-        tracker_config.sections()
-
-        for key in tracker_config["tracker"]:
-            if key == "tracker-width":
-                tracker_width = tracker_config.getint("tracker", key)
-                self.tracker_1.set_property("tracker-width", tracker_width)
-            if key == "tracker-height":
-                tracker_height = tracker_config.getint("tracker", key)
-                self.tracker_1.set_property("tracker-height", tracker_height)
-            if key == "gpu-id":
-                tracker_gpu_id = tracker_config.getint("tracker", key)
-                self.tracker_1.set_property("gpu_id", tracker_gpu_id)
-            if key == "ll-lib-file":
-                tracker_ll_lib_file = tracker_config.get("tracker", key)
-                self.tracker_1.set_property("ll-lib-file", tracker_ll_lib_file)
-            if key == "ll-config-file":
-                tracker_ll_config_file = tracker_config.get("tracker", key)
-                self.tracker_1.set_property("ll-config-file", tracker_ll_config_file)
-            if key == "enable-batch-process":
-                tracker_enable_batch_process = tracker_config.getint("tracker", key)
-                self.tracker_1.set_property(
-                    "enable_batch_process", tracker_enable_batch_process
-                )
-            if key == "enable-past-frame":
-                tracker_enable_past_frame = tracker_config.getint("tracker", key)
-                self.tracker_1.set_property(
-                    "enable_past_frame", tracker_enable_past_frame
-                )
-
-        # Set properties for the tracker_2
-        tracker_config.read("tracker_config_2.txt")
-        tracker_config.sections()
-
-        for key in tracker_config["tracker"]:
-            if key == "tracker-width":
-                tracker_width = tracker_config.getint("tracker", key)
-                self.tracker_2.set_property("tracker-width", tracker_width)
-            if key == "tracker-height":
-                tracker_height = tracker_config.getint("tracker", key)
-                self.tracker_2.set_property("tracker-height", tracker_height)
-            if key == "gpu-id":
-                tracker_gpu_id = tracker_config.getint("tracker", key)
-                self.tracker_2.set_property("gpu_id", tracker_gpu_id)
-            if key == "ll-lib-file":
-                tracker_ll_lib_file = tracker_config.get("tracker", key)
-                self.tracker_2.set_property("ll-lib-file", tracker_ll_lib_file)
-            if key == "ll-config-file":
-                tracker_ll_config_file = tracker_config.get("tracker", key)
-                self.tracker_2.set_property("ll-config-file", tracker_ll_config_file)
-            if key == "enable-batch-process":
-                tracker_enable_batch_process = tracker_config.getint("tracker", key)
-                self.tracker_2.set_property(
-                    "enable_batch_process", tracker_enable_batch_process
-                )
-            if key == "enable-past-frame":
-                tracker_enable_past_frame = tracker_config.getint("tracker", key)
-                self.tracker_2.set_property(
-                    "enable_past_frame", tracker_enable_past_frame
-                )
+        # Set properties for the inference engines
+        self.primary_inference.set_property("config-file-path", "pgie_config_1.txt")
+        self.secondary1_inference.set_property("config-file-path", "sgie1_config_1.txt")
+        self.secondary2_inference.set_property("config-file-path", "sgie2_config_1.txt")
+        self.secondary3_inference.set_property("config-file-path", "sgie3_config_1.txt")
 
         # ----------------------
         # PIPELINE DESCRIPTION
         # ----------------------
         # It appears that you need to have the nvstreammux components on each processing pipeline in order for the
-        # nvtracker to work properly.
+        # nvtracker to work properly. Each branch therefore has its own streammux and batch meta-data, and the
+        # primary inference runs only in branch 1. Its detections are copied into the meta-data of the other
+        # branches before their trackers by a metafanout.MetaFanOut.
         #
         #                                                                |-> queue_1 -> streammux_1 -> pipeline-1
         # filesrc -> demux -> queue -> h264parser -> h264decoder -> tee -|
-        #                                                                |-> queue_2 -> streammux_2 -> pipeline-2
+        #                                                                |-> queue_N -> streammux_N -> pipeline-N
         #
-        # pipeline-1 -> primary_inference_1 -> tracker_1 -> secondary_inference_1_1 -> secondary_inference_2_1
-        #   -> secondary_inference_3_1 -> videoconverter_1 -> osd_1 -> queue -> videosink_1
+        # pipeline-1 -> primary_inference (record detections) -> tracker_1 -> secondary_inference_1
+        #   -> secondary_inference_2 -> secondary_inference_3 -> videoconverter_1 -> osd_1 -> queue -> videosink_1
         #
-        # pipeline-2 -> primary_inference_2 -> tracker_2 -> secondary_inference_1_2 -> secondary_inference_2_2
-        #   -> secondary_inference_3_2 -> videoconverter_2 -> osd_2 -> queue -> videosink_2
+        # pipeline-N -> (inject detections) -> tracker_N -> videoconverter_N -> osd_N -> queue -> videosink_N
 
         # --- LINK IMAGE PROCESSING ---
         # Link source to demuxer
@@ -488,80 +228,112 @@ class Player(object):
             [self.video_queue, self.h264_parser, self.h264_decoder, self.tee]
         )
 
-        # Link tee to queue_1
-        source = self.tee.get_request_pad("src_0")
-        assert source is not None
-        sink = self.queue_1.get_static_pad("sink")
-        assert sink is not None
-        assert source.link(sink) == Gst.PadLinkReturn.OK
+        # --- TRACKER BRANCHES ---
+        # With a single branch no branch copies the detections, so none are recorded
+        self.fan_out = (
+            metafanout.MetaFanOut(num_targets=len(tracker_configs) - 1)
+            if len(tracker_configs) > 1
+            else None
+        )
+        self.comparison = metafanout.TrackerComparison(tracker_configs)
+        self.branches = []
+        for i, tracker_config in enumerate(tracker_configs):
+            self.branches.append(self.create_branch(i, tracker_config))
 
-        # Link queue_1 to stream_muxer_1
-        source = self.queue_1.get_static_pad("src")
-        assert source is not None
-        sink = self.stream_muxer_1.get_request_pad("sink_0")
-        assert sink is not None
-        assert source.link(sink) == Gst.PadLinkReturn.OK
+        if dump_dot_file:
+            Gst.debug_bin_to_dot_file(
+                self.pipeline, Gst.DebugGraphDetails.ALL, "gst-tracking-parallel"
+            )
+
+    def create_branch(self, i: int, tracker_config: str) -> Branch:
+        """
+        Creates and links a tracker branch after the tee.
+
+        :param i: index of the branch, the first branch runs the inference
+        :param tracker_config: tracker configuration file
+        :return: the branch
+        """
+        n = i + 1
+        queue = gsthelpers.create_element("queue", f"queue-{n}")
+        stream_muxer = gsthelpers.create_element("nvstreammux", f"stream-muxer-{n}")
+        tracker = gsthelpers.create_element("nvtracker", f"tracker-{n}")
+        video_converter = gsthelpers.create_element(
+            "nvvideoconvert", f"video-converter-{n}"
+        )
+        osd = gsthelpers.create_element("nvdsosd", f"nvidia-bounding-box-draw-{n}")
+        videosink_queue = gsthelpers.create_element("queue", f"videosink-queue-{n}")
+        video_sink = gsthelpers.create_element("nveglglessink", f"nvvideo-renderer-{n}")
+
+        for element in (
+            queue,
+            stream_muxer,
+            tracker,
+            video_converter,
+            osd,
+            videosink_queue,
+            video_sink,
+        ):
+            self.pipeline.add(element)
+
+        # Set properties for the streammux
+        stream_muxer.set_property("width", 1920)
+        stream_muxer.set_property("height", 1080)
+        stream_muxer.set_property("batch-size", 1)
+        stream_muxer.set_property("batched-push-timeout", 4000000)
 
-        # Link tee to queue_2
-        source = self.tee.get_request_pad("src_1")
+        configure_tracker(tracker, tracker_config)
+
+        # Link tee to queue
+        source = self.tee.get_request_pad(f"src_{i}")
         assert source is not None
-        sink = self.queue_2.get_static_pad("sink")
+        sink = queue.get_static_pad("sink")
         assert sink is not None
         assert source.link(sink) == Gst.PadLinkReturn.OK
 
-        # Link queue_2 to stream_muxer_2
-        source = self.queue_2.get_static_pad("src")
+        # Link queue to stream_muxer
+        source = queue.get_static_pad("src")
         assert source is not None
-        sink = self.stream_muxer_2.get_request_pad("sink_0")
+        sink = stream_muxer.get_request_pad("sink_0")
         assert sink is not None
         assert source.link(sink) == Gst.PadLinkReturn.OK
 
-        # --- LINK FIRST IMAGE PROCESSING PIPELINE ---
-        gsthelpers.link_elements(
-            [
-                self.stream_muxer_1,
-                self.primary_inference_1,
-                self.tracker_1,
-                self.secondary1_inference_1,
-                self.secondary2_inference_1,
-                self.secondary3_inference_1,
-                self.video_converter_1,
-                self.osd_1,
-                self.videosink_queue_1,
-                self.video_sink_1,
-            ]
-        )
-
-        # --- LINK SECOND IMAGE PROCESSING PIPELINE ---
-        gsthelpers.link_elements(
-            [
-                self.stream_muxer_2,
-                self.primary_inference_2,
-                self.tracker_2,
-                self.secondary1_inference_2,
-                self.secondary2_inference_2,
-                self.secondary3_inference_2,
-                self.video_converter_2,
-                self.osd_2,
-                self.videosink_queue_2,
-                self.video_sink_2,
-            ]
-        )
+        if i == 0:
+            # Run the inference, and keep the detections for the other branches
+            gsthelpers.link_elements(
+                [
+                    stream_muxer,
+                    self.primary_inference,
+                    tracker,
+                    self.secondary1_inference,
+                    self.secondary2_inference,
+                    self.secondary3_inference,
+                    video_converter,
+                ]
+            )
+            if self.fan_out is not None:
+                self.primary_inference.get_static_pad("src").add_probe(
+                    Gst.PadProbeType.BUFFER, detector_src_pad_buffer_probe, self.fan_out
+                )
+        else:
+            # Copy the detections of the first branch
+            gsthelpers.link_elements([stream_muxer, tracker, video_converter])
+            stream_muxer.get_static_pad("src").add_probe(
+                Gst.PadProbeType.BUFFER, muxer_src_pad_buffer_probe, self.fan_out
+            )
+        gsthelpers.link_elements([video_converter, osd, videosink_queue, video_sink])
 
         # --- Meta-data output ---
         # Add a probe to the sink pad of the osd-element in order to draw/print meta-data to the canvas
-        osdsinkpad = self.osd_1.get_static_pad("sink")
-        assert osdsinkpad is not None
-        osdsinkpad.add_probe(Gst.PadProbeType.BUFFER, osd_sink_pad_buffer_probe, 0)
-
-        osdsinkpad = self.osd_2.get_static_pad("sink")
+        branch = Branch(
+            i,
+            osdmeta.OSDObjectDrawer(ColorList, CLASS_NAMES),
+            self.comparison,
+            trajectorystore.TrajectoryStore(history=64),
+        )
+        osdsinkpad = osd.get_static_pad("sink")
         assert osdsinkpad is not None
-        osdsinkpad.add_probe(Gst.PadProbeType.BUFFER, osd_sink_pad_buffer_probe, 0)
-
-        if dump_dot_file:
-            Gst.debug_bin_to_dot_file(
-                self.pipeline, Gst.DebugGraphDetails.ALL, "gst-tracking-parallel"
-            )
+        osdsinkpad.add_probe(Gst.PadProbeType.BUFFER, osd_sink_pad_buffer_probe, branch)
+        return branch
 
     def play(self, input_file: str):
         """
@@ -598,6 +370,20 @@ class Player(object):
         print("Setting pipeline state to NULL...", end="")
         self.pipeline.set_state(Gst.State.NULL)
         print("done")
+        for branch in self.branches:
+            if len(branch.trajectory_store):
+                branch.trajectory_store.flush(
+                    TRAJECTORY_FILE.format(branch=branch.index + 1)
+                )
+        self.comparison.write(COMPARISON_FILE)
+        for result in self.comparison.summary():
+            print(
+                f"{result['name']}: {result['tracks']} tracks, mean length {result['mean_track_length']:.1f} frames"
+            )
+        if self.fan_out is not None:
+            print(
+                f"Detections copied to the tracker branches: {self.fan_out.injected}, missed: {self.fan_out.missed}"
+            )
         self.loop.quit()
 
     def on_message(self, bus, message):
@@ -633,6 +419,13 @@ class Player(object):
 if __name__ == "__main__":
     argParser = argparse.ArgumentParser()
     argParser.add_argument("-i", "--input_file", help="input file path", default="")
+    argParser.add_argument(
+        "-t",
+        "--tracker_configs",
+        nargs="+",
+        help="tracker configuration files, one tracker branch per file",
+        default=["tracker_config_1.txt", "tracker_config_2.txt"],
+    )
     argParser.add_argument(
         "-d",
         "--dump_dot_file",
@@ -645,7 +438,7 @@ if __name__ == "__main__":
         os.environ["GST_DEBUG_DUMP_DOT_DIR"] = str(os.getcwd())
         os.putenv("GST_DEBUG_DUMP_DIR_DIR", str(os.getcwd()))
 
-    player = Player(args.dump_dot_file)
+    player = Player(args.tracker_configs, args.dump_dot_file)
     try:
         player.play(args.input_file)
     except Exception as e:
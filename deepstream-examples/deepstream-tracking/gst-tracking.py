@@ -22,7 +22,7 @@ import os
 import sys
 import signal
 import pyds
-from helpers import gsthelpers
+from helpers import pipelinebuilder, probescheduler, trajectorystore
 import gi
 
 gi.require_version("Gst", "1.0")
@@ -34,6 +34,23 @@ PGIE_CLASS_ID_PERSON = 2
 PGIE_CLASS_ID_ROADSIGN = 3
 past_tracking_meta = [0]
 
+# Past-frame tracking meta is collected into a trajectory store, which is written to
+# TRAJECTORY_FILE when the pipeline stops
+TRAJECTORY_FILE = "trajectories.npz"
+trajectory_store = trajectorystore.TrajectoryStore(history=64)
+
+# Probes print from a background thread, so the streaming thread never waits for the terminal
+probe_log = probescheduler.BackgroundLogWriter()
+
+# Tracker settings in dstest2_tracker_config.txt that are integers
+TRACKER_INT_PROPERTIES = (
+    "tracker-width",
+    "tracker-height",
+    "gpu-id",
+    "enable-batch-process",
+    "enable-past-frame",
+)
+
 
 # This function is copied from:
 # https://github.com/NVIDIA-AI-IOT/deepstream_python_apps/blob/master/apps/deepstream-test2/deepstream_test_2.py
@@ -116,62 +133,17 @@ def osd_sink_pad_buffer_probe(pad, info, u_data):
         # set(red, green, blue, alpha); set to Black
         py_nvosd_text_params.text_bg_clr.set(0.0, 0.0, 0.0, 1.0)
         # Using pyds.get_string() to get display_text as string
-        print(pyds.get_string(py_nvosd_text_params.display_text))
+        probe_log.write(pyds.get_string(py_nvosd_text_params.display_text))
         pyds.nvds_add_display_meta_to_frame(frame_meta, display_meta)
         try:
             l_frame = l_frame.next
         except StopIteration:
             break
 
-    # past tracking meta data
+    # Past tracking meta data
     if past_tracking_meta[0] == 1:
-        l_user = batch_meta.batch_user_meta_list
-        while l_user is not None:
-            try:
-                # Note that l_user.data needs a cast to pyds.NvDsUserMeta
-                # The casting is done by pyds.NvDsUserMeta.cast()
-                # The casting also keeps ownership of the underlying memory
-                # in the C code, so the Python garbage collector will leave
-                # it alone
-                user_meta = pyds.NvDsUserMeta.cast(l_user.data)
-            except StopIteration:
-                break
-            if (
-                user_meta
-                and user_meta.base_meta.meta_type
-                == pyds.NvDsMetaType.NVDS_TRACKER_PAST_FRAME_META
-            ):
-                try:
-                    # Note that user_meta.user_meta_data needs a cast to pyds.NvDsPastFrameObjBatch
-                    # The casting is done by pyds.NvDsPastFrameObjBatch.cast()
-                    # The casting also keeps ownership of the underlying memory
-                    # in the C code, so the Python garbage collector will leave
-                    # it alone
-                    pPastFrameObjBatch = pyds.NvDsPastFrameObjBatch.cast(
-                        user_meta.user_meta_data
-                    )
-                except StopIteration:
-                    break
-                for trackobj in pyds.NvDsPastFrameObjBatch.list(pPastFrameObjBatch):
-                    print("streamId=", trackobj.streamID)
-                    print("surfaceStreamID=", trackobj.surfaceStreamID)
-                    for pastframeobj in pyds.NvDsPastFrameObjStream.list(trackobj):
-                        print("numobj=", pastframeobj.numObj)
-                        print("uniqueId=", pastframeobj.uniqueId)
-                        print("classId=", pastframeobj.classId)
-                        print("objLabel=", pastframeobj.objLabel)
-                        for objlist in pyds.NvDsPastFrameObjList.list(pastframeobj):
-                            print("frameNum:", objlist.frameNum)
-                            print("tBbox.left:", objlist.tBbox.left)
-                            print("tBbox.width:", objlist.tBbox.width)
-                            print("tBbox.top:", objlist.tBbox.top)
-                            print("tBbox.right:", objlist.tBbox.height)
-                            print("confidence:", objlist.confidence)
-                            print("age:", objlist.age)
-            try:
-                l_user = l_user.next
-            except StopIteration:
-                break
+        trajectory_store.add_past_frame_meta(batch_meta)
+
     return Gst.PadProbeReturn.OK
 
 
@@ -193,220 +165,106 @@ class Player(object):
         signal.signal(signal.SIGTERM, self.stop_handler)
         signal.signal(signal.SIGHUP, self.stop_handler)
 
-        # Create an empty pipeline
-        self.pipeline = Gst.Pipeline.new("video-pipeline")
-        assert self.pipeline is not None
-
-        # Create all the elements
-        self.source = gsthelpers.create_element("filesrc", "source")
-        self.demuxer = gsthelpers.create_element("qtdemux", "demuxer")
-        self.video_queue = gsthelpers.create_element("queue", "video-queue")
-        self.h264_parser = gsthelpers.create_element("h264parse", "h264-parser")
-        self.h264_decoder = gsthelpers.create_element("nvv4l2decoder", "h264-decoder")
-        self.stream_muxer = gsthelpers.create_element("nvstreammux", "stream-muxer")
-        self.primary_inference = gsthelpers.create_element(
-            "nvinfer", "primary-inference"
-        )
-        self.tracker = gsthelpers.create_element("nvtracker", "tracker")
-        self.secondary1_inference = gsthelpers.create_element(
-            "nvinfer", "secondary1-inference"
-        )
-        self.secondary2_inference = gsthelpers.create_element(
-            "nvinfer", "secondary2-inference"
-        )
-        self.secondary3_inference = gsthelpers.create_element(
-            "nvinfer", "secondary3-inference"
-        )
-        self.video_converter = gsthelpers.create_element(
-            "nvvideoconvert", "video-converter"
-        )
-        self.osd = gsthelpers.create_element("nvdsosd", "nvidia-bounding-box-draw")
-        self.tee = gsthelpers.create_element("tee", "tee")
-        # Video sink branch
-        self.videosink_queue = gsthelpers.create_element("queue", "videosink-queue")
-        self.video_sink = gsthelpers.create_element("nveglglessink", "nvvideo-renderer")
-        # File sink branch
-        self.filesink_queue = gsthelpers.create_element("queue", "filesink-queue")
-        self.file_sink_converter = gsthelpers.create_element(
-            "nvvideoconvert", "file-sink-videoconverter"
-        )
-        self.file_sink_encoder = gsthelpers.create_element(
-            "nvv4l2h264enc", "file-sink-encoder"
-        )
-        self.file_sink_parser = gsthelpers.create_element(
-            "h264parse", "file-sink-parser"
-        )
-        self.file_sink_muxer = gsthelpers.create_element(
-            "matroskamux", "file-sink-muxer"
-        )
-        self.file_sink = gsthelpers.create_element("filesink", "file-sink")
-
-        # Add elements to the pipeline
-        self.pipeline.add(self.source)
-        self.pipeline.add(self.demuxer)
-        self.pipeline.add(self.video_queue)
-        self.pipeline.add(self.h264_parser)
-        self.pipeline.add(self.h264_decoder)
-        self.pipeline.add(self.stream_muxer)
-        self.pipeline.add(self.primary_inference)
-        self.pipeline.add(self.tracker)
-        self.pipeline.add(self.secondary1_inference)
-        self.pipeline.add(self.secondary2_inference)
-        self.pipeline.add(self.secondary3_inference)
-        self.pipeline.add(self.video_converter)
-        self.pipeline.add(self.osd)
-        self.pipeline.add(self.tee)
-        # Video sink branch
-        self.pipeline.add(self.videosink_queue)
-        self.pipeline.add(self.video_sink)
-        # File sink branch
-        self.pipeline.add(self.filesink_queue)
-        self.pipeline.add(self.file_sink_converter)
-        self.pipeline.add(self.file_sink_encoder)
-        self.pipeline.add(self.file_sink_parser)
-        self.pipeline.add(self.file_sink_muxer)
-        self.pipeline.add(self.file_sink)
-
-        # Set properties for the streammux
-        self.stream_muxer.set_property("width", 1920)
-        self.stream_muxer.set_property("height", 1080)
-        self.stream_muxer.set_property("batch-size", 1)
-        self.stream_muxer.set_property("batched-push-timeout", 4000000)
-
-        # Set properties for file_sink_encoder
-        self.file_sink_encoder.set_property("profile", 4)
-
-        # Set properties for the inference engines
-        self.primary_inference.set_property(
-            "config-file-path", "dstest2_pgie_config.txt"
-        )
-        self.secondary1_inference.set_property(
-            "config-file-path", "dstest2_sgie1_config.txt"
-        )
-        self.secondary2_inference.set_property(
-            "config-file-path", "dstest2_sgie2_config.txt"
-        )
-        self.secondary3_inference.set_property(
-            "config-file-path", "dstest2_sgie3_config.txt"
-        )
-
         # Set properties for the tracker
         tracker_config = configparser.ConfigParser()
         tracker_config.read("dstest2_tracker_config.txt")
-        tracker_config.sections()
-
+        tracker_properties = {}
         for key in tracker_config["tracker"]:
-            if key == "tracker-width":
-                tracker_width = tracker_config.getint("tracker", key)
-                self.tracker.set_property("tracker-width", tracker_width)
-            if key == "tracker-height":
-                tracker_height = tracker_config.getint("tracker", key)
-                self.tracker.set_property("tracker-height", tracker_height)
-            if key == "gpu-id":
-                tracker_gpu_id = tracker_config.getint("tracker", key)
-                self.tracker.set_property("gpu_id", tracker_gpu_id)
-            if key == "ll-lib-file":
-                tracker_ll_lib_file = tracker_config.get("tracker", key)
-                self.tracker.set_property("ll-lib-file", tracker_ll_lib_file)
-            if key == "ll-config-file":
-                tracker_ll_config_file = tracker_config.get("tracker", key)
-                self.tracker.set_property("ll-config-file", tracker_ll_config_file)
-            if key == "enable-batch-process":
-                tracker_enable_batch_process = tracker_config.getint("tracker", key)
-                self.tracker.set_property(
-                    "enable_batch_process", tracker_enable_batch_process
-                )
-            if key == "enable-past-frame":
-                tracker_enable_past_frame = tracker_config.getint("tracker", key)
-                self.tracker.set_property(
-                    "enable_past_frame", tracker_enable_past_frame
-                )
-
-        # --- LINK IMAGE PROCESSING ---
-        # Link video input and inference as follows:
+            if key in TRACKER_INT_PROPERTIES:
+                tracker_properties[key] = tracker_config.getint("tracker", key)
+            elif key in ("ll-lib-file", "ll-config-file"):
+                tracker_properties[key] = tracker_config.get("tracker", key)
+
+        # Create, configure and link the pipeline:
         #
         # filesrc -> demux -> queue -> h264parser -> h264decoder -> streammux ->
         # primary_inference1 -> tracker -> secondary_inference1 -> secondary_inference2 -> secondary_inference3 ->
         # videoconverter -> osd (bounding boxes) -> tee
         #
-        # After the tee element we have two output branches that are described later.
-
-        # Link source to demuxer
-        gsthelpers.link_elements([self.source, self.demuxer])
-
-        # Connect demux to the pad-added signal, used to link demuxer to queue dynamically
-        demuxer_pad_added = gsthelpers.PadAddedLinkFunctor()
-        demuxer_pad_added.register("video_", self.video_queue, "sink")
-
-        assert self.demuxer.connect("pad-added", demuxer_pad_added) is not None
-
-        # Link video pipeline
-        gsthelpers.link_elements(
-            [self.video_queue, self.h264_parser, self.h264_decoder]
-        )
-
-        # Link decoder to streammux
-        source = self.h264_decoder.get_static_pad("src")
-        assert source is not None
-        sink = self.stream_muxer.get_request_pad("sink_0")
-        assert sink is not None
-        assert source.link(sink) == Gst.PadLinkReturn.OK
-
-        # Link inference, tracker and visualization
-        gsthelpers.link_elements(
-            [
-                self.stream_muxer,
-                self.primary_inference,
-                self.tracker,
-                self.secondary1_inference,
-                self.secondary2_inference,
-                self.secondary3_inference,
-                self.video_converter,
-                self.osd,
-                self.tee,
-            ]
-        )
-
-        # --- LINK OUTPUT BRANCHES ---
-        # We have two outputs, videosink and a filesink, as follows:
+        # After the tee element we have two outputs, videosink and a filesink, as follows:
         #
         #             |-> queue -> videosink
         # osd -> tee -|
         #             |-> queue -> videoconvert -> h264enc -> h264parse -> matroskamux -> filesink
-
-        # --- Video-sink output branch ---
-        src = self.tee.get_request_pad("src_0")
-        assert src is not None
-        sink = self.videosink_queue.get_static_pad("sink")
-        assert sink is not None
-        assert src.link(sink) == Gst.PadLinkReturn.OK
-
-        # Link video_queue to video_sink
-        gsthelpers.link_elements([self.videosink_queue, self.video_sink])
-
-        # --- File-sink output branch ---
-        src = self.tee.get_request_pad("src_1")
-        assert src is not None
-        sink = self.filesink_queue.get_static_pad("sink")
-        assert sink is not None
-        assert src.link(sink) == Gst.PadLinkReturn.OK
-
-        gsthelpers.link_elements(
-            [
-                self.filesink_queue,
-                self.file_sink_converter,
-                self.file_sink_encoder,
-                self.file_sink_parser,
-            ]
-        )
-
-        src = self.file_sink_parser.get_static_pad("src")
-        assert src is not None
-        sink = self.file_sink_muxer.get_request_pad("video_0")
-        assert sink is not None
-        assert src.link(sink) == Gst.PadLinkReturn.OK
-
-        gsthelpers.link_elements([self.file_sink_muxer, self.file_sink])
+        spec = {
+            "name": "video-pipeline",
+            "elements": [
+                {"factory": "filesrc", "name": "source"},
+                {"factory": "qtdemux", "name": "demuxer"},
+                {"factory": "queue", "name": "video-queue"},
+                {"factory": "h264parse", "name": "h264-parser"},
+                {"factory": "nvv4l2decoder", "name": "h264-decoder"},
+                {
+                    "factory": "nvstreammux",
+                    "name": "stream-muxer",
+                    "properties": {
+                        "width": 1920,
+                        "height": 1080,
+                        "batch-size": 1,
+                        "batched-push-timeout": 4000000,
+                    },
+                },
+                {
+                    "factory": "nvinfer",
+                    "name": "primary-inference",
+                    "properties": {"config-file-path": "dstest2_pgie_config.txt"},
+                },
+                {
+                    "factory": "nvtracker",
+                    "name": "tracker",
+                    "properties": tracker_properties,
+                },
+                {
+                    "factory": "nvinfer",
+                    "name": "secondary1-inference",
+                    "properties": {"config-file-path": "dstest2_sgie1_config.txt"},
+                },
+                {
+                    "factory": "nvinfer",
+                    "name": "secondary2-inference",
+                    "properties": {"config-file-path": "dstest2_sgie2_config.txt"},
+                },
+                {
+                    "factory": "nvinfer",
+                    "name": "secondary3-inference",
+                    "properties": {"config-file-path": "dstest2_sgie3_config.txt"},
+                },
+                {"factory": "nvvideoconvert", "name": "video-converter"},
+                {"factory": "nvdsosd", "name": "nvidia-bounding-box-draw"},
+                {"factory": "tee", "name": "tee"},
+                # Video sink branch
+                {"factory": "queue", "name": "videosink-queue"},
+                {"factory": "nveglglessink", "name": "nvvideo-renderer"},
+                # File sink branch
+                {"factory": "queue", "name": "filesink-queue"},
+                {"factory": "nvvideoconvert", "name": "file-sink-videoconverter"},
+                {
+                    "factory": "nvv4l2h264enc",
+                    "name": "file-sink-encoder",
+                    "properties": {"profile": 4},
+                },
+                {"factory": "h264parse", "name": "file-sink-parser"},
+                {"factory": "matroskamux", "name": "file-sink-muxer"},
+                {"factory": "filesink", "name": "file-sink"},
+            ],
+            "links": [
+                "source ! demuxer",
+                "demuxer.video_%u ! video-queue ! h264-parser ! h264-decoder ! stream-muxer.sink_0",
+                "stream-muxer ! primary-inference ! tracker ! secondary1-inference ! secondary2-inference "
+                "! secondary3-inference ! video-converter ! nvidia-bounding-box-draw ! tee",
+                "tee.src_0 ! videosink-queue ! nvvideo-renderer",
+                "tee.src_1 ! filesink-queue ! file-sink-videoconverter ! file-sink-encoder ! file-sink-parser "
+                "! file-sink-muxer.video_0",
+                "file-sink-muxer ! file-sink",
+            ],
+        }
+        built = pipelinebuilder.build_pipeline(spec)
+        print(f"Pipeline built in {built.timings['total_ms']:.1f} ms")
+        self.pipeline = built.pipeline
+        self.source = built["source"]
+        self.tracker = built["tracker"]
+        self.osd = built["nvidia-bounding-box-draw"]
+        self.file_sink = built["file-sink"]
 
         # --- Meta-data output ---
         # Add a probe to the sink pad of the osd-element in order to draw/print meta-data to the canvas
@@ -453,6 +311,9 @@ class Player(object):
         print("Setting pipeline state to NULL...", end="")
         self.pipeline.set_state(Gst.State.NULL)
         print("done")
+        if len(trajectory_store):
+            trajectory_store.flush(TRAJECTORY_FILE)
+        probe_log.close()
         self.loop.quit()
 
     def on_message(self, bus, message):
@@ -24,22 +24,31 @@ In order to process a single video file:
 In order to process several video files:
 >> python3 gst-triton-tracking-v1.py -u \
   /opt/nvidia/deepstream/deepstream/samples/streams/sample_1080p_h264.mp4,/opt/nvidia/deepstream/deepstream/samples/streams/sample_1080p_h265.mp4
+
+Streams can be added and removed while the pipeline runs, through a local control API:
+>> python3 gst-triton-parallel-tracking-v1.py -u file:///opt/nvidia/deepstream/deepstream/samples/streams/sample_1080p_h264.mp4 \
+  --control-port 8556
+>> curl localhost:8556/streams
+>> curl -X POST localhost:8556/streams -d '{"uri": "file:///opt/nvidia/deepstream/deepstream/samples/streams/sample_1080p_h265.mp4"}'
+>> curl -X DELETE localhost:8556/streams/1
 """
 
 import platform
+import json
+import threading
+import urllib.request
 from urllib.parse import urlparse
 from collections import namedtuple
-from operator import attrgetter
 import argparse
 import configparser
 import os
 import sys
 import signal
 import pyds
-from helpers import gsthelpers
+from helpers import gsthelpers, osdmeta, streamcontrol, trajectorystore
 import gi
 import logging
-from typing import Any
+from typing import Any, Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -52,10 +61,11 @@ PGIE_CLASS_ID_PERSON = 2
 PGIE_CLASS_ID_ROADSIGN = 3
 past_tracking_meta = [0]
 
-MetaObject = namedtuple(
-    "MetaObject",
-    ["left", "top", "height", "width", "area", "bottom", "id", "text", "class_id"],
-)
+# Past-frame tracking meta is collected into a trajectory store, which is written to
+# TRAJECTORY_FILE when the pipeline stops
+TRAJECTORY_FILE = "trajectories.npz"
+trajectory_store = trajectorystore.TrajectoryStore(history=64)
+
 
 ColorObject = namedtuple("ColorObject", ["red", "green", "blue", "alpha"])
 
@@ -66,204 +76,54 @@ ColorList = {
     PGIE_CLASS_ID_ROADSIGN: ColorObject(red=1.0, green=0.0, blue=1.0, alpha=1.0),
 }
 
+# Classes counted on the frame info line
+CLASS_NAMES = {
+    PGIE_CLASS_ID_VEHICLE: "Vehicles",
+    PGIE_CLASS_ID_PERSON: "Persons",
+    PGIE_CLASS_ID_BICYCLE: "Bicycles",
+    PGIE_CLASS_ID_ROADSIGN: "Road Signs",
+}
+
 
 def osd_sink_pad_buffer_probe(
     pad: Gst.Pad, info: Gst.PadProbeIndo, u_data: Any
 ) -> Gst.PadProbeReturn:
-    frame_number = 0
-    obj_counter = {
-        PGIE_CLASS_ID_VEHICLE: 0,
-        PGIE_CLASS_ID_PERSON: 0,
-        PGIE_CLASS_ID_BICYCLE: 0,
-        PGIE_CLASS_ID_ROADSIGN: 0,
-    }
-    num_rects = 0
     gst_buffer = info.get_buffer()
     if not gst_buffer:
         print("Unable to get GstBuffer ")
         return
 
     batch_meta = pyds.gst_buffer_get_nvds_batch_meta(hash(gst_buffer))
-    l_frame = batch_meta.frame_meta_list
-    meta_list = []
-
-    while l_frame is not None:
-        try:
-            frame_meta = pyds.NvDsFrameMeta.cast(l_frame.data)
-        except StopIteration:
-            break
-
-        frame_number = frame_meta.frame_num
-        num_rects = frame_meta.num_obj_meta
-        l_obj = frame_meta.obj_meta_list
-
-        while l_obj is not None:
-            try:
-                obj_meta = pyds.NvDsObjectMeta.cast(l_obj.data)
-            except StopIteration:
-                break
-
-            obj_counter[obj_meta.class_id] += 1
-
-            obj = MetaObject(
-                left=obj_meta.tracker_bbox_info.org_bbox_coords.left,
-                top=obj_meta.tracker_bbox_info.org_bbox_coords.top,
-                height=obj_meta.tracker_bbox_info.org_bbox_coords.height,
-                width=obj_meta.tracker_bbox_info.org_bbox_coords.width,
-                area=obj_meta.tracker_bbox_info.org_bbox_coords.height
-                * obj_meta.tracker_bbox_info.org_bbox_coords.width,
-                bottom=obj_meta.tracker_bbox_info.org_bbox_coords.top
-                + obj_meta.tracker_bbox_info.org_bbox_coords.height,
-                id=obj_meta.object_id,
-                text=f"ID: {obj_meta.object_id:04d}, Class: {pyds.get_string(obj_meta.text_params.display_text)}",
-                class_id=obj_meta.class_id,
-            )
-            meta_list.append(obj)
-
-            obj_meta.text_params.display_text = ""
-            obj_meta.text_params.set_bg_clr = 0
-            obj_meta.rect_params.border_width = 0
-
-            try:
-                l_obj = l_obj.next
-            except StopIteration:
-                break
-
-        meta_list_sorted = sorted(meta_list, key=attrgetter("bottom"))
-        max_labels = 10  # Define a suitable number for max_labels
-        num_objects = len(meta_list_sorted)
-        num_meta_objects = (num_objects + max_labels - 1) // max_labels
-
-        # Create a single display_meta for the frame counter and object counts
-        display_meta_main = pyds.nvds_acquire_display_meta_from_pool(batch_meta)
-        display_meta_main.num_labels = 1
-        py_nvosd_text_params = display_meta_main.text_params[0]
-        py_nvosd_text_params.display_text = (
-            f"Frame Number={frame_number:05d}, Number of Objects={num_rects:04d}, "
-            f"Vehicles={obj_counter[PGIE_CLASS_ID_VEHICLE]:04d}, "
-            f"Persons={obj_counter[PGIE_CLASS_ID_PERSON]:04d}, "
-            f"Bicycles={obj_counter[PGIE_CLASS_ID_BICYCLE]:04d}, "
-            f"Road Signs={obj_counter[PGIE_CLASS_ID_ROADSIGN]:04d}"
-        )
-        py_nvosd_text_params.x_offset = 10
-        py_nvosd_text_params.y_offset = 12
-        py_nvosd_text_params.font_params.font_name = "Serif"
-        py_nvosd_text_params.font_params.font_size = 10
-        py_nvosd_text_params.font_params.font_color.set(1.0, 1.0, 1.0, 1.0)
-        py_nvosd_text_params.set_bg_clr = 1
-        py_nvosd_text_params.text_bg_clr.set(0.0, 0.0, 0.0, 1.0)
-        pyds.nvds_add_display_meta_to_frame(frame_meta, display_meta_main)
-
-        for i in range(num_meta_objects):
-            display_meta = pyds.nvds_acquire_display_meta_from_pool(batch_meta)
-            display_meta.num_labels = 0
-
-            start_idx = i * max_labels
-            end_idx = min((i + 1) * max_labels, num_objects)
-
-            for j, idx in enumerate(range(start_idx, end_idx)):
-                x = int(meta_list_sorted[idx].left)
-                y = int(meta_list_sorted[idx].top) - 15
-
-                if x < 0 or y < 0:
-                    continue
-
-                display_meta.text_params[
-                    display_meta.num_labels
-                ].display_text = meta_list_sorted[idx].text
-                display_meta.text_params[display_meta.num_labels].x_offset = x
-                display_meta.text_params[display_meta.num_labels].y_offset = y
-                display_meta.text_params[
-                    display_meta.num_labels
-                ].font_params.font_name = "Serif"
-                display_meta.text_params[
-                    display_meta.num_labels
-                ].font_params.font_size = 10
-                display_meta.text_params[
-                    display_meta.num_labels
-                ].font_params.font_color.set(1.0, 1.0, 1.0, 1.0)
-                display_meta.text_params[display_meta.num_labels].set_bg_clr = 1
-                display_meta.text_params[display_meta.num_labels].text_bg_clr.set(
-                    0.45, 0.20, 0.50, 0.75
-                )
-                display_meta.num_labels += 1
-
-            display_meta.num_rects = end_idx - start_idx
-            for j, idx in enumerate(range(start_idx, end_idx)):
-                red = ColorList[meta_list_sorted[idx].class_id].red
-                green = ColorList[meta_list_sorted[idx].class_id].green
-                blue = ColorList[meta_list_sorted[idx].class_id].blue
-                alpha = ColorList[meta_list_sorted[idx].class_id].alpha
-
-                display_meta.rect_params[j].left = meta_list_sorted[idx].left
-                display_meta.rect_params[j].top = meta_list_sorted[idx].top
-                display_meta.rect_params[j].width = meta_list_sorted[idx].width
-                display_meta.rect_params[j].height = meta_list_sorted[idx].height
-                display_meta.rect_params[j].border_width = 2
-                display_meta.rect_params[j].border_color.red = red
-                display_meta.rect_params[j].border_color.green = green
-                display_meta.rect_params[j].border_color.blue = blue
-                display_meta.rect_params[j].border_color.alpha = alpha
-                display_meta.rect_params[j].has_bg_color = 0
-
-            pyds.nvds_add_display_meta_to_frame(frame_meta, display_meta)
-
-        try:
-            l_frame = l_frame.next
-        except StopIteration:
-            break
+    # u_data is the osdmeta.OSDObjectDrawer of the osd, it draws objects further away from the camera first
+    u_data.process_batch(batch_meta)
 
     # Past tracking meta data
     if past_tracking_meta[0] == 1:
-        l_user = batch_meta.batch_user_meta_list
-        while l_user is not None:
-            try:
-                user_meta = pyds.NvDsUserMeta.cast(l_user.data)
-            except StopIteration:
-                break
-            if (
-                user_meta
-                and user_meta.base_meta.meta_type
-                == pyds.NvDsMetaType.NVDS_TRACKER_PAST_FRAME_META
-            ):
-                try:
-                    pPastFrameObjBatch = pyds.NvDsPastFrameObjBatch.cast(
-                        user_meta.user_meta_data
-                    )
-                except StopIteration:
-                    break
-                for trackobj in pyds.NvDsPastFrameObjBatch.list(pPastFrameObjBatch):
-                    print("streamId=", trackobj.streamID)
-                    print("surfaceStreamID=", trackobj.surfaceStreamID)
-                    for pastframeobj in pyds.NvDsPastFrameObjStream.list(trackobj):
-                        print("numobj=", pastframeobj.numObj)
-                        print("uniqueId=", pastframeobj.uniqueId)
-                        print("classId=", pastframeobj.classId)
-                        print("objLabel=", pastframeobj.objLabel)
-                        for objlist in pyds.NvDsPastFrameObjList.list(pastframeobj):
-                            print("frameNum:", objlist.frameNum)
-                            print("tBbox.left:", objlist.tBbox.left)
-                            print("tBbox.width:", objlist.tBbox.width)
-                            print("tBbox.top:", objlist.tBbox.top)
-                            print("tBbox.right:", objlist.tBbox.height)
-                            print("confidence:", objlist.confidence)
-                            print("age:", objlist.age)
-            try:
-                l_user = l_user.next
-            except StopIteration:
-                break
+        trajectory_store.add_past_frame_meta(batch_meta)
 
     return Gst.PadProbeReturn.OK
 
 
 class MultiPlayer:
-    def __init__(self, uri_list: str):
+    def __init__(
+        self,
+        uri_list: str,
+        max_streams: int = 16,
+        control_port: Optional[int] = None,
+        rest_port: int = 9000,
+    ):
         """MultiPlayer constructor.
 
         Parameters
         ----------
         uri_list : str
             A comma separated list of URIs
+        max_streams : int, optional
+            Maximum number of streams, and the maximum batch size, by default 16
+        control_port : int, optional
+            Port of the local control API for adding and removing streams, by default no API
+        rest_port : int, optional
+            Port of the REST server of nvmultiurisrcbin, by default 9000
         """
         Gst.init(None)
         self.loop = GLib.MainLoop()
@@ -275,7 +135,8 @@ class MultiPlayer:
         signal.signal(signal.SIGHUP, self.stop_handler)
 
         # If the uri_list contains files, check that these exist
-        for uri in uri_list.split(","):
+        uris = [uri for uri in uri_list.split(",") if uri]
+        for uri in uris:
             uri_parsed = urlparse(uri)
             if uri_parsed.scheme == "file":
                 if not os.path.exists(uri_parsed.path):
@@ -290,62 +151,212 @@ class MultiPlayer:
         nvmultiurisrcbin = gsthelpers.create_element(
             "nvmultiurisrcbin", "multiurisrcbin"
         )
-        demuxer = gsthelpers.create_element("nvstreamdemux", "demuxer")
+        self.demuxer = gsthelpers.create_element("nvstreamdemux", "demuxer")
 
         # Add elements to the pipeline
         self.pipeline.add(nvmultiurisrcbin)
-        self.pipeline.add(demuxer)
+        self.pipeline.add(self.demuxer)
 
-        # Set the multiurisrcbin properties
+        # Set the multiurisrcbin properties. The batch size of its muxer follows the number of
+        # streams up to max-batch-size, and streams are added and removed through its REST server.
         logger.info(f"URI-list: {uri_list}")
-        nvmultiurisrcbin.set_property("uri-list", uri_list)
+        nvmultiurisrcbin.set_property("uri-list", ",".join(uris))
+        nvmultiurisrcbin.set_property(
+            "sensor-id-list", ",".join(f"stream-{i}" for i in range(len(uris)))
+        )
+        nvmultiurisrcbin.set_property("max-batch-size", max_streams)
+        nvmultiurisrcbin.set_property("port", str(rest_port))
         nvmultiurisrcbin.set_property("width", 1920)
         nvmultiurisrcbin.set_property("height", 1080)
         nvmultiurisrcbin.set_property("live-source", 1)
+        self.rest_url = f"http://127.0.0.1:{rest_port}/api/v1/stream"
 
         # Link elements
-        gsthelpers.link_elements([nvmultiurisrcbin, demuxer])
+        gsthelpers.link_elements([nvmultiurisrcbin, self.demuxer])
+
+        # Streams by source id, the id is the index of the demuxer src pad
+        self.max_streams = max_streams
+        self.streams: Dict[int, dict] = {}
+        self.streams_lock = threading.Lock()
 
         # Create the image processing pipelines, one for each stream
-        for i, el in enumerate(uri_list.split(",")):
+        for i, el in enumerate(uris):
             logger.info(f"Connecting processing bin for stream {el}")
-
-            # Create elements
-            processing_bin = self.create_processing_bin()
-
-            # Add to the pipeline
-            self.pipeline.add(processing_bin)
-
-            # Connect tee to muxer
-            src = demuxer.get_request_pad(f"src_{i}")
-            if src is None:
-                logger.error(
-                    f"Failed to request 'src_{i}' pad from the demuxer for stream {el}"
-                )
-                sys.exit(-1)
-
-            sink = processing_bin.get_static_pad("sink")
-            if sink is None:
-                logger.error(
-                    f"Failed to get 'sink' pad from the processing bin for stream {el}"
-                )
+            try:
+                self.streams[i] = self._attach_processing_bin(i, el)
+            except RuntimeError as e:
+                logger.error(e)
                 sys.exit(-1)
 
-            if src.link(sink) != Gst.PadLinkReturn.OK:
-                logger.error(
-                    f"Failed to the demuxer to the processing bin for stream {el}"
-                )
-                sys.exit(-1)
-            else:
-                logger.info(
-                    f"Linked demuxer 'src_{i}' pad to the processing bin 'sink' pad for stream {el}"
-                )
+        self.control_server = None
+        if control_port is not None:
+            self.control_server = streamcontrol.StreamControlServer(
+                self.add_stream, self.remove_stream, self.list_streams, control_port
+            )
 
         # Get hold of the bus and add a watcher
         bus = self.pipeline.get_bus()
         bus.add_signal_watch()
         bus.connect("message", self.on_message)
 
+    def _attach_processing_bin(self, source_id: int, uri: str) -> dict:
+        """Creates a processing bin and links it to a demuxer src pad.
+
+        Parameters
+        ----------
+        source_id : int
+            Source id of the stream in nvmultiurisrcbin
+        uri : str
+            URI of the stream
+
+        Returns
+        -------
+        dict
+            The stream: uri, processing bin and demuxer src pad
+        """
+        processing_bin = self.create_processing_bin()
+        self.pipeline.add(processing_bin)
+
+        src = self.demuxer.get_request_pad(f"src_{source_id}")
+        if src is None:
+            self.pipeline.remove(processing_bin)
+            raise RuntimeError(
+                f"Failed to request 'src_{source_id}' pad from the demuxer for stream {uri}"
+            )
+
+        sink = processing_bin.get_static_pad("sink")
+        if src.link(sink) != Gst.PadLinkReturn.OK:
+            self.demuxer.release_request_pad(src)
+            self.pipeline.remove(processing_bin)
+            raise RuntimeError(
+                f"Failed to link the demuxer to the processing bin for stream {uri}"
+            )
+        logger.info(
+            f"Linked demuxer 'src_{source_id}' pad to the processing bin 'sink' pad for stream {uri}"
+        )
+        return {"uri": uri, "bin": processing_bin, "src_pad": src}
+
+    def _post_stream_change(self, change: str, source_id: int, uri: str) -> None:
+        """Sends a camera_add or camera_remove request to the REST server of nvmultiurisrcbin."""
+        endpoint = "add" if change == "camera_add" else "remove"
+        body = {
+            "key": "sensor",
+            "value": {
+                "camera_id": f"stream-{source_id}",
+                "camera_name": f"stream-{source_id}",
+                "camera_url": uri,
+                "change": change,
+                "metadata": {},
+            },
+            "headers": {"source": "gst-triton-parallel-tracking"},
+        }
+        request = urllib.request.Request(
+            f"{self.rest_url}/{endpoint}",
+            data=json.dumps(body).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=10.0):
+                pass
+        except OSError as e:
+            raise RuntimeError(f"nvmultiurisrcbin refused {change} of {uri}: {e}")
+
+    def add_stream(self, uri: str) -> int:
+        """Adds a stream to the running pipeline.
+
+        A processing bin is linked to the demuxer pad of the next source id first, and then the
+        URI is added to nvmultiurisrcbin, which gives the new source the lowest free source id.
+
+        Parameters
+        ----------
+        uri : str
+            URI of the stream
+
+        Returns
+        -------
+        int
+            Id of the stream
+        """
+        with self.streams_lock:
+            free = [i for i in range(self.max_streams) if i not in self.streams]
+            if not free:
+                raise RuntimeError(f"All {self.max_streams} streams are in use")
+            source_id = free[0]
+            self.streams[source_id] = {"uri": uri}
+
+        def attach():
+            stream = self._attach_processing_bin(source_id, uri)
+            stream["bin"].sync_state_with_parent()
+            return stream
+
+        try:
+            stream = streamcontrol.call_in_main_loop(attach)
+        except Exception:
+            with self.streams_lock:
+                del self.streams[source_id]
+            raise
+        with self.streams_lock:
+            self.streams[source_id] = stream
+        try:
+            self._post_stream_change("camera_add", source_id, uri)
+        except RuntimeError:
+            streamcontrol.call_in_main_loop(lambda: self._detach(stream))
+            with self.streams_lock:
+                del self.streams[source_id]
+            raise
+        logger.info(f"Added stream {source_id}: {uri}")
+        return source_id
+
+    def _detach(self, stream: dict) -> None:
+        """Unlinks a processing bin from the demuxer and removes it from the pipeline."""
+        stream["bin"].set_state(Gst.State.NULL)
+        stream["src_pad"].unlink(stream["bin"].get_static_pad("sink"))
+        self.demuxer.release_request_pad(stream["src_pad"])
+        self.pipeline.remove(stream["bin"])
+
+    def remove_stream(self, source_id: int) -> None:
+        """Removes a stream from the running pipeline.
+
+        Parameters
+        ----------
+        source_id : int
+            Id of the stream, as returned by add_stream()
+        """
+        with self.streams_lock:
+            # Streams that are still being added, or already being removed, are not removable
+            stream = self.streams.get(source_id, {})
+            if "bin" not in stream or stream.get("removing"):
+                raise KeyError(source_id)
+            # The id stays taken until the demuxer pad is released, so add_stream() cannot link
+            # a second processing bin to it while nvmultiurisrcbin still streams the source
+            stream["removing"] = True
+
+        try:
+            self._post_stream_change("camera_remove", source_id, stream["uri"])
+        except RuntimeError:
+            with self.streams_lock:
+                stream["removing"] = False
+            raise
+        streamcontrol.call_in_main_loop(lambda: self._detach(stream))
+        with self.streams_lock:
+            del self.streams[source_id]
+        logger.info(f"Removed stream {source_id}: {stream['uri']}")
+
+    def list_streams(self) -> List[dict]:
+        """Returns the id and URI of each stream.
+
+        Returns
+        -------
+        List[dict]
+            Streams sorted by id
+        """
+        with self.streams_lock:
+            return [
+                {"id": source_id, "uri": stream["uri"]}
+                for source_id, stream in sorted(self.streams.items())
+            ]
+
     def create_processing_bin(self) -> Gst.Bin:
         """Creates a processor bin
 
@@ -508,7 +519,11 @@ class MultiPlayer:
         # using the function osd_sink_pad_buffer_probe
         osdsinkpad = osd.get_static_pad("sink")
         assert osdsinkpad is not None
-        osdsinkpad.add_probe(Gst.PadProbeType.BUFFER, osd_sink_pad_buffer_probe, 0)
+        osdsinkpad.add_probe(
+            Gst.PadProbeType.BUFFER,
+            osd_sink_pad_buffer_probe,
+            osdmeta.OSDObjectDrawer(ColorList, CLASS_NAMES),
+        )
 
         self.bin_cntr += 1
 
@@ -557,8 +572,13 @@ class MultiPlayer:
     def stop(self):
         logging.info("MultiPlayer stopping")
 
+        if self.control_server:
+            self.control_server.stop()
+            self.control_server = None
         if self.pipeline:
             self.pipeline.set_state(Gst.State.NULL)
+        if len(trajectory_store):
+            trajectory_store.flush(TRAJECTORY_FILE)
         self.loop.quit()
 
     def stop_handler(self, sig, frame):
@@ -570,9 +590,29 @@ def main():
 
     argParser = argparse.ArgumentParser()
     argParser.add_argument("-u", "--uri", help="Input uri", default="")
+    argParser.add_argument(
+        "--max-streams",
+        type=int,
+        default=16,
+        help="Maximum number of streams (default: 16)",
+    )
+    argParser.add_argument(
+        "--control-port",
+        type=int,
+        default=None,
+        help="Port of the local API for adding and removing streams at runtime (default: disabled)",
+    )
+    argParser.add_argument(
+        "--rest-port",
+        type=int,
+        default=9000,
+        help="Port of the REST server of nvmultiurisrcbin (default: 9000)",
+    )
     args = argParser.parse_args()
 
-    multi_player = MultiPlayer(args.uri)
+    multi_player = MultiPlayer(
+        args.uri, args.max_streams, args.control_port, args.rest_port
+    )
     try:
         multi_player.start()
     except Exception as e:
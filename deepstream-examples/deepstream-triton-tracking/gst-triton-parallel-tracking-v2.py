@@ -11,6 +11,13 @@ In order to process a video file:
 In order to process 2 video files:
 >> python3 gst-triton-parallel-tracking-v2.py -i /opt/nvidia/deepstream/deepstream/samples/streams/sample_1080p_h264.mp4 \\
 >>   /opt/nvidia/deepstream/deepstream/samples/streams/sample_1080p_h264.mp4
+
+Streams can be added and removed while the pipeline runs, through a local control API:
+>> python3 gst-triton-parallel-tracking-v2.py -i /opt/nvidia/deepstream/deepstream/samples/streams/sample_1080p_h264.mp4 \\
+>>   --control-port 8556
+>> curl localhost:8556/streams
+>> curl -X POST localhost:8556/streams -d '{"uri": "/opt/nvidia/deepstream/deepstream/samples/streams/sample_1080p_h264.mp4"}'
+>> curl -X DELETE localhost:8556/streams/1
 """
 
 import logging
@@ -19,10 +26,11 @@ import argparse
 import configparser
 import sys
 import signal
-from helpers import gsthelpers
+import threading
+import pyds
+from helpers import gsthelpers, pipelinebuilder, streamcontrol, tilerlayout
 import gi
-import math
-from typing import List
+from typing import Any, Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -30,39 +38,43 @@ gi.require_version("Gst", "1.0")
 from gi.repository import Gst, GLib  # noqa: E402
 
 
-def set_tiler_layout(
-    tiler: Gst.Element, num_streams: int, tile_width=1920, tile_height=1080
-):
-    """Automatically calculate rows and columns for the tiler and set its properties.
-
-    Parameters
-    ----------
-    tiler : Gst.Element
-        The nvmultistreamtiler element
-    num_streams : int
-        Number of input streams
-    tile_width : int, optional
-        Width of the tiled output, by default 1920
-    tile_height : int, optional
-        Height of the tiled output, by default 1080
-    """
-    # Calculate number of rows and columns
-    rows = math.ceil(math.sqrt(num_streams))
-    columns = math.ceil(num_streams / rows)
-
-    # Set properties for the tiler
-    tiler.set_property("rows", rows)
-    tiler.set_property("columns", columns)
-    tiler.set_property("width", tile_width)
-    tiler.set_property("height", tile_height)
-
-    logger.info(
-        f"Tiler layout: {rows} rows x {columns} columns, Output size: {tile_width}x{tile_height}"
-    )
+def tiler_sink_pad_buffer_probe(
+    pad: Gst.Pad, info: Gst.PadProbeInfo, u_data: Any
+) -> Gst.PadProbeReturn:
+    gst_buffer = info.get_buffer()
+    if not gst_buffer:
+        return Gst.PadProbeReturn.OK
+
+    batch_meta = pyds.gst_buffer_get_nvds_batch_meta(hash(gst_buffer))
+    # u_data is the tilerlayout.AdaptiveTiler, it places visible streams and drops frozen ones
+    u_data.process_batch(batch_meta)
+    return Gst.PadProbeReturn.OK
 
 
 class Player:
-    def __init__(self, input_files: List[str]):
+    def __init__(
+        self,
+        input_files: List[str],
+        max_streams: int = 16,
+        control_port: Optional[int] = None,
+        display_size: tuple = (1920, 1080),
+        frozen_timeout: Optional[float] = 2.0,
+    ):
+        """
+        Parameters
+        ----------
+        input_files : List[str]
+            h264 encoded mp4 files processed from the start
+        max_streams : int, optional
+            Maximum number of streams, by default 16
+        control_port : int, optional
+            Port of the local control API for adding and removing streams, by default no API
+        display_size : tuple, optional
+            Width and height of the display, the size of the tiled output, by default (1920, 1080)
+        frozen_timeout : float, optional
+            Seconds without new frames after which a stream is left out of the tiled output,
+            by default 2.0, None to show all streams
+        """
 
         Gst.init(None)
         self.loop = GLib.MainLoop()
@@ -106,7 +118,7 @@ class Player:
         # Configure streammux
         self.stream_muxer.set_property("width", 1920)
         self.stream_muxer.set_property("height", 1080)
-        self.stream_muxer.set_property("batch-size", len(input_files))
+        self.stream_muxer.set_property("batch-size", max(len(input_files), 1))
         self.stream_muxer.set_property("batched-push-timeout", 4000000)
         self.stream_muxer.set_property("attach-sys-ts", True)
         self.stream_muxer.set_property("enable-padding", True)
@@ -142,8 +154,18 @@ class Player:
                 value = int(value)
             self.tracker.set_property(key, value)
 
-        # Configure tiler
-        set_tiler_layout(self.tiler, len(input_files))
+        # Configure tiler, its layout follows the visible streams
+        self.adaptive_tiler = tilerlayout.AdaptiveTiler(
+            self.tiler,
+            display_width=display_size[0],
+            display_height=display_size[1],
+            source_width=1920,
+            source_height=1080,
+            frozen_timeout=frozen_timeout,
+        )
+        self.tiler.get_static_pad("sink").add_probe(
+            Gst.PadProbeType.BUFFER, tiler_sink_pad_buffer_probe, self.adaptive_tiler
+        )
 
         # Add elements to pipeline
         self.pipeline.add(self.stream_muxer)
@@ -215,39 +237,133 @@ class Player:
                 ]
             )
 
-        # Add sources dynamically
-        for i, input_file in enumerate(input_files):
-            # Create source elements
-            source = gsthelpers.create_element("filesrc", f"source-{i}")
-            source.set_property("location", input_file)
-            demuxer = gsthelpers.create_element("qtdemux", f"demuxer-{i}")
-            parser = gsthelpers.create_element("h264parse", f"parser-{i}")
-            decoder = gsthelpers.create_element("nvv4l2decoder", f"decoder-{i}")
-
-            # Add elements to the pipeline
-            self.pipeline.add(source)
-            self.pipeline.add(demuxer)
-            self.pipeline.add(parser)
-            self.pipeline.add(decoder)
-
-            # Link source to demuxer
-            gsthelpers.link_elements([source, demuxer])
-
-            # Connect to pad-added signal of the demuxer
-            def on_pad_added(demuxer, pad, parser):
-                sink_pad = parser.get_static_pad("sink")
-                if not sink_pad.is_linked():
-                    pad.link(sink_pad)
-
-            demuxer.connect("pad-added", on_pad_added, parser)
-
-            # Link parser to decoder
-            gsthelpers.link_elements([parser, decoder])
+        # Streams by id, the id is the index of the streammux sink pad
+        self.max_streams = max_streams
+        self.streams: Dict[int, dict] = {}
+        self.streams_lock = threading.Lock()
+        for input_file in input_files:
+            self.add_stream(input_file)
+
+        self.control_server = None
+        if control_port is not None:
+            self.control_server = streamcontrol.StreamControlServer(
+                self.add_stream, self.remove_stream, self.list_streams, control_port
+            )
 
-            # Connect decoder to streammux
-            sink_pad = self.stream_muxer.get_request_pad(f"sink_{i}")
-            src_pad = decoder.get_static_pad("src")
-            src_pad.link(sink_pad)
+    def _update_layout(self):
+        """Adapts the batch size and the tiler layout to the streams."""
+        self.stream_muxer.set_property("batch-size", max(len(self.streams), 1))
+        self.adaptive_tiler.set_streams(list(self.streams))
+
+    def add_stream(self, location: str) -> int:
+        """Adds an h264 encoded mp4 file to the running pipeline.
+
+        Parameters
+        ----------
+        location : str
+            Path or file:// URI of the file
+
+        Returns
+        -------
+        int
+            Id of the stream
+        """
+        if Gst.uri_is_valid(location):
+            location = Gst.uri_get_location(location)
+        with self.streams_lock:
+            free = [i for i in range(self.max_streams) if i not in self.streams]
+            if not free:
+                raise RuntimeError(f"All {self.max_streams} streams are in use")
+            stream_id = free[0]
+            self.streams[stream_id] = {"location": location}
+
+        def add():
+            # filesrc -> qtdemux -> h264parse -> nvv4l2decoder, exposed as the src pad of a bin
+            source_bin = pipelinebuilder.build_pipeline(
+                {
+                    "elements": [
+                        {
+                            "factory": "filesrc",
+                            "name": "source",
+                            "properties": {"location": location},
+                        },
+                        {"factory": "qtdemux", "name": "demuxer"},
+                        {"factory": "h264parse", "name": "parser"},
+                        {"factory": "nvv4l2decoder", "name": "decoder"},
+                    ],
+                    "links": [
+                        "source ! demuxer",
+                        "demuxer.video_%u ! parser ! decoder",
+                    ],
+                    "ghost_pads": {"src": "decoder.src"},
+                },
+                Gst.Bin.new(f"source-bin-{stream_id}"),
+            ).pipeline
+            self.pipeline.add(source_bin)
+            sink_pad = self.stream_muxer.get_request_pad(f"sink_{stream_id}")
+            if sink_pad is None:
+                self.pipeline.remove(source_bin)
+                raise RuntimeError(
+                    f"Failed to request 'sink_{stream_id}' pad from the muxer for {location}"
+                )
+            if source_bin.get_static_pad("src").link(sink_pad) != Gst.PadLinkReturn.OK:
+                self.stream_muxer.release_request_pad(sink_pad)
+                self.pipeline.remove(source_bin)
+                raise RuntimeError(f"Failed to link stream {stream_id} to the muxer")
+            self._update_layout()
+            source_bin.sync_state_with_parent()
+            return source_bin, sink_pad
+
+        try:
+            source_bin, sink_pad = streamcontrol.call_in_main_loop(add)
+        except Exception:
+            with self.streams_lock:
+                del self.streams[stream_id]
+            raise
+        with self.streams_lock:
+            self.streams[stream_id].update(bin=source_bin, sink_pad=sink_pad)
+        logger.info(f"Added stream {stream_id}: {location}")
+        return stream_id
+
+    def remove_stream(self, stream_id: int) -> None:
+        """Removes a stream from the running pipeline.
+
+        Parameters
+        ----------
+        stream_id : int
+            Id of the stream, as returned by add_stream()
+        """
+        with self.streams_lock:
+            # Streams that are still being added are not removable yet
+            if "bin" not in self.streams.get(stream_id, {}):
+                raise KeyError(stream_id)
+            stream = self.streams.pop(stream_id)
+
+        def remove():
+            stream["bin"].set_state(Gst.State.NULL)
+            # Clear the EOS and flushing state the muxer keeps for the pad
+            sink_pad = stream["sink_pad"]
+            sink_pad.send_event(Gst.Event.new_flush_stop(False))
+            self.stream_muxer.release_request_pad(sink_pad)
+            self.pipeline.remove(stream["bin"])
+            self._update_layout()
+
+        streamcontrol.call_in_main_loop(remove)
+        logger.info(f"Removed stream {stream_id}: {stream['location']}")
+
+    def list_streams(self) -> List[dict]:
+        """Returns the id and file of each stream.
+
+        Returns
+        -------
+        List[dict]
+            Streams sorted by id
+        """
+        with self.streams_lock:
+            return [
+                {"id": stream_id, "location": stream["location"]}
+                for stream_id, stream in sorted(self.streams.items())
+            ]
 
     def play(self):
 
@@ -277,6 +393,9 @@ class Player:
 
     def stop(self):
         logging.info("Stopping pipeline.")
+        if self.control_server:
+            self.control_server.stop()
+            self.control_server = None
         if self.pipeline:
             self.pipeline.set_state(Gst.State.NULL)  # Transition to NULL state
         self.loop.quit()  # Quit the GLib main loop
@@ -294,9 +413,41 @@ def main():
     argParser.add_argument(
         "-i", "--input_files", nargs="+", help="Input video files", required=True
     )
+    argParser.add_argument(
+        "--max-streams",
+        type=int,
+        default=16,
+        help="Maximum number of streams (default: 16)",
+    )
+    argParser.add_argument(
+        "--control-port",
+        type=int,
+        default=None,
+        help="Port of the local API for adding and removing streams at runtime (default: disabled)",
+    )
+    argParser.add_argument(
+        "--display-size",
+        type=int,
+        nargs=2,
+        default=[1920, 1080],
+        metavar=("WIDTH", "HEIGHT"),
+        help="Display size, the size of the tiled output (default: 1920 1080)",
+    )
+    argParser.add_argument(
+        "--frozen-timeout",
+        type=float,
+        default=2.0,
+        help="Seconds without new frames after which a stream is not tiled, 0 to tile all streams (default: 2.0)",
+    )
     args = argParser.parse_args()
 
-    player = Player(args.input_files)
+    player = Player(
+        args.input_files,
+        args.max_streams,
+        args.control_port,
+        tuple(args.display_size),
+        args.frozen_timeout or None,
+    )
     try:
         player.play()
     except Exception as e:
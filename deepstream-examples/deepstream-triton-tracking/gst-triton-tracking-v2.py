@@ -21,14 +21,13 @@ In order to process a file:
 """
 
 from collections import namedtuple
-from operator import attrgetter
 import argparse
 import configparser
 import os
 import sys
 import signal
 import pyds
-from helpers import gsthelpers
+from helpers import gsthelpers, osdmeta, trajectorystore
 import gi
 
 gi.require_version("Gst", "1.0")
@@ -40,10 +39,11 @@ PGIE_CLASS_ID_PERSON = 2
 PGIE_CLASS_ID_ROADSIGN = 3
 past_tracking_meta = [0]
 
-MetaObject = namedtuple(
-    "MetaObject",
-    ["left", "top", "height", "width", "area", "bottom", "id", "text", "class_id"],
-)
+# Past-frame tracking meta is collected into a trajectory store, which is written to
+# TRAJECTORY_FILE when the pipeline stops
+TRAJECTORY_FILE = "trajectories.npz"
+trajectory_store = trajectorystore.TrajectoryStore(history=64)
+
 
 ColorObject = namedtuple("ColorObject", ["red", "green", "blue", "alpha"])
 
@@ -54,190 +54,28 @@ ColorList = {
     PGIE_CLASS_ID_ROADSIGN: ColorObject(red=1.0, green=0.0, blue=1.0, alpha=1.0),
 }
 
+# Classes counted on the frame info line
+CLASS_NAMES = {
+    PGIE_CLASS_ID_VEHICLE: "Vehicles",
+    PGIE_CLASS_ID_PERSON: "Persons",
+    PGIE_CLASS_ID_BICYCLE: "Bicycles",
+    PGIE_CLASS_ID_ROADSIGN: "Road Signs",
+}
+
 
 def osd_sink_pad_buffer_probe(pad, info, u_data):
-    frame_number = 0
-    obj_counter = {
-        PGIE_CLASS_ID_VEHICLE: 0,
-        PGIE_CLASS_ID_PERSON: 0,
-        PGIE_CLASS_ID_BICYCLE: 0,
-        PGIE_CLASS_ID_ROADSIGN: 0,
-    }
-    num_rects = 0
     gst_buffer = info.get_buffer()
     if not gst_buffer:
         print("Unable to get GstBuffer ")
         return
 
     batch_meta = pyds.gst_buffer_get_nvds_batch_meta(hash(gst_buffer))
-    l_frame = batch_meta.frame_meta_list
-    meta_list = []
-
-    while l_frame is not None:
-        try:
-            frame_meta = pyds.NvDsFrameMeta.cast(l_frame.data)
-        except StopIteration:
-            break
-
-        frame_number = frame_meta.frame_num
-        num_rects = frame_meta.num_obj_meta
-        l_obj = frame_meta.obj_meta_list
-
-        while l_obj is not None:
-            try:
-                obj_meta = pyds.NvDsObjectMeta.cast(l_obj.data)
-            except StopIteration:
-                break
-
-            obj_counter[obj_meta.class_id] += 1
-
-            obj = MetaObject(
-                left=obj_meta.tracker_bbox_info.org_bbox_coords.left,
-                top=obj_meta.tracker_bbox_info.org_bbox_coords.top,
-                height=obj_meta.tracker_bbox_info.org_bbox_coords.height,
-                width=obj_meta.tracker_bbox_info.org_bbox_coords.width,
-                area=obj_meta.tracker_bbox_info.org_bbox_coords.height
-                * obj_meta.tracker_bbox_info.org_bbox_coords.width,
-                bottom=obj_meta.tracker_bbox_info.org_bbox_coords.top
-                + obj_meta.tracker_bbox_info.org_bbox_coords.height,
-                id=obj_meta.object_id,
-                text=f"ID: {obj_meta.object_id:04d}, Class: {pyds.get_string(obj_meta.text_params.display_text)}",
-                class_id=obj_meta.class_id,
-            )
-            meta_list.append(obj)
-
-            obj_meta.text_params.display_text = ""
-            obj_meta.text_params.set_bg_clr = 0
-            obj_meta.rect_params.border_width = 0
-
-            try:
-                l_obj = l_obj.next
-            except StopIteration:
-                break
-
-        meta_list_sorted = sorted(meta_list, key=attrgetter("bottom"))
-        max_labels = 10  # Define a suitable number for max_labels
-        num_objects = len(meta_list_sorted)
-        num_meta_objects = (num_objects + max_labels - 1) // max_labels
-
-        # Create a single display_meta for the frame counter and object counts
-        display_meta_main = pyds.nvds_acquire_display_meta_from_pool(batch_meta)
-        display_meta_main.num_labels = 1
-        py_nvosd_text_params = display_meta_main.text_params[0]
-        py_nvosd_text_params.display_text = (
-            f"Frame Number={frame_number:05d}, Number of Objects={num_rects:04d}, "
-            f"Vehicles={obj_counter[PGIE_CLASS_ID_VEHICLE]:04d}, "
-            f"Persons={obj_counter[PGIE_CLASS_ID_PERSON]:04d}, "
-            f"Bicycles={obj_counter[PGIE_CLASS_ID_BICYCLE]:04d}, "
-            f"Road Signs={obj_counter[PGIE_CLASS_ID_ROADSIGN]:04d}"
-        )
-        py_nvosd_text_params.x_offset = 10
-        py_nvosd_text_params.y_offset = 12
-        py_nvosd_text_params.font_params.font_name = "Serif"
-        py_nvosd_text_params.font_params.font_size = 10
-        py_nvosd_text_params.font_params.font_color.set(1.0, 1.0, 1.0, 1.0)
-        py_nvosd_text_params.set_bg_clr = 1
-        py_nvosd_text_params.text_bg_clr.set(0.0, 0.0, 0.0, 1.0)
-        pyds.nvds_add_display_meta_to_frame(frame_meta, display_meta_main)
-
-        for i in range(num_meta_objects):
-            display_meta = pyds.nvds_acquire_display_meta_from_pool(batch_meta)
-            display_meta.num_labels = 0
-
-            start_idx = i * max_labels
-            end_idx = min((i + 1) * max_labels, num_objects)
-
-            for j, idx in enumerate(range(start_idx, end_idx)):
-                x = int(meta_list_sorted[idx].left)
-                y = int(meta_list_sorted[idx].top) - 15
-
-                if x < 0 or y < 0:
-                    continue
-
-                display_meta.text_params[
-                    display_meta.num_labels
-                ].display_text = meta_list_sorted[idx].text
-                display_meta.text_params[display_meta.num_labels].x_offset = x
-                display_meta.text_params[display_meta.num_labels].y_offset = y
-                display_meta.text_params[
-                    display_meta.num_labels
-                ].font_params.font_name = "Serif"
-                display_meta.text_params[
-                    display_meta.num_labels
-                ].font_params.font_size = 10
-                display_meta.text_params[
-                    display_meta.num_labels
-                ].font_params.font_color.set(1.0, 1.0, 1.0, 1.0)
-                display_meta.text_params[display_meta.num_labels].set_bg_clr = 1
-                display_meta.text_params[display_meta.num_labels].text_bg_clr.set(
-                    0.45, 0.20, 0.50, 0.75
-                )
-                display_meta.num_labels += 1
-
-            display_meta.num_rects = end_idx - start_idx
-            for j, idx in enumerate(range(start_idx, end_idx)):
-                red = ColorList[meta_list_sorted[idx].class_id].red
-                green = ColorList[meta_list_sorted[idx].class_id].green
-                blue = ColorList[meta_list_sorted[idx].class_id].blue
-                alpha = ColorList[meta_list_sorted[idx].class_id].alpha
-
-                display_meta.rect_params[j].left = meta_list_sorted[idx].left
-                display_meta.rect_params[j].top = meta_list_sorted[idx].top
-                display_meta.rect_params[j].width = meta_list_sorted[idx].width
-                display_meta.rect_params[j].height = meta_list_sorted[idx].height
-                display_meta.rect_params[j].border_width = 2
-                display_meta.rect_params[j].border_color.red = red
-                display_meta.rect_params[j].border_color.green = green
-                display_meta.rect_params[j].border_color.blue = blue
-                display_meta.rect_params[j].border_color.alpha = alpha
-                display_meta.rect_params[j].has_bg_color = 0
-
-            pyds.nvds_add_display_meta_to_frame(frame_meta, display_meta)
-
-        try:
-            l_frame = l_frame.next
-        except StopIteration:
-            break
+    # u_data is the osdmeta.OSDObjectDrawer of the osd, it draws objects further away from the camera first
+    u_data.process_batch(batch_meta)
 
     # Past tracking meta data
     if past_tracking_meta[0] == 1:
-        l_user = batch_meta.batch_user_meta_list
-        while l_user is not None:
-            try:
-                user_meta = pyds.NvDsUserMeta.cast(l_user.data)
-            except StopIteration:
-                break
-            if (
-                user_meta
-                and user_meta.base_meta.meta_type
-                == pyds.NvDsMetaType.NVDS_TRACKER_PAST_FRAME_META
-            ):
-                try:
-                    pPastFrameObjBatch = pyds.NvDsPastFrameObjBatch.cast(
-                        user_meta.user_meta_data
-                    )
-                except StopIteration:
-                    break
-                for trackobj in pyds.NvDsPastFrameObjBatch.list(pPastFrameObjBatch):
-                    print("streamId=", trackobj.streamID)
-                    print("surfaceStreamID=", trackobj.surfaceStreamID)
-                    for pastframeobj in pyds.NvDsPastFrameObjStream.list(trackobj):
-                        print("numobj=", pastframeobj.numObj)
-                        print("uniqueId=", pastframeobj.uniqueId)
-                        print("classId=", pastframeobj.classId)
-                        print("objLabel=", pastframeobj.objLabel)
-                        for objlist in pyds.NvDsPastFrameObjList.list(pastframeobj):
-                            print("frameNum:", objlist.frameNum)
-                            print("tBbox.left:", objlist.tBbox.left)
-                            print("tBbox.width:", objlist.tBbox.width)
-                            print("tBbox.top:", objlist.tBbox.top)
-                            print("tBbox.right:", objlist.tBbox.height)
-                            print("confidence:", objlist.confidence)
-                            print("age:", objlist.age)
-            try:
-                l_user = l_user.next
-            except StopIteration:
-                break
+        trajectory_store.add_past_frame_meta(batch_meta)
 
     return Gst.PadProbeReturn.OK
 
@@ -485,7 +323,11 @@ class Player(object):
         # Add a probe to the sink pad of the osd-element in order to draw/print meta-data to the canvas
         osdsinkpad = self.osd.get_static_pad("sink")
         assert osdsinkpad is not None
-        osdsinkpad.add_probe(Gst.PadProbeType.BUFFER, osd_sink_pad_buffer_probe, 0)
+        osdsinkpad.add_probe(
+            Gst.PadProbeType.BUFFER,
+            osd_sink_pad_buffer_probe,
+            osdmeta.OSDObjectDrawer(ColorList, CLASS_NAMES),
+        )
 
     def play(self, input_file: str, output_file: str):
         """
@@ -526,6 +368,8 @@ class Player(object):
         print("Setting pipeline state to NULL...", end="")
         self.pipeline.set_state(Gst.State.NULL)
         print("done")
+        if len(trajectory_store):
+            trajectory_store.flush(TRAJECTORY_FILE)
         self.loop.quit()
 
     def on_message(self, bus, message):
@@ -20,7 +20,7 @@ import os
 import sys
 import signal
 import pyds
-from helpers import gsthelpers
+from helpers import gsthelpers, probescheduler, trajectorystore
 import gi
 
 gi.require_version("Gst", "1.0")
@@ -32,6 +32,14 @@ PGIE_CLASS_ID_PERSON = 2
 PGIE_CLASS_ID_ROADSIGN = 3
 past_tracking_meta = [0]
 
+# Past-frame tracking meta is collected into a trajectory store, which is written to
+# TRAJECTORY_FILE when the pipeline stops
+TRAJECTORY_FILE = "trajectories.npz"
+trajectory_store = trajectorystore.TrajectoryStore(history=64)
+
+# Probes print from a background thread, so the streaming thread never waits for the terminal
+probe_log = probescheduler.BackgroundLogWriter()
+
 
 # This function is copied from:
 # https://github.com/NVIDIA-AI-IOT/deepstream_python_apps/blob/master/apps/deepstream-test2/deepstream_test_2.py
@@ -114,62 +122,17 @@ def osd_sink_pad_buffer_probe(pad, info, u_data):
         # set(red, green, blue, alpha); set to Black
         py_nvosd_text_params.text_bg_clr.set(0.0, 0.0, 0.0, 1.0)
         # Using pyds.get_string() to get display_text as string
-        print(pyds.get_string(py_nvosd_text_params.display_text))
+        probe_log.write(pyds.get_string(py_nvosd_text_params.display_text))
         pyds.nvds_add_display_meta_to_frame(frame_meta, display_meta)
         try:
             l_frame = l_frame.next
         except StopIteration:
             break
 
-    # past tracking meta data
+    # Past tracking meta data
     if past_tracking_meta[0] == 1:
-        l_user = batch_meta.batch_user_meta_list
-        while l_user is not None:
-            try:
-                # Note that l_user.data needs a cast to pyds.NvDsUserMeta
-                # The casting is done by pyds.NvDsUserMeta.cast()
-                # The casting also keeps ownership of the underlying memory
-                # in the C code, so the Python garbage collector will leave
-                # it alone
-                user_meta = pyds.NvDsUserMeta.cast(l_user.data)
-            except StopIteration:
-                break
-            if (
-                user_meta
-                and user_meta.base_meta.meta_type
-                == pyds.NvDsMetaType.NVDS_TRACKER_PAST_FRAME_META
-            ):
-                try:
-                    # Note that user_meta.user_meta_data needs a cast to pyds.NvDsPastFrameObjBatch
-                    # The casting is done by pyds.NvDsPastFrameObjBatch.cast()
-                    # The casting also keeps ownership of the underlying memory
-                    # in the C code, so the Python garbage collector will leave
-                    # it alone
-                    pPastFrameObjBatch = pyds.NvDsPastFrameObjBatch.cast(
-                        user_meta.user_meta_data
-                    )
-                except StopIteration:
-                    break
-                for trackobj in pyds.NvDsPastFrameObjBatch.list(pPastFrameObjBatch):
-                    print("streamId=", trackobj.streamID)
-                    print("surfaceStreamID=", trackobj.surfaceStreamID)
-                    for pastframeobj in pyds.NvDsPastFrameObjStream.list(trackobj):
-                        print("numobj=", pastframeobj.numObj)
-                        print("uniqueId=", pastframeobj.uniqueId)
-                        print("classId=", pastframeobj.classId)
-                        print("objLabel=", pastframeobj.objLabel)
-                        for objlist in pyds.NvDsPastFrameObjList.list(pastframeobj):
-                            print("frameNum:", objlist.frameNum)
-                            print("tBbox.left:", objlist.tBbox.left)
-                            print("tBbox.width:", objlist.tBbox.width)
-                            print("tBbox.top:", objlist.tBbox.top)
-                            print("tBbox.right:", objlist.tBbox.height)
-                            print("confidence:", objlist.confidence)
-                            print("age:", objlist.age)
-            try:
-                l_user = l_user.next
-            except StopIteration:
-                break
+        trajectory_store.add_past_frame_meta(batch_meta)
+
     return Gst.PadProbeReturn.OK
 
 
@@ -459,6 +422,9 @@ class Player(object):
         print("Setting pipeline state to NULL...", end="")
         self.pipeline.set_state(Gst.State.NULL)
         print("done")
+        if len(trajectory_store):
+            trajectory_store.flush(TRAJECTORY_FILE)
+        probe_log.close()
         self.loop.quit()
 
     def on_message(self, bus, message):
@@ -1,8 +1,11 @@
 import os
-import urllib.request
-import urllib.error
+import http.client
+import queue
+import threading
+import time
 import urllib.parse
 import json
+from collections import OrderedDict
 from mcp.server.fastmcp import FastMCP
 
 mcp = FastMCP("GStreamer-Server")
@@ -10,43 +13,258 @@ mcp = FastMCP("GStreamer-Server")
 # Get Docker GStreamer server URL from environment, defaulting to localhost:8000
 SERVER_URL = os.environ.get("GST_DOCS_AGENT_URL", "http://localhost:8000")
 
+# Responses of idempotent endpoints are cached for this many seconds (0 disables caching)
+CACHE_TTL = float(os.environ.get("GST_DOCS_AGENT_CACHE_TTL", "300"))
+CACHE_SIZE = int(os.environ.get("GST_DOCS_AGENT_CACHE_SIZE", "256"))
 
-def _query_agent(endpoint: str, **params) -> dict | str:
-    """Queries the Docker GStreamer Doc-Agent HTTP server, returning parsed payload or error string."""
+# Endpoints whose responses only depend on the container's installed GStreamer version
+CACHEABLE_ENDPOINTS = {
+    "elements",
+    "elements/details",
+    "docs/python",
+    "docs/c",
+    "docs/classes",
+    "batch",
+}
+
+
+class AgentClient:
+    """
+    Keep-alive HTTP client for the Doc-Agent with a TTL/LRU response cache.
+
+    Connections are kept in a small pool and reused across tool calls, so consecutive
+    calls do not pay for a new TCP connection each time.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        pool_size: int = 4,
+        timeout: float = 10.0,
+        cache_size: int = 256,
+        cache_ttl: float = 300.0,
+    ) -> None:
+        parsed = urllib.parse.urlsplit(base_url)
+        self._connection_class = (
+            http.client.HTTPSConnection
+            if parsed.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        self._host = parsed.hostname or "localhost"
+        self._port = parsed.port
+        self._base_path = parsed.path.rstrip("/")
+        self._timeout = timeout
+        self._idle: queue.LifoQueue = queue.LifoQueue(maxsize=pool_size)
+
+        self._cache: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_ttl = cache_ttl
+        self._cache_lock = threading.Lock()
+
+    def _acquire(self) -> tuple[http.client.HTTPConnection, bool]:
+        """Return a connection, and whether it is a reused keep-alive connection."""
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            return self._new_connection(), False
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        return self._connection_class(self._host, self._port, timeout=self._timeout)
+
+    def _release(self, conn: http.client.HTTPConnection) -> None:
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def get(self, path: str, timeout: float | None = None) -> tuple[int, bytes]:
+        """
+        Perform a GET request over a pooled connection, with the client's timeout unless 'timeout'
+        is given.
+
+        A request failing because the server closed the reused keep-alive connection in the
+        meantime is retried once on a fresh connection. Other errors, timeouts in particular, are
+        not retried, as the server may already be processing the request.
+        """
+        conn, reused = self._acquire()
+        while True:
+            try:
+                self._set_timeout(conn, timeout or self._timeout)
+                conn.request("GET", self._base_path + path)
+                response = conn.getresponse()
+                body = response.read()
+            except (
+                http.client.RemoteDisconnected,
+                ConnectionResetError,
+                BrokenPipeError,
+            ):
+                conn.close()
+                if not reused:
+                    raise
+                conn, reused = self._new_connection(), False
+                continue
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                raise
+
+            if response.will_close:
+                conn.close()
+            else:
+                self._set_timeout(conn, self._timeout)
+                self._release(conn)
+            return response.status, body
+
+    @staticmethod
+    def _set_timeout(conn: http.client.HTTPConnection, timeout: float) -> None:
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+
+    def cache_get(self, key: str) -> dict | None:
+        """Return a cached payload if it has not expired."""
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            expires, payload = entry
+            if expires < time.monotonic():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return payload
+
+    def cache_put(self, key: str, payload: dict) -> None:
+        """Store a payload, evicting the least recently used entries beyond the cache size."""
+        if self._cache_ttl <= 0 or self._cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[key] = (time.monotonic() + self._cache_ttl, payload)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+
+# 10-second timeout to accommodate full gst-inspect scans and dry-run validations
+_client = AgentClient(
+    SERVER_URL, timeout=10.0, cache_size=CACHE_SIZE, cache_ttl=CACHE_TTL
+)
+
+
+def _query_agent(
+    endpoint: str, request_timeout: float | None = None, **params
+) -> dict | str:
+    """
+    Queries the Docker GStreamer Doc-Agent HTTP server, returning parsed payload or error string.
+    'request_timeout' overrides the client's timeout for endpoints that run for longer.
+    """
     query_string = urllib.parse.urlencode(
-        {k: v for k, v in params.items() if v is not None}
+        {k: v for k, v in params.items() if v is not None}, doseq=True
     )
-    url = f"{SERVER_URL}/{endpoint}"
+    path = f"/{endpoint}"
     if query_string:
-        url += f"?{query_string}"
+        path += f"?{query_string}"
+
+    cacheable = endpoint in CACHEABLE_ENDPOINTS
+    if cacheable:
+        cached = _client.cache_get(path)
+        if cached is not None:
+            return cached
 
     try:
-        # 10-second timeout to accommodate full gst-inspect scans and dry-run validations
-        with urllib.request.urlopen(url, timeout=10) as response:
-            if response.status == 200:
-                payload = json.loads(response.read().decode("utf-8"))
-                if payload.get("status") == "success":
-                    return payload
-                return f"Error from Doc-Agent: {payload.get('detail', 'Unknown error')}"
-            return f"Error: Received HTTP status code {response.status}"
-    except urllib.error.HTTPError as e:
-        try:
-            err_data = json.loads(e.read().decode("utf-8"))
-            detail = err_data.get("detail", str(e))
-            return f"Error from Doc-Agent: {detail}"
-        except Exception:
-            return f"Error from Doc-Agent: {e.reason} (HTTP {e.code})"
-    except urllib.error.URLError as e:
+        status, body = _client.get(path, timeout=request_timeout)
+    except (http.client.HTTPException, OSError) as e:
         return (
             f"Error: Could not connect to the GStreamer Doc-Agent at {SERVER_URL}.\n"
             f"Please ensure your GStreamer Docker container is running and port-forwarding is active (e.g. -p 8000:8000).\n"
             f"Inside the container, run:\n"
             f"  fastapi run /workspace/docker/gstreamer_mcp_server.py --port 8000\n"
-            f"Details: {e.reason}"
+            f"Details: {e}"
         )
     except Exception as e:
         return f"Unexpected error querying Doc-Agent: {e}"
 
+    try:
+        payload = json.loads(body.decode("utf-8"))
+    except Exception:
+        if status != 200:
+            reason = http.client.responses.get(status, "Unknown")
+            return f"Error from Doc-Agent: {reason} (HTTP {status})"
+        return f"Error: Received HTTP status code {status}"
+
+    if status != 200:
+        return f"Error from Doc-Agent: {payload.get('detail', 'Unknown error')}"
+    if payload.get("status") != "success":
+        return f"Error from Doc-Agent: {payload.get('detail', 'Unknown error')}"
+
+    if cacheable:
+        _client.cache_put(path, payload)
+    return payload
+
+
+def _format_element_details(data: dict, element_name: str, minify_raw: bool) -> str:
+    """Formats the element details payload of the Doc-Agent as a Markdown document."""
+    schema = data.get("schema", {})
+
+    md_output = []
+    md_output.append(f"# Element: {schema.get('name', element_name)}")
+    md_output.append(f"**Classification:** {schema.get('klass', 'N/A')}")
+    md_output.append(f"**Description:** {schema.get('description', 'N/A')}")
+    md_output.append(f"**Author:** {schema.get('author', 'N/A')}\n")
+
+    # Pad Templates
+    md_output.append("## Pad Templates")
+    pads = schema.get("pad_templates", [])
+    if not pads:
+        md_output.append("*No static pad templates found.*")
+    for pad in pads:
+        md_output.append(f"### {pad['direction'].upper()} Pad")
+        md_output.append("```text")
+        # Format caps nicely by splitting multiple mime-types onto separate lines
+        caps_str = pad["caps"].replace("; ", ";\n")
+        md_output.append(caps_str)
+        md_output.append("```\n")
+
+    # Properties
+    md_output.append("## Properties Schema")
+    props = schema.get("properties", [])
+    if not props:
+        md_output.append("*No configurable properties found.*")
+    else:
+        md_output.append("| Property Name | Type | Default | Access | Description |")
+        md_output.append("| :--- | :--- | :--- | :--- | :--- |")
+        for p in props:
+            # Construct access string (r/w)
+            access = []
+            if p["readable"]:
+                access.append("R")
+            if p["writable"]:
+                access.append("W")
+            access_str = "/".join(access) if access else "None"
+
+            # Format default value safely
+            default_val = p["default"]
+            if default_val is None:
+                default_str = "None"
+            elif isinstance(default_val, str) and default_val == "":
+                default_str = '""'
+            else:
+                default_str = str(default_val)
+
+            md_output.append(
+                f"| `{p['name']}` | `{p['type']}` | `{default_str}` | {access_str} | {p['description']} |"
+            )
+
+    if "raw_text" in data and data["raw_text"]:
+        md_output.append("\n---\n")
+        md_output.append(
+            f"## Raw gst-inspect-1.0 Output ({'Minified' if minify_raw else 'Original'})"
+        )
+        md_output.append("```text")
+        md_output.append(data["raw_text"])
+        md_output.append("```")
+
+    return "\n".join(md_output)
+
 
 @mcp.tool()
 def check_backend_status() -> str:
@@ -118,10 +336,14 @@ def list_gst_elements(
     plugin_filter: str = "",
     category_klass: str = "",
     global_query: str = "",
+    limit: int = 50,
+    offset: int = 0,
 ) -> str:
     """
     Lists all available GStreamer elements currently installed and registered in the container.
     Provides precise, structured filtering by name, plugin, classification, or global query fallback.
+    The global query is a ranked, typo-tolerant search over element names, classes, descriptions and caps,
+    returning the most relevant elements first. Use 'limit' and 'offset' to page through results.
     """
     res = _query_agent(
         "elements",
@@ -129,6 +351,8 @@ def list_gst_elements(
         plugin=plugin_filter or None,
         klass=category_klass or None,
         query=global_query or None,
+        limit=limit if limit > 0 else None,
+        offset=offset or None,
     )
     if isinstance(res, str):
         return res
@@ -147,7 +371,8 @@ def list_gst_elements(
         return f"No GStreamer elements found matching: {', '.join(filters)}."
 
     output = []
-    header = f"Found {len(elements)} elements"
+    total = res.get("total", len(elements))
+    header = f"Found {total} elements"
     if name_filter or plugin_filter or category_klass or global_query:
         header_filters = []
         if name_filter:
@@ -159,6 +384,8 @@ def list_gst_elements(
         if global_query:
             header_filters.append(f"global query '{global_query}'")
         header += f" matching {', '.join(header_filters)}"
+    if len(elements) < total:
+        header += f" (showing {offset + 1}-{offset + len(elements)})"
     output.append(header + ":\n")
 
     for item in elements:
@@ -185,82 +412,124 @@ def get_gst_element_details(
     if isinstance(res, str):
         return res
 
-    data = res.get("data", {})
-    schema = data.get("schema", {})
+    return _format_element_details(res.get("data", {}), element_name, minify_raw)
 
-    md_output = []
-    md_output.append(f"# Element: {schema.get('name', element_name)}")
-    md_output.append(f"**Classification:** {schema.get('klass', 'N/A')}")
-    md_output.append(f"**Description:** {schema.get('description', 'N/A')}")
-    md_output.append(f"**Author:** {schema.get('author', 'N/A')}\n")
 
-    # Pad Templates
-    md_output.append("## Pad Templates")
-    pads = schema.get("pad_templates", [])
-    if not pads:
-        md_output.append("*No static pad templates found.*")
-    for pad in pads:
-        md_output.append(f"### {pad['direction'].upper()} Pad")
-        md_output.append("```text")
-        # Format caps nicely by splitting multiple mime-types onto separate lines
-        caps_str = pad["caps"].replace("; ", ";\n")
-        md_output.append(caps_str)
-        md_output.append("```\n")
+@mcp.tool()
+def validate_gst_pipeline(pipeline_string: str) -> str:
+    """
+    Validates a GStreamer pipeline string by performing a timed dry-run inside the container.
+    Captures caps negotiation failures, linking errors, and state transitions, returning a detailed
+    diagnostic report of any errors or warnings. Use this to verify pipeline syntax before execution.
+    Example input: 'filesrc location=IL_Office_2.mp4 ! h264parse ! avdec_h264 ! fakesink'
+    """
+    res = _query_agent("pipelines/validate", pipeline=pipeline_string)
+    if isinstance(res, str):
+        return res
+    return res.get("data", {}).get("diagnostic", "No diagnostic available.")
 
-    # Properties
-    md_output.append("## Properties Schema")
-    props = schema.get("properties", [])
-    if not props:
-        md_output.append("*No configurable properties found.*")
-    else:
-        md_output.append("| Property Name | Type | Default | Access | Description |")
-        md_output.append("| :--- | :--- | :--- | :--- | :--- |")
-        for p in props:
-            # Construct access string (r/w)
-            access = []
-            if p["readable"]:
-                access.append("R")
-            if p["writable"]:
-                access.append("W")
-            access_str = "/".join(access) if access else "None"
 
-            # Format default value safely
-            default_val = p["default"]
-            if default_val is None:
-                default_str = "None"
-            elif isinstance(default_val, str) and default_val == "":
-                default_str = '""'
-            else:
-                default_str = str(default_val)
+@mcp.tool()
+def profile_gst_pipeline(
+    pipeline_string: str, num_buffers: int = 300, duration: float = 5.0
+) -> str:
+    """
+    Runs a GStreamer pipeline headlessly inside the container (display/audio sinks replaced by fakesink,
+    clock sync disabled) for 'num_buffers' buffers or 'duration' seconds, and reports per-element
+    throughput, per-link latency, queue fill levels and per-thread CPU time.
+    Use this to compare candidate pipelines on performance once validate_gst_pipeline accepts them.
+    Example input: 'videotestsrc num-buffers=300 ! videoconvert ! x264enc tune=zerolatency ! fakesink'
+    """
+    # The server runs the pipeline for up to 'duration' seconds plus its startup and teardown
+    res = _query_agent(
+        "pipelines/profile",
+        request_timeout=duration + 20.0,
+        pipeline=pipeline_string,
+        num_buffers=num_buffers,
+        duration=duration,
+    )
+    if isinstance(res, str):
+        return res
 
-            md_output.append(
-                f"| `{p['name']}` | `{p['type']}` | `{default_str}` | {access_str} | {p['description']} |"
+    report = res.get("data", {})
+    output = [
+        f"Outcome: {report.get('outcome')} after {report.get('wall_time_s')} s "
+        f"(process CPU {report.get('process_cpu_s')} s)"
+    ]
+    for error in report.get("errors", []):
+        output.append(f"🔴 {error}")
+
+    output.append("\n## Elements (src pad throughput)")
+    output.append("| Element | Factory | Buffers | Buffers/s | MB/s |")
+    output.append("| :--- | :--- | ---: | ---: | ---: |")
+    for e in report.get("elements", []):
+        output.append(
+            f"| `{e['name']}` | {e['factory']} | {e['buffers']} | {e['buffers_per_s']} | {e['mbytes_per_s']} |"
+        )
+
+    output.append("\n## Links (latency from entering upstream element)")
+    output.append("| Link | Samples | Avg ms | Max ms |")
+    output.append("| :--- | ---: | ---: | ---: |")
+    for link in report.get("links", []):
+        output.append(
+            f"| `{link['src']}` → `{link['sink']}` | {link['samples']} | {link['latency_ms_avg']} | {link['latency_ms_max']} |"
+        )
+
+    if report.get("queues"):
+        output.append("\n## Queues")
+        output.append(
+            "| Queue | Max size | Avg level | Max level | Max level ms | Overruns |"
+        )
+        output.append("| :--- | ---: | ---: | ---: | ---: | ---: |")
+        for q in report["queues"]:
+            output.append(
+                f"| `{q['name']}` | {q['max_size_buffers']} | {q['level_buffers_avg']} | {q['level_buffers_max']} "
+                f"| {q['level_time_ms_max']} | {q['overruns']} |"
             )
 
-    if "raw_text" in data and data["raw_text"]:
-        md_output.append("\n---\n")
-        md_output.append(
-            f"## Raw gst-inspect-1.0 Output ({'Minified' if minify_raw else 'Original'})"
+    output.append("\n## Streaming threads")
+    for t in report.get("threads", []):
+        output.append(
+            f" - thread {t['tid']}: {t['cpu_s']} s CPU ({', '.join(t['elements'])})"
         )
-        md_output.append("```text")
-        md_output.append(data["raw_text"])
-        md_output.append("```")
 
-    return "\n".join(md_output)
+    return "\n".join(output)
 
 
 @mcp.tool()
-def validate_gst_pipeline(pipeline_string: str) -> str:
+def find_gst_caps_path(
+    src_caps: str, sink_caps: str, max_length: int = 4, max_results: int = 5
+) -> str:
     """
-    Validates a GStreamer pipeline string by performing a timed dry-run inside the container.
-    Captures caps negotiation failures, linking errors, and state transitions, returning a detailed
-    diagnostic report of any errors or warnings. Use this to verify pipeline syntax before execution.
-    Example input: 'filesrc location=IL_Office_2.mp4 ! h264parse ! avdec_h264 ! fakesink'
+    Finds the cheapest chains of GStreamer elements that convert 'src_caps' into 'sink_caps',
+    using a pre-computed pad-template caps compatibility graph of the container's registry.
+    Higher-ranked elements (the ones autoplugging would pick) are preferred. Runs in milliseconds,
+    use it to pick candidate chains before confirming the best one with validate_gst_pipeline.
+    Example inputs: src_caps='video/x-h264', sink_caps='video/x-raw, format=RGBA'
     """
-    res = _query_agent("pipelines/validate", pipeline=pipeline_string)
+    res = _query_agent(
+        "pipelines/paths",
+        src_caps=src_caps,
+        sink_caps=sink_caps,
+        max_length=max_length,
+        max_results=max_results,
+    )
     if isinstance(res, str):
         return res
-    return res.get("data", {}).get("diagnostic", "No diagnostic available.")
+
+    paths = res.get("data", {}).get("paths", [])
+    if not paths:
+        return (
+            f"No element chain of at most {max_length} elements converts "
+            f"'{src_caps}' into '{sink_caps}'."
+        )
+
+    output = [
+        f"Found {len(paths)} element chains from '{src_caps}' to '{sink_caps}':\n"
+    ]
+    for i, path in enumerate(paths, start=1):
+        output.append(f" {i}. {path['pipeline']}  (cost {path['cost']})")
+    return "\n".join(output)
 
 
 @mcp.tool()
@@ -301,5 +570,49 @@ def list_gst_classes(namespace: str = "", filter_text: str = "") -> str:
     return "\n".join(output)
 
 
+@mcp.tool()
+def get_gst_batch_details(
+    element_names: list[str] | None = None,
+    class_paths: list[str] | None = None,
+    docs_language: str = "c",
+) -> str:
+    """
+    Resolves many GStreamer element specifications and/or class docs in a single round trip.
+    Prefer this over repeated calls to get_gst_element_details, get_c_gst_docs or get_python_gst_docs
+    when several lookups are needed at once. 'docs_language' selects 'c' or 'python' class docs.
+    Example inputs: element_names=['h264parse', 'avdec_h264'], class_paths=['Gst.Pad', 'GstApp.AppSink']
+    """
+    if not element_names and not class_paths:
+        return "Provide at least one element name or class path."
+    if docs_language not in ("c", "python"):
+        return f"Unsupported docs_language '{docs_language}', use 'c' or 'python'."
+
+    res = _query_agent(
+        "batch",
+        elements=element_names or None,
+        c_classes=(class_paths or None) if docs_language == "c" else None,
+        python_classes=(class_paths or None) if docs_language == "python" else None,
+    )
+    if isinstance(res, str):
+        return res
+
+    data = res.get("data", {})
+    sections = []
+    for name, item in data.get("elements", {}).items():
+        if "error" in item:
+            sections.append(f"# Element: {name}\nError: {item['error']}")
+        else:
+            sections.append(_format_element_details(item["data"], name, True))
+
+    docs = data.get(f"{docs_language}_docs", {})
+    for class_path, item in docs.items():
+        if "error" in item:
+            sections.append(f"# Class: {class_path}\nError: {item['error']}")
+        else:
+            sections.append(f"# Class: {class_path}\n{item['data']}")
+
+    return "\n\n---\n\n".join(sections)
+
+
 if __name__ == "__main__":
     mcp.run()
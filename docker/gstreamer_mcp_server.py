@@ -1,9 +1,22 @@
+import argparse
+import bisect
+import functools
+import heapq
 import importlib
 import inspect
+import json
+import math
+import mmap
 import os
+import re
+import struct
 import subprocess
 import shlex
+import sys
+import threading
+import time
 import xml.etree.ElementTree as ET
+from contextlib import asynccontextmanager
 from typing import Any
 from fastapi import FastAPI, HTTPException, Query, Depends
 from fastapi.responses import HTMLResponse
@@ -19,9 +32,14 @@ class Settings(BaseSettings):
     gir_search_paths : list of str
         The list of directory paths searched to locate GObject Introspection (.gir) files.
         Default is ["/usr/local/share/gir-1.0", "/usr/share/gir-1.0"].
+    gir_index_path : str
+        Location of the pre-parsed, memory-mapped GIR index file. It is rebuilt incrementally
+        whenever a .gir file is added, removed or modified.
+        Default is "~/.cache/gstmcp/gir-index.bin".
     """
 
     gir_search_paths: list[str] = ["/usr/local/share/gir-1.0", "/usr/share/gir-1.0"]
+    gir_index_path: str = os.path.join("~", ".cache", "gstmcp", "gir-index.bin")
 
     class Config:
         env_prefix = "GSTMCP_"
@@ -39,7 +57,29 @@ def get_settings() -> Settings:
     return Settings()
 
 
-app = FastAPI(title="GStreamer Documentation Agent", version="1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Build or load the on-disk GIR index once at startup, so that the first documentation
+    lookup does not have to parse any .gir files, and pre-compute the caps graph.
+
+    Parameters
+    ----------
+    app : FastAPI
+        The application instance.
+    """
+    try:
+        _get_gir_index(get_settings())
+    except Exception:
+        # The documentation endpoints retry building the index on demand
+        pass
+
+    # Building the caps graph intersects thousands of pad templates, do it in the background
+    threading.Thread(target=_warm_up_caps_graph, daemon=True).start()
+    yield
+
+
+app = FastAPI(title="GStreamer Documentation Agent", version="1.0", lifespan=lifespan)
 
 
 def _parse_class_path(class_path: str) -> tuple[str, str]:
@@ -198,6 +238,779 @@ def _format_c_method(
     return f" - {tag} {ret_type} {c_func_name}({param_string});"
 
 
+_GIR_NS = {
+    "core": "http://www.gtk.org/introspection/core/1.0",
+    "c": "http://www.gtk.org/introspection/c/1.0",
+}
+
+
+def _is_indexed_namespace(ns_name: str) -> bool:
+    """
+    Check whether a GObject namespace is exposed by the documentation endpoints.
+
+    Parameters
+    ----------
+    ns_name : str
+        The GObject namespace, e.g., 'GstVideo'.
+
+    Returns
+    -------
+    bool
+        True for GStreamer namespaces and the GLib, GObject and Gio base libraries.
+    """
+    return ns_name.startswith("Gst") or ns_name in ("GLib", "GObject", "Gio")
+
+
+def _parse_gir_classes(gir_path: str) -> dict[str, dict[str, Any]]:
+    """
+    Incrementally parse a .gir file and extract every class and interface.
+
+    The file is streamed with ``iterparse`` and each top-level namespace child is released as
+    soon as it has been processed, so memory use is bounded by the largest single class rather
+    than by the size of the whole file.
+
+    Parameters
+    ----------
+    gir_path : str
+        Path to the .gir file.
+
+    Returns
+    -------
+    dict of str to dict
+        Maps class names to records with keys 'kind', 'c_type', 'summary' and 'methods'.
+    """
+    class_tag = f"{{{_GIR_NS['core']}}}class"
+    interface_tag = f"{{{_GIR_NS['core']}}}interface"
+
+    records: dict[str, dict[str, Any]] = {}
+    depth = 0
+    for event, elem in ET.iterparse(gir_path, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            continue
+        depth -= 1
+
+        if elem.tag in (class_tag, interface_tag):
+            name = elem.attrib.get("name")
+            if name and name not in records:
+                c_type_name = elem.attrib.get(f"{{{_GIR_NS['c']}}}type", name)
+
+                summary = None
+                doc = elem.find("core:doc", _GIR_NS)
+                if doc is not None and doc.text:
+                    summary = doc.text.strip().split("\n\n")[0]
+
+                methods = []
+                for method in elem.findall("core:method", _GIR_NS) + elem.findall(
+                    "core:virtual-method", _GIR_NS
+                ):
+                    formatted = _format_c_method(method, _GIR_NS, c_type_name)
+                    if formatted:
+                        methods.append(formatted)
+
+                records[name] = {
+                    "kind": "class" if elem.tag == class_tag else "interface",
+                    "c_type": c_type_name,
+                    "summary": summary,
+                    "methods": methods,
+                }
+
+        # <repository> is depth 0, <namespace> depth 1; drop its children once parsed
+        if depth <= 2:
+            elem.clear()
+
+    return records
+
+
+class GirIndex:
+    """
+    Compact on-disk index of GObject namespaces, classes and C signatures.
+
+    The index file consists of a magic line, a length-prefixed JSON header and a blob of
+    per-class JSON records. The header lists every namespace together with the mtime and size
+    of its source .gir file and the offset of each class record inside the blob. The file is
+    memory-mapped, so only the header is decoded up front and class records are decoded lazily
+    on lookup. Namespaces whose .gir file is unchanged are copied verbatim on rebuild, only
+    modified files are re-parsed.
+
+    Parameters
+    ----------
+    index_path : str
+        Location of the index file. Falls back to an in-memory index if it cannot be written.
+    gir_search_paths : list of str
+        Search paths to the directories where .gir files can be found.
+    """
+
+    MAGIC = b"GSTMCP-GIR-INDEX 1\n"
+    _HEADER_LEN = struct.Struct("<Q")
+
+    def __init__(self, index_path: str, gir_search_paths: list[str]) -> None:
+        self.index_path = os.path.expanduser(index_path)
+        self.gir_search_paths = list(gir_search_paths)
+        self._lock = threading.Lock()
+        self._buffer: mmap.mmap | bytes = b""
+        self._blob_offset = 0
+        self._namespaces: dict[str, dict[str, Any]] = {}
+        self._dir_signature: tuple | None = None
+        self._load()
+        self.refresh()
+
+    def _scan_dirs(self) -> tuple:
+        """Return the (directory, mtime) signature of the search paths."""
+        signature = []
+        for base_dir in self.gir_search_paths:
+            try:
+                signature.append((base_dir, os.stat(base_dir).st_mtime_ns))
+            except OSError:
+                signature.append((base_dir, None))
+        return tuple(signature)
+
+    def _discover(self) -> dict[str, str | None]:
+        """Map every available namespace to its '-1.0' .gir file, or None if missing."""
+        names = set()
+        for base_dir in self.gir_search_paths:
+            if os.path.exists(base_dir):
+                for f in os.listdir(base_dir):
+                    if f.endswith(".gir"):
+                        ns_name = f.split("-")[0]
+                        if _is_indexed_namespace(ns_name):
+                            names.add(ns_name)
+
+        sources: dict[str, str | None] = {}
+        for ns_name in sorted(names):
+            try:
+                sources[ns_name] = _find_gir_path(ns_name, self.gir_search_paths)
+            except FileNotFoundError:
+                sources[ns_name] = None
+        return sources
+
+    def _load(self) -> None:
+        """Memory-map an existing index file, ignoring it if it is missing or corrupt."""
+        try:
+            with open(self.index_path, "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return
+
+        try:
+            if buffer[: len(self.MAGIC)] != self.MAGIC:
+                raise ValueError("Unknown index format")
+            start = len(self.MAGIC)
+            (header_len,) = self._HEADER_LEN.unpack_from(buffer, start)
+            start += self._HEADER_LEN.size
+            header = json.loads(buffer[start : start + header_len].decode("utf-8"))
+            if header.get("search_paths") != self.gir_search_paths:
+                raise ValueError("Index was built for different search paths")
+        except Exception:
+            buffer.close()
+            return
+
+        self._buffer = buffer
+        self._blob_offset = start + header_len
+        self._namespaces = header["namespaces"]
+
+    def _read_record(self, namespace: str, class_name: str) -> bytes | None:
+        """Return the raw JSON record of a class from the current buffer."""
+        entry = self._namespaces.get(namespace, {}).get("classes", {}).get(class_name)
+        if entry is None:
+            return None
+        _, offset, length = entry
+        start = self._blob_offset + offset
+        return bytes(self._buffer[start : start + length])
+
+    @staticmethod
+    def _source_stamp(gir_path: str | None) -> list[int] | None:
+        """Return the [mtime_ns, size] stamp used to detect modified .gir files."""
+        if gir_path is None:
+            return None
+        try:
+            st = os.stat(gir_path)
+        except OSError:
+            return None
+        return [st.st_mtime_ns, st.st_size]
+
+    def refresh(self) -> None:
+        """
+        Rebuild the index for every namespace whose .gir file was added, removed or modified.
+        """
+        with self._lock:
+            self._dir_signature = self._scan_dirs()
+            sources = self._discover()
+
+            stale = False
+            if set(sources) != set(self._namespaces):
+                stale = True
+            for ns_name, gir_path in sources.items():
+                old = self._namespaces.get(ns_name)
+                if (
+                    old is None
+                    or old.get("path") != gir_path
+                    or old.get("stamp") != self._source_stamp(gir_path)
+                ):
+                    stale = True
+                    break
+            if not stale:
+                return
+
+            blob = bytearray()
+            namespaces: dict[str, dict[str, Any]] = {}
+            for ns_name, gir_path in sources.items():
+                stamp = self._source_stamp(gir_path)
+                old = self._namespaces.get(ns_name)
+                classes: dict[str, list] = {}
+
+                if (
+                    old is not None
+                    and old.get("path") == gir_path
+                    and old.get("stamp") == stamp
+                ):
+                    # Unchanged source: copy the existing records verbatim
+                    for class_name, (kind, _, _) in old["classes"].items():
+                        raw = self._read_record(ns_name, class_name)
+                        classes[class_name] = [kind, len(blob), len(raw)]
+                        blob += raw
+                elif gir_path is not None:
+                    try:
+                        records = _parse_gir_classes(gir_path)
+                    except Exception:
+                        records = {}
+                    for class_name, record in records.items():
+                        raw = json.dumps(record, separators=(",", ":")).encode("utf-8")
+                        classes[class_name] = [record["kind"], len(blob), len(raw)]
+                        blob += raw
+
+                namespaces[ns_name] = {
+                    "path": gir_path,
+                    "stamp": stamp,
+                    "classes": classes,
+                }
+
+            header = json.dumps(
+                {"search_paths": self.gir_search_paths, "namespaces": namespaces},
+                separators=(",", ":"),
+            ).encode("utf-8")
+            data = (
+                self.MAGIC + self._HEADER_LEN.pack(len(header)) + header + bytes(blob)
+            )
+
+            old_buffer = self._buffer
+            self._buffer = self._write(data)
+            self._blob_offset = len(self.MAGIC) + self._HEADER_LEN.size + len(header)
+            self._namespaces = namespaces
+            if isinstance(old_buffer, mmap.mmap):
+                old_buffer.close()
+
+    def _write(self, data: bytes) -> mmap.mmap | bytes:
+        """Atomically replace the index file and map it, or keep it in memory on failure."""
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self.index_path)
+            with open(self.index_path, "rb") as f:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return data
+
+    def _ensure_fresh(self, namespace: str | None = None) -> None:
+        """Refresh the index if a search directory or the namespace's .gir file changed."""
+        if self._scan_dirs() != self._dir_signature:
+            self.refresh()
+            return
+        if namespace is not None and namespace in self._namespaces:
+            entry = self._namespaces[namespace]
+            if entry["stamp"] != self._source_stamp(entry["path"]):
+                self.refresh()
+
+    def namespaces(self) -> list[str]:
+        """
+        List available GStreamer-related GObject namespaces.
+
+        Returns
+        -------
+        list of str
+            A sorted list of available namespace names.
+        """
+        self._ensure_fresh()
+        return sorted(self._namespaces)
+
+    def classes(self, namespace: str) -> list[str]:
+        """
+        Get all classes and interfaces for a specific GObject namespace.
+
+        Parameters
+        ----------
+        namespace : str
+            The GObject namespace, e.g., 'Gst'.
+
+        Returns
+        -------
+        list of str
+            A sorted list of class and interface names in the namespace.
+        """
+        self._ensure_fresh(namespace)
+        return sorted(self._namespaces.get(namespace, {}).get("classes", {}))
+
+    def lookup(self, namespace: str, class_name: str) -> dict[str, Any] | None:
+        """
+        Look up the parsed record of a single class or interface.
+
+        Parameters
+        ----------
+        namespace : str
+            The GObject namespace, e.g., 'Gst'.
+        class_name : str
+            The class name, e.g., 'Element'.
+
+        Returns
+        -------
+        dict of str to Any or None
+            The record with keys 'kind', 'c_type', 'summary' and 'methods', or None if not found.
+        """
+        self._ensure_fresh(namespace)
+        with self._lock:
+            raw = self._read_record(namespace, class_name)
+        return json.loads(raw) if raw is not None else None
+
+    def has_namespace(self, namespace: str) -> bool:
+        """Check whether a namespace has a .gir file in the search paths."""
+        self._ensure_fresh(namespace)
+        entry = self._namespaces.get(namespace)
+        return entry is not None and entry["path"] is not None
+
+
+_gir_index: GirIndex | None = None
+_gir_index_lock = threading.Lock()
+
+
+def _get_gir_index(settings: Settings) -> GirIndex:
+    """
+    Return the process-wide GIR index, creating it on first use.
+
+    Parameters
+    ----------
+    settings : Settings
+        The application configuration settings instance.
+
+    Returns
+    -------
+    GirIndex
+        The GIR index matching the configured search paths and index location.
+    """
+    global _gir_index
+    with _gir_index_lock:
+        if (
+            _gir_index is None
+            or _gir_index.gir_search_paths != list(settings.gir_search_paths)
+            or _gir_index.index_path != os.path.expanduser(settings.gir_index_path)
+        ):
+            _gir_index = GirIndex(settings.gir_index_path, settings.gir_search_paths)
+        return _gir_index
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _tokenize(text: str) -> list[str]:
+    """
+    Split text into lowercase alphanumeric search terms.
+
+    Parameters
+    ----------
+    text : str
+        The text to tokenize, e.g., 'avdec_h264' or 'video/x-h264'.
+
+    Returns
+    -------
+    list of str
+        The search terms, e.g., ['avdec', 'h264'].
+    """
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _trigrams(term: str) -> set[str]:
+    """Return the padded character trigrams of a search term."""
+    padded = f"  {term} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class ElementSearchIndex:
+    """
+    Ranked, typo-tolerant search over the registered GStreamer elements.
+
+    Documents are scored with BM25 over the element name, klass, description and pad-template
+    media types, each field weighted by ``FIELD_WEIGHTS``. Query terms missing from the
+    vocabulary are expanded to known terms sharing a prefix or enough character trigrams,
+    which makes queries such as 'h26' or 'decodr' still return relevant elements.
+
+    Parameters
+    ----------
+    elements : list of dict
+        Element records with keys 'plugin', 'element', 'klass', 'description' and 'caps'.
+    """
+
+    FIELD_WEIGHTS = {"element": 3.0, "klass": 1.5, "description": 1.0, "caps": 1.0}
+    K1 = 1.2
+    B = 0.75
+    MIN_TRIGRAM_SIMILARITY = 0.35
+    MAX_EXPANSIONS = 5
+
+    def __init__(self, elements: list[dict[str, Any]]) -> None:
+        self.elements = elements
+        self._postings: dict[str, dict[int, float]] = {}
+        self._doc_lengths: list[float] = []
+
+        for doc_id, element in enumerate(elements):
+            length = 0.0
+            for field, weight in self.FIELD_WEIGHTS.items():
+                value = element[field]
+                text = " ".join(value) if isinstance(value, list) else value
+                for term in _tokenize(text):
+                    postings = self._postings.setdefault(term, {})
+                    postings[doc_id] = postings.get(doc_id, 0.0) + weight
+                    length += weight
+            self._doc_lengths.append(length)
+
+        self._avg_length = (
+            sum(self._doc_lengths) / len(self._doc_lengths) if elements else 0.0
+        )
+        self._vocabulary = sorted(self._postings)
+        self._trigram_index: dict[str, list[str]] = {}
+        for term in self._vocabulary:
+            for trigram in _trigrams(term):
+                self._trigram_index.setdefault(trigram, []).append(term)
+
+    def _expand(self, term: str) -> list[tuple[str, float]]:
+        """
+        Map a query term to vocabulary terms with a similarity weight in (0, 1].
+        """
+        if term in self._postings:
+            return [(term, 1.0)]
+
+        candidates: dict[str, float] = {}
+
+        # Prefix matches, e.g. 'h26' -> 'h264', 'h265'
+        if len(term) >= 2:
+            start = bisect.bisect_left(self._vocabulary, term)
+            for vocab_term in self._vocabulary[start:]:
+                if not vocab_term.startswith(term):
+                    break
+                candidates[vocab_term] = max(
+                    candidates.get(vocab_term, 0.0),
+                    len(term) / len(vocab_term),
+                )
+
+        # Trigram similarity for typos, e.g. 'decodr' -> 'decoder'
+        query_trigrams = _trigrams(term)
+        shared: dict[str, int] = {}
+        for trigram in query_trigrams:
+            for vocab_term in self._trigram_index.get(trigram, ()):
+                shared[vocab_term] = shared.get(vocab_term, 0) + 1
+        for vocab_term, count in shared.items():
+            similarity = count / (
+                len(query_trigrams) + len(_trigrams(vocab_term)) - count
+            )
+            if similarity >= self.MIN_TRIGRAM_SIMILARITY:
+                candidates[vocab_term] = max(
+                    candidates.get(vocab_term, 0.0), similarity
+                )
+
+        ranked = sorted(candidates.items(), key=lambda item: item[1], reverse=True)
+        return ranked[: self.MAX_EXPANSIONS]
+
+    def search(
+        self, query: str, candidates: set[int] | None = None
+    ) -> list[tuple[int, float]]:
+        """
+        Rank documents by relevance to a free-text query.
+
+        Parameters
+        ----------
+        query : str
+            The free-text query, e.g., 'h264 hardware decoder'.
+        candidates : set of int or None, optional
+            Restrict results to these document ids, by default None.
+
+        Returns
+        -------
+        list of tuple of (int, float)
+            Document ids and scores, best match first.
+        """
+        n_docs = len(self.elements)
+        scores: dict[int, float] = {}
+        query_lower = query.strip().lower()
+
+        for term in dict.fromkeys(_tokenize(query)):
+            for vocab_term, similarity in self._expand(term):
+                postings = self._postings[vocab_term]
+                idf = math.log(
+                    1.0 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5)
+                )
+                for doc_id, tf in postings.items():
+                    if candidates is not None and doc_id not in candidates:
+                        continue
+                    norm = self.K1 * (
+                        1.0
+                        - self.B
+                        + self.B * self._doc_lengths[doc_id] / self._avg_length
+                    )
+                    score = similarity * idf * tf * (self.K1 + 1.0) / (tf + norm)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + score
+
+        # Favour exact and prefix matches on the element name
+        for doc_id in scores:
+            name = self.elements[doc_id]["element"]
+            if name == query_lower:
+                scores[doc_id] *= 2.0
+            elif name.startswith(query_lower):
+                scores[doc_id] *= 1.5
+
+        return sorted(
+            scores.items(),
+            key=lambda item: (-item[1], self.elements[item[0]]["element"]),
+        )
+
+
+_element_search_index: ElementSearchIndex | None = None
+_element_search_cookie: int | None = None
+_element_search_lock = threading.Lock()
+
+
+def _get_element_search_index() -> ElementSearchIndex:
+    """
+    Return the element search index, rebuilding it when the GStreamer registry changes.
+
+    Returns
+    -------
+    ElementSearchIndex
+        The search index over all registered element factories.
+    """
+    global _element_search_index, _element_search_cookie
+
+    import gi
+
+    gi.require_version("Gst", "1.0")
+    from gi.repository import Gst
+
+    Gst.init(None)
+    registry = Gst.Registry.get()
+    cookie = registry.get_feature_list_cookie()
+
+    with _element_search_lock:
+        if _element_search_index is None or cookie != _element_search_cookie:
+            elements = []
+            for factory in registry.get_feature_list(Gst.ElementFactory):
+                media_types = []
+                for pad_template in factory.get_static_pad_templates():
+                    caps = pad_template.get_caps()
+                    if caps.is_any():
+                        continue
+                    for i in range(caps.get_size()):
+                        media_types.append(caps.get_structure(i).get_name())
+
+                elements.append(
+                    {
+                        "plugin": factory.get_plugin_name() or "core",
+                        "element": factory.get_name(),
+                        "klass": factory.get_klass() or "",
+                        "description": factory.get_description() or "",
+                        "caps": list(dict.fromkeys(media_types)),
+                    }
+                )
+            elements.sort(key=lambda x: x["element"])
+            _element_search_index = ElementSearchIndex(elements)
+            _element_search_cookie = cookie
+        return _element_search_index
+
+
+def _caps_media_types(caps: Any) -> set[str]:
+    """Return the media types (structure names) of a Gst.Caps, e.g. {'video/x-raw'}."""
+    return {caps.get_structure(i).get_name() for i in range(caps.get_size())}
+
+
+class CapsGraph:
+    """
+    Pad-template caps compatibility graph of the registered element factories.
+
+    Nodes are element factories with both sink and src pad templates, and an edge A -> B exists
+    when any src template caps of A can intersect any sink template caps of B. Factories with
+    ANY caps (queue, tee, identity, ...) only pass data through and are left out. Edge
+    candidates are bucketed by media type, so only factories sharing a media type are tested
+    for caps intersection while building the graph.
+
+    The cost of a path is the sum of its element costs, which grow as the factory rank drops:
+    a PRIMARY element costs 1.0 and a rank NONE element costs 2.0. Chains made of fewer,
+    higher-ranked elements, the ones autoplugging would pick, are therefore preferred.
+
+    Parameters
+    ----------
+    factories : list of dict
+        Factory records with keys 'name', 'klass', 'rank', 'sink_caps' and 'src_caps', the
+        latter two being Gst.Caps merged over the factory's sink and src pad templates.
+    """
+
+    PRIMARY_RANK = 256
+
+    def __init__(self, factories: list[dict[str, Any]]) -> None:
+        self.nodes = [
+            f
+            for f in factories
+            if not f["sink_caps"].is_empty()
+            and not f["src_caps"].is_empty()
+            and not f["sink_caps"].is_any()
+            and not f["src_caps"].is_any()
+        ]
+        self.costs = [
+            1.0 + max(0, self.PRIMARY_RANK - node["rank"]) / self.PRIMARY_RANK
+            for node in self.nodes
+        ]
+
+        self._sink_index: dict[str, list[int]] = {}
+        for node_id, node in enumerate(self.nodes):
+            for media_type in _caps_media_types(node["sink_caps"]):
+                self._sink_index.setdefault(media_type, []).append(node_id)
+
+        self.edges: list[list[int]] = []
+        for node in self.nodes:
+            self.edges.append(self._accepting(node["src_caps"], exclude=node))
+
+    def _accepting(self, caps: Any, exclude: dict | None = None) -> list[int]:
+        """Return the ids of the nodes whose sink caps can intersect the given caps."""
+        candidates = set()
+        for media_type in _caps_media_types(caps):
+            candidates.update(self._sink_index.get(media_type, ()))
+        return sorted(
+            node_id
+            for node_id in candidates
+            if self.nodes[node_id] is not exclude
+            and self.nodes[node_id]["sink_caps"].can_intersect(caps)
+        )
+
+    def find_paths(
+        self,
+        src_caps: Any,
+        sink_caps: Any,
+        max_length: int = 4,
+        max_results: int = 5,
+    ) -> list[tuple[float, list[int]]]:
+        """
+        Find the cheapest element chains converting the source caps into the sink caps.
+
+        Uses best-first search over loopless paths, expanding each node at most
+        ``max_results`` times, which yields the k cheapest chains in order of cost.
+
+        Parameters
+        ----------
+        src_caps : Gst.Caps
+            The caps produced upstream of the chain.
+        sink_caps : Gst.Caps
+            The caps accepted downstream of the chain.
+        max_length : int, optional
+            The maximum number of elements in a chain, by default 4.
+        max_results : int, optional
+            The maximum number of chains to return, by default 5.
+
+        Returns
+        -------
+        list of tuple of (float, list of int)
+            The cost and node ids of each chain, cheapest first.
+        """
+        heap = [(self.costs[n], [n]) for n in self._accepting(src_caps)]
+        heapq.heapify(heap)
+
+        results: list[tuple[float, list[int]]] = []
+        expansions = [0] * len(self.nodes)
+        accepts_sink: dict[int, bool] = {}
+
+        while heap and len(results) < max_results:
+            cost, path = heapq.heappop(heap)
+            node_id = path[-1]
+            if expansions[node_id] >= max_results:
+                continue
+            expansions[node_id] += 1
+
+            if node_id not in accepts_sink:
+                accepts_sink[node_id] = self.nodes[node_id]["src_caps"].can_intersect(
+                    sink_caps
+                )
+            if accepts_sink[node_id]:
+                results.append((cost, path))
+                continue
+
+            if len(path) >= max_length:
+                continue
+            for next_id in self.edges[node_id]:
+                if next_id not in path:
+                    heapq.heappush(heap, (cost + self.costs[next_id], path + [next_id]))
+
+        return results
+
+
+def _warm_up_caps_graph() -> None:
+    """Build the caps graph ahead of the first /pipelines/paths request."""
+    try:
+        _get_caps_graph()
+    except Exception:
+        pass
+
+
+_caps_graph: CapsGraph | None = None
+_caps_graph_cookie: int | None = None
+_caps_graph_lock = threading.Lock()
+
+
+def _get_caps_graph() -> CapsGraph:
+    """
+    Return the caps compatibility graph, rebuilding it when the GStreamer registry changes.
+
+    Returns
+    -------
+    CapsGraph
+        The caps compatibility graph over all registered element factories.
+    """
+    global _caps_graph, _caps_graph_cookie
+
+    import gi
+
+    gi.require_version("Gst", "1.0")
+    from gi.repository import Gst
+
+    Gst.init(None)
+    registry = Gst.Registry.get()
+    cookie = registry.get_feature_list_cookie()
+
+    with _caps_graph_lock:
+        if _caps_graph is None or cookie != _caps_graph_cookie:
+            factories = []
+            for factory in registry.get_feature_list(Gst.ElementFactory):
+                sink_caps = Gst.Caps.new_empty()
+                src_caps = Gst.Caps.new_empty()
+                for pad_template in factory.get_static_pad_templates():
+                    if pad_template.direction == Gst.PadDirection.SINK:
+                        sink_caps = sink_caps.merge(pad_template.get_caps())
+                    elif pad_template.direction == Gst.PadDirection.SRC:
+                        src_caps = src_caps.merge(pad_template.get_caps())
+
+                factories.append(
+                    {
+                        "name": factory.get_name(),
+                        "klass": factory.get_klass() or "",
+                        "rank": factory.get_rank(),
+                        "sink_caps": sink_caps,
+                        "src_caps": src_caps,
+                    }
+                )
+            factories.sort(key=lambda x: x["name"])
+            _caps_graph = CapsGraph(factories)
+            _caps_graph_cookie = cookie
+        return _caps_graph
+
+
 @app.get("/", response_class=HTMLResponse)
 def get_dashboard(settings: Settings = Depends(get_settings)) -> HTMLResponse:
     """
@@ -292,6 +1105,12 @@ def get_dashboard(settings: Settings = Depends(get_settings)) -> HTMLResponse:
             "source": "Application Settings",
             "desc": "List of directories scanned to locate GObject Introspection (.gir) XML files inside the container.",
         },
+        {
+            "name": "GSTMCP_GIR_INDEX_PATH",
+            "value": os.path.expanduser(settings.gir_index_path),
+            "source": "Application Settings",
+            "desc": "Pre-parsed, memory-mapped index of the .gir files. Rebuilt incrementally when a .gir file changes.",
+        },
         {
             "name": "GST_DOCS_AGENT_URL",
             "value": os.environ.get(
@@ -979,6 +1798,44 @@ curl "http://127.0.0.1:8000/docs/c?class_path=Gst.Element"</pre>
                             </div>
                         </div>
                     </div>
+
+                    <!-- Caps Path Search API -->
+                    <div class="bg-slate-900/40 border border-slate-800/80 rounded-2xl p-6 space-y-3">
+                        <h4 class="text-sm font-bold text-white">Find Element Chains Between Caps</h4>
+                        <p class="text-xs text-slate-400">
+                            Searches the pad-template caps graph for the cheapest chains converting the
+                            source caps into the sink caps, without starting a pipeline. Check the chosen
+                            chain with <code>/pipelines/validate</code>.
+                        </p>
+                        <pre class="bg-slate-950 p-3 rounded-xl text-xs text-slate-300
+                                    border border-slate-800/50 overflow-x-auto"
+                        >curl "http://127.0.0.1:8000/pipelines/paths?src_caps=video%2Fx-h264&amp;sink_caps=video%2Fx-raw%2Cformat%3DRGBA" | jq .</pre>
+                    </div>
+
+                    <!-- Pipeline Profiling API -->
+                    <div class="bg-slate-900/40 border border-slate-800/80 rounded-2xl p-6 space-y-3">
+                        <h4 class="text-sm font-bold text-white">Profile a Pipeline</h4>
+                        <p class="text-xs text-slate-400">
+                            Runs the pipeline headlessly in a separate process and reports per-element
+                            throughput, per-link latency, queue fill levels and per-thread CPU time.
+                        </p>
+                        <pre class="bg-slate-950 p-3 rounded-xl text-xs text-slate-300
+                                    border border-slate-800/50 overflow-x-auto"
+                        >curl "http://127.0.0.1:8000/pipelines/profile?pipeline=videotestsrc+%21+x264enc+%21+fakesink&amp;num_buffers=300&amp;duration=5" | jq .</pre>
+                    </div>
+
+                    <!-- Batch Lookup API -->
+                    <div class="bg-slate-900/40 border border-slate-800/80 rounded-2xl p-6 space-y-3 md:col-span-2">
+                        <h4 class="text-sm font-bold text-white">Batch Element &amp; Class Lookups</h4>
+                        <p class="text-xs text-slate-400">
+                            Resolves many <code>/elements/details</code>, <code>/docs/c</code> and
+                            <code>/docs/python</code> lookups in one round trip. A failing lookup is reported
+                            in its own entry instead of failing the whole batch.
+                        </p>
+                        <pre class="bg-slate-950 p-3 rounded-xl text-xs text-slate-300
+                                    border border-slate-800/50 overflow-x-auto"
+                        >curl "http://127.0.0.1:8000/batch?elements=h264parse&amp;elements=filesrc&amp;c_classes=Gst.Pad&amp;python_classes=Gst.Pad" | jq .</pre>
+                    </div>
                 </div>
             </section>
         </main>
@@ -1048,11 +1905,19 @@ def get_available_elements(
     query: str
     | None = Query(
         None,
-        description="Optional global fallback search (name, desc, plugin, class)",
+        description="Optional ranked, typo-tolerant search over name, class, description and caps",
+    ),
+    limit: int
+    | None = Query(None, ge=1, description="Optional maximum number of results"),
+    offset: int = Query(0, ge=0, description="Number of results to skip"),
+    fields: str
+    | None = Query(
+        None,
+        description="Optional comma-separated fields to return: plugin, element, klass, description, caps, score",
     ),
 ) -> dict[str, Any]:
     """
-    List and filter GStreamer elements registered in the container.
+    List, filter and search GStreamer elements registered in the container.
 
     Parameters
     ----------
@@ -1063,71 +1928,70 @@ def get_available_elements(
     klass : str or None, optional
         A semantic class to filter elements, by default None.
     query : str or None, optional
-        A global search string to filter elements by name, description, plugin, or class, by default None.
+        A free-text query. Matching elements are ranked by relevance instead of sorted
+        alphabetically, by default None.
+    limit : int or None, optional
+        The maximum number of elements to return, by default None (all).
+    offset : int, optional
+        The number of elements to skip, by default 0.
+    fields : str or None, optional
+        Comma-separated fields to include in each element, by default
+        'plugin,element,klass,description'.
 
     Returns
     -------
     dict of str to Any
-        A dictionary containing the status and sorted list of filtered elements.
+        A dictionary containing the status, the total number of matches and the requested page
+        of elements.
 
     Raises
     ------
     HTTPException
-        If GStreamer registry querying fails.
+        If an unknown field is requested or GStreamer registry querying fails.
     """
-    try:
-        import gi
-
-        gi.require_version("Gst", "1.0")
-        from gi.repository import Gst
-
-        Gst.init(None)
-
-        registry = Gst.Registry.get()
-        factories = registry.get_feature_list(Gst.ElementFactory)
+    allowed_fields = ("plugin", "element", "klass", "description", "caps", "score")
+    if fields:
+        selected_fields = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in selected_fields if f not in allowed_fields]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields {unknown}. Available: {list(allowed_fields)}",
+            )
+    else:
+        selected_fields = ["plugin", "element", "klass", "description"]
 
-        elements = []
-        for factory in factories:
-            f_name = factory.get_name()
-            f_klass = factory.get_klass() or ""
-            desc = factory.get_description() or ""
-            f_plugin = factory.get_plugin_name() or "core"
+    try:
+        search_index = _get_element_search_index()
 
-            # 1. Strict Name Filter
-            if name and name.lower() not in f_name.lower():
+        # 1. Strict name, plugin and classification filters
+        candidates = []
+        for doc_id, element in enumerate(search_index.elements):
+            if name and name.lower() not in element["element"].lower():
                 continue
-
-            # 2. Strict Plugin Filter
-            if plugin and plugin.lower() not in f_plugin.lower():
+            if plugin and plugin.lower() not in element["plugin"].lower():
                 continue
-
-            # 3. Strict Classification Filter
-            if klass and klass.lower() not in f_klass.lower():
+            if klass and klass.lower() not in element["klass"].lower():
                 continue
+            candidates.append(doc_id)
 
-            # 4. Fallback Global Query
-            if query:
-                q = query.lower()
-                if (
-                    q not in f_name.lower()
-                    and q not in desc.lower()
-                    and q not in f_plugin.lower()
-                    and q not in f_klass.lower()
-                ):
-                    continue
+        # 2. Ranked global query, otherwise alphabetical
+        if query:
+            ranked = search_index.search(query, set(candidates))
+        else:
+            ranked = [(doc_id, None) for doc_id in candidates]
 
-            elements.append(
-                {
-                    "plugin": f_plugin,
-                    "element": f_name,
-                    "klass": f_klass,
-                    "description": desc,
-                }
-            )
+        total = len(ranked)
+        end = offset + limit if limit is not None else None
+
+        elements = []
+        for doc_id, score in ranked[offset:end]:
+            element = dict(search_index.elements[doc_id], score=score)
+            if score is not None:
+                element["score"] = round(score, 3)
+            elements.append({f: element[f] for f in selected_fields})
 
-        # Sort alphabetically
-        elements.sort(key=lambda x: x["element"])
-        return {"status": "success", "data": elements}
+        return {"status": "success", "total": total, "data": elements}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1248,8 +2112,6 @@ def get_element_details(
         data = {"schema": schema}
         if raw and raw_text:
             if minify:
-                import re
-
                 minified_lines = []
                 for line in raw_text.splitlines():
                     line = line.rstrip()
@@ -1377,9 +2239,575 @@ def validate_pipeline(
         )
 
 
-@app.get("/docs/python")
-def get_python_docs(
-    class_path: str = Query(..., description="E.g., Gst.Element, Gst.Pad")
+def _thread_cpu_seconds(native_id: int) -> float | None:
+    """
+    Read the user + system CPU time of a thread of this process from /proc.
+
+    Parameters
+    ----------
+    native_id : int
+        The native (kernel) thread id.
+
+    Returns
+    -------
+    float or None
+        The consumed CPU time in seconds, or None if the thread has exited.
+    """
+    try:
+        with open(f"/proc/self/task/{native_id}/stat") as f:
+            # The command name may contain spaces, the remaining fields follow the last ')'
+            fields = f.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def _profile_pipeline(
+    pipeline_string: str, num_buffers: int, duration: float, headless: bool
+) -> dict[str, Any]:
+    """
+    Run a pipeline and measure per-element throughput, per-link latency, queue levels and CPU time.
+
+    Buffer probes are attached to every pad of every element. Throughput is counted on src pads,
+    the latency of a link is the time from a buffer entering the upstream element to the buffer
+    with the same PTS reaching the downstream element, and CPU time is read per streaming thread.
+    The pipeline stops after any sink has received ``num_buffers`` buffers, after ``duration``
+    seconds, on EOS or on error, whichever comes first.
+
+    This function runs GStreamer in the calling process and is meant to be executed in a
+    dedicated subprocess, see the /pipelines/profile endpoint.
+
+    Parameters
+    ----------
+    pipeline_string : str
+        The GStreamer pipeline description.
+    num_buffers : int
+        Stop after a sink has received this many buffers.
+    duration : float
+        Stop after this many seconds.
+    headless : bool
+        Replace video and audio output sinks with fakesink, and disable clock sync on all sinks.
+
+    Returns
+    -------
+    dict of str to Any
+        The profiling report. Its 'outcome' tells what stopped the run: 'num_buffers',
+        'duration', 'eos' or 'error'.
+    """
+    import gi
+
+    gi.require_version("Gst", "1.0")
+    from gi.repository import Gst
+
+    Gst.init(None)
+
+    pipeline = Gst.parse_launch(pipeline_string)
+    if not isinstance(pipeline, Gst.Pipeline):
+        wrapper = Gst.Pipeline.new("profiled-pipeline")
+        wrapper.add(pipeline)
+        pipeline = wrapper
+
+    def _iterate(iterator) -> list:
+        items = []
+        while True:
+            result, item = iterator.next()
+            if result != Gst.IteratorResult.OK:
+                break
+            items.append(item)
+        return items
+
+    def _elements() -> list:
+        return _iterate(pipeline.iterate_recurse())
+
+    def _factory_name(element) -> str:
+        factory = element.get_factory()
+        return factory.get_name() if factory else type(element).__name__
+
+    def _is_sink(element) -> bool:
+        factory = element.get_factory()
+        return (
+            bool(factory)
+            and "Sink" in (factory.get_klass() or "")
+            and not _iterate(element.iterate_src_pads())
+        )
+
+    # 1. Headless mode: swap display and audio sinks for fakesink, disable clock sync
+    if headless:
+        for element in _elements():
+            klass = element.get_factory().get_klass() if element.get_factory() else ""
+            if not _is_sink(element) or not ("Video" in klass or "Audio" in klass):
+                continue
+            sink_pad = element.get_static_pad("sink")
+            peer = sink_pad.get_peer() if sink_pad else None
+            if peer is None:
+                continue
+            parent = element.get_parent()
+            name = element.get_name()
+            peer.unlink(sink_pad)
+            parent.remove(element)
+            fakesink = Gst.ElementFactory.make("fakesink", name)
+            parent.add(fakesink)
+            peer.link(fakesink.get_static_pad("sink"))
+
+        for element in _elements():
+            if _is_sink(element) and element.find_property("sync") is not None:
+                element.set_property("sync", False)
+
+    # 2. Buffer probes on every pad
+    lock = threading.Lock()
+    stats: dict[str, dict[str, Any]] = {}
+    arrivals: dict[str, dict[int, float]] = {}
+    links: dict[tuple[str, str], list[float]] = {}
+    sink_buffers: dict[str, int] = {}
+    stop = threading.Event()
+    max_arrivals = 512
+
+    def _on_src_buffer(pad, info, element_name):
+        buffer = info.get_buffer()
+        now = time.perf_counter()
+        with lock:
+            entry = stats[element_name]
+            entry["buffers"] += 1
+            entry["bytes"] += buffer.get_size() if buffer else 0
+            entry["first"] = entry["first"] if entry["first"] is not None else now
+            entry["last"] = now
+            entry["threads"].add(threading.get_native_id())
+        return Gst.PadProbeReturn.OK
+
+    def _on_sink_buffer(pad, info, element_name):
+        buffer = info.get_buffer()
+        now = time.perf_counter()
+        with lock:
+            stats[element_name]["threads"].add(threading.get_native_id())
+            if buffer is not None and buffer.pts != Gst.CLOCK_TIME_NONE:
+                # Latency of the link from the upstream element
+                peer = pad.get_peer()
+                upstream = peer.get_parent_element() if peer else None
+                if upstream is not None:
+                    upstream_name = upstream.get_name()
+                    arrived = arrivals.get(upstream_name, {}).get(buffer.pts)
+                    key = (
+                        f"{upstream_name}.{peer.get_name()}",
+                        f"{element_name}.{pad.get_name()}",
+                    )
+                    samples = links.setdefault(key, [])
+                    if arrived is not None:
+                        samples.append(now - arrived)
+
+                own = arrivals.setdefault(element_name, {})
+                own[buffer.pts] = now
+                if len(own) > max_arrivals:
+                    del own[next(iter(own))]
+
+            if element_name in sink_buffers:
+                sink_buffers[element_name] += 1
+                if sink_buffers[element_name] >= num_buffers:
+                    stop.set()
+        return Gst.PadProbeReturn.OK
+
+    def _probe_pad(pad, element_name):
+        if pad.get_direction() == Gst.PadDirection.SRC:
+            pad.add_probe(Gst.PadProbeType.BUFFER, _on_src_buffer, element_name)
+        else:
+            pad.add_probe(Gst.PadProbeType.BUFFER, _on_sink_buffer, element_name)
+
+    def _on_pad_added(element, pad):
+        _probe_pad(pad, element.get_name())
+
+    queues = []
+    for element in _elements():
+        if isinstance(element, Gst.Bin):
+            continue
+        element_name = element.get_name()
+        stats[element_name] = {
+            "factory": _factory_name(element),
+            "buffers": 0,
+            "bytes": 0,
+            "first": None,
+            "last": None,
+            "threads": set(),
+        }
+        if _is_sink(element):
+            sink_buffers[element_name] = 0
+        for pad in _iterate(element.iterate_pads()):
+            _probe_pad(pad, element_name)
+        element.connect("pad-added", _on_pad_added)
+
+        if _factory_name(element) in ("queue", "queue2"):
+            queues.append(
+                {
+                    "element": element,
+                    "levels_buffers": [],
+                    "levels_time": [],
+                    "overruns": 0,
+                }
+            )
+
+    def _on_overrun(queue, entry):
+        entry["overruns"] += 1
+
+    for entry in queues:
+        entry["element"].connect("overrun", _on_overrun, entry)
+
+    # 3. Run, sampling queue levels while waiting for the stop condition
+    errors = []
+    outcome = "num_buffers"
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    deadline = wall_start + duration
+    thread_cpu: dict[int, float] = {}
+
+    bus = pipeline.get_bus()
+    if pipeline.set_state(Gst.State.PLAYING) == Gst.StateChangeReturn.FAILURE:
+        outcome = "error"
+        errors.append("Failed to set the pipeline to PLAYING")
+    else:
+        while not stop.is_set():
+            if time.perf_counter() >= deadline:
+                outcome = "duration"
+                break
+            msg = bus.timed_pop_filtered(
+                50 * Gst.MSECOND, Gst.MessageType.ERROR | Gst.MessageType.EOS
+            )
+            if msg is not None:
+                if msg.type == Gst.MessageType.ERROR:
+                    err, debug = msg.parse_error()
+                    errors.append(f"{msg.src.get_name()}: {err.message}")
+                    outcome = "error"
+                else:
+                    outcome = "eos"
+                break
+            for entry in queues:
+                entry["levels_buffers"].append(
+                    entry["element"].get_property("current-level-buffers")
+                )
+                entry["levels_time"].append(
+                    entry["element"].get_property("current-level-time")
+                )
+
+        # Streaming threads exit on teardown, read their CPU time before
+        with lock:
+            thread_ids = set().union(*(s["threads"] for s in stats.values()))
+        for tid in thread_ids:
+            cpu = _thread_cpu_seconds(tid)
+            if cpu is not None:
+                thread_cpu[tid] = cpu
+
+    wall_time = time.perf_counter() - wall_start
+    process_cpu = time.process_time() - cpu_start
+    pipeline.set_state(Gst.State.NULL)
+
+    # 4. Report
+    elements_report = []
+    for element_name, entry in stats.items():
+        active = (
+            entry["last"] - entry["first"]
+            if entry["first"] is not None and entry["last"] > entry["first"]
+            else 0.0
+        )
+        elements_report.append(
+            {
+                "name": element_name,
+                "factory": entry["factory"],
+                "buffers": entry["buffers"],
+                "bytes": entry["bytes"],
+                "buffers_per_s": round(entry["buffers"] / active, 2)
+                if active
+                else None,
+                "mbytes_per_s": (
+                    round(entry["bytes"] / active / 1e6, 3) if active else None
+                ),
+                "threads": sorted(entry["threads"]),
+            }
+        )
+
+    links_report = []
+    for (src, sink), samples in links.items():
+        links_report.append(
+            {
+                "src": src,
+                "sink": sink,
+                "samples": len(samples),
+                "latency_ms_avg": (
+                    round(1000.0 * sum(samples) / len(samples), 3) if samples else None
+                ),
+                "latency_ms_max": round(1000.0 * max(samples), 3) if samples else None,
+            }
+        )
+
+    queues_report = []
+    for entry in queues:
+        levels = entry["levels_buffers"]
+        levels_time = entry["levels_time"]
+        queues_report.append(
+            {
+                "name": entry["element"].get_name(),
+                "max_size_buffers": entry["element"].get_property("max-size-buffers"),
+                "level_buffers_avg": (
+                    round(sum(levels) / len(levels), 2) if levels else None
+                ),
+                "level_buffers_max": max(levels) if levels else None,
+                "level_time_ms_max": (
+                    round(max(levels_time) / Gst.MSECOND, 3) if levels_time else None
+                ),
+                "overruns": entry["overruns"],
+            }
+        )
+
+    threads_report = [
+        {
+            "tid": tid,
+            "cpu_s": round(cpu, 3),
+            "elements": sorted(
+                name for name, entry in stats.items() if tid in entry["threads"]
+            ),
+        }
+        for tid, cpu in sorted(thread_cpu.items())
+    ]
+
+    return {
+        "outcome": outcome,
+        "errors": errors,
+        "wall_time_s": round(wall_time, 3),
+        "process_cpu_s": round(process_cpu, 3),
+        "sink_buffers": sink_buffers,
+        "elements": elements_report,
+        "links": links_report,
+        "queues": queues_report,
+        "threads": threads_report,
+    }
+
+
+@app.get("/pipelines/profile")
+def profile_pipeline(
+    pipeline: str = Query(
+        ...,
+        description="The full pipeline string, e.g. 'videotestsrc ! x264enc ! fakesink'",
+    ),
+    num_buffers: int = Query(
+        300, ge=1, description="Stop after any sink has received this many buffers"
+    ),
+    duration: float = Query(
+        5.0, gt=0.0, le=60.0, description="Stop after this many seconds"
+    ),
+    headless: bool = Query(
+        True,
+        description="Replace video/audio sinks with fakesink and disable clock sync on sinks",
+    ),
+) -> dict[str, Any]:
+    """
+    Run a pipeline headlessly and report its performance.
+
+    The pipeline runs in a separate process, so a crashing pipeline cannot take the server down.
+
+    Parameters
+    ----------
+    pipeline : str
+        The full GStreamer pipeline string to profile.
+    num_buffers : int, optional
+        Stop after any sink has received this many buffers, by default 300.
+    duration : float, optional
+        Stop after this many seconds, by default 5.0.
+    headless : bool, optional
+        Whether to replace video/audio sinks with fakesink and disable clock sync, by default True.
+
+    Returns
+    -------
+    dict of str to Any
+        A dictionary containing the status and the profiling report with per-element throughput,
+        per-link latency, queue fill levels and per-thread CPU time.
+
+    Raises
+    ------
+    HTTPException
+        If the profiling process crashes or does not terminate.
+    """
+    args = [
+        sys.executable,
+        os.path.abspath(__file__),
+        "profile",
+        pipeline,
+        "--num-buffers",
+        str(num_buffers),
+        "--duration",
+        str(duration),
+    ]
+    if not headless:
+        args.append("--no-headless")
+
+    try:
+        # Allow time for plugin loading and state changes on top of the run itself
+        result = subprocess.run(
+            args, capture_output=True, text=True, timeout=duration + 15.0
+        )
+    except subprocess.TimeoutExpired:
+        raise HTTPException(
+            status_code=500, detail="Pipeline profiling did not terminate in time."
+        )
+
+    try:
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+    except Exception:
+        stderr = "\n".join(result.stderr.strip().splitlines()[-15:])
+        raise HTTPException(
+            status_code=500,
+            detail=f"Pipeline profiling process crashed (Exit Code {result.returncode}):\n{stderr}",
+        )
+
+    if "detail" in report:
+        raise HTTPException(status_code=400, detail=report["detail"])
+    return {"status": "success", "data": report}
+
+
+@app.get("/pipelines/paths")
+def find_caps_paths(
+    src_caps: str = Query(
+        ...,
+        description="Caps produced upstream, e.g. 'video/x-h264, stream-format=byte-stream'",
+    ),
+    sink_caps: str = Query(
+        ..., description="Caps accepted downstream, e.g. 'video/x-raw, format=RGBA'"
+    ),
+    max_length: int = Query(
+        4, ge=1, le=8, description="Maximum number of elements in a chain"
+    ),
+    max_results: int = Query(
+        5, ge=1, le=20, description="Maximum number of chains to return"
+    ),
+) -> dict[str, Any]:
+    """
+    Find the cheapest element chains converting the source caps into the sink caps.
+
+    Chains are searched on the pre-computed pad-template caps compatibility graph, so no
+    pipeline is started. Template caps are only an upper bound of what an element negotiates,
+    the chosen chain should still be checked with /pipelines/validate.
+
+    Parameters
+    ----------
+    src_caps : str
+        The caps produced upstream of the chain.
+    sink_caps : str
+        The caps accepted downstream of the chain.
+    max_length : int, optional
+        The maximum number of elements in a chain, by default 4.
+    max_results : int, optional
+        The maximum number of chains to return, by default 5.
+
+    Returns
+    -------
+    dict of str to Any
+        A dictionary containing the status, the chains found, cheapest first, and the search time.
+
+    Raises
+    ------
+    HTTPException
+        If the caps cannot be parsed or the GStreamer registry querying fails.
+    """
+    try:
+        import gi
+
+        gi.require_version("Gst", "1.0")
+        from gi.repository import Gst
+
+        Gst.init(None)
+        graph = _get_caps_graph()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    parsed = {}
+    for label, caps_string in (("src_caps", src_caps), ("sink_caps", sink_caps)):
+        caps = Gst.Caps.from_string(caps_string)
+        if caps is None or caps.is_empty():
+            raise HTTPException(
+                status_code=400, detail=f"Could not parse {label} '{caps_string}'"
+            )
+        parsed[label] = caps
+
+    start = time.perf_counter()
+    paths = graph.find_paths(
+        parsed["src_caps"],
+        parsed["sink_caps"],
+        max_length=max_length,
+        max_results=max_results,
+    )
+    elapsed_ms = (time.perf_counter() - start) * 1000.0
+
+    data = []
+    for cost, path in paths:
+        names = [graph.nodes[node_id]["name"] for node_id in path]
+        data.append(
+            {
+                "elements": names,
+                "klass": [graph.nodes[node_id]["klass"] for node_id in path],
+                "cost": round(cost, 3),
+                "pipeline": " ! ".join(names),
+            }
+        )
+
+    return {
+        "status": "success",
+        "data": {"paths": data, "search_ms": round(elapsed_ms, 3)},
+    }
+
+
+@functools.lru_cache(maxsize=512)
+def _render_python_docs(namespace: str, class_name: str) -> str:
+    """
+    Render the Python documentation of a GObject class.
+
+    The typelibs cannot change while the process is running, so the rendered text is cached.
+
+    Parameters
+    ----------
+    namespace : str
+        The GObject namespace, e.g., 'Gst'.
+    class_name : str
+        The class name, e.g., 'Element'.
+
+    Returns
+    -------
+    str
+        The Python-formatted class documentation.
+
+    Raises
+    ------
+    HTTPException
+        If the class cannot be found in the namespace.
+    """
+    import gi
+
+    gi.require_version("Gst", "1.0")
+    if namespace != "Gst":
+        gi.require_version(namespace, "1.0")
+
+    module = importlib.import_module(f"gi.repository.{namespace}")
+    if not hasattr(module, class_name):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Class '{class_name}' not found in namespace '{namespace}'",
+        )
+    target_class = getattr(module, class_name)
+
+    output = [f"Class: {target_class.__name__}"]
+    if target_class.__doc__:
+        output.append(f"Docstring:\n{target_class.__doc__}")
+
+    output.append("\nSpecific Members:")
+
+    for name, member in inspect.getmembers(target_class):
+        if name.startswith("_"):
+            continue
+
+        if name in target_class.__dict__:
+            formatted = _format_python_member(name, member)
+            output.append(formatted)
+
+    return "\n".join(output)
+
+
+@app.get("/docs/python")
+def get_python_docs(
+    class_path: str = Query(..., description="E.g., Gst.Element, Gst.Pad")
 ) -> dict[str, Any]:
     """
     Retrieve Python documentation and method signatures for a GObject class.
@@ -1400,7 +2828,7 @@ def get_python_docs(
         If PyGObject is missing, parsing fails, or class cannot be found.
     """
     try:
-        import gi
+        import gi  # noqa: F401
     except ImportError:
         raise HTTPException(
             status_code=500,
@@ -1413,34 +2841,9 @@ def get_python_docs(
         raise HTTPException(status_code=400, detail=str(e))
 
     try:
-        gi.require_version("Gst", "1.0")
-        if namespace != "Gst":
-            gi.require_version(namespace, "1.0")
-
-        module = importlib.import_module(f"gi.repository.{namespace}")
-        if not hasattr(module, class_name):
-            raise HTTPException(
-                status_code=404,
-                detail=f"Class '{class_name}' not found in namespace '{namespace}'",
-            )
-        target_class = getattr(module, class_name)
-
-        output = [f"Class: {target_class.__name__}"]
-        if target_class.__doc__:
-            output.append(f"Docstring:\n{target_class.__doc__}")
-
-        output.append("\nSpecific Members:")
-
-        for name, member in inspect.getmembers(target_class):
-            if name.startswith("_"):
-                continue
-
-            if name in target_class.__dict__:
-                formatted = _format_python_member(name, member)
-                output.append(formatted)
-
-        return {"status": "success", "data": "\n".join(output)}
-
+        return {"status": "success", "data": _render_python_docs(namespace, class_name)}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Introspection failed: {str(e)}")
 
@@ -1476,132 +2879,36 @@ def get_c_docs(
         raise HTTPException(status_code=400, detail=str(e))
 
     try:
-        gir_path = _find_gir_path(
-            namespace=namespace, gir_search_paths=settings.gir_search_paths
-        )
-    except FileNotFoundError as e:
-        raise HTTPException(status_code=404, detail=str(e))
-
-    try:
-        tree = ET.parse(gir_path)
-        root = tree.getroot()
-
-        ns = {
-            "core": "http://www.gtk.org/introspection/core/1.0",
-            "c": "http://www.gtk.org/introspection/c/1.0",
-        }
+        gir_index = _get_gir_index(settings)
+        if not gir_index.has_namespace(namespace):
+            raise HTTPException(
+                status_code=404,
+                detail=f"Could not find introspection file for {namespace} in {settings.gir_search_paths}",
+            )
 
-        target_class = root.find(f".//core:class[@name='{class_name}']", ns)
-        if target_class is None:
+        record = gir_index.lookup(namespace, class_name)
+        if record is None or record["kind"] != "class":
             raise HTTPException(
                 status_code=404,
                 detail=f"Class '{class_name}' not found in {namespace}.",
             )
 
-        c_type_name = target_class.attrib.get(f"{{{ns['c']}}}type", class_name)
-
-        output = [f"C Struct: {c_type_name}"]
+        output = [f"C Struct: {record['c_type']}"]
 
-        doc = target_class.find("core:doc", ns)
-        if doc is not None and doc.text:
-            summary = doc.text.strip().split("\n\n")[0]
-            output.append(f"Summary: {summary}\n")
+        if record["summary"]:
+            output.append(f"Summary: {record['summary']}\n")
 
         output.append("C Functions & Methods:")
-
-        methods = target_class.findall("core:method", ns) + target_class.findall(
-            "core:virtual-method", ns
-        )
-        for method in methods:
-            formatted = _format_c_method(method, ns, c_type_name)
-            if formatted:
-                output.append(formatted)
+        output.extend(record["methods"])
 
         return {"status": "success", "data": "\n".join(output)}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"XML Parsing failed: {str(e)}")
 
 
-_classes_cache: dict[str, list[str]] = {}
-
-
-def _list_available_namespaces(search_paths: list[str]) -> list[str]:
-    """
-    List available GStreamer-related GObject namespaces from .gir files.
-
-    Parameters
-    ----------
-    search_paths : list of str
-        The search paths for GObject Introspection (.gir) files.
-
-    Returns
-    -------
-    list of str
-        A sorted list of available namespace names.
-    """
-    namespaces = set()
-    for base_dir in search_paths:
-        if os.path.exists(base_dir):
-            for f in os.listdir(base_dir):
-                if f.endswith(".gir"):
-                    parts = f.split("-")
-                    if parts:
-                        ns_name = parts[0]
-                        if ns_name.startswith("Gst") or ns_name in (
-                            "GLib",
-                            "GObject",
-                            "Gio",
-                        ):
-                            namespaces.add(ns_name)
-    return sorted(list(namespaces))
-
-
-def _get_classes_for_namespace(namespace: str, search_paths: list[str]) -> list[str]:
-    """
-    Get all classes and interfaces for a specific GObject namespace.
-
-    Parameters
-    ----------
-    namespace : str
-        The GObject namespace, e.g., 'Gst'.
-    search_paths : list of str
-        The search paths for .gir files.
-
-    Returns
-    -------
-    list of str
-        A sorted list of class and interface names in the namespace.
-    """
-    if namespace in _classes_cache:
-        return _classes_cache[namespace]
-
-    try:
-        gir_path = _find_gir_path(namespace, search_paths)
-    except FileNotFoundError:
-        return []
-
-    try:
-        tree = ET.parse(gir_path)
-        root = tree.getroot()
-        ns = {
-            "core": "http://www.gtk.org/introspection/core/1.0",
-        }
-
-        classes = []
-        for tag in ["class", "interface"]:
-            for elem in root.findall(f".//core:{tag}", ns):
-                name = elem.attrib.get("name")
-                if name:
-                    classes.append(name)
-
-        classes.sort()
-        _classes_cache[namespace] = classes
-        return classes
-    except Exception:
-        return []
-
-
 @app.get("/docs/classes")
 def get_available_classes(
     namespace: str
@@ -1629,7 +2936,8 @@ def get_available_classes(
     dict of str to Any
         A dictionary containing the status, available namespaces, and classes.
     """
-    available_namespaces = _list_available_namespaces(settings.gir_search_paths)
+    gir_index = _get_gir_index(settings)
+    available_namespaces = gir_index.namespaces()
 
     if namespace:
         if namespace not in available_namespaces:
@@ -1643,7 +2951,7 @@ def get_available_classes(
 
     data = []
     for ns_name in target_namespaces:
-        classes = _get_classes_for_namespace(ns_name, settings.gir_search_paths)
+        classes = gir_index.classes(ns_name)
         for cls in classes:
             class_path = f"{ns_name}.{cls}"
             # Apply search filter
@@ -1665,3 +2973,87 @@ def get_available_classes(
         "namespaces": available_namespaces,
         "data": data,
     }
+
+
+@app.get("/batch")
+def get_batch(
+    elements: list[str] = Query(
+        [],
+        description="Element names to inspect, e.g. elements=h264parse&elements=filesrc",
+    ),
+    c_classes: list[str] = Query(
+        [], description="Class paths to fetch C docs for, e.g. c_classes=Gst.Pad"
+    ),
+    python_classes: list[str] = Query(
+        [],
+        description="Class paths to fetch Python docs for, e.g. python_classes=Gst.Pad",
+    ),
+    settings: Settings = Depends(get_settings),
+) -> dict[str, Any]:
+    """
+    Resolve many element and class lookups in one round trip.
+
+    Each lookup is resolved independently, a failing lookup is reported as an error entry
+    instead of failing the whole batch.
+
+    Parameters
+    ----------
+    elements : list of str
+        Element names to inspect, equivalent to calling /elements/details for each name.
+    c_classes : list of str
+        Class paths to fetch, equivalent to calling /docs/c for each class path.
+    python_classes : list of str
+        Class paths to fetch, equivalent to calling /docs/python for each class path.
+    settings : Settings
+        Application settings.
+
+    Returns
+    -------
+    dict of str to Any
+        A dictionary containing the status and per-lookup results keyed by name or class path.
+    """
+
+    def _resolve(lookup, *args) -> dict[str, Any]:
+        try:
+            return {"data": lookup(*args)["data"]}
+        except HTTPException as e:
+            return {"error": e.detail}
+        except Exception as e:
+            # E.g. a GIR parse error or a missing key for one name, the other lookups still resolve
+            return {"error": f"{type(e).__name__}: {e}"}
+
+    data = {
+        "elements": {
+            name: _resolve(get_element_details, name, False, True)
+            for name in dict.fromkeys(elements)
+        },
+        "c_docs": {
+            class_path: _resolve(get_c_docs, class_path, settings)
+            for class_path in dict.fromkeys(c_classes)
+        },
+        "python_docs": {
+            class_path: _resolve(get_python_docs, class_path)
+            for class_path in dict.fromkeys(python_classes)
+        },
+    }
+    return {"status": "success", "data": data}
+
+
+if __name__ == "__main__":
+    # Entry point of the isolated process started by /pipelines/profile
+    parser = argparse.ArgumentParser(description="GStreamer Doc-Agent helper commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    profile_parser = subparsers.add_parser("profile", help="Profile a pipeline")
+    profile_parser.add_argument("pipeline", help="The GStreamer pipeline description")
+    profile_parser.add_argument("--num-buffers", type=int, default=300)
+    profile_parser.add_argument("--duration", type=float, default=5.0)
+    profile_parser.add_argument("--no-headless", dest="headless", action="store_false")
+    args = parser.parse_args()
+
+    try:
+        report = _profile_pipeline(
+            args.pipeline, args.num_buffers, args.duration, args.headless
+        )
+    except Exception as e:
+        report = {"detail": f"Pipeline profiling failed: {e}"}
+    print(json.dumps(report))
@@ -10,7 +10,7 @@ the input video file.
 import argparse
 import sys
 import os
-from typing import List, Tuple, Dict, Any, Optional
+from typing import List, Any, Optional
 
 import gi
 
@@ -19,108 +19,17 @@ gi.require_version("GstBase", "1.0")
 gi.require_version("GstVideo", "1.0")
 gi.require_version("GstAnalytics", "1.0")
 from gi.repository import Gst, GstBase, GstAnalytics, GLib  # noqa: E402
+from helpers.latency import (  # noqa: E402
+    LATENCY_POLICIES,
+    get_latency_policy,
+    parse_drops_message,
+)
+from helpers.tracking import KalmanTracker, SimpleTracker  # noqa: E402
 
 # Initialize GStreamer before defining any Gst-derived classes
 Gst.init(None)
 
 
-def compute_iou(boxA: List[float], boxB: List[float]) -> float:
-    """
-    Compute the Intersection over Union (IoU) of two bounding boxes.
-
-    Parameters
-    ----------
-    boxA : List[float]
-        Bounding box in format [x, y, w, h].
-    boxB : List[float]
-        Bounding box in format [x, y, w, h].
-
-    Returns
-    -------
-    float
-        The intersection-over-union ratio, between 0.0 and 1.0.
-    """
-    xA = max(boxA[0], boxB[0])
-    yA = max(boxA[1], boxB[1])
-    xB = min(boxA[0] + boxA[2], boxB[0] + boxB[2])
-    yB = min(boxA[1] + boxA[3], boxB[1] + boxB[3])
-
-    interArea = max(0.0, xB - xA) * max(0.0, yB - yA)
-    boxAArea = boxA[2] * boxA[3]
-    boxBArea = boxB[2] * boxB[3]
-
-    unionArea = boxAArea + boxBArea - interArea
-    if unionArea == 0.0:
-        return 0.0
-    return interArea / unionArea
-
-
-class SimpleTracker:
-    """
-    A simple Intersection-over-Union (IoU) tracker for bounding boxes.
-
-    This class serves as a functional placeholder for ByteTrack, tracking
-    objects between frames by matching bounding boxes with the highest IoU.
-
-    Attributes
-    ----------
-    next_id : int
-        The next unique integer ID to assign to a tracked object.
-    tracks : dict
-        A dictionary mapping object IDs to their last known bounding box
-        represented as a list or tuple: [x, y, w, h].
-    """
-
-    def __init__(self) -> None:
-        """Initialize the tracker with empty tracks and ID counter."""
-        self.next_id: int = 1
-        self.tracks: Dict[int, List[float]] = {}
-
-    def update(self, detections: List[List[float]]) -> List[Tuple[int, List[float]]]:
-        """
-        Update the tracker with new detections from the current frame.
-
-        Parameters
-        ----------
-        detections : List[List[float]]
-            A list of bounding boxes detected in the current frame,
-            where each box is [x, y, w, h].
-
-        Returns
-        -------
-        List[Tuple[int, List[float]]]
-            A list of tuples, each containing the tracking ID and its corresponding
-            updated bounding box.
-        """
-        new_tracks: Dict[int, List[float]] = {}
-        matched_detections = set()
-
-        # Try to match existing tracks with new detections
-        for track_id, last_box in self.tracks.items():
-            best_iou = 0.3  # Threshold
-            best_idx = -1
-            for idx, det in enumerate(detections):
-                if idx in matched_detections:
-                    continue
-                iou = compute_iou(last_box, det)
-                if iou > best_iou:
-                    best_iou = iou
-                    best_idx = idx
-
-            if best_idx != -1:
-                new_tracks[track_id] = detections[best_idx]
-                matched_detections.add(best_idx)
-
-        # Assign new IDs to remaining unmatched detections
-        for idx, det in enumerate(detections):
-            if idx not in matched_detections:
-                new_tracks[self.next_id] = det
-                self.next_id += 1
-
-        self.tracks = new_tracks
-        return list(self.tracks.items())
-
-
 class GstByteTrack(GstBase.BaseTransform):
     """
     GStreamer element that reads object detections and applies ByteTrack.
@@ -209,6 +118,8 @@ class GstByteTrack(GstBase.BaseTransform):
                     minimum_matching_threshold=0.8,
                     frame_rate=int(fps),
                 )
+            elif self.tracker_type == "kalman":
+                self.tracker = KalmanTracker(lost_track_buffer=30)
             else:
                 self.tracker = SimpleTracker()
 
@@ -237,20 +148,24 @@ class GstByteTrack(GstBase.BaseTransform):
             return Gst.FlowReturn.OK
 
         # Process detections with selected tracker
-        tracks: List[Tuple[int, List[float]]] = []
+        track_ids: List[int] = []
+        track_boxes: List[List[float]] = []
+        detection_rows: List[int] = []
 
         if self.tracker_type == "bytetrack":
             xyxy_list: List[List[float]] = []
             conf_list: List[float] = []
             class_ids: List[int] = []
+            rows: List[int] = []
 
-            for od_mtd in od_mtds:
+            for idx, od_mtd in enumerate(od_mtds):
                 ok, x, y, w, h, conf = od_mtd.get_location()
                 if ok:
                     # Convert to Pascal VOC format: [x_min, y_min, x_max, y_max]
                     xyxy_list.append([float(x), float(y), float(x + w), float(y + h)])
                     conf_list.append(float(conf))
                     class_ids.append(int(od_mtd.get_obj_type()))
+                    rows.append(idx)
 
             if not xyxy_list:
                 return Gst.FlowReturn.OK
@@ -259,20 +174,26 @@ class GstByteTrack(GstBase.BaseTransform):
                 xyxy=np.array(xyxy_list, dtype=np.float32),
                 confidence=np.array(conf_list, dtype=np.float32),
                 class_id=np.array(class_ids, dtype=np.int32),
+                data={"index": np.array(rows, dtype=np.int64)},
             )
 
             tracked_detections = self.tracker.update_with_detections(sv_detections)
 
-            # Format tracks as a list of (track_id, [x, y, w, h])
-            if tracked_detections.tracker_id is not None:
-                for i in range(len(tracked_detections)):
-                    xyxy = tracked_detections.xyxy[i]
-                    track_id = int(tracked_detections.tracker_id[i])
-                    track_box = [xyxy[0], xyxy[1], xyxy[2] - xyxy[0], xyxy[3] - xyxy[1]]
-                    tracks.append((track_id, track_box))
+            # Format tracks as IDs, [x, y, w, h] boxes and the indices of their detections
+            if tracked_detections.tracker_id is not None and len(tracked_detections):
+                boxes = tracked_detections.xyxy.astype(np.float64)
+                boxes[:, 2:] -= boxes[:, :2]
+                track_ids = tracked_detections.tracker_id.tolist()
+                track_boxes = boxes.tolist()
+                detection_rows = tracked_detections.data["index"].tolist()
         else:
-            # Simple IoU tracker
-            tracks = self.tracker.update(detections)
+            # IoU tracker, or IoU tracker with Kalman filter, which keep their tracks in a
+            # TrackStore along with the index of the detection each track was matched with
+            store = self.tracker.store
+            slots = self.tracker.track(detections)
+            track_ids = store.ids[slots].tolist()
+            track_boxes = store.boxes[slots].tolist()
+            detection_rows = store.detections[slots].tolist()
 
         # Map tracked IDs back and link to the Object Detection descriptor
         if self.verbose:
@@ -280,37 +201,25 @@ class GstByteTrack(GstBase.BaseTransform):
                 f"\n--- Frame [PTS: {buf.pts}] {self.tracker_type.upper()} Tracking Update ---"
             )
 
-        for track_id, track_box in tracks:
-            best_match_idx: int = -1
-            best_match_iou: float = 0.5
+        for track_id, track_box, detection_idx in zip(
+            track_ids, track_boxes, detection_rows
+        ):
+            matched_od = od_mtds[detection_idx]
+            label = GLib.quark_to_string(matched_od.get_obj_type())
 
-            for idx, od_mtd in enumerate(od_mtds):
-                ok, x, y, w, h, conf = od_mtd.get_location()
-                roi_box = [float(x), float(y), float(w), float(h)]
-
-                # Simple IoU matching to identify which detection this track belongs to
-                iou = compute_iou(track_box, roi_box)
-                if iou > best_match_iou:
-                    best_match_iou = iou
-                    best_match_idx = idx
-
-            if best_match_idx != -1:
-                matched_od = od_mtds[best_match_idx]
-                label = GLib.quark_to_string(matched_od.get_obj_type())
-
-                # Print the bounding boxes only if verbose option is enabled
-                if self.verbose:
-                    print(
-                        f"Track ID {track_id} ({label}): x={track_box[0]:.1f}, y={track_box[1]:.1f}, w={track_box[2]:.1f}, h={track_box[3]:.1f}"
-                    )
-
-                # Add tracking descriptor
-                ok, tracking_mtd = relation_meta.add_tracking_mtd(track_id, buf.pts)
-                if ok:
-                    # Relate tracking descriptor to detection descriptor
-                    relation_meta.set_relation(
-                        GstAnalytics.RelTypes.RELATE_TO, matched_od.id, tracking_mtd.id
-                    )
+            # Print the bounding boxes only if verbose option is enabled
+            if self.verbose:
+                print(
+                    f"Track ID {track_id} ({label}): x={track_box[0]:.1f}, y={track_box[1]:.1f}, w={track_box[2]:.1f}, h={track_box[3]:.1f}"
+                )
+
+            # Add tracking descriptor
+            ok, tracking_mtd = relation_meta.add_tracking_mtd(track_id, buf.pts)
+            if ok:
+                # Relate tracking descriptor to detection descriptor
+                relation_meta.set_relation(
+                    GstAnalytics.RelTypes.RELATE_TO, matched_od.id, tracking_mtd.id
+                )
 
         return Gst.FlowReturn.OK
 
@@ -325,6 +234,7 @@ def run_pipeline(
     iou_threshold: float = 0.7,
     model_type: str = "medium",
     output_file_path: Optional[str] = None,
+    latency_policy: str = "strict-every-frame",
 ) -> None:
     """
     Configure, build, and execute the GStreamer tracking pipeline.
@@ -336,7 +246,7 @@ def run_pipeline(
     backend : str, optional
         The Burn inference backend ('nd-array', 'vulkan', or 'cuda'), by default 'nd-array'.
     tracker : str, optional
-        The tracking algorithm choice ('iou' or 'bytetrack'), by default 'iou'.
+        The tracking algorithm choice ('iou', 'kalman' or 'bytetrack'), by default 'iou'.
     verbose : bool, optional
         Whether to print verbose console outputs for active tracked objects, by default False.
     box_threshold : float, optional
@@ -347,6 +257,9 @@ def run_pipeline(
         NMS IoU threshold for yoloxtensordec, by default 0.7.
     model_type : str, optional
         YOLOX model type ('nano', 'tiny', 'small', 'medium', 'large', 'extra-large'), by default 'medium'.
+    latency_policy : str, optional
+        Queue behaviour around inference, one of helpers.latency.LATENCY_POLICIES, by default
+        'strict-every-frame'. Use 'latest-only' or 'drop-oldest' with live sources.
 
     Raises
     ------
@@ -356,6 +269,9 @@ def run_pipeline(
     if not os.path.exists(video_file_path):
         raise RuntimeError(f"Error: Input file '{video_file_path}' does not exist.")
 
+    # Queue leakiness and sizes around inference, see helpers.latency
+    policy = get_latency_policy(latency_policy)
+
     # Initialize GStreamer
     Gst.init(None)
 
@@ -392,9 +308,9 @@ def run_pipeline(
     pipeline_definition = f"""
         filesrc location={video_file_path} !
         {decode_scale_block.strip()} !
-        queue max-size-buffers=2 !
+        {policy.queue_launch("inference-queue")} !
         burn-yoloxinference backend-type={backend} model-type={model_type} !
-        queue max-size-buffers=2 !
+        {policy.queue_launch("post-inference-queue")} !
         yoloxtensordec label-file=COCO_classes.txt
                      box-confidence-threshold={box_threshold}
                      class-confidence-threshold={class_threshold}
@@ -409,6 +325,7 @@ def run_pipeline(
     print("===========================")
 
     pipeline = Gst.parse_launch(pipeline_definition)
+    policy.watch(pipeline, ["inference-queue", "post-inference-queue"])
 
     # Create GLib mainloop and run
     loop = GLib.MainLoop()
@@ -427,6 +344,11 @@ def run_pipeline(
             if dbg:
                 print(f"Debug info: {dbg}")
             loop.quit()
+        elif message.type == Gst.MessageType.ELEMENT:
+            drops = parse_drops_message(message)
+            if drops is not None:
+                policy_name, queue_name, dropped = drops
+                print(f"[{policy_name}] {queue_name} dropped {dropped} frames in total")
 
     bus.connect("message", on_message)
 
@@ -465,8 +387,8 @@ if __name__ == "__main__":
         "--tracker",
         type=str,
         default="iou",
-        choices=["iou", "bytetrack"],
-        help="Tracker algorithm selection: 'iou' or 'bytetrack' (default: iou).",
+        choices=["iou", "kalman", "bytetrack"],
+        help="Tracker algorithm selection: 'iou', 'kalman' or 'bytetrack' (default: iou).",
     )
     parser.add_argument(
         "-v",
@@ -500,6 +422,14 @@ if __name__ == "__main__":
         choices=["nano", "tiny", "small", "medium", "large", "extra-large"],
         help="YOLOX model type (default: small).",
     )
+    parser.add_argument(
+        "--latency-policy",
+        type=str,
+        default="strict-every-frame",
+        choices=list(LATENCY_POLICIES),
+        help="Queue behaviour when inference is slower than the frame rate: process every frame, "
+        "drop the oldest queued frames, or only process the latest frame (default: strict-every-frame).",
+    )
     args = parser.parse_args()
 
     try:
@@ -513,6 +443,7 @@ if __name__ == "__main__":
             args.iou_threshold,
             args.model_type,
             args.output,
+            args.latency_policy,
         )
     except Exception as e:
         print(e)
@@ -1,13 +1,13 @@
 #!/usr/bin/env python3
 """
 GStreamer Python pipeline implementing CPU decoding and GPU/CPU YOLOX object detection (via PyTorch)
-and tracking (via Supervision's ByteTrack or IoU simple tracker).
+and tracking (via Supervision's ByteTrack, or IoU simple tracker with or without a Kalman filter).
 """
 
 import argparse
 import sys
 import os
-from typing import List, Tuple, Dict, Any, Optional
+from typing import List, Tuple, Any, Optional
 
 import torch
 import numpy as np
@@ -20,103 +20,28 @@ gi.require_version("GstBase", "1.0")
 gi.require_version("GstVideo", "1.0")
 gi.require_version("GstAnalytics", "1.0")
 from gi.repository import Gst, GstBase, GstAnalytics, GLib  # noqa: E402
+from helpers.latency import (  # noqa: E402
+    LATENCY_POLICIES,
+    get_latency_policy,
+    parse_drops_message,
+)
+from helpers.detectioncache import (  # noqa: E402
+    DetectionCache,
+    DetectionRecorder,
+    cache_key,
+    cache_path,
+    file_digest,
+)
+from helpers.tracking import KalmanTracker, SimpleTracker  # noqa: E402
+
+# Size of the frames given to the model
+INPUT_WIDTH = 800
+INPUT_HEIGHT = 640
 
 # Initialize GStreamer
 Gst.init(None)
 
 
-def compute_iou(boxA: List[float], boxB: List[float]) -> float:
-    """
-    Compute the Intersection over Union (IoU) of two bounding boxes.
-
-    Parameters
-    ----------
-    boxA : List[float]
-        The first bounding box specified as [x, y, width, height].
-    boxB : List[float]
-        The second bounding box specified as [x, y, width, height].
-
-    Returns
-    -------
-    float
-        The calculated Intersection over Union value, in the range [0.0, 1.0].
-    """
-    xA = max(boxA[0], boxB[0])
-    yA = max(boxA[1], boxB[1])
-    xB = min(boxA[0] + boxA[2], boxB[0] + boxB[2])
-    yB = min(boxA[1] + boxA[3], boxB[1] + boxB[3])
-
-    interArea = max(0.0, xB - xA) * max(0.0, yB - yA)
-    boxAArea = boxA[2] * boxA[3]
-    boxBArea = boxB[2] * boxB[3]
-
-    unionArea = boxAArea + boxBArea - interArea
-    if unionArea == 0.0:
-        return 0.0
-    return interArea / unionArea
-
-
-class SimpleTracker:
-    """
-    A simple Intersection-over-Union (IoU) tracker for bounding boxes.
-
-    Attributes
-    ----------
-    next_id : int
-        The unique tracking identifier to be assigned to the next newly created track.
-    tracks : Dict[int, List[float]]
-        A mapping of active track IDs to their latest bounding box coordinates
-        represented as [x, y, width, height].
-    """
-
-    def __init__(self) -> None:
-        """Initialize the SimpleTracker with an empty list of active tracks."""
-        self.next_id: int = 1
-        self.tracks: Dict[int, List[float]] = {}
-
-    def update(self, detections: List[List[float]]) -> List[Tuple[int, List[float]]]:
-        """
-        Update the tracker state with a new set of bounding box detections.
-
-        Parameters
-        ----------
-        detections : List[List[float]]
-            A list of bounding box coordinates from the latest frame, where each bounding
-            box is a list of floats representing [x, y, width, height].
-
-        Returns
-        -------
-        List[Tuple[int, List[float]]]
-            A list of active tracks after update, where each track is represented as a
-            tuple containing the track ID (int) and its assigned bounding box (List[float]).
-        """
-        new_tracks: Dict[int, List[float]] = {}
-        matched_detections = set()
-
-        for track_id, last_box in self.tracks.items():
-            best_iou = 0.3
-            best_idx = -1
-            for idx, det in enumerate(detections):
-                if idx in matched_detections:
-                    continue
-                iou = compute_iou(last_box, det)
-                if iou > best_iou:
-                    best_iou = iou
-                    best_idx = idx
-
-            if best_idx != -1:
-                new_tracks[track_id] = detections[best_idx]
-                matched_detections.add(best_idx)
-
-        for idx, det in enumerate(detections):
-            if idx not in matched_detections:
-                new_tracks[self.next_id] = det
-                self.next_id += 1
-
-        self.tracks = new_tracks
-        return list(self.tracks.items())
-
-
 class GstYoloxByteTrack(GstBase.BaseTransform):
     """
     GStreamer Python transform element that runs YOLOX via PyTorch on CPU-decoded frames.
@@ -126,8 +51,8 @@ class GstYoloxByteTrack(GstBase.BaseTransform):
     model : torch.nn.Module or None
         The pre-loaded YOLOX PyTorch model instance used for inference.
     tracker : object or None
-        The initialized tracker object (either a `supervision.ByteTrack` or
-        a `SimpleTracker` instance).
+        The initialized tracker object (a `supervision.ByteTrack`,
+        `SimpleTracker` or `KalmanTracker` instance).
     device : torch.device or None
         The PyTorch hardware device context (CUDA or CPU) on which tensor calculations
         and model inference are performed.
@@ -139,7 +64,7 @@ class GstYoloxByteTrack(GstBase.BaseTransform):
     backend : str
         The preferred inference backend, either "cuda" or "cpu".
     tracker_type : str
-        The object tracking algorithm choice, either "bytetrack" or "iou".
+        The object tracking algorithm choice, "bytetrack", "kalman" or "iou".
     verbose : bool
         If True, enables logging of inference speed, tracking IDs, coordinates,
         and other debug properties on stdout.
@@ -150,6 +75,13 @@ class GstYoloxByteTrack(GstBase.BaseTransform):
     iou_threshold : float
         The Intersection over Union threshold used in PyTorch's Non-Maximum
         Suppression (NMS) stage.
+    track_threshold : float or None
+        The confidence at which ByteTrack activates a new track, None for
+        `box_threshold`. Unlike the detector thresholds it is not part of the
+        key of recorded detections, so it can be tuned on a replay.
+    recorder : helpers.detectioncache.DetectionRecorder or None
+        If set, the post-NMS detections of every frame are recorded for replaying
+        them with `GstDetectionReplay`.
     """
 
     __gtype_name__ = "GstYoloxByteTrack"
@@ -159,6 +91,7 @@ class GstYoloxByteTrack(GstBase.BaseTransform):
     tracker: Optional[Any] = None
     device: Optional[Any] = None
     use_gpu: bool = False
+    recorder: Optional[Any] = None
 
     # Static properties set dynamically
     model_type: str = "yolox_s"
@@ -168,6 +101,7 @@ class GstYoloxByteTrack(GstBase.BaseTransform):
     box_threshold: float = 0.4
     class_threshold: float = 0.4
     iou_threshold: float = 0.7
+    track_threshold: Optional[float] = None
 
     __gstmetadata__ = (
         "CPU Decode YOLOX + ByteTrack Element",
@@ -235,14 +169,49 @@ class GstYoloxByteTrack(GstBase.BaseTransform):
 
             if self.tracker_type == "bytetrack":
                 self.tracker = sv.ByteTrack(
-                    track_activation_threshold=self.box_threshold,
+                    track_activation_threshold=(
+                        self.box_threshold
+                        if self.track_threshold is None
+                        else self.track_threshold
+                    ),
                     lost_track_buffer=30,
                     minimum_matching_threshold=0.8,
                     frame_rate=int(fps),
                 )
+            elif self.tracker_type == "kalman":
+                self.tracker = KalmanTracker(lost_track_buffer=30)
             else:
                 self.tracker = SimpleTracker()
 
+        # 2. - 5. Post-NMS detections of the frame
+        detections = self.detect(buf)
+        if detections is None:
+            return Gst.FlowReturn.OK
+        xyxy_list, conf_list, class_ids = detections
+
+        if self.recorder is not None:
+            self.recorder.add(buf.pts, xyxy_list, conf_list, class_ids)
+
+        self.track(buf, xyxy_list, conf_list, class_ids)
+        return Gst.FlowReturn.OK
+
+    def detect(
+        self, buf: Gst.Buffer
+    ) -> Optional[Tuple[List[List[float]], List[float], List[int]]]:
+        """
+        Run YOLOX inference and NMS on a frame.
+
+        Parameters
+        ----------
+        buf : Gst.Buffer
+            The active GStreamer buffer representing the current video frame in system memory.
+
+        Returns
+        -------
+        tuple or None
+            Bounding boxes (x1, y1, x2, y2), confidences and class IDs of the detections,
+            or None if the frame could not be processed.
+        """
         # 2. Get width, height and format of current frame
         caps = self.sinkpad.get_current_caps()
         struct = caps.get_structure(0)
@@ -271,7 +240,7 @@ class GstYoloxByteTrack(GstBase.BaseTransform):
             print(
                 "[GstYolox] Error: Failed to acquire any frame data. Passing buffer through."
             )
-            return Gst.FlowReturn.OK
+            return None
 
         # 4. YOLOX Model Inference
         batch_input = rgb_tensor.unsqueeze(0)  # [1, 3, height, width]
@@ -281,7 +250,7 @@ class GstYoloxByteTrack(GstBase.BaseTransform):
                 predictions = self.model(batch_input)
         except Exception as e:
             print(f"[GstYolox] Inference error: {e}")
-            return Gst.FlowReturn.OK
+            return None
 
         # 5. Post-process (Anchor Grid Decode + NMS)
         from yolox.utils import postprocess
@@ -290,7 +259,6 @@ class GstYoloxByteTrack(GstBase.BaseTransform):
             predictions, 80, self.box_threshold, self.iou_threshold
         )
 
-        # 6. Tracking (ByteTrack or IoU)
         xyxy_list: List[List[float]] = []
         conf_list: List[float] = []
         class_ids: List[int] = []
@@ -301,32 +269,60 @@ class GstYoloxByteTrack(GstBase.BaseTransform):
             conf_list = det_tensor[:, 4].tolist()
             class_ids = det_tensor[:, 6].astype(int).tolist()
 
-        tracks: List[Tuple[int, List[float]]] = []
+        return xyxy_list, conf_list, class_ids
+
+    def track(
+        self,
+        buf: Gst.Buffer,
+        xyxy_list: List[List[float]],
+        conf_list: List[float],
+        class_ids: List[int],
+    ) -> None:
+        """
+        Update the tracker with the detections of a frame and attach the tracks to the buffer.
 
+        Parameters
+        ----------
+        buf : Gst.Buffer
+            The active GStreamer buffer representing the current video frame.
+        xyxy_list : list of list of float
+            Bounding boxes (x1, y1, x2, y2) of the detections.
+        conf_list : list of float
+            Confidences of the detections.
+        class_ids : list of int
+            Class IDs of the detections.
+        """
+        # 6. Tracking (ByteTrack, Kalman or IoU): ID, box (x, y, w, h) and matched detection of
+        # each track
         if self.tracker_type == "bytetrack":
             if len(xyxy_list) > 0:
                 sv_detections = sv.Detections(
                     xyxy=np.array(xyxy_list, dtype=np.float32),
                     confidence=np.array(conf_list, dtype=np.float32),
                     class_id=np.array(class_ids, dtype=np.int32),
+                    data={"index": np.arange(len(xyxy_list))},
                 )
             else:
                 sv_detections = sv.Detections.empty()
 
             tracked_detections = self.tracker.update_with_detections(sv_detections)
-            if tracked_detections.tracker_id is not None:
-                for i in range(len(tracked_detections)):
-                    xyxy = tracked_detections.xyxy[i]
-                    track_id = int(tracked_detections.tracker_id[i])
-                    # Convert xyxy -> xywh
-                    track_box = [xyxy[0], xyxy[1], xyxy[2] - xyxy[0], xyxy[3] - xyxy[1]]
-                    tracks.append((track_id, track_box))
+            track_ids = tracked_detections.tracker_id
+            if track_ids is None or len(tracked_detections) == 0:
+                track_ids = np.zeros(0, dtype=np.int64)
+                detection_rows = np.zeros(0, dtype=np.int64)
+            else:
+                detection_rows = tracked_detections.data["index"]
+            # Convert xyxy -> xywh
+            track_boxes = tracked_detections.xyxy.astype(np.float64)
+            track_boxes[:, 2:] -= track_boxes[:, :2]
         else:
-            # Simple IoU tracker requires xywh format
-            xywh_list = [
-                [box[0], box[1], box[2] - box[0], box[3] - box[1]] for box in xyxy_list
-            ]
-            tracks = self.tracker.update(xywh_list)
+            # IoU and Kalman trackers require xywh format, and keep their tracks in a TrackStore
+            xywh = np.array(xyxy_list, dtype=np.float64).reshape(-1, 4)
+            xywh[:, 2:] -= xywh[:, :2]
+            slots = self.tracker.track(xywh)
+            track_ids = self.tracker.store.ids[slots]
+            track_boxes = self.tracker.store.boxes[slots]
+            detection_rows = self.tracker.store.detections[slots]
 
         # 7. Attach Metadata using GstAnalytics API so 'objectdetectionoverlay' draws it
         relation_meta = GstAnalytics.buffer_get_analytics_relation_meta(buf)
@@ -336,49 +332,82 @@ class GstYoloxByteTrack(GstBase.BaseTransform):
         if self.verbose:
             print(f"\n--- YOLOX Inference + {self.tracker_type.upper()} ---")
 
-        # Map tracker outputs to detection objects
-        for track_id, track_box in tracks:
-            # Find closest detection match via IoU
-            best_match_idx = -1
-            best_match_iou = 0.5
-
-            for idx, box in enumerate(xyxy_list):
-                xywh_det = [box[0], box[1], box[2] - box[0], box[3] - box[1]]
-                iou = compute_iou(track_box, xywh_det)
-                if iou > best_match_iou:
-                    best_match_iou = iou
-                    best_match_idx = idx
-
-            if best_match_idx != -1:
-                class_id = class_ids[best_match_idx]
-                conf = conf_list[best_match_idx]
-                label_name = (
-                    self.labels[class_id] if class_id < len(self.labels) else "unknown"
-                )
-                label_quark = GLib.quark_from_string(label_name)
-
-                # Add Object Detection metadata (xywh format)
-                # Convert to integer coordinates for GstAnalytics format
-                x_int, y_int, w_int, h_int = map(int, track_box)
+        # Map tracker outputs to the detections they were matched with. Boxes are converted to
+        # integer coordinates for GstAnalytics format in one step
+        for track_id, (x_int, y_int, w_int, h_int), detection_idx in zip(
+            track_ids.tolist(),
+            track_boxes.astype(np.int64).tolist(),
+            detection_rows.tolist(),
+        ):
+            class_id = class_ids[detection_idx]
+            conf = conf_list[detection_idx]
+            label_name = (
+                self.labels[class_id] if class_id < len(self.labels) else "unknown"
+            )
+            label_quark = GLib.quark_from_string(label_name)
 
-                success, od_mtd = relation_meta.add_od_mtd(
-                    label_quark, x_int, y_int, w_int, h_int, float(conf)
-                )
+            # Add Object Detection metadata (xywh format)
+            success, od_mtd = relation_meta.add_od_mtd(
+                label_quark, x_int, y_int, w_int, h_int, float(conf)
+            )
 
-                if success:
-                    # Add Tracking metadata and relate it
-                    ok, tracking_mtd = relation_meta.add_tracking_mtd(track_id, buf.pts)
-                    if ok:
-                        relation_meta.set_relation(
-                            GstAnalytics.RelTypes.RELATE_TO, od_mtd.id, tracking_mtd.id
+            if success:
+                # Add Tracking metadata and relate it
+                ok, tracking_mtd = relation_meta.add_tracking_mtd(track_id, buf.pts)
+                if ok:
+                    relation_meta.set_relation(
+                        GstAnalytics.RelTypes.RELATE_TO, od_mtd.id, tracking_mtd.id
+                    )
+
+                    if self.verbose:
+                        print(
+                            f"Track ID {track_id} ({label_name}): x={x_int}, y={y_int}, w={w_int}, h={h_int} (conf: {conf:.2f})"
                         )
 
-                        if self.verbose:
-                            print(
-                                f"Track ID {track_id} ({label_name}): x={x_int}, y={y_int}, w={w_int}, h={h_int} (conf: {conf:.2f})"
-                            )
 
-        return Gst.FlowReturn.OK
+class GstDetectionReplay(GstYoloxByteTrack):
+    """
+    GStreamer Python transform element that tracks detections recorded by `GstYoloxByteTrack`
+    instead of running YOLOX, so that frames are processed at decoding speed.
+
+    Detections are looked up by buffer PTS, so the frames must come from the same video,
+    decoded and scaled the same way as when the detections were recorded.
+
+    Attributes
+    ----------
+    cache : helpers.detectioncache.DetectionCache or None
+        The recorded detections.
+    """
+
+    __gtype_name__ = "GstDetectionReplay"
+
+    cache: Optional[Any] = None
+
+    __gstmetadata__ = (
+        "Detection Replay + ByteTrack Element",
+        "Filter/Effect/Video/Tracker",
+        "Replays recorded YOLOX detections and performs ByteTrack object tracking",
+        "Author <jarno@ralli.fi>",
+    )
+
+    def detect(
+        self, buf: Gst.Buffer
+    ) -> Optional[Tuple[List[List[float]], List[float], List[int]]]:
+        """
+        Look up the recorded detections of a frame.
+
+        Parameters
+        ----------
+        buf : Gst.Buffer
+            The active GStreamer buffer representing the current video frame.
+
+        Returns
+        -------
+        tuple
+            Bounding boxes (x1, y1, x2, y2), confidences and class IDs of the detections.
+        """
+        boxes, confidences, class_ids = self.cache.get(buf.pts)
+        return boxes.tolist(), confidences.tolist(), class_ids.tolist()
 
 
 def run_pipeline(
@@ -391,6 +420,10 @@ def run_pipeline(
     iou_threshold: float = 0.7,
     model_type: str = "small",
     output_file_path: Optional[str] = None,
+    latency_policy: str = "strict-every-frame",
+    detection_mode: str = "infer",
+    detection_cache_dir: str = "detection-cache",
+    track_threshold: Optional[float] = None,
 ) -> None:
     """
     Configures and runs the PyTorch YOLOX GStreamer pipeline with CPU decoding.
@@ -402,7 +435,7 @@ def run_pipeline(
     backend : str, optional
         The computer vision inference backend to utilize ("cpu" or "cuda").
     tracker : str, optional
-        The tracker algorithm choice ("iou" or "bytetrack").
+        The tracker algorithm choice ("iou", "kalman" or "bytetrack").
     verbose : bool, optional
         If True, verbose output details will be printed to stdout.
     box_threshold : float, optional
@@ -414,10 +447,25 @@ def run_pipeline(
     model_type : str, optional
         The architectural variant of the pre-trained YOLOX model to load from PyTorch Hub
         ("nano", "tiny", "small", "medium", "large", "extra-large").
+    latency_policy : str, optional
+        Queue behaviour around inference, one of helpers.latency.LATENCY_POLICIES
+        ("strict-every-frame", "drop-oldest", "latest-only").
+    detection_mode : str, optional
+        "infer" runs YOLOX on every frame, "record" also records the detections to
+        `detection_cache_dir`, and "replay" tracks the recorded detections without running YOLOX.
+    detection_cache_dir : str, optional
+        Directory of the recorded detections. Recordings are keyed by the model, the video
+        file, the detector thresholds and the input size.
+    track_threshold : float, optional
+        The confidence at which ByteTrack activates a new track, by default `box_threshold`.
+        It is not part of the recording key, so it can be tuned with "replay".
     """
     if not os.path.exists(video_file_path):
         raise RuntimeError(f"Error: Input file '{video_file_path}' does not exist.")
 
+    # Queue leakiness and sizes around inference, see helpers.latency
+    policy = get_latency_policy(latency_policy)
+
     # Register custom Python YOLOX tracking element
     GstYoloxByteTrack.backend = backend
     GstYoloxByteTrack.tracker_type = tracker
@@ -425,6 +473,7 @@ def run_pipeline(
     GstYoloxByteTrack.box_threshold = box_threshold
     GstYoloxByteTrack.class_threshold = class_threshold
     GstYoloxByteTrack.iou_threshold = iou_threshold
+    GstYoloxByteTrack.track_threshold = track_threshold
 
     # Map model types
     model_mapping = {
@@ -438,68 +487,126 @@ def run_pipeline(
     model_type_str = model_mapping.get(model_type, "yolox_s")
     GstYoloxByteTrack.model_type = model_type_str
 
-    # Load PyTorch, the YOLOX model, and initialize the target device
-    if backend == "cuda" and torch.cuda.is_available():
-        device = torch.device("cuda")
-        use_gpu = True
-        print("[Pipeline] Successfully initialized PyTorch on CUDA GPU.")
-    else:
-        device = torch.device("cpu")
-        use_gpu = False
-        print("[Pipeline] PyTorch executing on CPU.")
+    # Recorded detections are keyed by everything they depend on
+    recorder = None
+    cache = None
+    if detection_mode != "infer":
+        key = cache_key(
+            model_type_str,
+            file_digest(video_file_path),
+            box_threshold,
+            class_threshold,
+            iou_threshold,
+            INPUT_WIDTH,
+            INPUT_HEIGHT,
+        )
+        cache_file = cache_path(detection_cache_dir, key)
 
-    print(
-        f"[Pipeline] Loading pre-trained YOLOX model '{model_type_str}' on {device}..."
-    )
-    try:
-        model = (
-            torch.hub.load(
-                "Megvii-BaseDetection/YOLOX",
-                model_type_str,
-                pretrained=True,
-                trust_repo=True,
+    if detection_mode == "replay":
+        if not os.path.exists(cache_file):
+            raise RuntimeError(
+                f"Error: No recorded detections in '{cache_file}'. "
+                "Record them first with '--detections record'."
             )
-            .to(device)
-            .eval()
+        cache = DetectionCache(cache_file)
+        GstDetectionReplay.cache = cache
+        element_name = "gstdetectionreplay"
+        Gst.Element.register(
+            None, element_name, Gst.Rank.NONE, GstDetectionReplay.__gtype__
         )
-        print("[Pipeline] Model loaded successfully.")
-    except Exception as e:
-        print(f"[Pipeline] Error loading model from Hub: {e}")
-        sys.exit(1)
+        print(
+            f"[Pipeline] Replaying {len(cache)} detections of "
+            f"{cache.metadata.get('frames', '?')} frames from '{cache_file}'."
+        )
+    else:
+        if detection_mode == "record":
+            # Every frame must reach the detector to be recorded
+            if latency_policy != "strict-every-frame":
+                print("[Pipeline] Recording detections, using 'strict-every-frame'.")
+                policy = get_latency_policy("strict-every-frame")
+            recorder = DetectionRecorder(
+                cache_file,
+                {
+                    "model": model_type_str,
+                    "video": os.path.abspath(video_file_path),
+                    "box_threshold": box_threshold,
+                    "class_threshold": class_threshold,
+                    "iou_threshold": iou_threshold,
+                    "width": INPUT_WIDTH,
+                    "height": INPUT_HEIGHT,
+                },
+            )
+            GstYoloxByteTrack.recorder = recorder
+            print(
+                f"[Pipeline] Recording detections to '{cache_file}' at end-of-stream."
+            )
 
-    # Assign pre-loaded variables as class attributes
-    GstYoloxByteTrack.model = model
-    GstYoloxByteTrack.device = device
-    GstYoloxByteTrack.use_gpu = use_gpu
+        # Load PyTorch, the YOLOX model, and initialize the target device
+        if backend == "cuda" and torch.cuda.is_available():
+            device = torch.device("cuda")
+            use_gpu = True
+            print("[Pipeline] Successfully initialized PyTorch on CUDA GPU.")
+        else:
+            device = torch.device("cpu")
+            use_gpu = False
+            print("[Pipeline] PyTorch executing on CPU.")
 
-    # Register element
-    Gst.Element.register(
-        None, "gstyoloxbytetrack", Gst.Rank.NONE, GstYoloxByteTrack.__gtype__
-    )
+        print(
+            f"[Pipeline] Loading pre-trained YOLOX model '{model_type_str}' on {device}..."
+        )
+        try:
+            model = (
+                torch.hub.load(
+                    "Megvii-BaseDetection/YOLOX",
+                    model_type_str,
+                    pretrained=True,
+                    trust_repo=True,
+                )
+                .to(device)
+                .eval()
+            )
+            print("[Pipeline] Model loaded successfully.")
+        except Exception as e:
+            print(f"[Pipeline] Error loading model from Hub: {e}")
+            sys.exit(1)
+
+        # Assign pre-loaded variables as class attributes
+        GstYoloxByteTrack.model = model
+        GstYoloxByteTrack.device = device
+        GstYoloxByteTrack.use_gpu = use_gpu
+
+        # Register element
+        element_name = "gstyoloxbytetrack"
+        Gst.Element.register(
+            None, element_name, Gst.Rank.NONE, GstYoloxByteTrack.__gtype__
+        )
 
-    print(
-        f"[Pipeline] Initializing pipeline with GStreamer decoding on CPU and PyTorch YOLOX inference on {backend.upper()}..."
-    )
+        print(
+            f"[Pipeline] Initializing pipeline with GStreamer decoding on CPU and PyTorch YOLOX inference on {backend.upper()}..."
+        )
+
+    # Replayed detections are tracked as fast as frames are decoded, not in real time
+    display_sync = "false" if detection_mode == "replay" else "true"
 
     # Build the sink branch of the pipeline: always show display, optionally write to output file
     if output_file_path:
         sink_branch = f"""
             videoconvertscale ! tee name=t
-            t. ! queue ! videoconvertscale ! autovideosink sync=true
+            t. ! queue ! videoconvertscale ! autovideosink sync={display_sync}
             t. ! queue ! videoconvertscale !
             x264enc bframes=0 tune=zerolatency bitrate=12000 speed-preset=veryfast !
             h264parse ! mp4mux ! filesink sync=false location={output_file_path}
         """
     else:
-        sink_branch = "videoconvertscale ! autovideosink sync=true"
+        sink_branch = f"videoconvertscale ! autovideosink sync={display_sync}"
 
     pipeline_definition = f"""
         filesrc location={video_file_path} !
         decodebin !
-        videoconvertscale ! video/x-raw,width=800,height=640,format=RGBA !
-        queue max-size-buffers=2 !
-        gstyoloxbytetrack !
-        queue max-size-buffers=2 !
+        videoconvertscale ! video/x-raw,width={INPUT_WIDTH},height={INPUT_HEIGHT},format=RGBA !
+        {policy.queue_launch("inference-queue")} !
+        {element_name} !
+        {policy.queue_launch("post-inference-queue")} !
         objectdetectionoverlay !
         {sink_branch}
     """
@@ -509,6 +616,7 @@ def run_pipeline(
     print("===========================")
 
     pipeline = Gst.parse_launch(pipeline_definition)
+    policy.watch(pipeline, ["inference-queue", "post-inference-queue"])
     loop = GLib.MainLoop()
 
     bus = pipeline.get_bus()
@@ -517,6 +625,12 @@ def run_pipeline(
     def on_message(bus: Gst.Bus, message: Gst.Message) -> None:
         if message.type == Gst.MessageType.EOS:
             print("End-Of-Stream reached.")
+            if recorder is not None:
+                recorder.close()
+                print(
+                    f"[Pipeline] Recorded {recorder.detections} detections of "
+                    f"{recorder.frames} frames to '{recorder.path}'."
+                )
             loop.quit()
         elif message.type == Gst.MessageType.ERROR:
             err, dbg = message.parse_error()
@@ -524,6 +638,11 @@ def run_pipeline(
             if dbg:
                 print(f"Debug info: {dbg}")
             loop.quit()
+        elif message.type == Gst.MessageType.ELEMENT:
+            drops = parse_drops_message(message)
+            if drops is not None:
+                policy_name, queue_name, dropped = drops
+                print(f"[{policy_name}] {queue_name} dropped {dropped} frames in total")
 
     bus.connect("message", on_message)
 
@@ -536,6 +655,8 @@ def run_pipeline(
         print("\nStopping pipeline...")
     finally:
         pipeline.set_state(Gst.State.NULL)
+        if cache is not None:
+            print(f"[Pipeline] Replayed detections of {cache.hits} frames.")
         print("Pipeline stopped.")
 
 
@@ -562,7 +683,7 @@ if __name__ == "__main__":
         "--tracker",
         type=str,
         default="iou",
-        choices=["iou", "bytetrack"],
+        choices=["iou", "kalman", "bytetrack"],
         help="Tracker algorithm selection (default: iou).",
     )
     parser.add_argument(
@@ -589,6 +710,13 @@ if __name__ == "__main__":
         default=0.7,
         help="NMS IoU threshold (default: 0.7).",
     )
+    parser.add_argument(
+        "--track-threshold",
+        type=float,
+        default=None,
+        help="Confidence at which ByteTrack activates a new track, not part of the key of "
+        "recorded detections (default: the box threshold).",
+    )
     parser.add_argument(
         "-m",
         "--model-type",
@@ -597,6 +725,28 @@ if __name__ == "__main__":
         choices=["nano", "tiny", "small", "medium", "large", "extra-large"],
         help="YOLOX model type (default: small).",
     )
+    parser.add_argument(
+        "--latency-policy",
+        type=str,
+        default="strict-every-frame",
+        choices=list(LATENCY_POLICIES),
+        help="Queue behaviour when inference is slower than the frame rate: process every frame, "
+        "drop the oldest queued frames, or only process the latest frame (default: strict-every-frame).",
+    )
+    parser.add_argument(
+        "--detections",
+        type=str,
+        default="infer",
+        choices=["infer", "record", "replay"],
+        help="Run YOLOX on every frame, also record its detections at end-of-stream, or track "
+        "recorded detections without running YOLOX (default: infer).",
+    )
+    parser.add_argument(
+        "--detection-cache",
+        type=str,
+        default="detection-cache",
+        help="Directory of the recorded detections (default: detection-cache).",
+    )
     args = parser.parse_args()
 
     try:
@@ -610,6 +760,10 @@ if __name__ == "__main__":
             args.iou_threshold,
             args.model_type,
             args.output,
+            args.latency_policy,
+            args.detections,
+            args.detection_cache,
+            args.track_threshold,
         )
     except Exception as e:
         print(e)
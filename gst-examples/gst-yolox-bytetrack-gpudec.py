@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 GStreamer Python pipeline implementing zero-copy YOLOX object detection (via PyTorch/CuPy)
-and tracking (via Supervision's ByteTrack or IoU simple tracker) to avoid GPU-CPU-GPU roundtrips.
+and tracking (via Supervision's ByteTrack, or IoU simple tracker with or without a Kalman filter) to avoid GPU-CPU-GPU roundtrips.
 """
 
 import argparse
@@ -22,6 +22,12 @@ gi.require_version("GstBase", "1.0")
 gi.require_version("GstVideo", "1.0")
 gi.require_version("GstAnalytics", "1.0")
 from gi.repository import Gst, GstBase, GstAnalytics, GLib  # noqa: E402
+from helpers.latency import (  # noqa: E402
+    LATENCY_POLICIES,
+    get_latency_policy,
+    parse_drops_message,
+)
+from helpers.tracking import KalmanTracker, SimpleTracker  # noqa: E402
 
 # Initialize GStreamer
 Gst.init(None)
@@ -36,44 +42,6 @@ except Exception:
     HAS_GST_CUDA = False
 
 
-def compute_iou(boxA: List[float], boxB: List[float]) -> float:
-    """
-    Compute the Intersection over Union (IoU) of two bounding boxes.
-
-    The IoU measures the overlap between two bounding boxes to evaluate how
-    well they correspond to the same physical object. This is a critical metric
-    for both non-maximum suppression (NMS) and object tracking, where bounding
-    boxes from successive frames are matched.
-
-    Parameters
-    ----------
-    boxA : list of float
-        The first bounding box specified as [x, y, width, height] or [x1, y1, x2, y2].
-        Both boxes must use the same coordinate system and convention.
-    boxB : list of float
-        The second bounding box specified using the same format as boxA.
-
-    Returns
-    -------
-    float
-        The calculated Intersection over Union value, in the range [0.0, 1.0].
-        Returns 0.0 if there is no overlap or if the union area is zero.
-    """
-    xA = max(boxA[0], boxB[0])
-    yA = max(boxA[1], boxB[1])
-    xB = min(boxA[0] + boxA[2], boxB[0] + boxB[2])
-    yB = min(boxA[1] + boxA[3], boxB[1] + boxB[3])
-
-    interArea = max(0.0, xB - xA) * max(0.0, yB - yA)
-    boxAArea = boxA[2] * boxA[3]
-    boxBArea = boxB[2] * boxB[3]
-
-    unionArea = boxAArea + boxBArea - interArea
-    if unionArea == 0.0:
-        return 0.0
-    return interArea / unionArea
-
-
 class GstCUDAArrayWrapper:
     """
     A class that exposes a GStreamer CUdeviceptr directly to PyTorch.
@@ -264,76 +232,6 @@ if libgstcuda is not None:
         print(f"[GstYolox] Failed to bind GstCuda sync functions: {e}")
 
 
-class SimpleTracker:
-    """
-    A simple Intersection-over-Union (IoU) tracker for bounding boxes.
-
-    This tracker associates detections across consecutive video frames by computing the
-    IoU between the bounding boxes of existing active tracks and newly detected boxes.
-    It is lightweight, relies on no appearance models or motion models (like Kalman filters),
-    and is designed for scenarios with high frame rates and relatively slow-moving objects.
-
-    Attributes
-    ----------
-    next_id : int
-        The unique tracking identifier to be assigned to the next newly created track.
-    tracks : dict of {int: list of float}
-        A mapping of active track IDs to their latest bounding box coordinates
-        represented as [x, y, width, height].
-    """
-
-    def __init__(self) -> None:
-        """Initialize the SimpleTracker with an empty list of active tracks."""
-        self.next_id: int = 1
-        self.tracks: Dict[int, List[float]] = {}
-
-    def update(self, detections: List[List[float]]) -> List[Tuple[int, List[float]]]:
-        """
-        Update the tracker state with a new set of bounding box detections.
-
-        This method attempts to match the current frame's detections with existing tracks
-        using a greedy IoU matching strategy. Unmatched tracks are discarded, and unmatched
-        detections are instantiated as new tracks with unique IDs.
-
-        Parameters
-        ----------
-        detections : list of list of float
-            A list of bounding box coordinates from the latest frame, where each bounding
-            box is a list of floats representing [x, y, width, height].
-
-        Returns
-        -------
-        list of tuple of (int, list of float)
-            A list of active tracks after update, where each track is represented as a
-            tuple containing the track ID (int) and its assigned bounding box (list of float).
-        """
-        new_tracks: Dict[int, List[float]] = {}
-        matched_detections = set()
-
-        for track_id, last_box in self.tracks.items():
-            best_iou = 0.3
-            best_idx = -1
-            for idx, det in enumerate(detections):
-                if idx in matched_detections:
-                    continue
-                iou = compute_iou(last_box, det)
-                if iou > best_iou:
-                    best_iou = iou
-                    best_idx = idx
-
-            if best_idx != -1:
-                new_tracks[track_id] = detections[best_idx]
-                matched_detections.add(best_idx)
-
-        for idx, det in enumerate(detections):
-            if idx not in matched_detections:
-                new_tracks[self.next_id] = det
-                self.next_id += 1
-
-        self.tracks = new_tracks
-        return list(self.tracks.items())
-
-
 class GstYoloxByteTrack(GstBase.BaseTransform):
     """
     GStreamer Python transform element that runs YOLOX via PyTorch.
@@ -350,8 +248,8 @@ class GstYoloxByteTrack(GstBase.BaseTransform):
     model : torch.nn.Module or None
         The pre-loaded YOLOX PyTorch model instance used for inference.
     tracker : object or None
-        The initialized tracker object (either a `supervision.ByteTrack` or
-        a `SimpleTracker` instance).
+        The initialized tracker object (a `supervision.ByteTrack`,
+        `SimpleTracker` or `KalmanTracker` instance).
     device : torch.device or None
         The PyTorch hardware device context (CUDA or CPU) on which tensor calculations
         and model inference are performed.
@@ -363,7 +261,7 @@ class GstYoloxByteTrack(GstBase.BaseTransform):
     backend : str
         The preferred inference backend, either "cuda" or "cpu".
     tracker_type : str
-        The object tracking algorithm choice, either "bytetrack" or "iou".
+        The object tracking algorithm choice, "bytetrack", "kalman" or "iou".
     verbose : bool
         If True, enables logging of inference speed, tracking IDs, coordinates,
         and other debug properties on stdout.
@@ -529,6 +427,8 @@ class GstYoloxByteTrack(GstBase.BaseTransform):
                     minimum_matching_threshold=0.8,
                     frame_rate=int(fps),
                 )
+            elif self.tracker_type == "kalman":
+                self.tracker = KalmanTracker(lost_track_buffer=30)
             else:
                 self.tracker = SimpleTracker()
 
@@ -671,7 +571,8 @@ class GstYoloxByteTrack(GstBase.BaseTransform):
             predictions, 80, self.box_threshold, self.iou_threshold
         )
 
-        # 7. Tracking (ByteTrack or IoU)
+        # 7. Tracking (ByteTrack, Kalman or IoU): ID, box (x, y, w, h) and matched detection of
+        # each track
         xyxy_list: List[List[float]] = []
         conf_list: List[float] = []
         class_ids: List[int] = []
@@ -682,32 +583,35 @@ class GstYoloxByteTrack(GstBase.BaseTransform):
             conf_list = det_tensor[:, 4].tolist()
             class_ids = det_tensor[:, 6].astype(int).tolist()
 
-        tracks: List[Tuple[int, List[float]]] = []
-
         if self.tracker_type == "bytetrack":
             if len(xyxy_list) > 0:
                 sv_detections = sv.Detections(
                     xyxy=np.array(xyxy_list, dtype=np.float32),
                     confidence=np.array(conf_list, dtype=np.float32),
                     class_id=np.array(class_ids, dtype=np.int32),
+                    data={"index": np.arange(len(xyxy_list))},
                 )
             else:
                 sv_detections = sv.Detections.empty()
 
             tracked_detections = self.tracker.update_with_detections(sv_detections)
-            if tracked_detections.tracker_id is not None:
-                for i in range(len(tracked_detections)):
-                    xyxy = tracked_detections.xyxy[i]
-                    track_id = int(tracked_detections.tracker_id[i])
-                    # Convert xyxy -> xywh
-                    track_box = [xyxy[0], xyxy[1], xyxy[2] - xyxy[0], xyxy[3] - xyxy[1]]
-                    tracks.append((track_id, track_box))
+            track_ids = tracked_detections.tracker_id
+            if track_ids is None or len(tracked_detections) == 0:
+                track_ids = np.zeros(0, dtype=np.int64)
+                detection_rows = np.zeros(0, dtype=np.int64)
+            else:
+                detection_rows = tracked_detections.data["index"]
+            # Convert xyxy -> xywh
+            track_boxes = tracked_detections.xyxy.astype(np.float64)
+            track_boxes[:, 2:] -= track_boxes[:, :2]
         else:
-            # Simple IoU tracker requires xywh format
-            xywh_list = [
-                [box[0], box[1], box[2] - box[0], box[3] - box[1]] for box in xyxy_list
-            ]
-            tracks = self.tracker.update(xywh_list)
+            # IoU and Kalman trackers require xywh format, and keep their tracks in a TrackStore
+            xywh = np.array(xyxy_list, dtype=np.float64).reshape(-1, 4)
+            xywh[:, 2:] -= xywh[:, :2]
+            slots = self.tracker.track(xywh)
+            track_ids = self.tracker.store.ids[slots]
+            track_boxes = self.tracker.store.boxes[slots]
+            detection_rows = self.tracker.store.detections[slots]
 
         # 8. Attach Metadata using GstAnalytics API so 'objectdetectionoverlay' draws it
         relation_meta = GstAnalytics.buffer_get_analytics_relation_meta(buf)
@@ -717,48 +621,38 @@ class GstYoloxByteTrack(GstBase.BaseTransform):
         if self.verbose:
             print(f"\n--- YOLOX Inference + {self.tracker_type.upper()} ---")
 
-        # Map tracker outputs to detection objects
-        for track_id, track_box in tracks:
-            # Find closest detection match via IoU
-            best_match_idx = -1
-            best_match_iou = 0.5
-
-            for idx, box in enumerate(xyxy_list):
-                xywh_det = [box[0], box[1], box[2] - box[0], box[3] - box[1]]
-                iou = compute_iou(track_box, xywh_det)
-                if iou > best_match_iou:
-                    best_match_iou = iou
-                    best_match_idx = idx
-
-            if best_match_idx != -1:
-                class_id = class_ids[best_match_idx]
-                conf = conf_list[best_match_idx]
-                label_name = (
-                    self.labels[class_id] if class_id < len(self.labels) else "unknown"
-                )
-                label_quark = GLib.quark_from_string(label_name)
+        # Map tracker outputs to the detections they were matched with. Boxes are converted to
+        # integer coordinates for GstAnalytics format in one step
+        for track_id, (x_int, y_int, w_int, h_int), detection_idx in zip(
+            track_ids.tolist(),
+            track_boxes.astype(np.int64).tolist(),
+            detection_rows.tolist(),
+        ):
+            class_id = class_ids[detection_idx]
+            conf = conf_list[detection_idx]
+            label_name = (
+                self.labels[class_id] if class_id < len(self.labels) else "unknown"
+            )
+            label_quark = GLib.quark_from_string(label_name)
 
-                # Add Object Detection metadata (xywh format)
-                # Convert to integer coordinates for GstAnalytics format
-                x_int, y_int, w_int, h_int = map(int, track_box)
+            # Add Object Detection metadata (xywh format)
+            success, od_mtd = relation_meta.add_od_mtd(
+                label_quark, x_int, y_int, w_int, h_int, float(conf)
+            )
 
-                success, od_mtd = relation_meta.add_od_mtd(
-                    label_quark, x_int, y_int, w_int, h_int, float(conf)
-                )
+            if success:
+                # Add Tracking metadata and relate it
+                ok, tracking_mtd = relation_meta.add_tracking_mtd(track_id, buf.pts)
+                if ok:
+                    relation_meta.set_relation(
+                        GstAnalytics.RelTypes.RELATE_TO, od_mtd.id, tracking_mtd.id
+                    )
 
-                if success:
-                    # Add Tracking metadata and relate it
-                    ok, tracking_mtd = relation_meta.add_tracking_mtd(track_id, buf.pts)
-                    if ok:
-                        relation_meta.set_relation(
-                            GstAnalytics.RelTypes.RELATE_TO, od_mtd.id, tracking_mtd.id
+                    if self.verbose:
+                        print(
+                            f"Track ID {track_id} ({label_name}): x={x_int}, y={y_int}, w={w_int}, h={h_int} (conf: {conf:.2f})"
                         )
 
-                        if self.verbose:
-                            print(
-                                f"Track ID {track_id} ({label_name}): x={x_int}, y={y_int}, w={w_int}, h={h_int} (conf: {conf:.2f})"
-                            )
-
         return Gst.FlowReturn.OK
 
 
@@ -772,6 +666,7 @@ def run_pipeline(
     iou_threshold: float = 0.7,
     model_type: str = "small",
     output_file_path: Optional[str] = None,
+    latency_policy: str = "strict-every-frame",
 ) -> None:
     """
     Configure, build, and execute the GStreamer YOLOX Object Detection and Tracking pipeline.
@@ -791,7 +686,7 @@ def run_pipeline(
         The computer vision inference backend to utilize ("cpu" or "cuda").
         Default is "cuda".
     tracker : str, optional
-        The tracker algorithm choice ("iou" or "bytetrack").
+        The tracker algorithm choice ("iou", "kalman" or "bytetrack").
         Default is "iou".
     verbose : bool, optional
         If True, verbose output details such as active tracking coordinates and
@@ -808,6 +703,9 @@ def run_pipeline(
     model_type : str, optional
         The architectural variant of the pre-trained YOLOX model to load from PyTorch Hub
         ("nano", "tiny", "small", "medium", "large", "extra-large"). Default is "small".
+    latency_policy : str, optional
+        Queue behaviour around inference, one of helpers.latency.LATENCY_POLICIES
+        ("strict-every-frame", "drop-oldest", "latest-only"). Default is "strict-every-frame".
 
     Raises
     ------
@@ -817,6 +715,9 @@ def run_pipeline(
     if not os.path.exists(video_file_path):
         raise RuntimeError(f"Error: Input file '{video_file_path}' does not exist.")
 
+    # Queue leakiness and sizes around inference, see helpers.latency
+    policy = get_latency_policy(latency_policy)
+
     # Register custom Python YOLOX tracking element
     GstYoloxByteTrack.backend = backend
     GstYoloxByteTrack.tracker_type = tracker
@@ -877,9 +778,9 @@ def run_pipeline(
     pipeline_definition = f"""
         filesrc location={video_file_path} !
         {decode_and_scale}
-        queue max-size-buffers=2 !
+        {policy.queue_launch("inference-queue")} !
         gstyoloxbytetrack !
-        queue max-size-buffers=2 !
+        {policy.queue_launch("post-inference-queue")} !
         {download_and_overlay}
     """.strip()
 
@@ -888,6 +789,7 @@ def run_pipeline(
     print("===========================")
 
     pipeline = Gst.parse_launch(pipeline_definition)
+    policy.watch(pipeline, ["inference-queue", "post-inference-queue"])
     loop = GLib.MainLoop()
 
     bus = pipeline.get_bus()
@@ -916,6 +818,11 @@ def run_pipeline(
             if dbg:
                 print(f"Debug info: {dbg}")
             loop.quit()
+        elif message.type == Gst.MessageType.ELEMENT:
+            drops = parse_drops_message(message)
+            if drops is not None:
+                policy_name, queue_name, dropped = drops
+                print(f"[{policy_name}] {queue_name} dropped {dropped} frames in total")
 
     bus.connect("message", on_message)
 
@@ -954,7 +861,7 @@ if __name__ == "__main__":
         "--tracker",
         type=str,
         default="iou",
-        choices=["iou", "bytetrack"],
+        choices=["iou", "kalman", "bytetrack"],
         help="Tracker algorithm selection (default: iou).",
     )
     parser.add_argument(
@@ -989,6 +896,14 @@ if __name__ == "__main__":
         choices=["nano", "tiny", "small", "medium", "large", "extra-large"],
         help="YOLOX model type (default: small).",
     )
+    parser.add_argument(
+        "--latency-policy",
+        type=str,
+        default="strict-every-frame",
+        choices=list(LATENCY_POLICIES),
+        help="Queue behaviour when inference is slower than the frame rate: process every frame, "
+        "drop the oldest queued frames, or only process the latest frame (default: strict-every-frame).",
+    )
     args = parser.parse_args()
 
     try:
@@ -1002,6 +917,7 @@ if __name__ == "__main__":
             args.iou_threshold,
             args.model_type,
             args.output,
+            args.latency_policy,
         )
     except Exception as e:
         print(e)
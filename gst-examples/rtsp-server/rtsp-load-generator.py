@@ -0,0 +1,531 @@
+"""
+RTSP Load Generator
+
+This script opens N concurrent RTSP clients against an RTSP server and reports, per stream, the
+connection setup time, bitrate, frame interval jitter, RTP packet loss and glass-to-glass latency.
+
+Latency is measured from the latency marker that rtsp-server.py draws into each frame when started
+with --latency-marker: the wall-clock time at the server, in milliseconds, encoded as a row of
+black and white blocks. Clients decode the pattern with simplevideomarkdetect, without OCR, and
+compare it with their own wall-clock time. Server and clients must therefore run on the same host
+or have synchronized clocks. Decoding is expensive, so only the first --latency-streams clients
+decode the video; the other clients only depayload it.
+
+Example usage, ramping up to 64 clients by 8 clients every 30 seconds:
+    python3 rtsp-server.py --latency-marker --files file:///Videos/video1.mp4
+    python3 rtsp-load-generator.py --urls rtsp://127.0.0.1:8554/camera1 --clients 64 \\
+        --ramp-step 8 --ramp-interval 30 --output report.json
+
+The per-interval summary shows how bitrate, jitter, loss and latency degrade as clients are added,
+which shows where the server stops scaling.
+"""
+
+import argparse
+import json
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+import gi
+
+gi.require_version("Gst", "1.0")
+from gi.repository import Gst, GLib  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+# Must match MARKER_BITS and MARKER_BLOCK of rtsp-server.py
+MARKER_BITS = 32
+MARKER_BLOCK = 16
+
+# Depayloader, elementary stream caps and decoder of each RTP encoding-name the server sends
+RTP_CODECS = {
+    "H264": ("rtph264depay", "video/x-h264", "h264parse ! avdec_h264"),
+    "H265": ("rtph265depay", "video/x-h265", "h265parse ! avdec_h265"),
+}
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """
+    Nearest-rank percentile.
+
+    Parameters
+    ----------
+    values : List[float]
+        The values, in any order.
+    q : float
+        Percentile between 0 and 100.
+
+    Returns
+    -------
+    Optional[float]
+        The percentile, or None if there are no values.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, math.ceil(q / 100.0 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def summarize(values: List[float]) -> Dict[str, Optional[float]]:
+    """Mean, median, 95th percentile and maximum of a list of values, rounded to 0.01."""
+    if not values:
+        return {"mean": None, "p50": None, "p95": None, "max": None}
+    return {
+        "mean": round(sum(values) / len(values), 2),
+        "p50": round(percentile(values, 50), 2),
+        "p95": round(percentile(values, 95), 2),
+        "max": round(max(values), 2),
+    }
+
+
+def stddev(values: List[float]) -> float:
+    """Population standard deviation, 0.0 for fewer than two values."""
+    if len(values) < 2:
+        return 0.0
+    mean = sum(values) / len(values)
+    return math.sqrt(sum((v - mean) ** 2 for v in values) / len(values))
+
+
+@dataclass
+class StreamStats:
+    """
+    Measurements of one RTSP client.
+
+    Counters are updated from the streaming threads and read by the reporter, under a lock.
+    Frame intervals and latencies are kept per report interval and reset by take_interval().
+    """
+
+    url: str
+    started: float = field(default_factory=time.monotonic)
+    setup_ms: Optional[float] = None
+    first_frame_ms: Optional[float] = None
+    bytes_received: int = 0
+    frames: int = 0
+    packets_lost: int = 0
+    packets_received: int = 0
+    errors: int = 0
+    last_error: Optional[str] = None
+    _last_frame: Optional[float] = None
+    _intervals_ms: List[float] = field(default_factory=list)
+    _latencies_ms: List[float] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def on_packet(self, pad: Gst.Pad, info: Gst.PadProbeInfo) -> Gst.PadProbeReturn:
+        """Pad probe on the depayloader sink pad counting received RTP bytes."""
+        now = time.monotonic()
+        with self._lock:
+            if self.setup_ms is None:
+                self.setup_ms = 1000.0 * (now - self.started)
+            self.bytes_received += info.get_buffer().get_size()
+        return Gst.PadProbeReturn.OK
+
+    def on_frame(self, pad: Gst.Pad, info: Gst.PadProbeInfo) -> Gst.PadProbeReturn:
+        """Pad probe on the depayloader source pad timing frame arrivals."""
+        now = time.monotonic()
+        with self._lock:
+            if self.first_frame_ms is None:
+                self.first_frame_ms = 1000.0 * (now - self.started)
+            if self._last_frame is not None:
+                self._intervals_ms.append(1000.0 * (now - self._last_frame))
+            self._last_frame = now
+            self.frames += 1
+        return Gst.PadProbeReturn.OK
+
+    def on_marker(self, pattern_data: int) -> None:
+        """Record the latency of a frame from its decoded latency marker."""
+        now_ms = int(time.time() * 1000) % (1 << MARKER_BITS)
+        latency = (now_ms - pattern_data) % (1 << MARKER_BITS)
+        with self._lock:
+            self._latencies_ms.append(float(latency))
+
+    def take_interval(self) -> Dict[str, List[float]]:
+        """Return and reset the frame intervals and latencies of the last report interval."""
+        with self._lock:
+            taken = {
+                "intervals_ms": self._intervals_ms,
+                "latency_ms": self._latencies_ms,
+            }
+            self._intervals_ms = []
+            self._latencies_ms = []
+        return taken
+
+
+class RTSPClient:
+    """
+    A single RTSP client pipeline.
+
+    Parameters
+    ----------
+    url : str
+        RTSP URL of the stream.
+    protocol : str
+        'tcp' or 'udp'.
+    latency_ms : int
+        rtspsrc jitter buffer latency in milliseconds.
+    decode : bool
+        Decode the video and measure glass-to-glass latency from the latency marker.
+    """
+
+    def __init__(self, url: str, protocol: str, latency_ms: int, decode: bool) -> None:
+        self.stats = StreamStats(url)
+        self.decode = decode
+        self._jitterbuffers: List[Gst.Element] = []
+
+        # The depayloader is chosen from the SDP once rtspsrc exposes the stream, as passthrough
+        # mounts serve H.264 or H.265
+        self.pipeline = Gst.Pipeline.new(None)
+        src = Gst.parse_launch(
+            f'rtspsrc name=src location="{url}" protocols={protocol} latency={latency_ms}'
+        )
+        self.pipeline.add(src)
+        src.connect("pad-added", self._on_pad_added)
+        src.connect("new-manager", self._on_new_manager)
+
+        bus = self.pipeline.get_bus()
+        bus.add_signal_watch()
+        bus.connect("message::error", self._on_error)
+        if decode:
+            # Sync emission handles the marker in the streaming thread, before the main loop
+            bus.enable_sync_message_emission()
+            bus.connect("sync-message::element", self._on_element_message)
+
+    def _on_pad_added(self, src: Gst.Element, pad: Gst.Pad) -> None:
+        """Depayload, and optionally decode, a stream of rtspsrc by its encoding-name."""
+        caps = pad.get_current_caps() or pad.query_caps(None)
+        structure = caps.get_structure(0)
+        codec = None
+        if structure.get_string("media") == "video":
+            codec = RTP_CODECS.get(structure.get_string("encoding-name"))
+
+        if codec is None:
+            logging.warning(
+                f"{self.stats.url}: ignoring stream {caps.to_string()}, "
+                f"supported video encodings are {sorted(RTP_CODECS)}"
+            )
+            branch = "fakesink sync=false"
+        else:
+            depayloader, stream_caps, decoder = codec
+            branch = (
+                f"{depayloader} name=depay ! "
+                f"{stream_caps},stream-format=byte-stream,alignment=au ! "
+            )
+            if self.decode:
+                branch += (
+                    f"{decoder} ! videoconvert ! "
+                    f"simplevideomarkdetect name=detect pattern-count={MARKER_BITS} "
+                    f"pattern-width={MARKER_BLOCK} pattern-height={MARKER_BLOCK} ! "
+                    "fakesink sync=true"
+                )
+            else:
+                branch += "fakesink sync=false"
+
+        sink_bin = Gst.parse_bin_from_description(branch, True)
+        if codec is not None:
+            depay = sink_bin.get_by_name("depay")
+            depay.get_static_pad("sink").add_probe(
+                Gst.PadProbeType.BUFFER, self.stats.on_packet
+            )
+            depay.get_static_pad("src").add_probe(
+                Gst.PadProbeType.BUFFER, self.stats.on_frame
+            )
+        self.pipeline.add(sink_bin)
+        sink_bin.sync_state_with_parent()
+        pad.link(sink_bin.get_static_pad("sink"))
+
+    def _on_new_manager(self, src: Gst.Element, manager: Gst.Element) -> None:
+        manager.connect("new-jitterbuffer", self._on_new_jitterbuffer)
+
+    def _on_new_jitterbuffer(
+        self, manager: Gst.Element, jitterbuffer: Gst.Element, *args: Any
+    ) -> None:
+        self._jitterbuffers.append(jitterbuffer)
+
+    def _on_element_message(self, bus: Gst.Bus, message: Gst.Message) -> None:
+        structure = message.get_structure()
+        if structure is None or structure.get_name() != "GstSimpleVideoMarkDetect":
+            return
+        found, have_pattern = structure.get_boolean("have-pattern")
+        if found and have_pattern:
+            found, pattern_data = structure.get_uint64("pattern-data")
+            if found:
+                self.stats.on_marker(pattern_data)
+
+    def _on_error(self, bus: Gst.Bus, message: Gst.Message) -> None:
+        error, debug = message.parse_error()
+        logging.error(f"{self.stats.url}: {error.message}")
+        logging.debug(f"Debug info: {debug}")
+        self.stats.errors += 1
+        self.stats.last_error = error.message
+
+    def update_packet_stats(self) -> None:
+        """Read the received and lost packet counts from the RTP jitter buffers."""
+        received = lost = 0
+        for jitterbuffer in self._jitterbuffers:
+            stats = jitterbuffer.get_property("stats")
+            received += stats.get_uint64("num-pushed")[1]
+            lost += stats.get_uint64("num-lost")[1]
+        self.stats.packets_received = received
+        self.stats.packets_lost = lost
+
+    def start(self) -> None:
+        """Connect and start streaming."""
+        self.stats.started = time.monotonic()
+        self.pipeline.set_state(Gst.State.PLAYING)
+
+    def stop(self) -> None:
+        """Disconnect."""
+        self.pipeline.set_state(Gst.State.NULL)
+
+
+class LoadGenerator:
+    """
+    Starts RTSP clients, ramping up to the requested count, and reports their measurements.
+
+    Parameters
+    ----------
+    urls : List[str]
+        RTSP URLs; clients are assigned to them round-robin.
+    clients : int
+        Total number of clients.
+    protocol : str
+        'tcp' or 'udp'.
+    latency_ms : int
+        rtspsrc jitter buffer latency in milliseconds.
+    latency_streams : int
+        Number of clients that decode the video to measure glass-to-glass latency.
+    ramp_step : int
+        Clients started at once, 0 to start all clients at once.
+    ramp_interval : int
+        Seconds between ramp steps.
+    report_interval : int
+        Seconds between summary reports.
+    duration : int
+        Seconds to run after the last client has been started.
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        clients: int,
+        protocol: str = "tcp",
+        latency_ms: int = 200,
+        latency_streams: int = 1,
+        ramp_step: int = 0,
+        ramp_interval: int = 30,
+        report_interval: int = 5,
+        duration: int = 60,
+    ) -> None:
+        Gst.init(None)
+        self.clients = [
+            RTSPClient(
+                urls[idx % len(urls)], protocol, latency_ms, idx < latency_streams
+            )
+            for idx in range(clients)
+        ]
+        self.ramp_step = ramp_step if ramp_step > 0 else clients
+        self.ramp_interval = ramp_interval
+        self.report_interval = report_interval
+        self.duration = duration
+        self.started = 0
+        self.reports: List[Dict[str, Any]] = []
+        self.loop = GLib.MainLoop()
+        self._start_time = 0.0
+        self._last_report = 0.0
+        self._last_bytes: Dict[int, int] = {}
+
+    def _ramp(self) -> bool:
+        """Start the next ramp step of clients."""
+        for client in self.clients[self.started : self.started + self.ramp_step]:
+            client.start()
+        self.started = min(len(self.clients), self.started + self.ramp_step)
+        logging.info(f"{self.started} clients started")
+        if self.started < len(self.clients):
+            return GLib.SOURCE_CONTINUE
+        GLib.timeout_add_seconds(self.duration, self._finish)
+        return GLib.SOURCE_REMOVE
+
+    def _report(self) -> bool:
+        """Summarize the measurements of the running clients over the last report interval."""
+        now = time.monotonic()
+        elapsed = now - self._last_report
+        self._last_report = now
+
+        streams = []
+        intervals: List[float] = []
+        latencies: List[float] = []
+        for idx, client in enumerate(self.clients[: self.started]):
+            client.update_packet_stats()
+            stats = client.stats
+            taken = stats.take_interval()
+            intervals += taken["intervals_ms"]
+            latencies += taken["latency_ms"]
+            received = stats.bytes_received - self._last_bytes.get(idx, 0)
+            self._last_bytes[idx] = stats.bytes_received
+            expected = stats.packets_received + stats.packets_lost
+            streams.append(
+                {
+                    "url": stats.url,
+                    "setup_ms": None
+                    if stats.setup_ms is None
+                    else round(stats.setup_ms, 1),
+                    "first_frame_ms": (
+                        None
+                        if stats.first_frame_ms is None
+                        else round(stats.first_frame_ms, 1)
+                    ),
+                    "bitrate_kbps": round(8.0 * received / elapsed / 1000.0, 1),
+                    "frames": stats.frames,
+                    "frame_interval_ms": summarize(taken["intervals_ms"]),
+                    "jitter_ms": round(stddev(taken["intervals_ms"]), 2),
+                    "packet_loss_percent": round(
+                        100.0 * stats.packets_lost / expected if expected else 0.0, 3
+                    ),
+                    "latency_ms": summarize(taken["latency_ms"]),
+                    "errors": stats.errors,
+                }
+            )
+
+        setup = [s["setup_ms"] for s in streams if s["setup_ms"] is not None]
+        report = {
+            "time_s": round(now - self._start_time, 1),
+            "clients": self.started,
+            "connected": len(setup),
+            "total_bitrate_kbps": round(sum(s["bitrate_kbps"] for s in streams), 1),
+            "setup_ms": summarize(setup),
+            "jitter_ms": round(stddev(intervals), 2),
+            "packet_loss_percent": summarize(
+                [s["packet_loss_percent"] for s in streams]
+            ),
+            "latency_ms": summarize(latencies),
+            "errors": sum(s["errors"] for s in streams),
+            "streams": streams,
+        }
+        self.reports.append(report)
+        latency = report["latency_ms"]
+        logging.info(
+            f"t={report['time_s']:.0f}s clients={report['connected']}/{report['clients']} "
+            f"bitrate={report['total_bitrate_kbps']:.0f} kbit/s "
+            f"setup p95={report['setup_ms']['p95']} ms jitter={report['jitter_ms']} ms "
+            f"loss max={report['packet_loss_percent']['max']}% "
+            f"latency p50={latency['p50']} p95={latency['p95']} ms errors={report['errors']}"
+        )
+        return GLib.SOURCE_CONTINUE
+
+    def _finish(self) -> bool:
+        self._report()
+        self.loop.quit()
+        return GLib.SOURCE_REMOVE
+
+    def run(self) -> List[Dict[str, Any]]:
+        """
+        Run the load test.
+
+        Returns
+        -------
+        List[Dict[str, Any]]
+            The summary reports, one per report interval.
+        """
+        self._start_time = self._last_report = time.monotonic()
+        if self._ramp():
+            GLib.timeout_add_seconds(self.ramp_interval, self._ramp)
+        GLib.timeout_add_seconds(self.report_interval, self._report)
+        try:
+            self.loop.run()
+        except KeyboardInterrupt:
+            logging.info("Interrupted, stopping clients")
+        finally:
+            for client in self.clients:
+                client.stop()
+        return self.reports
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Open concurrent RTSP clients and measure the server under load."
+    )
+    parser.add_argument(
+        "--urls",
+        type=str,
+        nargs="+",
+        required=True,
+        help="RTSP URLs to connect to, clients are assigned round-robin.",
+    )
+    parser.add_argument(
+        "--clients", type=int, default=1, help="Number of clients (default: 1)."
+    )
+    parser.add_argument(
+        "--protocol",
+        type=str,
+        default="tcp",
+        choices=["tcp", "udp"],
+        help="RTP transport (default: tcp).",
+    )
+    parser.add_argument(
+        "--latency",
+        type=int,
+        default=200,
+        help="Jitter buffer latency in milliseconds (default: 200).",
+    )
+    parser.add_argument(
+        "--latency-streams",
+        type=int,
+        default=1,
+        help="Number of clients that decode the video to measure glass-to-glass latency; "
+        "requires rtsp-server.py --latency-marker (default: 1).",
+    )
+    parser.add_argument(
+        "--ramp-step",
+        type=int,
+        default=0,
+        help="Clients started per ramp step, 0 to start all at once (default: 0).",
+    )
+    parser.add_argument(
+        "--ramp-interval",
+        type=int,
+        default=30,
+        help="Seconds between ramp steps (default: 30).",
+    )
+    parser.add_argument(
+        "--report-interval",
+        type=int,
+        default=5,
+        help="Seconds between summary reports (default: 5).",
+    )
+    parser.add_argument(
+        "--duration",
+        type=int,
+        default=60,
+        help="Seconds to run after all clients are started (default: 60).",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="Write the reports as JSON to this file.",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    generator = LoadGenerator(
+        args.urls,
+        args.clients,
+        args.protocol,
+        args.latency,
+        args.latency_streams,
+        args.ramp_step,
+        args.ramp_interval,
+        args.report_interval,
+        args.duration,
+    )
+    reports = generator.run()
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(reports, f, indent=2)
+        logging.info(f"Reports written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,30 @@ This script creates an RTSP server that streams a media file specified via comma
 The stream can be played back using an RTSP-compatible player like VLC or ffplay.
 
 Example usage to start the server:
-    python3 rtsp_server.py --file /path/to/media/file.mp4
+    python3 rtsp_server.py --files file:///path/to/media/file.mp4
+
+Transcoded mounts use the low-latency x264 profile by default. Profiles, bitrate, keyframe
+interval, thread count, resolution and framerate can be set from the command line, or per mount
+in a JSON config file:
+    python3 rtsp_server.py --config mounts.json
+
+With --cache-dir each file input is transcoded once to an H.264/H.265 elementary stream cached on
+disk. Mounts are then served from the memory-mapped cache and loop seamlessly, without decoding
+or encoding while streaming.
+
+By default (--mode auto) inputs that already contain H.264 or H.265 video are only parsed and
+re-payloaded, without decoding and re-encoding. Other inputs are transcoded to H.264.
+
+Mounts can be listed, added, reconfigured and removed at runtime through the local HTTP API on
+--api-port. A mount's pipeline is created on its first client and its resources are released after
+--idle-timeout seconds without clients.
+
+File mounts loop forever using segment seeks, without tearing down the pipeline. Per-mount health
+metrics (clients, bitrate, dropped frames, encode latency, loops and errors) are served as JSON from
+http://localhost:8555/metrics, see --api-port.
+
+With --latency-marker transcoded mounts embed the wall-clock time of each frame as a block pattern
+(simplevideomark) that rtsp-load-generator.py decodes to measure glass-to-glass latency.
 
 To playback the stream, use one of the following:
     - ffplay rtsp://localhost:8554/camera1
@@ -14,36 +37,956 @@ To playback the stream, use one of the following:
         mux.sink_1 nvstreammux name=mux width=1920 height=1080 batch-size=1 live-source=1 ! queue !
         nvvideoconvert ! queue ! nvdsosd ! queue ! nveglglessink
 
-The server will stream the media file over the RTSP protocol, converting raw video to H.264 format.
+The server will stream the media file over the RTSP protocol, converting raw video to H.264 format
+when needed.
 """
 
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from urllib.parse import urlparse
+from dataclasses import asdict, dataclass, field, fields, replace
 import os
 import argparse
+import hashlib
+import json
+import mmap
 import logging
-from typing import List
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 import gi
 
 gi.require_version("Gst", "1.0")
+gi.require_version("GstPbutils", "1.0")
 gi.require_version("GstRtspServer", "1.0")
-from gi.repository import Gst, GstRtspServer, GLib  # noqa: E402, F401
+from gi.repository import Gst, GstPbutils, GstRtspServer, GLib  # noqa: E402, F401
 
 logger = logging.getLogger(__name__)
 
+# auto: passthrough when the input codec can be re-payloaded, transcode otherwise
+STREAM_MODES = ["auto", "passthrough", "transcode"]
+
+# Latency marker: wall-clock milliseconds modulo 2^MARKER_BITS drawn as MARKER_BITS blocks of
+# MARKER_BLOCK x MARKER_BLOCK pixels in the top-left corner, see simplevideomark
+MARKER_BITS = 32
+MARKER_BLOCK = 16
+
+# Video media types that can be re-payloaded without transcoding, and their parser/payloader
+PASSTHROUGH_CODECS = {
+    "video/x-h264": ("h264parse", "rtph264pay"),
+    "video/x-h265": ("h265parse", "rtph265pay"),
+}
+
+
+def probe_video_codec(uri: str, timeout_s: int = 5) -> Optional[str]:
+    """
+    Find the media type of the first video stream of a URI.
+
+    Parameters
+    ----------
+    uri : str
+        URI of the input, e.g. file:///Videos/video1.mp4.
+    timeout_s : int
+        Discovery timeout in seconds.
+
+    Returns
+    -------
+    Optional[str]
+        Media type such as 'video/x-h264', or None if the URI could not be discovered or
+        has no video stream.
+    """
+    try:
+        discoverer = GstPbutils.Discoverer.new(timeout_s * Gst.SECOND)
+        info = discoverer.discover_uri(uri)
+    except GLib.Error as e:
+        logger.warning(f"Could not discover '{uri}': {e.message}")
+        return None
+
+    video_streams = info.get_video_streams()
+    if not video_streams:
+        return None
+    caps = video_streams[0].get_caps()
+    if caps is None or caps.get_size() == 0:
+        return None
+    return caps.get_structure(0).get_name()
+
+
+@dataclass
+class EncodingProfile:
+    """
+    x264 encoder settings and output caps of a transcoded mount.
+
+    Attributes
+    ----------
+    speed_preset : str
+        x264enc speed-preset, e.g. 'ultrafast' or 'medium'.
+    tune : str
+        x264enc tune flags, e.g. 'zerolatency'. Empty string for none.
+    bitrate_kbps : int
+        Target bitrate in kbit/s.
+    key_int_max : int
+        Maximum keyframe interval in frames.
+    bframes : int
+        Number of B-frames between I and P frames.
+    threads : int
+        Number of x264 threads, 0 for automatic.
+    width : Optional[int]
+        Output width, None to keep the input width.
+    height : Optional[int]
+        Output height, None to keep the input height.
+    framerate : Optional[int]
+        Output framerate in frames per second, None to keep the input framerate.
+    """
+
+    speed_preset: str = "ultrafast"
+    tune: str = "zerolatency"
+    bitrate_kbps: int = 2048
+    key_int_max: int = 30
+    bframes: int = 0
+    threads: int = 0
+    width: Optional[int] = None
+    height: Optional[int] = None
+    framerate: Optional[int] = None
+
+    def requires_transcode(self) -> bool:
+        """Whether the profile changes resolution or framerate, which passthrough cannot do."""
+        return any(v is not None for v in (self.width, self.height, self.framerate))
+
+    def encoder_launch(self, latency_marker: bool = False) -> str:
+        """
+        Launch string from raw video to the H.264 encoder, named 'encoder'.
+
+        Parameters
+        ----------
+        latency_marker : bool
+            Draw a time overlay and the latency marker, named 'marker', before encoding.
+
+        Returns
+        -------
+        str
+            Partial launch string.
+        """
+        caps = []
+        if self.width is not None:
+            caps.append(f"width={self.width}")
+        if self.height is not None:
+            caps.append(f"height={self.height}")
+        if self.framerate is not None:
+            caps.append(f"framerate={self.framerate}/1")
+
+        launch = "videoconvert ! "
+        if caps:
+            launch += f"videoscale ! videorate ! video/x-raw,{','.join(caps)} ! "
+        if latency_marker:
+            launch += (
+                "timeoverlay time-mode=elapsed-running-time ! "
+                f"simplevideomark name=marker pattern-count={MARKER_BITS} "
+                f"pattern-width={MARKER_BLOCK} pattern-height={MARKER_BLOCK} ! "
+            )
+
+        # The queue gives the encoder its own streaming thread, see MountStats
+        launch += (
+            f"queue ! x264enc name=encoder speed-preset={self.speed_preset} "
+            f"bitrate={self.bitrate_kbps} key-int-max={self.key_int_max} "
+            f"bframes={self.bframes} threads={self.threads}"
+        )
+        if self.tune:
+            launch += f" tune={self.tune}"
+        return launch
+
+
+ENCODING_PROFILES: Dict[str, EncodingProfile] = {
+    "low-latency": EncodingProfile(),
+    "balanced": EncodingProfile(
+        speed_preset="veryfast", bitrate_kbps=4096, key_int_max=60
+    ),
+    "quality": EncodingProfile(
+        speed_preset="medium", tune="", bitrate_kbps=6144, key_int_max=120, bframes=2
+    ),
+}
+
+
+@dataclass
+class MountConfig:
+    """
+    Input and encoding settings of an RTSP mount.
+
+    Attributes
+    ----------
+    uri : str
+        URI of the input, e.g. file:///Videos/video1.mp4.
+    path : str
+        Mount path, e.g. /camera1.
+    profile : EncodingProfile
+        Encoding settings used when the input is transcoded.
+    """
+
+    uri: str
+    path: str
+    profile: EncodingProfile = field(default_factory=EncodingProfile)
+
+
+PROFILE_FIELDS = {f.name for f in fields(EncodingProfile)}
+
+
+def parse_profiles(config: Dict[str, Any]) -> Dict[str, EncodingProfile]:
+    """
+    Parse the named profiles of a config, on top of the built-in ENCODING_PROFILES.
+
+    Parameters
+    ----------
+    config : Dict[str, Any]
+        The config, with the profiles under 'profiles'.
+
+    Returns
+    -------
+    Dict[str, EncodingProfile]
+        The built-in and the configured profiles.
+    """
+    profiles = dict(ENCODING_PROFILES)
+    for name, settings in config.get("profiles", {}).items():
+        unknown = set(settings) - PROFILE_FIELDS
+        if unknown:
+            raise ValueError(f"Unknown settings {sorted(unknown)} in profile '{name}'")
+        profiles[name] = EncodingProfile(**settings)
+    return profiles
+
+
+def parse_mount(
+    entry: Dict[str, Any],
+    profiles: Dict[str, EncodingProfile],
+    default_profile: EncodingProfile,
+    default_path: str,
+) -> MountConfig:
+    """
+    Parse a mount entry of a config or of an API request.
+
+    Parameters
+    ----------
+    entry : Dict[str, Any]
+        The mount with 'uri', and optionally 'path', 'profile' and profile field overrides.
+    profiles : Dict[str, EncodingProfile]
+        Available named profiles.
+    default_profile : EncodingProfile
+        Profile used when the entry does not select a profile.
+    default_path : str
+        Mount path used when the entry has no 'path'.
+
+    Returns
+    -------
+    MountConfig
+        The mount configuration.
+
+    Raises
+    ------
+    ValueError
+        If the entry has no URI, selects an unknown profile or overrides unknown settings.
+    """
+    if "uri" not in entry:
+        raise ValueError("Mount has no 'uri'")
+    profile_name = entry.get("profile")
+    if profile_name is not None and profile_name not in profiles:
+        raise ValueError(
+            f"Unknown profile '{profile_name}', available: {sorted(profiles)}"
+        )
+    profile = profiles[profile_name] if profile_name else default_profile
+
+    overrides = {k: v for k, v in entry.items() if k not in ("uri", "path", "profile")}
+    unknown = set(overrides) - PROFILE_FIELDS
+    if unknown:
+        raise ValueError(
+            f"Unknown settings {sorted(unknown)} in mount '{entry['uri']}'"
+        )
+
+    path = "/" + entry.get("path", default_path).strip("/")
+    return MountConfig(
+        uri=entry["uri"], path=path, profile=replace(profile, **overrides)
+    )
+
+
+def load_mount_config(
+    config_path: str, default_profile: EncodingProfile
+) -> Tuple[Dict[str, EncodingProfile], List[MountConfig]]:
+    """
+    Load mounts and encoding profiles from a JSON config file.
+
+    The file may define additional named profiles and lists the mounts. Each mount selects a
+    profile by name and may override any profile field, e.g.
+
+        {
+            "profiles": {"cheap": {"bitrate_kbps": 1000, "width": 640, "height": 360}},
+            "mounts": [
+                {"uri": "file:///Videos/video1.mp4", "profile": "cheap"},
+                {"uri": "file:///Videos/video2.mp4", "path": "/lobby", "bitrate_kbps": 800}
+            ]
+        }
+
+    Parameters
+    ----------
+    config_path : str
+        Path to the JSON config file.
+    default_profile : EncodingProfile
+        Profile of mounts that do not select a profile.
+
+    Returns
+    -------
+    Tuple[Dict[str, EncodingProfile], List[MountConfig]]
+        The available profiles and the configured mounts.
+    """
+    with open(config_path) as f:
+        config = json.load(f)
+
+    profiles = parse_profiles(config)
+    mounts = [
+        parse_mount(entry, profiles, default_profile, f"/camera{idx}")
+        for idx, entry in enumerate(config.get("mounts", []), 1)
+    ]
+    return profiles, mounts
+
+
+def thread_cpu_seconds(native_id: int) -> Optional[float]:
+    """
+    Read the user + system CPU time of a thread of this process from /proc.
+
+    Parameters
+    ----------
+    native_id : int
+        The native (kernel) thread id.
+
+    Returns
+    -------
+    Optional[float]
+        The consumed CPU time in seconds, or None if the thread has exited.
+    """
+    try:
+        with open(f"/proc/self/task/{native_id}/stat") as f:
+            # The command name may contain spaces, the remaining fields follow the last ')'
+            stat_fields = f.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(stat_fields[11]) + int(stat_fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def thread_name(native_id: int) -> Optional[str]:
+    """
+    Read the name of a thread of this process from /proc.
+
+    Parameters
+    ----------
+    native_id : int
+        The native (kernel) thread id.
+
+    Returns
+    -------
+    Optional[str]
+        The thread name, or None if the thread has exited.
+    """
+    try:
+        with open(f"/proc/self/task/{native_id}/comm") as f:
+            return f.read().rstrip("\n")
+    except OSError:
+        return None
+
+
+def threads_named(names: Set[str]) -> List[int]:
+    """
+    List the threads of this process with one of the given names.
+
+    Parameters
+    ----------
+    names : Set[str]
+        Thread names.
+
+    Returns
+    -------
+    List[int]
+        Native (kernel) thread ids.
+    """
+    try:
+        tids = [int(tid) for tid in os.listdir("/proc/self/task")]
+    except OSError:
+        return []
+    return [tid for tid in tids if thread_name(tid) in names]
+
+
+class MountStats:
+    """
+    Health metrics and encoder CPU accounting of a mount.
+
+    The encoder runs in its own streaming thread, whose CPU time is read from /proc. Threads are
+    recorded by a probe on the encoder sink pad, so CPU time accumulates over media re-creation.
+    GStreamer names streaming threads after their pad, e.g. 'queue3:src', with names unique in
+    the process, and the x264 worker threads started by the encoder inherit that name, so they
+    are attributed to the mount as well. Encode latency is the wall-clock time between a frame entering and
+    leaving the encoder, matched by PTS.
+    """
+
+    # Frames waiting in the encoder that are tracked for latency; older ones are forgotten
+    MAX_PENDING_FRAMES = 256
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._threads: Dict[int, float] = {}
+        self._thread_names: Set[str] = set()
+        self._pending: Dict[int, float] = {}
+        self.frames = 0
+        self.clients = 0
+        self.bytes_sent = 0
+        self.bitrate_kbps = 0.0
+        self.dropped_frames = 0
+        self.loops = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self._latency_sum = 0.0
+        self._latency_max = 0.0
+        self._latency_count = 0
+        self._sample_bytes = 0
+        self._sample_time = time.monotonic()
+
+    def on_encoder_buffer(
+        self, pad: Gst.Pad, info: Gst.PadProbeInfo
+    ) -> Gst.PadProbeReturn:
+        """Pad probe recording the encoder thread, counting frames and timing their entry."""
+        tid = threading.get_native_id()
+        pts = info.get_buffer().pts
+        with self._lock:
+            self.frames += 1
+            if tid not in self._threads:
+                self._threads[tid] = 0.0
+                name = thread_name(tid)
+                if name is not None:
+                    self._thread_names.add(name)
+            if len(self._pending) >= self.MAX_PENDING_FRAMES:
+                self._pending.pop(next(iter(self._pending)))
+            self._pending[pts] = time.monotonic()
+        return Gst.PadProbeReturn.OK
+
+    def on_encoded_buffer(
+        self, pad: Gst.Pad, info: Gst.PadProbeInfo
+    ) -> Gst.PadProbeReturn:
+        """Pad probe on the encoder source pad measuring encode latency."""
+        pts = info.get_buffer().pts
+        with self._lock:
+            entered = self._pending.pop(pts, None)
+            if entered is not None:
+                latency = time.monotonic() - entered
+                self._latency_sum += latency
+                self._latency_count += 1
+                self._latency_max = max(self._latency_max, latency)
+        return Gst.PadProbeReturn.OK
+
+    def on_payloaded_buffer(
+        self, pad: Gst.Pad, info: Gst.PadProbeInfo
+    ) -> Gst.PadProbeReturn:
+        """Pad probe on the payloader source pad counting sent bytes."""
+        with self._lock:
+            self.bytes_sent += info.get_buffer().get_size()
+        return Gst.PadProbeReturn.OK
+
+    def sample(self) -> None:
+        """Update the bitrate from the bytes sent since the previous sample."""
+        now = time.monotonic()
+        with self._lock:
+            elapsed = now - self._sample_time
+            if elapsed > 0:
+                sent = self.bytes_sent - self._sample_bytes
+                self.bitrate_kbps = 8.0 * sent / elapsed / 1000.0
+            self._sample_bytes = self.bytes_sent
+            self._sample_time = now
+
+    def encode_cpu_seconds(self) -> float:
+        """Total CPU time of the encoder threads, keeping the last value of exited threads."""
+        with self._lock:
+            # x264 worker threads, named after the encoder streaming thread that started them
+            for tid in threads_named(self._thread_names):
+                self._threads.setdefault(tid, 0.0)
+            for tid in self._threads:
+                cpu = thread_cpu_seconds(tid)
+                if cpu is not None:
+                    self._threads[tid] = cpu
+            return sum(self._threads.values())
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Snapshot of the metrics for the metrics endpoint."""
+        encode_cpu = self.encode_cpu_seconds()
+        with self._lock:
+            mean_latency = (
+                self._latency_sum / self._latency_count if self._latency_count else None
+            )
+            return {
+                "clients": self.clients,
+                "bitrate_kbps": round(self.bitrate_kbps, 1),
+                "bytes_sent": self.bytes_sent,
+                "frames_encoded": self.frames,
+                "dropped_frames": self.dropped_frames,
+                "encode_latency_ms": {
+                    "mean": None
+                    if mean_latency is None
+                    else round(1000 * mean_latency, 2),
+                    "max": round(1000 * self._latency_max, 2),
+                },
+                "encode_cpu_seconds": round(encode_cpu, 3),
+                "loops": self.loops,
+                "errors": self.errors,
+                "last_error": self.last_error,
+            }
+
+
+class LoopingMedia(GstRtspServer.RTSPMedia):
+    """
+    RTSP media that loops its input and records bus messages in the mount's MountStats.
+
+    Looping uses segment seeks: at the end of each segment a non-flushing seek back to the start
+    is made, so the running time continues and the pipeline is not torn down. If the media
+    reaches EOS anyway, e.g. because a client seek replaced the segment seek, a flushing segment
+    seek restarts it.
+    """
+
+    stats: Optional[MountStats] = None
+
+    def _seek_to_start(self, flush: bool) -> bool:
+        flags = Gst.SeekFlags.SEGMENT
+        if flush:
+            flags |= Gst.SeekFlags.FLUSH
+        return self.get_element().seek(
+            1.0,
+            Gst.Format.TIME,
+            flags,
+            Gst.SeekType.SET,
+            0,
+            Gst.SeekType.NONE,
+            Gst.CLOCK_TIME_NONE,
+        )
+
+    def on_prepared(self, media: "LoopingMedia") -> None:
+        """Start the first segment, so that the first loop is already seamless."""
+        if self.get_element().get_by_name("loopsrc") is None:
+            self._seek_to_start(flush=True)
+
+    def do_handle_message(self, message: Gst.Message) -> bool:
+        """Loop on segment done and EOS, record QoS drops and errors, then chain up."""
+        if message.type == Gst.MessageType.SEGMENT_DONE:
+            self._seek_to_start(flush=False)
+            if self.stats is not None:
+                self.stats.loops += 1
+            return True
+        if message.type == Gst.MessageType.EOS:
+            logging.info("EOS received, restarting from the beginning")
+            self._seek_to_start(flush=True)
+            if self.stats is not None:
+                self.stats.loops += 1
+            return True
+        if message.type == Gst.MessageType.QOS and self.stats is not None:
+            dropped = message.parse_qos_stats()[2]
+            self.stats.dropped_frames = max(self.stats.dropped_frames, dropped)
+        elif message.type == Gst.MessageType.ERROR and self.stats is not None:
+            error, debug = message.parse_error()
+            logging.error(
+                f"Error received from {message.src.get_name()}: {error.message}"
+            )
+            logging.error(f"Debug info: {debug}")
+            self.stats.errors += 1
+            self.stats.last_error = error.message
+        return GstRtspServer.RTSPMedia.do_handle_message(self, message)
+
+
+class LoopCache:
+    """
+    A pre-encoded, AU-aligned elementary stream served from a memory-mapped file.
+
+    The cache consists of a data file holding the byte-stream and a JSON index with the caps and
+    the offset, size, timestamps and keyframe flag of every access unit. The index is written
+    last, so an entry with an index is complete.
+
+    Parameters
+    ----------
+    data_path : str
+        Path to the elementary stream file.
+    index_path : str
+        Path to the JSON index file.
+    """
+
+    def __init__(self, data_path: str, index_path: str) -> None:
+        with open(index_path) as f:
+            index = json.load(f)
+        self.codec: str = index["codec"]
+        self.caps: str = index["caps"]
+        # [offset, size, pts, dts, duration, keyframe] per access unit, timestamps in ns
+        self.units: List[List[int]] = index["units"]
+        self.loop_duration: int = index["loop_duration"]
+        with open(data_path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self) -> None:
+        """Unmap the cached stream; appsrcs still attached end their stream."""
+        self._mm.close()
+
+    @staticmethod
+    def key(mount: MountConfig, codec: Optional[str]) -> Optional[str]:
+        """
+        Cache key of a mount, None if the input is not a local file.
+
+        The key covers the input path, its modification time and size, and the encoding profile,
+        or the passthrough codec when the input is not transcoded.
+        """
+        uri_parsed = urlparse(mount.uri)
+        if uri_parsed.scheme != "file":
+            return None
+        st = os.stat(uri_parsed.path)
+        fingerprint = {
+            "path": os.path.realpath(uri_parsed.path),
+            "mtime_ns": st.st_mtime_ns,
+            "size": st.st_size,
+            "encoding": codec if codec is not None else asdict(mount.profile),
+        }
+        return hashlib.sha1(
+            json.dumps(fingerprint, sort_keys=True).encode()
+        ).hexdigest()
+
+    @classmethod
+    def build(
+        cls, mount: MountConfig, codec: Optional[str], cache_dir: str
+    ) -> Optional["LoopCache"]:
+        """
+        Load the cache of a mount, encoding the input first if it is not cached yet.
+
+        Parameters
+        ----------
+        mount : MountConfig
+            The mount configuration.
+        codec : Optional[str]
+            Passthrough media type of the input, or None to transcode with the mount's profile.
+        cache_dir : str
+            Directory of the cached streams.
+
+        Returns
+        -------
+        Optional[LoopCache]
+            The cache, or None if the input is not a local file.
+
+        Raises
+        ------
+        RuntimeError
+            If encoding the input fails.
+        """
+        key = cls.key(mount, codec)
+        if key is None:
+            return None
+        data_path = os.path.join(cache_dir, f"{key}.es")
+        index_path = os.path.join(cache_dir, f"{key}.json")
+        if os.path.exists(index_path) and os.path.exists(data_path):
+            logging.info(f"{mount.uri}: using cached stream {data_path}")
+            return cls(data_path, index_path)
+
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{data_path}.{os.getpid()}.tmp"
+        if codec is not None:
+            parser = PASSTHROUGH_CODECS[codec][0]
+            media_type = codec
+            encode = f"parsebin ! {parser} config-interval=-1"
+        else:
+            media_type = "video/x-h264"
+            encode = (
+                f"decodebin ! queue ! {mount.profile.encoder_launch()} ! "
+                "h264parse config-interval=-1"
+            )
+        launch = (
+            f'urisourcebin uri="{mount.uri}" ! queue ! {encode} ! '
+            f"{media_type},stream-format=byte-stream,alignment=au ! "
+            f'filesink name=sink location="{tmp_path}"'
+        )
+
+        logging.info(f"{mount.uri}: encoding to cache {data_path}")
+        units: List[List[int]] = []
+        caps: List[str] = []
+
+        def on_buffer(pad: Gst.Pad, info: Gst.PadProbeInfo) -> Gst.PadProbeReturn:
+            buffer = info.get_buffer()
+            if not caps:
+                caps.append(pad.get_current_caps().to_string())
+            offset = units[-1][0] + units[-1][1] if units else 0
+            units.append(
+                [
+                    offset,
+                    buffer.get_size(),
+                    buffer.pts,
+                    buffer.dts,
+                    buffer.duration,
+                    int(not buffer.has_flags(Gst.BufferFlags.DELTA_UNIT)),
+                ]
+            )
+            return Gst.PadProbeReturn.OK
+
+        pipeline = Gst.parse_launch(launch)
+        pipeline.get_by_name("sink").get_static_pad("sink").add_probe(
+            Gst.PadProbeType.BUFFER, on_buffer
+        )
+        pipeline.set_state(Gst.State.PLAYING)
+        message = pipeline.get_bus().timed_pop_filtered(
+            Gst.CLOCK_TIME_NONE, Gst.MessageType.EOS | Gst.MessageType.ERROR
+        )
+        pipeline.set_state(Gst.State.NULL)
+        if message.type == Gst.MessageType.ERROR or not units:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            error = (
+                message.parse_error()[0].message
+                if message.type == Gst.MessageType.ERROR
+                else "no video"
+            )
+            raise RuntimeError(f"Could not encode '{mount.uri}' to cache: {error}")
+
+        # Loop from the first keyframe, so that every loop starts decodable
+        first_key = next((i for i, u in enumerate(units) if u[5]), 0)
+        units = units[first_key:]
+
+        # Rebase timestamps to zero and fill in missing ones from the frame duration
+        durations = sorted(u[4] for u in units if u[4] != Gst.CLOCK_TIME_NONE)
+        frame_duration = (
+            durations[len(durations) // 2] if durations else Gst.SECOND // 30
+        )
+        first_dts = units[0][3] if units[0][3] != Gst.CLOCK_TIME_NONE else units[0][2]
+        if first_dts == Gst.CLOCK_TIME_NONE:
+            first_dts = 0
+        for idx, unit in enumerate(units):
+            if unit[2] == Gst.CLOCK_TIME_NONE:
+                unit[2] = first_dts + idx * frame_duration
+            if unit[3] == Gst.CLOCK_TIME_NONE:
+                unit[3] = unit[2]
+            if unit[4] == Gst.CLOCK_TIME_NONE:
+                unit[4] = frame_duration
+            unit[2] -= first_dts
+            unit[3] -= first_dts
+        loop_duration = max(u[2] + u[4] for u in units)
+
+        os.replace(tmp_path, data_path)
+        index = {
+            "uri": mount.uri,
+            "codec": media_type,
+            "caps": caps[0],
+            "loop_duration": loop_duration,
+            "units": units,
+        }
+        with open(f"{index_path}.tmp", "w") as f:
+            json.dump(index, f)
+        os.replace(f"{index_path}.tmp", index_path)
+        logging.info(
+            f"{mount.uri}: cached {len(units)} access units, "
+            f"{os.path.getsize(data_path) / 1e6:.1f} MB"
+        )
+        return cls(data_path, index_path)
+
+    def launch(self) -> str:
+        """Launch string serving the cached stream from an appsrc named 'loopsrc'."""
+        payloader = PASSTHROUGH_CODECS[self.codec][1]
+        return f"""
+            appsrc name=loopsrc format=time max-bytes=1000000 caps="{self.caps}" !
+            {payloader} name=pay0 pt=96 config-interval=1
+        """
+
+    def attach(self, appsrc: Gst.Element) -> None:
+        """Feed the cached access units to an appsrc, looping forever."""
+        state = {"idx": 0, "base": 0}
+
+        def on_need_data(src: Gst.Element, length: int) -> None:
+            if self._mm.closed:
+                src.emit("end-of-stream")
+                return
+            unit = self.units[state["idx"]]
+            offset, size, pts, dts, duration, keyframe = unit
+            buffer = Gst.Buffer.new_wrapped(self._mm[offset : offset + size])
+            buffer.pts = state["base"] + pts
+            buffer.dts = state["base"] + dts
+            buffer.duration = duration
+            if not keyframe:
+                buffer.set_flags(Gst.BufferFlags.DELTA_UNIT)
+
+            # Timestamps keep increasing over loops, so the stream never sees an EOS or a seek
+            state["idx"] += 1
+            if state["idx"] == len(self.units):
+                state["idx"] = 0
+                state["base"] += self.loop_duration
+            src.emit("push-buffer", buffer)
+
+        appsrc.connect("need-data", on_need_data)
+
+
+class MountFactory(GstRtspServer.RTSPMediaFactory):
+    """
+    Shared media factory of a mount that creates its pipeline description on the first client.
+
+    Until a client connects the factory only holds the mount configuration. The launch string is
+    built, and a cached stream mapped, when the first media is created, and both are released
+    again by release() when the mount has been idle. The media that have been configured and not
+    yet unprepared are kept in live_media, the mount is only idle when there are none, so that a
+    media prepared by DESCRIBE or SETUP, or still streaming, keeps its cached stream.
+
+    Parameters
+    ----------
+    mount : MountConfig
+        The mount configuration.
+    codec : Optional[str]
+        Passthrough media type of the input, None to transcode.
+    build_launch : Callable[[MountConfig, Optional[str]], str]
+        Builds the launch string of a mount that is not served from the cache.
+    cache_dir : Optional[str]
+        Directory of the loop cache, None to not use the cache.
+    """
+
+    def __init__(
+        self,
+        mount: MountConfig,
+        codec: Optional[str],
+        build_launch: Callable[[MountConfig, Optional[str]], str],
+        cache_dir: Optional[str] = None,
+    ) -> None:
+        super().__init__()
+        self.mount = mount
+        self.codec = codec
+        self.stats = MountStats()
+        self.cache: Optional[LoopCache] = None
+        self.active = False
+        self.removed = False
+        self.live_media: Set[GstRtspServer.RTSPMedia] = set()
+        self.idle_since: Optional[float] = None
+        self._build_launch = build_launch
+        self._cache_dir = cache_dir
+        self.set_shared(True)
+        self.set_eos_shutdown(False)
+        self.set_media_gtype(LoopingMedia.__gtype__)
+
+    def do_create_element(self, url: Any) -> Gst.Element:
+        if not self.active:
+            if self._cache_dir is not None:
+                self.cache = LoopCache.build(self.mount, self.codec, self._cache_dir)
+            if self.cache is not None:
+                self.set_launch(self.cache.launch())
+            else:
+                self.set_launch(self._build_launch(self.mount, self.codec))
+            self.active = True
+            logging.info(f"{self.mount.path}: created media pipeline")
+        self.idle_since = None
+        return GstRtspServer.RTSPMediaFactory.do_create_element(self, url)
+
+    def release(self) -> None:
+        """Release the launch string and unmap the cached stream, once live_media is empty."""
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+        self.active = False
+        self.idle_since = None
+        logging.info(f"{self.mount.path}: released media resources")
+
+
+class ControlHandler(BaseHTTPRequestHandler):
+    """
+    Local HTTP API of the RTSP server.
+
+    GET /metrics returns the health metrics. GET /mounts lists the mounts, POST /mounts adds a
+    mount, PUT /mounts/<path> reconfigures and DELETE /mounts/<path> removes one. POST and PUT
+    take a mount entry as in the config file, e.g. {"uri": "file:///Videos/video1.mp4",
+    "path": "/camera3", "profile": "balanced", "bitrate_kbps": 1000}.
+    """
+
+    server_ref: "RTSPServer"
+
+    def _send_json(self, status: int, data: Any) -> None:
+        body = json.dumps(data, indent=2).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length", 0))
+        entry = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(entry, dict):
+            raise ValueError("Request body must be a JSON object")
+        return entry
+
+    def _mount_path(self) -> Optional[str]:
+        """Mount path of a /mounts/<path> request, None for /mounts."""
+        path = urlparse(self.path).path.rstrip("/")
+        if path == "/mounts":
+            return None
+        return path[len("/mounts") :]
+
+    def _handle(self, method: str) -> None:
+        path = urlparse(self.path).path.rstrip("/")
+        if not (path == "/metrics" or path == "/mounts" or path.startswith("/mounts/")):
+            self._send_json(404, {"error": f"Unknown endpoint {path}"})
+            return
+        server = self.server_ref
+        try:
+            if method == "GET" and path == "/metrics":
+                self._send_json(200, server.metrics())
+            elif method == "GET" and path == "/mounts":
+                self._send_json(200, server.list_mounts())
+            elif method == "POST" and path == "/mounts":
+                mount = server.add_mount(self._read_json())
+                self._send_json(201, {"path": mount.path})
+            elif method == "PUT" and self._mount_path():
+                mount = server.reconfigure_mount(self._mount_path(), self._read_json())
+                self._send_json(200, {"path": mount.path})
+            elif method == "DELETE" and self._mount_path():
+                server.remove_mount(self._mount_path())
+                self._send_json(200, {"path": self._mount_path()})
+            else:
+                self._send_json(405, {"error": f"{method} not supported on {path}"})
+        except KeyError as e:
+            self._send_json(404, {"error": f"Unknown mount {e}"})
+        except FileExistsError as e:
+            self._send_json(409, {"error": str(e)})
+        except (FileNotFoundError, RuntimeError, ValueError) as e:
+            self._send_json(400, {"error": str(e)})
+
+    def do_GET(self) -> None:
+        self._handle("GET")
+
+    def do_POST(self) -> None:
+        self._handle("POST")
+
+    def do_PUT(self) -> None:
+        self._handle("PUT")
+
+    def do_DELETE(self) -> None:
+        self._handle("DELETE")
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(format % args)
+
 
 class RTSPServer:
     """RTSP Server to stream media files over RTSP protocol using urisrcbin."""
 
-    def __init__(self, uri_list: List[str]) -> None:
-        if not uri_list:
+    def __init__(
+        self,
+        mounts: List[MountConfig],
+        mode: str = "auto",
+        stats_interval: int = 10,
+        cache_dir: Optional[str] = None,
+        api_port: int = 8555,
+        profiles: Optional[Dict[str, EncodingProfile]] = None,
+        default_profile: Optional[EncodingProfile] = None,
+        idle_timeout: int = 60,
+        latency_marker: bool = False,
+    ) -> None:
+        if not mounts and api_port <= 0:
             raise ValueError("No input files provided.")
 
-        # If the uri_list contains files, check that these exist
-        for uri in uri_list:
-            uri_parsed = urlparse(uri)
-            if uri_parsed.scheme == "file":
-                if not os.path.exists(uri_parsed.path):
-                    raise RuntimeError(f"File '{uri_parsed.path}' does not exist")
+        if mode not in STREAM_MODES:
+            raise ValueError(f"Unknown mode '{mode}', expected one of {STREAM_MODES}")
+        self.mode = mode
+        self.latency_marker = latency_marker
+        self.cache_dir = cache_dir
+        self.profiles = profiles if profiles is not None else dict(ENCODING_PROFILES)
+        self.default_profile = (
+            default_profile if default_profile is not None else EncodingProfile()
+        )
+        self.factories: Dict[str, MountFactory] = {}
+        # Keyed by the client object: the strong reference keeps its wrapper, and so its
+        # identity, the same in every signal emission until the client closes
+        self._client_stats: Dict[GstRtspServer.RTSPClient, List[MountStats]] = {}
 
         Gst.init(None)
 
@@ -51,82 +994,468 @@ class RTSPServer:
         self.server.set_address("0.0.0.0")
         self.server.props.service = "8554"
 
-        self._setup_streams(uri_list)
+        for mount in mounts:
+            self.add_mount(mount)
+        self.server.connect("client-connected", self._on_client_connected)
         self.server.attach(None)
         logging.info("RTSP server is running. Streams available at:")
-        for idx, file_path in enumerate(uri_list, 1):
-            logging.info(f"{file_path} -> rtsp://0.0.0.0:8554/camera{idx}")
+        for mount in mounts:
+            logging.info(f"{mount.uri} -> rtsp://0.0.0.0:8554{mount.path}")
 
-    def _setup_streams(self, file_paths: List[str]) -> None:
-        """Set up RTSP streams for each file."""
-        mount_points = self.server.get_mount_points()
+        self._cpu_start = time.process_time()
+        self._wall_start = time.monotonic()
+        if stats_interval > 0:
+            GLib.timeout_add_seconds(stats_interval, self._log_stats)
+        GLib.timeout_add_seconds(1, self._sample_stats)
+        if idle_timeout > 0:
+            self.idle_timeout = idle_timeout
+            GLib.timeout_add_seconds(max(1, idle_timeout // 4), self._release_idle)
 
-        for idx, file_path in enumerate(file_paths, 1):
-            if not os.path.exists(file_path) and not file_path.startswith("file://"):
-                raise FileNotFoundError(f"File or URI not found: {file_path}")
+        if api_port > 0:
+            handler = type("Handler", (ControlHandler,), {"server_ref": self})
+            self.api_server = ThreadingHTTPServer(("127.0.0.1", api_port), handler)
+            threading.Thread(target=self.api_server.serve_forever, daemon=True).start()
+            logging.info(f"Metrics and control API at http://127.0.0.1:{api_port}")
 
-            factory = GstRtspServer.RTSPMediaFactory()
-            factory.set_shared(True)
-            factory.set_eos_shutdown(False)
+    @staticmethod
+    def _call_in_main_loop(func: Callable[[], Any]) -> Any:
+        """
+        Run a function in the GLib main loop and wait for its result.
 
-            # Use urisrcbin to handle URI inputs
-            launch_str = f"""
-                urisourcebin uri="{file_path}" !
-                queue !
-                decodebin name=decodebin !
-                queue !
-                videoconvert !
-                x264enc !
-                h264parse !
-                rtph264pay name=pay0 pt=96 config-interval=1
-            """
-            factory.set_launch(launch_str)
+        Mount points and the per-mount state are only changed from the main loop, which runs
+        in the main thread. Called from the main thread the function runs directly.
+        """
+        if threading.current_thread() is threading.main_thread():
+            return func()
 
-            # Add factory to the RTSP server mount point
-            mount_points.add_factory(f"/camera{idx}", factory)
+        done = threading.Event()
+        outcome: Dict[str, Any] = {}
 
-    def handle_message_callback(self, message, *user_data):
-        logger.info("Message")
+        def run() -> bool:
+            try:
+                outcome["result"] = func()
+            except Exception as e:
+                outcome["error"] = e
+            done.set()
+            return GLib.SOURCE_REMOVE
 
-    def on_message(bus: Gst.Bus, message: Gst.Message, pipeline: Gst.Pipeline) -> None:
+        GLib.idle_add(run)
+        done.wait()
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["result"]
+
+    def _parse_mount(self, mount: Any) -> MountConfig:
+        """Mount configuration from a MountConfig or an API mount entry."""
+        if isinstance(mount, MountConfig):
+            return mount
+        idx = len(self.factories) + 1
+        while f"/camera{idx}" in self.factories:
+            idx += 1
+        return parse_mount(mount, self.profiles, self.default_profile, f"/camera{idx}")
+
+    def add_mount(self, mount: Any) -> MountConfig:
         """
-        Handles GStreamer bus messages.
+        Add a mount. Safe to call from any thread.
 
-        This inner function listens for End of Stream (EOS) messages and restarts the pipeline
-        when EOS is reached.
+        The input is probed, and encoded to the loop cache when enabled, in the calling thread.
+        The media pipeline is only created when the first client connects.
 
         Parameters
         ----------
-        bus : Gst.Bus
-            The GStreamer bus to listen for messages on.
-        message : Gst.Message
-            The GStreamer message received on the bus.
-        pipeline : Gst.Pipeline
-            The pipeline to restart if an EOS message is received.
+        mount : Any
+            MountConfig, or a mount entry as in the config file.
 
         Returns
         -------
-        None
+        MountConfig
+            The configuration of the added mount.
+
+        Raises
+        ------
+        FileExistsError
+            If the mount path is already in use.
+        FileNotFoundError
+            If the input file does not exist.
+        ValueError
+            If the mount entry is invalid or the input cannot be served in the current mode.
         """
-        if message.type == Gst.MessageType.EOS:
-            logging.info(
-                f"EOS received for pipeline: {pipeline.get_name()}. Restarting pipeline..."
+        mount = self._parse_mount(mount)
+        if mount.path in self.factories:
+            raise FileExistsError(f"Mount {mount.path} already exists")
+        factory = self._create_factory(mount)
+
+        def register() -> None:
+            if mount.path in self.factories:
+                raise FileExistsError(f"Mount {mount.path} already exists")
+            self.factories[mount.path] = factory
+            self.server.get_mount_points().add_factory(mount.path, factory)
+
+        self._call_in_main_loop(register)
+        logging.info(f"Added mount {mount.path} for {mount.uri}")
+        return mount
+
+    def _create_factory(self, mount: MountConfig) -> MountFactory:
+        """
+        Probe the input of a mount, encode it to the loop cache when enabled, and create the
+        factory of the mount, without registering it.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the input file does not exist.
+        ValueError
+            If the input cannot be served in the current mode.
+        """
+        uri_parsed = urlparse(mount.uri)
+        if uri_parsed.scheme == "file" and not os.path.exists(uri_parsed.path):
+            raise FileNotFoundError(f"File '{uri_parsed.path}' does not exist")
+        if not uri_parsed.scheme and not os.path.exists(mount.uri):
+            raise FileNotFoundError(f"File or URI not found: {mount.uri}")
+
+        codec = self._select_codec(mount)
+        if self.cache_dir is not None:
+            # Encode now rather than on the first client; the stream is mapped on first use
+            cache = LoopCache.build(mount, codec, self.cache_dir)
+            if cache is not None:
+                cache.close()
+        factory = MountFactory(mount, codec, self._build_launch, self.cache_dir)
+        factory.connect("media-configure", self._on_media_configure)
+        return factory
+
+    def remove_mount(self, path: str) -> None:
+        """
+        Remove a mount and disconnect its clients. Safe to call from any thread.
+
+        Parameters
+        ----------
+        path : str
+            The mount path, e.g. /camera1.
+
+        Raises
+        ------
+        KeyError
+            If there is no such mount.
+        """
+        self._call_in_main_loop(lambda: self._unregister(path))
+        logging.info(f"Removed mount {path}")
+
+    def _unregister(self, path: str) -> None:
+        """
+        Remove the factory of a mount and disconnect its clients, in the main loop. The cached
+        stream is released once the media of the mount have been unprepared.
+        """
+        factory = self.factories.pop(path)
+        self.server.get_mount_points().remove_factory(path)
+        stats = factory.stats
+
+        def disconnect(
+            server: GstRtspServer.RTSPServer, client: GstRtspServer.RTSPClient
+        ) -> GstRtspServer.RTSPFilterResult:
+            if stats in self._client_stats.get(client, []):
+                return GstRtspServer.RTSPFilterResult.REMOVE
+            return GstRtspServer.RTSPFilterResult.KEEP
+
+        self.server.client_filter(disconnect)
+        factory.removed = True
+        if not factory.live_media:
+            factory.release()
+
+    def reconfigure_mount(self, path: str, entry: Dict[str, Any]) -> MountConfig:
+        """
+        Replace the configuration of a mount. Safe to call from any thread.
+
+        Clients of the mount are disconnected and get the new configuration on reconnect;
+        other mounts are not affected. The new factory is created, and its loop cache encoded,
+        before the old one is replaced, so a failure leaves the mount as it was.
+
+        Parameters
+        ----------
+        path : str
+            The mount path, e.g. /camera1.
+        entry : Dict[str, Any]
+            The new mount entry. Without 'uri' the current input is kept.
+
+        Returns
+        -------
+        MountConfig
+            The new configuration of the mount.
+        """
+        current = self.factories[path].mount
+        mount = parse_mount(
+            {"uri": current.uri, **entry, "path": path},
+            self.profiles,
+            self.default_profile,
+            path,
+        )
+        factory = self._create_factory(mount)
+
+        def swap() -> None:
+            self._unregister(path)
+            self.factories[path] = factory
+            self.server.get_mount_points().add_factory(path, factory)
+
+        self._call_in_main_loop(swap)
+        logging.info(f"Reconfigured mount {path} for {mount.uri}")
+        return mount
+
+    def list_mounts(self) -> Dict[str, Any]:
+        """
+        Configuration and state of every mount.
+
+        Returns
+        -------
+        Dict[str, Any]
+            URI, encoding profile, passthrough codec, whether the media pipeline is created and
+            the client count of every mount, keyed by mount path.
+        """
+        return {
+            path: {
+                "uri": factory.mount.uri,
+                "profile": asdict(factory.mount.profile),
+                "passthrough_codec": factory.codec,
+                "active": factory.active,
+                "clients": factory.stats.clients,
+            }
+            for path, factory in list(self.factories.items())
+        }
+
+    def _release_idle(self) -> bool:
+        """Release the resources of mounts that have had no clients for idle_timeout seconds."""
+        now = time.monotonic()
+        for factory in self.factories.values():
+            if not factory.active or factory.stats.clients > 0 or factory.live_media:
+                factory.idle_since = None
+            elif factory.idle_since is None:
+                factory.idle_since = now
+            elif now - factory.idle_since >= self.idle_timeout:
+                factory.release()
+        return GLib.SOURCE_CONTINUE
+
+    def _on_media_configure(
+        self, factory: MountFactory, media: GstRtspServer.RTSPMedia
+    ) -> None:
+        """Attach the cache feeder and the metrics probes to a newly created media."""
+        stats = factory.stats
+        media.stats = stats
+        media.connect("prepared", media.on_prepared)
+        factory.live_media.add(media)
+        media.connect("unprepared", self._on_media_unprepared, factory)
+        pipeline = media.get_element()
+
+        loopsrc = pipeline.get_by_name("loopsrc")
+        if loopsrc is not None:
+            factory.cache.attach(loopsrc)
+        encoder = pipeline.get_by_name("encoder")
+        if encoder is not None:
+            encoder.get_static_pad("sink").add_probe(
+                Gst.PadProbeType.BUFFER, stats.on_encoder_buffer
             )
-            pipeline.set_state(Gst.State.NULL)  # Stop the pipeline
-            pipeline.set_state(Gst.State.PLAYING)  # Restart the pipeline
-        elif message.type == Gst.MessageType.ERROR:
-            error, debug = message.parse_error()
-            logging.error(
-                f"Error received from {message.src.get_name()}: {error.message}"
+            encoder.get_static_pad("src").add_probe(
+                Gst.PadProbeType.BUFFER, stats.on_encoded_buffer
             )
-            logging.error(f"Debug info: {debug}")
-            pipeline.set_state(Gst.State.NULL)  # Stop on error
-        elif message.type == Gst.MessageType.STATE_CHANGED:
-            old, new, pending = message.parse_state_changed()
-            if message.src == pipeline:
-                logging.info(
-                    f"Pipeline state changed from {old.value_name} to {new.value_name}."
+        marker = pipeline.get_by_name("marker")
+        if marker is not None:
+            marker.get_static_pad("sink").add_probe(
+                Gst.PadProbeType.BUFFER, self._on_marker_buffer, marker
+            )
+        payloader = pipeline.get_by_name("pay0")
+        if payloader is not None:
+            payloader.get_static_pad("src").add_probe(
+                Gst.PadProbeType.BUFFER, stats.on_payloaded_buffer
+            )
+
+    def _on_media_unprepared(
+        self, media: GstRtspServer.RTSPMedia, factory: MountFactory
+    ) -> None:
+        """Forget a media that has stopped, releasing a removed mount after its last media."""
+
+        # Media can be unprepared from their own thread, the factory state is changed in the
+        # main loop
+        def forget() -> bool:
+            factory.live_media.discard(media)
+            if factory.removed and not factory.live_media:
+                factory.release()
+            return GLib.SOURCE_REMOVE
+
+        GLib.idle_add(forget)
+
+    @staticmethod
+    def _on_marker_buffer(
+        pad: Gst.Pad, info: Gst.PadProbeInfo, marker: Gst.Element
+    ) -> Gst.PadProbeReturn:
+        """Set the latency marker of the next frame to the current wall-clock time."""
+        now_ms = int(time.time() * 1000) % (1 << MARKER_BITS)
+        marker.set_property("pattern-data", now_ms)
+        return Gst.PadProbeReturn.OK
+
+    def _on_client_connected(
+        self, server: GstRtspServer.RTSPServer, client: GstRtspServer.RTSPClient
+    ) -> None:
+        """Track the mounts each client plays, for the per-mount client counts."""
+        self._client_stats[client] = []
+        client.connect("play-request", self._on_play_request)
+        client.connect("teardown-request", self._on_teardown_request)
+        client.connect("closed", self._on_client_closed)
+
+    def _on_play_request(
+        self, client: GstRtspServer.RTSPClient, ctx: GstRtspServer.RTSPContext
+    ) -> None:
+        factory = self._context_factory(ctx)
+        played = self._client_stats.setdefault(client, [])
+        if factory is not None and factory.stats not in played:
+            played.append(factory.stats)
+            factory.stats.clients += 1
+
+    def _on_teardown_request(
+        self, client: GstRtspServer.RTSPClient, ctx: GstRtspServer.RTSPContext
+    ) -> None:
+        factory = self._context_factory(ctx)
+        played = self._client_stats.get(client, [])
+        if factory is not None and factory.stats in played:
+            played.remove(factory.stats)
+            factory.stats.clients -= 1
+
+    def _on_client_closed(self, client: GstRtspServer.RTSPClient) -> None:
+        for stats in self._client_stats.pop(client, []):
+            stats.clients -= 1
+
+    def _context_factory(
+        self, ctx: GstRtspServer.RTSPContext
+    ) -> Optional[MountFactory]:
+        """Mount of a request; aggregate control URLs such as /camera1/stream=0 included."""
+        abspath = ctx.uri.abspath.rstrip("/")
+        for path, factory in self.factories.items():
+            if abspath == path or abspath.startswith(path + "/"):
+                return factory
+        return None
+
+    def _sample_stats(self) -> bool:
+        """Update the per-mount bitrates once per second."""
+        for factory in self.factories.values():
+            factory.stats.sample()
+        return GLib.SOURCE_CONTINUE
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Current health metrics of the server.
+
+        Returns
+        -------
+        Dict[str, Any]
+            Process uptime and CPU usage, and the metrics of every mount keyed by mount path.
+        """
+        elapsed = time.monotonic() - self._wall_start
+        process_cpu = time.process_time() - self._cpu_start
+        return {
+            "uptime_seconds": round(elapsed, 1),
+            "process_cpu_percent": round(100.0 * process_cpu / max(elapsed, 1e-9), 1),
+            "mounts": {
+                path: factory.stats.as_dict()
+                for path, factory in list(self.factories.items())
+            },
+        }
+
+    def _log_stats(self) -> bool:
+        """Periodically log the encoder CPU time of each mount."""
+        elapsed = time.monotonic() - self._wall_start
+        process_cpu = time.process_time() - self._cpu_start
+        logging.info(
+            f"Process CPU {process_cpu:.1f} s in {elapsed:.0f} s "
+            f"({100.0 * process_cpu / elapsed:.0f}% of one core)"
+        )
+        for path, factory in self.factories.items():
+            stats = factory.stats
+            if stats.frames == 0:
+                continue
+            cpu = stats.encode_cpu_seconds()
+            logging.info(
+                f"{path}: {stats.frames} frames encoded, encode CPU {cpu:.1f} s "
+                f"({1000.0 * cpu / stats.frames:.2f} ms/frame, {100.0 * cpu / elapsed:.0f}% of one core)"
+            )
+        return GLib.SOURCE_CONTINUE
+
+    def _select_codec(self, mount: MountConfig) -> Optional[str]:
+        """
+        Select the passthrough codec of a mount.
+
+        Parameters
+        ----------
+        mount : MountConfig
+            The mount configuration.
+
+        Returns
+        -------
+        Optional[str]
+            Media type of the input video if it can be passed through, None if the input is
+            transcoded.
+
+        Raises
+        ------
+        ValueError
+            If the mode is 'passthrough' and the input cannot be passed through.
+        """
+        uri = mount.uri
+        # A latency marker can only be drawn into frames that are encoded while streaming
+        transcode = mount.profile.requires_transcode() or self.latency_marker
+        if self.mode != "transcode" and not transcode:
+            codec = probe_video_codec(uri)
+            if codec in PASSTHROUGH_CODECS:
+                return codec
+            if self.mode == "passthrough":
+                raise ValueError(
+                    f"Cannot pass '{uri}' through, its video codec is {codec}. "
+                    f"Supported: {list(PASSTHROUGH_CODECS)}"
                 )
+        elif self.mode == "passthrough":
+            raise ValueError(
+                f"Cannot pass '{uri}' through, its profile changes resolution or framerate "
+                "or the latency marker is enabled"
+            )
+        return None
+
+    def _build_launch(self, mount: MountConfig, codec: Optional[str]) -> str:
+        """
+        Build the launch string of a mount.
+
+        Inputs that already contain H.264/H.265 video are only parsed and re-payloaded. Other
+        inputs are decoded and encoded to H.264 with the mount's profile.
+
+        Parameters
+        ----------
+        mount : MountConfig
+            The mount configuration.
+        codec : Optional[str]
+            Passthrough media type from _select_codec, None to transcode.
+
+        Returns
+        -------
+        str
+            Launch string for GstRtspServer.RTSPMediaFactory.
+        """
+        uri = mount.uri
+        if codec is not None:
+            parser, payloader = PASSTHROUGH_CODECS[codec]
+            logging.info(f"{uri}: {codec}, passing through without transcoding")
+            return f"""
+                urisourcebin uri="{uri}" !
+                queue !
+                parsebin !
+                {parser} !
+                {payloader} name=pay0 pt=96 config-interval=1
+            """
+
+        logging.info(f"{uri}: transcoding to H.264 with {mount.profile}")
+        # Use urisrcbin to handle URI inputs
+        return f"""
+            urisourcebin uri="{uri}" !
+            queue !
+            decodebin name=decodebin !
+            queue !
+            {mount.profile.encoder_launch(self.latency_marker)} !
+            h264parse !
+            rtph264pay name=pay0 pt=96 config-interval=1
+        """
 
     def run(self):
         """Start the GLib main loop."""
@@ -142,21 +1471,126 @@ def main():
     parser = argparse.ArgumentParser(
         description="RTSP Server to stream multiple media files over RTSP protocol."
     )
-    parser.add_argument(
+    # Without inputs the server starts empty, and mounts are added through the API
+    inputs = parser.add_mutually_exclusive_group()
+    inputs.add_argument(
         "--files",
         type=str,
         nargs="+",
-        required=True,
         help="Paths or URIs of the media files to be streamed.",
     )
+    inputs.add_argument(
+        "--config",
+        type=str,
+        help="JSON file listing the mounts and their encoding profiles.",
+    )
+    parser.add_argument(
+        "--mode",
+        type=str,
+        default="auto",
+        choices=STREAM_MODES,
+        help="'passthrough' re-payloads H.264/H.265 inputs without transcoding, 'transcode' always "
+        "decodes and encodes to H.264, 'auto' passes through when possible (default: auto).",
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        default="low-latency",
+        choices=list(ENCODING_PROFILES),
+        help="Default encoding profile of transcoded mounts (default: low-latency).",
+    )
+    parser.add_argument(
+        "--bitrate", type=int, default=None, help="Encoder bitrate in kbit/s."
+    )
+    parser.add_argument(
+        "--keyframe-interval",
+        type=int,
+        default=None,
+        help="Maximum keyframe interval in frames.",
+    )
+    parser.add_argument(
+        "--threads", type=int, default=None, help="x264 threads, 0 for automatic."
+    )
+    parser.add_argument("--width", type=int, default=None, help="Output width.")
+    parser.add_argument("--height", type=int, default=None, help="Output height.")
+    parser.add_argument(
+        "--framerate", type=int, default=None, help="Output framerate in fps."
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=None,
+        help="Encode each file input once into this directory and serve the mounts from the "
+        "cache, looping seamlessly.",
+    )
+    parser.add_argument(
+        "--api-port",
+        "--metrics-port",
+        type=int,
+        default=8555,
+        help="Port of the local HTTP metrics and mount control API, 0 to disable "
+        "(default: 8555).",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=int,
+        default=60,
+        help="Seconds without clients after which a mount's media resources are released, "
+        "0 to keep them (default: 60).",
+    )
+    parser.add_argument(
+        "--latency-marker",
+        action="store_true",
+        help="Transcode every mount and embed the frame wall-clock time for latency "
+        "measurements with rtsp-load-generator.py.",
+    )
+    parser.add_argument(
+        "--stats-interval",
+        type=int,
+        default=10,
+        help="Seconds between encoder CPU reports, 0 to disable (default: 10).",
+    )
     args = parser.parse_args()
+    if args.latency_marker and args.cache_dir:
+        parser.error("--latency-marker cannot be used with --cache-dir")
+
+    overrides = {
+        "bitrate_kbps": args.bitrate,
+        "key_int_max": args.keyframe_interval,
+        "threads": args.threads,
+        "width": args.width,
+        "height": args.height,
+        "framerate": args.framerate,
+    }
+    default_profile = replace(
+        ENCODING_PROFILES[args.profile],
+        **{k: v for k, v in overrides.items() if v is not None},
+    )
 
-    file_paths: List[str] = args.files
     try:
         logging.basicConfig(level=logging.INFO)
-        server = RTSPServer(file_paths)
+        profiles = dict(ENCODING_PROFILES)
+        if args.config:
+            profiles, mounts = load_mount_config(args.config, default_profile)
+        else:
+            file_paths: List[str] = args.files or []
+            mounts = [
+                MountConfig(uri=uri, path=f"/camera{idx}", profile=default_profile)
+                for idx, uri in enumerate(file_paths, 1)
+            ]
+        server = RTSPServer(
+            mounts,
+            args.mode,
+            args.stats_interval,
+            args.cache_dir,
+            args.api_port,
+            profiles,
+            default_profile,
+            args.idle_timeout,
+            args.latency_marker,
+        )
         server.run()
-    except (FileNotFoundError, ValueError) as e:
+    except (FileNotFoundError, RuntimeError, ValueError) as e:
         logging.error(f"ERROR: {e}")
 
 
@@ -0,0 +1,242 @@
+"""
+OSD Metadata Benchmark
+
+Measures the time it takes to add display metadata to DeepStream frames with
+helpers.osdmeta.OSDObjectDrawer, and with the per-object implementation it replaces, at 50, 200 and
+500 objects per frame. Runs against the pure-Python pyds stand-in, so it needs neither DeepStream
+nor a GPU. Both implementations are also checked to draw the same boxes and labels.
+
+Usage:
+    python benchmark_osd_meta.py --objects 50 200 500 --frames 200
+"""
+
+import argparse
+import time
+from collections import namedtuple
+from operator import attrgetter
+
+from helpers import osdmeta, pydsstandin
+
+pyds = pydsstandin
+
+CLASS_COLORS = {
+    0: (1.0, 0.0, 0.0, 1.0),
+    1: (0.0, 1.0, 0.0, 1.0),
+    2: (0.0, 0.0, 1.0, 1.0),
+    3: (1.0, 0.0, 1.0, 1.0),
+}
+CLASS_NAMES = {0: "Vehicles", 2: "Persons", 1: "Bicycles", 3: "Road Signs"}
+
+MetaObject = namedtuple(
+    "MetaObject",
+    ["left", "top", "height", "width", "area", "bottom", "id", "text", "class_id"],
+)
+
+
+def legacy_process_batch(batch_meta) -> None:
+    """
+    The per-object frame loop of osd_sink_pad_buffer_probe before OSDObjectDrawer.
+
+    Parameters
+    ----------
+    batch_meta : pydsstandin.NvDsBatchMeta
+        Batch metadata to add display metadata to.
+    """
+    l_frame = batch_meta.frame_meta_list
+    while l_frame is not None:
+        frame_meta = pyds.NvDsFrameMeta.cast(l_frame.data)
+        obj_counter = {0: 0, 1: 0, 2: 0, 3: 0}
+        meta_list = []
+        frame_number = frame_meta.frame_num
+        num_rects = frame_meta.num_obj_meta
+        l_obj = frame_meta.obj_meta_list
+        while l_obj is not None:
+            obj_meta = pyds.NvDsObjectMeta.cast(l_obj.data)
+            obj_counter[obj_meta.class_id] += 1
+            obj = MetaObject(
+                left=obj_meta.tracker_bbox_info.org_bbox_coords.left,
+                top=obj_meta.tracker_bbox_info.org_bbox_coords.top,
+                height=obj_meta.tracker_bbox_info.org_bbox_coords.height,
+                width=obj_meta.tracker_bbox_info.org_bbox_coords.width,
+                area=obj_meta.tracker_bbox_info.org_bbox_coords.height
+                * obj_meta.tracker_bbox_info.org_bbox_coords.width,
+                bottom=obj_meta.tracker_bbox_info.org_bbox_coords.top
+                + obj_meta.tracker_bbox_info.org_bbox_coords.height,
+                id=obj_meta.object_id,
+                text=f"ID: {obj_meta.object_id:04d}, Class: {pyds.get_string(obj_meta.text_params.display_text)}",
+                class_id=obj_meta.class_id,
+            )
+            meta_list.append(obj)
+            obj_meta.text_params.display_text = ""
+            obj_meta.text_params.set_bg_clr = 0
+            obj_meta.rect_params.border_width = 0
+            l_obj = l_obj.next
+
+        meta_list_sorted = sorted(meta_list, key=attrgetter("bottom"))
+        max_labels = 10
+        num_objects = len(meta_list_sorted)
+        num_meta_objects = (num_objects + max_labels - 1) // max_labels
+
+        display_meta_main = pyds.nvds_acquire_display_meta_from_pool(batch_meta)
+        display_meta_main.num_labels = 1
+        params = display_meta_main.text_params[0]
+        params.display_text = (
+            f"Frame Number={frame_number:05d}, Number of Objects={num_rects:04d}, "
+            f"Vehicles={obj_counter[0]:04d}, Persons={obj_counter[2]:04d}, "
+            f"Bicycles={obj_counter[1]:04d}, Road Signs={obj_counter[3]:04d}"
+        )
+        params.x_offset = 10
+        params.y_offset = 12
+        params.font_params.font_name = "Serif"
+        params.font_params.font_size = 10
+        params.font_params.font_color.set(1.0, 1.0, 1.0, 1.0)
+        params.set_bg_clr = 1
+        params.text_bg_clr.set(0.0, 0.0, 0.0, 1.0)
+        pyds.nvds_add_display_meta_to_frame(frame_meta, display_meta_main)
+
+        for i in range(num_meta_objects):
+            display_meta = pyds.nvds_acquire_display_meta_from_pool(batch_meta)
+            display_meta.num_labels = 0
+            start_idx = i * max_labels
+            end_idx = min((i + 1) * max_labels, num_objects)
+            for idx in range(start_idx, end_idx):
+                x = int(meta_list_sorted[idx].left)
+                y = int(meta_list_sorted[idx].top) - 15
+                if x < 0 or y < 0:
+                    continue
+                n = display_meta.num_labels
+                display_meta.text_params[n].display_text = meta_list_sorted[idx].text
+                display_meta.text_params[n].x_offset = x
+                display_meta.text_params[n].y_offset = y
+                display_meta.text_params[n].font_params.font_name = "Serif"
+                display_meta.text_params[n].font_params.font_size = 10
+                display_meta.text_params[n].font_params.font_color.set(
+                    1.0, 1.0, 1.0, 1.0
+                )
+                display_meta.text_params[n].set_bg_clr = 1
+                display_meta.text_params[n].text_bg_clr.set(0.45, 0.20, 0.50, 0.75)
+                display_meta.num_labels += 1
+            display_meta.num_rects = end_idx - start_idx
+            for j, idx in enumerate(range(start_idx, end_idx)):
+                color = CLASS_COLORS[meta_list_sorted[idx].class_id]
+                display_meta.rect_params[j].left = meta_list_sorted[idx].left
+                display_meta.rect_params[j].top = meta_list_sorted[idx].top
+                display_meta.rect_params[j].width = meta_list_sorted[idx].width
+                display_meta.rect_params[j].height = meta_list_sorted[idx].height
+                display_meta.rect_params[j].border_width = 2
+                display_meta.rect_params[j].border_color.red = color[0]
+                display_meta.rect_params[j].border_color.green = color[1]
+                display_meta.rect_params[j].border_color.blue = color[2]
+                display_meta.rect_params[j].border_color.alpha = color[3]
+                display_meta.rect_params[j].has_bg_color = 0
+            pyds.nvds_add_display_meta_to_frame(frame_meta, display_meta)
+        l_frame = l_frame.next
+
+
+def drawn(batch_meta) -> tuple:
+    """
+    Collects what the display metadata of a batch draws, in drawing order.
+
+    Parameters
+    ----------
+    batch_meta : pydsstandin.NvDsBatchMeta
+        Processed batch metadata.
+
+    Returns
+    -------
+    tuple
+        Lists of labels and of rectangles.
+    """
+    labels, rects = [], []
+    l_frame = batch_meta.frame_meta_list
+    while l_frame is not None:
+        for display_meta in l_frame.data.display_meta:
+            for params in display_meta.text_params[: display_meta.num_labels]:
+                labels.append((params.display_text, params.x_offset, params.y_offset))
+            for params in display_meta.rect_params[: display_meta.num_rects]:
+                color = params.border_color
+                rects.append(
+                    (
+                        params.left,
+                        params.top,
+                        params.width,
+                        params.height,
+                        (color.red, color.green, color.blue, color.alpha),
+                    )
+                )
+        l_frame = l_frame.next
+    return labels, rects
+
+
+def measure(process, objects_per_frame: int, frames: int) -> float:
+    """
+    Measures the mean time it takes to process one frame.
+
+    Parameters
+    ----------
+    process : callable
+        Function that processes batch metadata.
+    objects_per_frame : int
+        Number of objects in each frame.
+    frames : int
+        Number of frames to process.
+
+    Returns
+    -------
+    float
+        Mean processing time per frame in microseconds.
+    """
+    # Fill the display meta pool first, DeepStream preallocates it
+    for seed in range(10):
+        batch_meta = pydsstandin.make_batch_meta(1, objects_per_frame, seed=seed)
+        process(batch_meta)
+        pydsstandin.release_batch_meta(batch_meta)
+
+    batches = [
+        pydsstandin.make_batch_meta(1, objects_per_frame, seed=seed)
+        for seed in range(frames)
+    ]
+    start = time.perf_counter()
+    for batch_meta in batches:
+        process(batch_meta)
+        pydsstandin.release_batch_meta(batch_meta)
+    return 1e6 * (time.perf_counter() - start) / frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OSD metadata probes")
+    parser.add_argument(
+        "--objects",
+        type=int,
+        nargs="+",
+        default=[50, 200, 500],
+        help="objects per frame",
+    )
+    parser.add_argument(
+        "--frames", type=int, default=200, help="frames to process per measurement"
+    )
+    args = parser.parse_args()
+
+    drawer = osdmeta.OSDObjectDrawer(CLASS_COLORS, CLASS_NAMES, pyds_module=pydsstandin)
+
+    for objects_per_frame in args.objects:
+        legacy_batch = pydsstandin.make_batch_meta(1, objects_per_frame)
+        batch = pydsstandin.make_batch_meta(1, objects_per_frame)
+        legacy_process_batch(legacy_batch)
+        drawer.process_batch(batch)
+        if drawn(legacy_batch) != drawn(batch):
+            raise RuntimeError(
+                f"OSDObjectDrawer draws differently at {objects_per_frame} objects"
+            )
+
+    print(f"{'objects':>8} {'legacy us':>10} {'drawer us':>10} {'speedup':>8}")
+    for objects_per_frame in args.objects:
+        legacy = measure(legacy_process_batch, objects_per_frame, args.frames)
+        vectorized = measure(drawer.process_batch, objects_per_frame, args.frames)
+        print(
+            f"{objects_per_frame:>8} {legacy:>10.1f} {vectorized:>10.1f} {legacy / vectorized:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
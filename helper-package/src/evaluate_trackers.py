@@ -0,0 +1,349 @@
+"""
+Tracker Evaluation
+
+Replays detection sequences through the CPU trackers of the gst-examples tracking scripts, the IoU
+trackers helpers.tracking.SimpleTracker and helpers.tracking.KalmanTracker, and Supervision's
+ByteTrack configured as in the scripts, and prints MOTA, IDF1, ID switches and per-frame update latency for each tracker. Sequences are
+either synthetic, generated from a seed, or recorded MOTChallenge ground truth and detection
+files, so no video is decoded and no GPU is needed. --script selects whose settings are
+replayed: the YOLOX scripts update the trackers on frames without detections, gst-bytetrack.py
+skips those frames and activates ByteTrack tracks at a fixed confidence.
+
+Usage:
+    python evaluate_trackers.py --seeds 0 1 2 --frames 300
+    python evaluate_trackers.py --script gst-bytetrack --trackers iou bytetrack
+    python evaluate_trackers.py --gt gt.txt --det det.txt --fps 25 --json results.json
+"""
+
+import argparse
+import json
+import sys
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from helpers import trackeval
+from helpers.tracking import KalmanTracker, SimpleTracker
+
+TRACKERS = ["iou", "kalman", "bytetrack"]
+
+# Tracker settings of the tracking scripts: whether frames without detections update the tracker,
+# and the confidence at which ByteTrack activates a track, None for the box threshold
+SCRIPT_SETTINGS = {
+    "yolox": {"update_on_empty": True, "track_activation_threshold": None},
+    "gst-bytetrack": {"update_on_empty": False, "track_activation_threshold": 0.25},
+}
+
+
+def make_iou_tracker(frame_rate: float, script: str, box_threshold: float) -> Callable:
+    """
+    Creates the update function of SimpleTracker.
+
+    Parameters
+    ----------
+    frame_rate : float
+        Frames per second, not used by SimpleTracker.
+    script : str
+        Tracking script whose settings are used, one of SCRIPT_SETTINGS.
+    box_threshold : float
+        Minimum confidence of a detection, not used by SimpleTracker.
+
+    Returns
+    -------
+    callable
+        Function that takes the detections of a frame and returns the tracks of the frame.
+    """
+    return _box_tracker_update(SimpleTracker(), script)
+
+
+def make_kalman_tracker(
+    frame_rate: float, script: str, box_threshold: float
+) -> Callable:
+    """
+    Creates the update function of KalmanTracker, configured as in the tracking scripts.
+
+    Parameters
+    ----------
+    frame_rate : float
+        Frames per second, not used by KalmanTracker.
+    script : str
+        Tracking script whose settings are used, one of SCRIPT_SETTINGS.
+    box_threshold : float
+        Minimum confidence of a detection, not used by KalmanTracker.
+
+    Returns
+    -------
+    callable
+        Function that takes the detections of a frame and returns the tracks of the frame.
+    """
+    return _box_tracker_update(KalmanTracker(lost_track_buffer=30), script)
+
+
+def _box_tracker_update(tracker, script: str) -> Callable:
+    """
+    Wraps a tracker with the track() method and the TrackStore of SimpleTracker, read as in the
+    tracking scripts.
+
+    Parameters
+    ----------
+    tracker : SimpleTracker or KalmanTracker
+        The tracker.
+    script : str
+        Tracking script whose settings are used, one of SCRIPT_SETTINGS.
+
+    Returns
+    -------
+    callable
+        Function that takes the detections of a frame and returns the tracks of the frame.
+    """
+
+    update_on_empty = SCRIPT_SETTINGS[script]["update_on_empty"]
+
+    def update(detections: trackeval.Frame) -> trackeval.Frame:
+        if len(detections.boxes) == 0 and not update_on_empty:
+            return trackeval.make_frame()
+        slots = tracker.track(detections.boxes.reshape(-1, 4))
+        return trackeval.make_frame(
+            tracker.store.ids[slots], tracker.store.boxes[slots]
+        )
+
+    return update
+
+
+def make_bytetrack_tracker(
+    frame_rate: float, script: str, box_threshold: float
+) -> Callable:
+    """
+    Creates the update function of Supervision's ByteTrack, configured as in the tracking scripts.
+
+    Parameters
+    ----------
+    frame_rate : float
+        Frames per second.
+    script : str
+        Tracking script whose settings are used, one of SCRIPT_SETTINGS.
+    box_threshold : float
+        Minimum confidence of a detection, the activation threshold of the YOLOX scripts.
+
+    Returns
+    -------
+    callable
+        Function that takes the detections of a frame and returns the tracks of the frame.
+    """
+    import supervision as sv
+
+    settings = SCRIPT_SETTINGS[script]
+    activation_threshold = settings["track_activation_threshold"]
+    tracker = sv.ByteTrack(
+        track_activation_threshold=(
+            box_threshold if activation_threshold is None else activation_threshold
+        ),
+        lost_track_buffer=30,
+        minimum_matching_threshold=0.8,
+        frame_rate=int(frame_rate),
+    )
+
+    def update(detections: trackeval.Frame) -> trackeval.Frame:
+        if len(detections.boxes) == 0:
+            if not settings["update_on_empty"]:
+                return trackeval.make_frame()
+            sv_detections = sv.Detections.empty()
+        else:
+            xyxy = detections.boxes.copy()
+            xyxy[:, 2:] += xyxy[:, :2]
+            sv_detections = sv.Detections(
+                xyxy=xyxy.astype(np.float32),
+                confidence=detections.confidences.astype(np.float32),
+                class_id=np.zeros(len(xyxy), dtype=np.int32),
+            )
+        tracked = tracker.update_with_detections(sv_detections)
+        if tracked.tracker_id is None or len(tracked) == 0:
+            return trackeval.make_frame()
+        boxes = tracked.xyxy.astype(np.float64)
+        boxes[:, 2:] -= boxes[:, :2]
+        return trackeval.make_frame(tracked.tracker_id, boxes)
+
+    return update
+
+
+TRACKER_FACTORIES = {
+    "iou": make_iou_tracker,
+    "kalman": make_kalman_tracker,
+    "bytetrack": make_bytetrack_tracker,
+}
+
+
+def filter_detections(
+    detections: List[trackeval.Frame], box_threshold: float
+) -> List[trackeval.Frame]:
+    """
+    Drops the detections below the box confidence threshold, as the detector decoder does.
+
+    Parameters
+    ----------
+    detections : list of trackeval.Frame
+        Detection frames.
+    box_threshold : float
+        Minimum confidence of a detection.
+
+    Returns
+    -------
+    list of trackeval.Frame
+        Filtered detection frames.
+    """
+    filtered = []
+    for frame in detections:
+        keep = frame.confidences >= box_threshold
+        filtered.append(
+            trackeval.Frame(frame.ids[keep], frame.boxes[keep], frame.confidences[keep])
+        )
+    return filtered
+
+
+def evaluate_sequence(
+    name: str,
+    sequence: trackeval.TrackingSequence,
+    box_threshold: float,
+    iou_threshold: float,
+    script: str = "yolox",
+) -> Dict[str, float]:
+    """
+    Runs one tracker over a sequence and computes its metrics.
+
+    Parameters
+    ----------
+    name : str
+        Name of the tracker, one of TRACKERS.
+    sequence : trackeval.TrackingSequence
+        Sequence to replay.
+    box_threshold : float
+        Minimum confidence of a detection.
+    iou_threshold : float
+        Minimum IoU of a match between a track and a ground truth object.
+    script : str, optional
+        Tracking script whose settings are used, one of SCRIPT_SETTINGS, by default "yolox".
+
+    Returns
+    -------
+    dict
+        Tracker and sequence names, and the metrics and latency statistics.
+    """
+    update = TRACKER_FACTORIES[name](sequence.frame_rate, script, box_threshold)
+    detections = filter_detections(sequence.detections, box_threshold)
+    hypotheses, latencies = trackeval.run_tracker(update, detections)
+    result = {"tracker": name, "sequence": sequence.name}
+    result.update(trackeval.evaluate(sequence.ground_truth, hypotheses, iou_threshold))
+    result.update(trackeval.latency_stats(latencies))
+    return result
+
+
+def print_table(results: List[Dict[str, float]]) -> None:
+    """
+    Prints the results as a table.
+
+    Parameters
+    ----------
+    results : list of dict
+        Results of evaluate_sequence().
+    """
+    print(
+        f"{'tracker':<10} {'sequence':<16} {'MOTA':>7} {'IDF1':>7} {'IDSW':>6} {'FP':>6} {'FN':>6} "
+        f"{'tracks':>7} {'mean ms':>8} {'p95 ms':>8} {'max ms':>8}"
+    )
+    for r in results:
+        print(
+            f"{r['tracker']:<10} {r['sequence'][-16:]:<16} {r['mota']:>7.3f} {r['idf1']:>7.3f} "
+            f"{r['id_switches']:>6} {r['false_positives']:>6} {r['misses']:>6} {r['track_ids']:>7} "
+            f"{r['latency_mean_ms']:>8.3f} {r['latency_p95_ms']:>8.3f} {r['latency_max_ms']:>8.3f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the CPU trackers")
+    parser.add_argument(
+        "--trackers",
+        nargs="+",
+        choices=TRACKERS,
+        default=TRACKERS,
+        help="trackers to evaluate",
+    )
+    parser.add_argument(
+        "--script",
+        choices=list(SCRIPT_SETTINGS),
+        default="yolox",
+        help="tracking script whose tracker settings are replayed (default: yolox)",
+    )
+    parser.add_argument(
+        "--seeds",
+        type=int,
+        nargs="+",
+        default=[0, 1, 2],
+        help="seeds of the synthetic sequences",
+    )
+    parser.add_argument(
+        "--frames", type=int, default=300, help="frames per synthetic sequence"
+    )
+    parser.add_argument(
+        "--objects", type=int, default=20, help="objects per synthetic sequence"
+    )
+    parser.add_argument(
+        "--gt", help="MOTChallenge ground truth file, replaces the synthetic sequences"
+    )
+    parser.add_argument("--det", help="MOTChallenge detection file, used with --gt")
+    parser.add_argument(
+        "--fps", type=float, default=30.0, help="frame rate of the recorded sequence"
+    )
+    parser.add_argument(
+        "--box-threshold",
+        type=float,
+        default=0.4,
+        help="minimum detection confidence, as in yoloxtensordec (default: 0.4)",
+    )
+    parser.add_argument(
+        "--iou-threshold",
+        type=float,
+        default=0.5,
+        help="minimum IoU of a match with the ground truth (default: 0.5)",
+    )
+    parser.add_argument("--json", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    if bool(args.gt) != bool(args.det):
+        parser.error("--gt and --det must be given together")
+    if args.gt:
+        sequences = [trackeval.load_mot_sequence(args.gt, args.det, args.fps)]
+    else:
+        sequences = [
+            trackeval.synthetic_sequence(args.frames, args.objects, seed=seed)
+            for seed in args.seeds
+        ]
+
+    trackers = []
+    for name in args.trackers:
+        if name == "bytetrack":
+            try:
+                import supervision  # noqa: F401
+            except ImportError:
+                print(
+                    "Skipping 'bytetrack': the 'supervision' package is not installed",
+                    file=sys.stderr,
+                )
+                continue
+        trackers.append(name)
+
+    results = [
+        evaluate_sequence(
+            name, sequence, args.box_threshold, args.iou_threshold, args.script
+        )
+        for sequence in sequences
+        for name in trackers
+    ]
+    print_table(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,16 @@
-__all__ = ["gsthelpers"]
+__all__ = [
+    "detectioncache",
+    "gsthelpers",
+    "latency",
+    "metafanout",
+    "osdmeta",
+    "pipelinebuilder",
+    "probescheduler",
+    "pydsstandin",
+    "shmtransport",
+    "streamcontrol",
+    "tilerlayout",
+    "trackeval",
+    "tracking",
+    "trajectorystore",
+]
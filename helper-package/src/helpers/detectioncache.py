@@ -0,0 +1,216 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is only needed by the recorder and the cache
+    np = None
+
+# One record per detection, 32 bytes. Boxes are (x1, y1, x2, y2) in the coordinates of the frames
+# that were run through the detector.
+DETECTION_DTYPE = [
+    ("pts", "<u8"),
+    ("box", "<f4", (4,)),
+    ("confidence", "<f4"),
+    ("class_id", "<i4"),
+]
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Computes the SHA-256 digest of a file.
+
+    :param path: path of the file
+    :param chunk_size: number of bytes read at a time
+    :return: hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(
+    model: str,
+    video_digest: str,
+    box_threshold: float,
+    class_threshold: float,
+    iou_threshold: float,
+    width: int,
+    height: int,
+) -> str:
+    """
+    Returns the key of the detections of a video, which changes with everything the detections
+    depend on: the model, the video, the thresholds and the size of the frames the model sees.
+
+    :param model: model name, e.g. 'yolox_s'
+    :param video_digest: digest of the video file, see file_digest()
+    :param box_threshold: box confidence threshold
+    :param class_threshold: class confidence threshold
+    :param iou_threshold: NMS IoU threshold
+    :param width: width of the frames given to the model
+    :param height: height of the frames given to the model
+    :return: the key, usable as a file name
+    """
+    return (
+        f"{model}-{video_digest[:16]}-{width}x{height}"
+        f"-box{box_threshold:g}-class{class_threshold:g}-iou{iou_threshold:g}"
+    )
+
+
+def cache_path(cache_dir: str, key: str) -> str:
+    """
+    Returns the path of the detection file of a key.
+
+    :param cache_dir: directory of the detection files
+    :param key: key returned by cache_key()
+    :return: path of the .npy file, the metadata is stored next to it in a .json file
+    """
+    return os.path.join(cache_dir, key + ".npy")
+
+
+class DetectionRecorder:
+    """
+    Records the post-NMS detections of each frame, so that a video only needs to be run through
+    the detector once:
+
+        recorder = DetectionRecorder(cache_path("detection-cache", key), {"model": "yolox_s"})
+
+        # For each frame, boxes as (x1, y1, x2, y2)
+        recorder.add(buf.pts, boxes, confidences, class_ids)
+
+        # At end-of-stream
+        recorder.close()
+
+    close() writes the detections, sorted by PTS, to a .npy file that DetectionCache maps into
+    memory, and the metadata with the number of frames and detections to a .json file next to it.
+    The file only appears when close() is called, so an interrupted recording leaves no partial
+    file behind.
+    """
+
+    def __init__(self, path: str, metadata: Optional[dict] = None):
+        """
+        :param path: path of the .npy file
+        :param metadata: values stored in the .json file, e.g. the model and the thresholds
+        """
+        if np is None:
+            raise ImportError("DetectionRecorder requires numpy")
+
+        self.path = path
+        self.metadata = dict(metadata or {})
+        self.frames = 0
+        self.detections = 0
+        self._chunks: List["np.ndarray"] = []
+        self._lock = threading.Lock()
+
+    def add(self, pts: int, boxes, confidences, class_ids) -> None:
+        """
+        Adds the detections of a frame.
+
+        :param pts: presentation timestamp of the frame
+        :param boxes: bounding boxes (x1, y1, x2, y2), shape (n, 4)
+        :param confidences: detection confidences, shape (n,)
+        :param class_ids: class ids, shape (n,)
+        :return: None
+        """
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        chunk = np.empty(len(boxes), dtype=DETECTION_DTYPE)
+        chunk["pts"] = pts
+        chunk["box"] = boxes
+        chunk["confidence"] = confidences
+        chunk["class_id"] = class_ids
+        with self._lock:
+            self.frames += 1
+            self.detections += len(chunk)
+            if len(chunk):
+                self._chunks.append(chunk)
+
+    def close(self) -> str:
+        """
+        Writes the recorded detections and the metadata.
+
+        :return: path of the .npy file
+        """
+        with self._lock:
+            if self._chunks:
+                detections = np.concatenate(self._chunks)
+            else:
+                detections = np.empty(0, dtype=DETECTION_DTYPE)
+            detections = detections[np.argsort(detections["pts"], kind="stable")]
+            metadata = dict(
+                self.metadata, frames=self.frames, detections=self.detections
+            )
+            self._chunks = []
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Write to temporary files first so that readers never see a partial file
+        temporary = self.path + ".tmp"
+        with open(temporary, "wb") as f:
+            np.save(f, detections)
+        with open(temporary + ".json", "w") as f:
+            json.dump(metadata, f, indent=2)
+        os.replace(temporary + ".json", os.path.splitext(self.path)[0] + ".json")
+        os.replace(temporary, self.path)
+        logger.info(
+            f"Wrote {self.detections} detections of {self.frames} frames to '{self.path}'"
+        )
+        return self.path
+
+
+class DetectionCache:
+    """
+    Detections written by DetectionRecorder, memory-mapped so that opening a cache is instant and
+    only the pages of the frames that are looked up are read:
+
+        cache = DetectionCache(cache_path("detection-cache", key))
+        boxes, confidences, class_ids = cache.get(buf.pts)
+
+    Frames are looked up by PTS with a binary search. A frame without detections, or that was not
+    recorded, gives empty arrays. 'hits' counts the frames that had detections.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: path of the .npy file
+        """
+        if np is None:
+            raise ImportError("DetectionCache requires numpy")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No recorded detections in '{path}'")
+
+        self.path = path
+        self.detections = np.load(path, mmap_mode="r")
+        self._pts = self.detections["pts"]
+        self.metadata: Dict = {}
+        metadata_path = os.path.splitext(path)[0] + ".json"
+        if os.path.exists(metadata_path):
+            with open(metadata_path, "r") as f:
+                self.metadata = json.load(f)
+        self.hits = 0
+
+    def __len__(self) -> int:
+        return len(self.detections)
+
+    def get(self, pts: int) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+        """
+        Returns the detections of a frame.
+
+        :param pts: presentation timestamp of the frame
+        :return: bounding boxes (x1, y1, x2, y2) of shape (n, 4), confidences and class ids
+        """
+        pts = np.uint64(pts)
+        start = np.searchsorted(self._pts, pts, side="left")
+        end = np.searchsorted(self._pts, pts, side="right")
+        rows = self.detections[start:end]
+        if end > start:
+            self.hits += 1
+        return rows["box"], rows["confidence"], rows["class_id"]
@@ -1,5 +1,7 @@
 import gi
 import logging
+import re
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
@@ -58,18 +60,106 @@ def link_elements(elements: list) -> None:
             )
 
 
+class _PadLink:
+    """Link target of a PadAddedLinkFunctor connection, with its sink pad resolved once."""
+
+    def __init__(self, prefix: str, target_element: Gst.Element, target_sink_name: str):
+        self.prefix = prefix
+        self.target_element = target_element
+        self.target_sink_name = target_sink_name
+        self.template = None
+        self.sink_pad = target_element.get_static_pad(target_sink_name)
+        if self.sink_pad is None:
+            self.template = find_pad_template(
+                target_element, target_sink_name, Gst.PadDirection.SINK
+            )
+            if (
+                self.template is not None
+                and self.template.presence != Gst.PadPresence.REQUEST
+            ):
+                self.template = None
+            assert (
+                self.template is not None
+            ), f"'{target_element.get_name()}' has no static or request pad called '{target_sink_name}'"
+
+    def get_sink_pad(self):
+        """
+        Returns the sink pad to link to. A template name such as 'sink_%u' requests a new pad for
+        every new source pad, a request pad name such as 'sink_0' is requested once.
+        """
+        if self.sink_pad is not None:
+            return self.sink_pad
+        if self.target_sink_name == self.template.name_template:
+            return self.target_element.request_pad(self.template, None, None)
+        self.sink_pad = self.target_element.request_pad(
+            self.template, self.target_sink_name, None
+        )
+        return self.sink_pad
+
+    def release_sink_pad(self, sink_pad: Gst.Pad) -> None:
+        """
+        Releases a sink pad that could not be linked. Only pads requested from a template name are
+        released, they would otherwise stay in the target element, e.g. in the batch of
+        nvstreammux. Static pads and pads requested by name are kept for the next source pad.
+        """
+        if (
+            self.template is not None
+            and self.target_sink_name == self.template.name_template
+        ):
+            self.target_element.release_request_pad(sink_pad)
+
+
+def _template_regex(name_template: str) -> "re.Pattern":
+    pattern = re.escape(name_template)
+    pattern = pattern.replace("%u", r"\d+").replace("%d", r"-?\d+")
+    return re.compile(pattern.replace("%s", ".+") + "$")
+
+
+def find_pad_template(
+    element: Gst.Element, pad_name: str, direction: Gst.PadDirection
+) -> Optional[Gst.PadTemplate]:
+    """
+    Finds the pad template that a pad name, e.g. sink_0, or a template name, e.g. sink_%u,
+    belongs to.
+
+    :param element: element whose pad templates are searched
+    :param pad_name: pad name or template name
+    :param direction: direction of the pad
+    :return: the pad template, None if the element has no matching template
+    """
+    for template in element.get_pad_template_list():
+        if template.direction != direction:
+            continue
+        if template.name_template == pad_name or _template_regex(
+            template.name_template
+        ).match(pad_name):
+            return template
+    return None
+
+
 class PadAddedLinkFunctor:
     """
     A functor that can be used with pad-added messages to dynamically link new pads with subsequent
     elements' sink pads. Before using, an instance of the PadAddedLinkFunctor registers information
     regarding which new pads will be linked to which element.
+
+    Registered pad name prefixes are kept in a prefix trie per source element, so finding the
+    connection of a new pad takes time proportional to the length of the pad name rather than
+    the number of connections. One functor can be shared by several demuxers.
     """
 
     def __init__(self):
         self.connections = []
+        # Source element name (None for any element) -> prefix trie. Trie nodes are dicts from a
+        # character to the child node; the key None holds the connection whose prefix ends there.
+        self._tries = {}
 
     def register(
-        self, new_pad: str, target_element: Gst.Element, target_sink_name: str
+        self,
+        new_pad: str,
+        target_element: Gst.Element,
+        target_sink_name: str,
+        source_element: Gst.Element = None,
     ) -> None:
         """
         Registers linking information indicating how new pads should be linked to subsequent elements.
@@ -82,9 +172,18 @@ class PadAddedLinkFunctor:
         pad_added_functor.register("video_", parser, , "sink")
         demuxer.connect("pad-added", pad_added_functor)
 
+        The target may also be a request pad. With a template name, e.g. streammux's 'sink_%u',
+        every matching new pad gets a pad of its own, so the video pads of several demuxers can be
+        linked to one streammux:
+
+        pad_added_functor.register("video_", streammux, "sink_%u")
+        demuxer1.connect("pad-added", pad_added_functor)
+        demuxer2.connect("pad-added", pad_added_functor)
+
         :param new_pad: name of the new pad that is linked: new_pad -> target_element.target_sink_name
         :param target_element: target gst-element
-        :param target_sink_name: name of the target gst-element sink
+        :param target_sink_name: name of the target gst-element sink, or of a request pad (template)
+        :param source_element: only link new pads of this element, by default new pads of any element
         :return: None
         """
 
@@ -95,9 +194,33 @@ class PadAddedLinkFunctor:
         assert isinstance(
             target_sink_name, str
         ), "'target_sink_name' must be of type str"
+        assert source_element is None or isinstance(
+            source_element, Gst.Element
+        ), "'source_element' must be of type Gst.Element"
 
+        link = _PadLink(new_pad, target_element, target_sink_name)
+        source_name = None if source_element is None else source_element.get_name()
+        node = self._tries.setdefault(source_name, {})
+        for char in new_pad:
+            node = node.setdefault(char, {})
+        assert None not in node, f"Pad prefix '{new_pad}' has already been registered"
+        node[None] = link
         self.connections.append((new_pad, target_element, target_sink_name))
 
+    def _lookup(self, source_name, pad_name: str) -> list:
+        """Connections whose prefix matches the pad name, for the given source element."""
+        node = self._tries.get(source_name)
+        if node is None:
+            return []
+        matches = [node[None]] if None in node else []
+        for char in pad_name:
+            node = node.get(char)
+            if node is None:
+                break
+            if None in node:
+                matches.append(node[None])
+        return matches
+
     def __call__(self, element: Gst.Element, pad: Gst.Pad) -> None:
         """
         Functor for pad-added signal.
@@ -107,39 +230,35 @@ class PadAddedLinkFunctor:
         :return: None
         """
 
-        assert isinstance(element, Gst.Element), "'element' must be of type Gst.Element"
-        assert isinstance(pad, Gst.Pad), "'pad' must be of type Gst.Pad"
-
         pad_name = pad.get_name()
         element_name = element.get_name()
 
         logger.info(f"New pad '{pad_name}' created")
 
         # Search if the new pad corresponds to any of the defined connections
-        index = [i for i, v in enumerate(self.connections) if pad_name.startswith(v[0])]
-        if len(index) == 1:
-            index = index.pop()
-            target_element = self.connections[index][1]
-            target_sink_name = self.connections[index][2]
-            sink_pad = target_element.get_static_pad(target_sink_name)
-
-            assert (
-                sink_pad
-            ), f"'{target_element.get_name()}' has no static pad called '{target_sink_name}'"
-
-            if not sink_pad.is_linked():
-                logger.info(
-                    f"Linking '{element_name}:{pad_name}' -> '{target_element.get_name()}:{sink_pad.get_name()}'"
-                )
-                ret = pad.link(sink_pad)
-                if ret == Gst.PadLinkReturn.OK:
-                    logger.info("Linked")
-                else:
-                    logger.error("Failed to link")
-
-        elif len(index) > 1:
+        matches = self._lookup(element_name, pad_name) + self._lookup(None, pad_name)
+        if len(matches) > 1:
             raise RuntimeError(
                 f"Pad '{pad_name}' corresponds to several link-definitions, cannot continue"
             )
-        else:
+        if not matches:
+            return
+
+        link = matches[0]
+        sink_pad = link.get_sink_pad()
+        if sink_pad is None:
+            logger.error(
+                f"Failed to request pad '{link.target_sink_name}' from '{link.target_element.get_name()}'"
+            )
             return
+
+        if not sink_pad.is_linked():
+            logger.info(
+                f"Linking '{element_name}:{pad_name}' -> '{link.target_element.get_name()}:{sink_pad.get_name()}'"
+            )
+            ret = pad.link(sink_pad)
+            if ret == Gst.PadLinkReturn.OK:
+                logger.info("Linked")
+            else:
+                logger.error("Failed to link")
+                link.release_sink_pad(sink_pad)
@@ -0,0 +1,146 @@
+import gi
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+gi.require_version("Gst", "1.0")
+from gi.repository import Gst  # noqa: E402
+
+# Name of the element messages that report dropped buffers
+DROPS_MESSAGE = "latency-policy-drops"
+
+
+class LatencyPolicy:
+    """
+    Queue configuration that decides what a real-time pipeline does when a stage, typically
+    inference, is slower than the frame rate.
+
+    Non-leaky queues block upstream, so every frame is processed but latency grows without bound
+    with live sources. Leaky queues drop the oldest buffer instead, which bounds latency to the
+    queue size. Queues created with queue_launch() and registered with watch() report the number
+    of dropped buffers with element messages named DROPS_MESSAGE on the bus, with the fields
+    policy, queue and dropped (total dropped by that queue).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        leaky: str,
+        max_size_buffers: int,
+        report_interval: float = 1.0,
+    ):
+        """
+        :param name: name of the policy
+        :param leaky: queue leakiness, 'no' or 'downstream' (drop the oldest buffer)
+        :param max_size_buffers: queue size in buffers
+        :param report_interval: minimum number of seconds between drop messages of a queue
+        """
+        assert leaky in ("no", "downstream"), f"Unsupported leakiness '{leaky}'"
+        assert max_size_buffers >= 1, "'max_size_buffers' must be at least 1"
+
+        self.name = name
+        self.leaky = leaky
+        self.max_size_buffers = max_size_buffers
+        self.report_interval = report_interval
+
+    def __repr__(self) -> str:
+        return (
+            f"LatencyPolicy(name={self.name!r}, leaky={self.leaky!r}, "
+            f"max_size_buffers={self.max_size_buffers})"
+        )
+
+    def queue_launch(self, name: str) -> str:
+        """
+        Returns the launch description of a queue configured by the policy.
+
+        The byte and time limits are disabled, so the queue size is bounded by buffers only.
+
+        :param name: name of the queue, used to find it with watch()
+        :return: launch description, e.g. for Gst.parse_launch
+        """
+        return (
+            f"queue name={name} leaky={self.leaky} max-size-buffers={self.max_size_buffers} "
+            "max-size-bytes=0 max-size-time=0"
+        )
+
+    def watch(self, pipeline: Gst.Bin, queue_names: list) -> None:
+        """
+        Counts the buffers that the named queues drop and posts the counts on the pipeline bus.
+
+        A leaky queue drops one buffer for every buffer that arrives while it is full, which it
+        signals with 'overrun'. Non-leaky queues block instead and are not watched.
+
+        :param pipeline: pipeline containing the queues
+        :param queue_names: names of the queues to watch
+        :return: None
+        """
+        if self.leaky == "no":
+            return
+
+        for queue_name in queue_names:
+            queue = pipeline.get_by_name(queue_name)
+            assert queue is not None, f"Pipeline has no element called '{queue_name}'"
+            counter = {"dropped": 0, "reported": 0.0, "lock": threading.Lock()}
+            queue.connect("overrun", self._on_overrun, counter)
+
+    def _on_overrun(self, queue: Gst.Element, counter: dict) -> None:
+        now = time.monotonic()
+        with counter["lock"]:
+            counter["dropped"] += 1
+            if now - counter["reported"] < self.report_interval:
+                return
+            counter["reported"] = now
+            dropped = counter["dropped"]
+
+        structure = Gst.Structure.new_empty(DROPS_MESSAGE)
+        structure.set_value("policy", self.name)
+        structure.set_value("queue", queue.get_name())
+        structure.set_value("dropped", dropped)
+        queue.post_message(Gst.Message.new_element(queue, structure))
+
+
+# strict-every-frame: never drop, upstream waits for inference (offline processing)
+# drop-oldest: keep a small backlog, drop the oldest frames when it is full
+# latest-only: always process the newest frame, lowest latency with live sources
+LATENCY_POLICIES = {
+    "strict-every-frame": LatencyPolicy(
+        "strict-every-frame", leaky="no", max_size_buffers=2
+    ),
+    "drop-oldest": LatencyPolicy("drop-oldest", leaky="downstream", max_size_buffers=2),
+    "latest-only": LatencyPolicy("latest-only", leaky="downstream", max_size_buffers=1),
+}
+
+
+def get_latency_policy(name: str) -> LatencyPolicy:
+    """
+    Returns a named latency policy.
+
+    :param name: one of LATENCY_POLICIES, e.g. latest-only
+    :return: the policy
+    """
+    if name not in LATENCY_POLICIES:
+        raise ValueError(
+            f"Unknown latency policy '{name}', available: {list(LATENCY_POLICIES)}"
+        )
+    return LATENCY_POLICIES[name]
+
+
+def parse_drops_message(message: Gst.Message):
+    """
+    Parses a drop counter message posted by LatencyPolicy.watch().
+
+    :param message: a bus message
+    :return: (policy, queue, dropped), or None if the message is not a drop counter message
+    """
+    if message.type != Gst.MessageType.ELEMENT:
+        return None
+    structure = message.get_structure()
+    if structure is None or structure.get_name() != DROPS_MESSAGE:
+        return None
+    return (
+        structure.get_string("policy"),
+        structure.get_string("queue"),
+        structure.get_value("dropped"),
+    )
@@ -0,0 +1,305 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyds
+except ImportError:  # pragma: no cover - pyds is only available with DeepStream
+    pyds = None
+
+
+class Detection(NamedTuple):
+    """
+    Object metadata copied from the primary detector.
+
+    :param class_id: class id
+    :param confidence: detector confidence
+    :param left: left edge of the bounding box
+    :param top: top edge of the bounding box
+    :param width: width of the bounding box
+    :param height: height of the bounding box
+    :param label: class label
+    :param component_id: unique id of the detector (gie-unique-id)
+    """
+
+    class_id: int
+    confidence: float
+    left: float
+    top: float
+    width: float
+    height: float
+    label: str
+    component_id: int
+
+
+def _frames(batch_meta, pyds_module) -> list:
+    frames = []
+    l_frame = batch_meta.frame_meta_list
+    while l_frame is not None:
+        try:
+            frames.append(pyds_module.NvDsFrameMeta.cast(l_frame.data))
+        except StopIteration:
+            break
+        try:
+            l_frame = l_frame.next
+        except StopIteration:
+            break
+    return frames
+
+
+def _objects(frame_meta, pyds_module) -> list:
+    objects = []
+    l_obj = frame_meta.obj_meta_list
+    while l_obj is not None:
+        try:
+            objects.append(pyds_module.NvDsObjectMeta.cast(l_obj.data))
+        except StopIteration:
+            break
+        try:
+            l_obj = l_obj.next
+        except StopIteration:
+            break
+    return objects
+
+
+class MetaFanOut:
+    """
+    Runs the primary detector once for several tracker branches.
+
+    The branches are fed by a tee before their nvstreammux, so every branch has its own batch
+    metadata. The source branch runs the detector, and record() keeps a copy of the detections of
+    each frame. In the other branches, inject() adds the detections of the same frame, matched by
+    source id and buffer timestamp, to the batch before the tracker. Each tracker therefore works
+    on its own copy of the object metadata:
+
+        fan_out = MetaFanOut(num_targets=1)
+
+        # Probe on the src pad of the detector in the source branch
+        fan_out.record(batch_meta)
+
+        # Probe on the src pad of nvstreammux in a tracker branch
+        fan_out.inject(batch_meta)
+
+    inject() waits up to 'timeout' seconds for the source branch to reach the frame. Frames it
+    gives up on are counted in 'missed' and tracked without detections.
+    """
+
+    def __init__(
+        self,
+        num_targets: int,
+        timeout: float = 1.0,
+        max_pending: int = 256,
+        pyds_module=None,
+    ):
+        """
+        :param num_targets: number of branches that inject the detections
+        :param timeout: maximum number of seconds inject() waits for the detections of a frame
+        :param max_pending: maximum number of frames kept, the oldest frame is dropped when a
+            target branch falls behind
+        :param pyds_module: the pyds module to use, by default the DeepStream bindings
+        """
+        assert (
+            num_targets >= 1
+        ), f"'num_targets' must be at least 1, given {num_targets}"
+        assert (
+            max_pending >= 1
+        ), f"'max_pending' must be at least 1, given {max_pending}"
+
+        self.num_targets = num_targets
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.pyds = pyds_module or pyds
+        self.recorded = 0
+        self.injected = 0
+        self.missed = 0
+        self.dropped = 0
+
+        # (source id, buffer pts) -> [detections, number of targets that have not injected yet]
+        self._pending: "OrderedDict[Tuple[int, int], list]" = OrderedDict()
+        self._condition = threading.Condition()
+
+    def record(self, batch_meta) -> int:
+        """
+        Keeps the detections of all frames of a batch.
+
+        :param batch_meta: NvDsBatchMeta of the source branch
+        :return: number of detections recorded
+        """
+        pyds_module = self.pyds
+        frames = []
+        num_detections = 0
+        for frame_meta in _frames(batch_meta, pyds_module):
+            detections = []
+            for obj_meta in _objects(frame_meta, pyds_module):
+                rect = obj_meta.rect_params
+                detections.append(
+                    Detection(
+                        obj_meta.class_id,
+                        obj_meta.confidence,
+                        rect.left,
+                        rect.top,
+                        rect.width,
+                        rect.height,
+                        pyds_module.get_string(obj_meta.text_params.display_text),
+                        obj_meta.unique_component_id,
+                    )
+                )
+            frames.append(((frame_meta.source_id, frame_meta.buf_pts), detections))
+            num_detections += len(detections)
+
+        with self._condition:
+            for key, detections in frames:
+                self._pending[key] = [detections, self.num_targets]
+                self.recorded += 1
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+                self.dropped += 1
+            self._condition.notify_all()
+        return num_detections
+
+    def _take(self, key: Tuple[int, int]) -> Optional[List[Detection]]:
+        with self._condition:
+            if not self._condition.wait_for(lambda: key in self._pending, self.timeout):
+                self.missed += 1
+                return None
+            entry = self._pending[key]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._pending[key]
+            self.injected += 1
+            return entry[0]
+
+    def inject(self, batch_meta) -> int:
+        """
+        Adds the recorded detections to all frames of a batch, as untracked objects.
+
+        :param batch_meta: NvDsBatchMeta of a tracker branch
+        :return: number of detections added
+        """
+        pyds_module = self.pyds
+        added = 0
+        for frame_meta in _frames(batch_meta, pyds_module):
+            detections = self._take((frame_meta.source_id, frame_meta.buf_pts))
+            if not detections:
+                continue
+            for detection in detections:
+                obj_meta = pyds_module.nvds_acquire_obj_meta_from_pool(batch_meta)
+                obj_meta.class_id = detection.class_id
+                obj_meta.confidence = detection.confidence
+                obj_meta.unique_component_id = detection.component_id
+                obj_meta.object_id = pyds_module.UNTRACKED_OBJECT_ID
+                rect = obj_meta.rect_params
+                rect.left = detection.left
+                rect.top = detection.top
+                rect.width = detection.width
+                rect.height = detection.height
+                coords = obj_meta.detector_bbox_info.org_bbox_coords
+                coords.left = detection.left
+                coords.top = detection.top
+                coords.width = detection.width
+                coords.height = detection.height
+                obj_meta.text_params.display_text = detection.label
+                pyds_module.nvds_add_obj_meta_to_frame(frame_meta, obj_meta, None)
+            added += len(detections)
+        return added
+
+
+class TrackerComparison:
+    """
+    Collects the tracking results of several branches for comparison: the number of frames and
+    objects, and per branch the tracks, identified by (source id, object id), with the number of
+    frames each track was seen in.
+
+        comparison = TrackerComparison(["tracker_config_1.txt", "tracker_config_2.txt"])
+
+        # Probe after the tracker of branch i
+        comparison.add_batch(i, batch_meta)
+
+        comparison.write("tracker_comparison.json")
+
+    Fewer, longer tracks for the same detections mean fewer identity switches and fragments.
+    """
+
+    def __init__(self, names: List[str], pyds_module=None):
+        """
+        :param names: names of the branches, e.g. their tracker configuration files
+        :param pyds_module: the pyds module to use, by default the DeepStream bindings
+        """
+        self.names = list(names)
+        self.pyds = pyds_module or pyds
+        self._frames = [0] * len(self.names)
+        self._objects = [0] * len(self.names)
+        self._tracks: List[Dict[Tuple[int, int], int]] = [{} for _ in self.names]
+        self._lock = threading.Lock()
+
+    def add_batch(self, branch: int, batch_meta) -> None:
+        """
+        Adds the tracked objects of a batch.
+
+        :param branch: index of the branch
+        :param batch_meta: NvDsBatchMeta after the tracker of the branch
+        :return: None
+        """
+        pyds_module = self.pyds
+        untracked = pyds_module.UNTRACKED_OBJECT_ID
+        keys = []
+        num_frames = 0
+        for frame_meta in _frames(batch_meta, pyds_module):
+            num_frames += 1
+            source_id = frame_meta.source_id
+            keys.extend(
+                (source_id, obj_meta.object_id)
+                for obj_meta in _objects(frame_meta, pyds_module)
+            )
+
+        with self._lock:
+            tracks = self._tracks[branch]
+            self._frames[branch] += num_frames
+            self._objects[branch] += len(keys)
+            for key in keys:
+                if key[1] != untracked:
+                    tracks[key] = tracks.get(key, 0) + 1
+
+    def summary(self) -> List[dict]:
+        """
+        Returns the results of each branch.
+
+        :return: list of dicts with name, frames, objects, tracks and mean_track_length, the mean
+            number of frames a track was seen in
+        """
+        with self._lock:
+            return [
+                {
+                    "name": name,
+                    "frames": frames,
+                    "objects": objects,
+                    "tracks": len(tracks),
+                    "mean_track_length": sum(tracks.values()) / len(tracks)
+                    if tracks
+                    else 0.0,
+                }
+                for name, frames, objects, tracks in zip(
+                    self.names, self._frames, self._objects, self._tracks
+                )
+            ]
+
+    def write(self, path: str) -> None:
+        """
+        Writes the summary to a JSON file.
+
+        :param path: path of the file
+        :return: None
+        """
+        summary = self.summary()
+        with open(path, "w") as f:
+            json.dump(summary, f, indent=2)
+        for result in summary:
+            logger.info(
+                f"{result['name']}: {result['tracks']} tracks, mean length "
+                f"{result['mean_track_length']:.1f} frames, {result['objects']} objects in "
+                f"{result['frames']} frames"
+            )
@@ -0,0 +1,266 @@
+import logging
+from typing import Dict, NamedTuple, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is only needed by OSDObjectDrawer
+    np = None
+
+try:
+    import pyds
+except ImportError:  # pragma: no cover - pyds is only available with DeepStream
+    pyds = None
+
+Color = Tuple[float, float, float, float]
+
+
+class ClassStyle(NamedTuple):
+    """
+    Drawing settings of the objects of one class.
+
+    :param border_color: bounding box color (red, green, blue, alpha)
+    :param border_width: bounding box line width in pixels
+    :param font_name: label font
+    :param font_size: label font size
+    :param font_color: label text color
+    :param bg_color: label background color
+    """
+
+    border_color: Color
+    border_width: int
+    font_name: str
+    font_size: int
+    font_color: Color
+    bg_color: Color
+
+
+class OSDObjectDrawer:
+    """
+    Draws the objects of DeepStream frames with bounding boxes colored by class and labels with the
+    object ID and class. Objects are drawn from the top of the frame to the bottom, so the labels of
+    objects closer to the camera are drawn last and stay readable. A line at the top of each frame
+    shows the frame number and the number of objects per class.
+
+    Object fields are collected into preallocated NumPy arrays, counters and drawing order are
+    computed in bulk, and the display metadata is filled from plain lists with per-class style
+    settings computed once. Display metadata holds up to MAX_ELEMENTS_IN_DISPLAY_META labels and
+    rectangles, so a frame of n objects needs ceil(n / 16) of them.
+
+        drawer = OSDObjectDrawer(colors, {0: "Vehicles", 2: "Persons"})
+
+        def osd_sink_pad_buffer_probe(pad, info, u_data):
+            batch_meta = pyds.gst_buffer_get_nvds_batch_meta(hash(info.get_buffer()))
+            drawer.process_batch(batch_meta)
+            return Gst.PadProbeReturn.OK
+    """
+
+    def __init__(
+        self,
+        class_colors: Dict[int, Color],
+        class_names: Dict[int, str],
+        label_bg_color: Color = (0.45, 0.20, 0.50, 0.75),
+        font_name: str = "Serif",
+        font_size: int = 10,
+        border_width: int = 2,
+        capacity: int = 256,
+        pyds_module=None,
+    ):
+        """
+        :param class_colors: bounding box color of each class id, objects of other classes are white
+        :param class_names: names of the classes counted on the frame info line, in display order
+        :param label_bg_color: label background color
+        :param font_name: label font
+        :param font_size: label font size
+        :param border_width: bounding box line width in pixels
+        :param capacity: number of objects per frame the arrays are allocated for, grows as needed
+        :param pyds_module: the pyds module to use, by default the DeepStream bindings. Pass
+            helpers.pydsstandin to run without DeepStream.
+        """
+        if np is None:
+            raise ImportError("OSDObjectDrawer requires numpy")
+        self.pyds = pyds_module or pyds
+        if self.pyds is None:
+            raise ImportError(
+                "OSDObjectDrawer requires the DeepStream Python bindings (pyds)"
+            )
+        self.max_elements = getattr(self.pyds, "MAX_ELEMENTS_IN_DISPLAY_META", 16)
+        self.class_names = class_names
+
+        num_classes = max(list(class_colors) + list(class_names) + [0]) + 1
+        white = (1.0, 1.0, 1.0, 1.0)
+        # Index num_classes holds the style of unknown classes
+        self._styles = [
+            ClassStyle(
+                class_colors.get(class_id, white),
+                border_width,
+                font_name,
+                font_size,
+                white,
+                label_bg_color,
+            )
+            for class_id in range(num_classes + 1)
+        ]
+        self._info_style = ClassStyle(
+            white, 0, font_name, font_size, white, (0.0, 0.0, 0.0, 1.0)
+        )
+        self._num_classes = num_classes
+
+        # Per frame: (left, top, width, height) and class id of each object, and the labels
+        self._boxes = np.empty((capacity, 4), dtype=np.float64)
+        self._class_ids = np.empty(capacity, dtype=np.int64)
+        self._labels = []
+
+    def process_batch(self, batch_meta) -> None:
+        """
+        Adds display metadata to all frames of a batch.
+
+        :param batch_meta: NvDsBatchMeta
+        :return: None
+        """
+        l_frame = batch_meta.frame_meta_list
+        while l_frame is not None:
+            try:
+                frame_meta = self.pyds.NvDsFrameMeta.cast(l_frame.data)
+            except StopIteration:
+                break
+            self.process_frame(batch_meta, frame_meta)
+            try:
+                l_frame = l_frame.next
+            except StopIteration:
+                break
+
+    def _collect(self, frame_meta) -> int:
+        """Reads the objects of a frame into the arrays and hides their default drawing."""
+        pyds_module = self.pyds
+        boxes = self._boxes
+        class_ids = self._class_ids
+        labels = self._labels
+        labels.clear()
+        get_string = pyds_module.get_string
+        cast = pyds_module.NvDsObjectMeta.cast
+
+        n = 0
+        l_obj = frame_meta.obj_meta_list
+        while l_obj is not None:
+            try:
+                obj_meta = cast(l_obj.data)
+            except StopIteration:
+                break
+            if n == len(boxes):
+                boxes = self._boxes = np.concatenate([boxes, np.empty_like(boxes)])
+                class_ids = self._class_ids = np.concatenate(
+                    [class_ids, np.empty_like(class_ids)]
+                )
+            coords = obj_meta.tracker_bbox_info.org_bbox_coords
+            boxes[n] = (coords.left, coords.top, coords.width, coords.height)
+            class_ids[n] = obj_meta.class_id
+            text_params = obj_meta.text_params
+            labels.append(
+                f"ID: {obj_meta.object_id:04d}, Class: {get_string(text_params.display_text)}"
+            )
+            # nvdsosd would draw the object as well, these are drawn by the display metadata
+            text_params.display_text = ""
+            text_params.set_bg_clr = 0
+            obj_meta.rect_params.border_width = 0
+            n += 1
+            try:
+                l_obj = l_obj.next
+            except StopIteration:
+                break
+        return n
+
+    def process_frame(self, batch_meta, frame_meta) -> None:
+        """
+        Adds display metadata to a frame.
+
+        :param batch_meta: NvDsBatchMeta the frame belongs to
+        :param frame_meta: NvDsFrameMeta
+        :return: None
+        """
+        pyds_module = self.pyds
+        n = self._collect(frame_meta)
+
+        class_ids = self._class_ids[:n]
+        unknown = (class_ids < 0) | (class_ids >= self._num_classes)
+        class_ids = np.where(unknown, self._num_classes, class_ids)
+        counts = np.bincount(class_ids, minlength=self._num_classes + 1).tolist()
+        self._add_info(batch_meta, frame_meta, n, counts)
+        if n == 0:
+            return
+
+        boxes = self._boxes[:n]
+        # Draw from the top of the frame to the bottom, by the bottom edge of the box
+        order = np.argsort(boxes[:, 1] + boxes[:, 3], kind="stable")
+        boxes = boxes[order]
+        rects = boxes.tolist()
+        styles = [self._styles[class_id] for class_id in class_ids[order].tolist()]
+        label_x = boxes[:, 0].astype(np.int64)
+        label_y = boxes[:, 1].astype(np.int64) - 15
+        visible = np.flatnonzero((label_x >= 0) & (label_y >= 0))
+        label_pos = np.stack([label_x[visible], label_y[visible]], axis=1).tolist()
+        visible = visible.tolist()
+        labels = self._labels
+        order = order.tolist()
+
+        acquire = pyds_module.nvds_acquire_display_meta_from_pool
+        add = pyds_module.nvds_add_display_meta_to_frame
+        step = self.max_elements
+        for start in range(0, n, step):
+            display_meta = acquire(batch_meta)
+
+            end = min(start + step, n)
+            rect_params = display_meta.rect_params
+            for j in range(start, end):
+                left, top, width, height = rects[j]
+                style = styles[j]
+                params = rect_params[j - start]
+                params.left = left
+                params.top = top
+                params.width = width
+                params.height = height
+                params.border_width = style.border_width
+                params.border_color.set(*style.border_color)
+                params.has_bg_color = 0
+            display_meta.num_rects = end - start
+
+            end = min(start + step, len(visible))
+            text_params = display_meta.text_params
+            for j in range(start, end):
+                idx = visible[j]
+                x, y = label_pos[j]
+                style = styles[idx]
+                params = text_params[j - start]
+                params.display_text = labels[order[idx]]
+                params.x_offset = x
+                params.y_offset = y
+                font_params = params.font_params
+                font_params.font_name = style.font_name
+                font_params.font_size = style.font_size
+                font_params.font_color.set(*style.font_color)
+                params.set_bg_clr = 1
+                params.text_bg_clr.set(*style.bg_color)
+            display_meta.num_labels = max(end - start, 0)
+
+            add(frame_meta, display_meta)
+
+    def _add_info(self, batch_meta, frame_meta, num_objects: int, counts: list) -> None:
+        """Adds the frame info line to the top left corner of the frame."""
+        text = f"Frame Number={frame_meta.frame_num:05d}, Number of Objects={num_objects:04d}"
+        for class_id, name in self.class_names.items():
+            text += f", {name}={counts[class_id]:04d}"
+
+        style = self._info_style
+        display_meta = self.pyds.nvds_acquire_display_meta_from_pool(batch_meta)
+        display_meta.num_labels = 1
+        params = display_meta.text_params[0]
+        params.display_text = text
+        params.x_offset = 10
+        params.y_offset = 12
+        params.font_params.font_name = style.font_name
+        params.font_params.font_size = style.font_size
+        params.font_params.font_color.set(*style.font_color)
+        params.set_bg_clr = 1
+        params.text_bg_clr.set(*style.bg_color)
+        self.pyds.nvds_add_display_meta_to_frame(frame_meta, display_meta)
@@ -0,0 +1,363 @@
+import gi
+import json
+import logging
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+gi.require_version("Gst", "1.0")
+from gi.repository import Gst  # noqa: E402
+from helpers.gsthelpers import find_pad_template  # noqa: E402
+
+# Element factories by name, looked up once per process
+_factories: Dict[str, Gst.ElementFactory] = {}
+
+
+def load_spec(path: str) -> dict:
+    """
+    Loads a pipeline spec from a JSON or YAML file. YAML requires PyYAML.
+
+    :param path: path to a .json, .yaml or .yml file
+    :return: the spec
+    """
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("Loading YAML pipeline specs requires PyYAML")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def _make_element(factory_name: str, name: str) -> Gst.Element:
+    factory = _factories.get(factory_name)
+    if factory is None:
+        factory = Gst.ElementFactory.find(factory_name)
+        if factory is None:
+            raise RuntimeError(f"Failed to create a Gst element '{factory_name}'")
+        _factories[factory_name] = factory
+    element = factory.create(name)
+    if element is None:
+        raise RuntimeError(f"Failed to create a Gst element '{factory_name}'")
+    return element
+
+
+def _set_properties(element: Gst.Element, properties: dict) -> None:
+    for key, value in properties.items():
+        if element.find_property(key) is None:
+            raise ValueError(f"Element '{element.get_name()}' has no property '{key}'")
+        if isinstance(value, str):
+            # Also converts enum and flag nicks, and caps given as strings
+            Gst.util_set_object_arg(element, key, value)
+        else:
+            element.set_property(key, value)
+
+
+class _DeferredLink:
+    """A link from a sometimes pad, made when the source element adds the pad."""
+
+    def __init__(
+        self,
+        src: Gst.Element,
+        template: Optional[Gst.PadTemplate],
+        sink: Gst.Element,
+        sink_pad: Optional[Gst.Pad],
+    ):
+        self.src = src
+        self.template = template
+        self.sink = sink
+        self.sink_pad = sink_pad
+        self.linked = False
+        src.connect("pad-added", self)
+
+    def describe(self) -> str:
+        src = self.src.get_name()
+        if self.template is not None:
+            src += f".{self.template.name_template}"
+        sink = self.sink.get_name()
+        if self.sink_pad is not None:
+            sink += f".{self.sink_pad.get_name()}"
+        return f"{src} -> {sink}"
+
+    def __call__(self, element: Gst.Element, pad: Gst.Pad) -> None:
+        if self.linked or pad.get_direction() != Gst.PadDirection.SRC:
+            return
+        if self.template is not None and (
+            pad.get_pad_template() is None
+            or pad.get_pad_template().name_template != self.template.name_template
+        ):
+            return
+        sink_pad = self.sink_pad or self.sink.get_compatible_pad(pad, None)
+        if sink_pad is None or sink_pad.is_linked():
+            return
+        ret = pad.link(sink_pad)
+        if ret == Gst.PadLinkReturn.OK:
+            self.linked = True
+            logger.info(
+                f"Linked '{element.get_name()}:{pad.get_name()}' -> "
+                f"'{self.sink.get_name()}:{sink_pad.get_name()}'"
+            )
+        else:
+            logger.error(f"Failed to link {self.describe()}: {ret.value_nick}")
+
+
+class BuiltPipeline:
+    """
+    Result of build_pipeline().
+
+    :param pipeline: the created pipeline or bin
+    :param elements: created elements by name, capsfilters created for caps in links included
+    :param timings: construction time per phase, and in total, in milliseconds
+    """
+
+    def __init__(self, pipeline: Gst.Bin):
+        self.pipeline = pipeline
+        self.elements: Dict[str, Gst.Element] = {}
+        self.timings: Dict[str, float] = {}
+        self.deferred: List[_DeferredLink] = []
+
+    def __getitem__(self, name: str) -> Gst.Element:
+        return self.elements[name]
+
+    def validate(self) -> None:
+        """
+        Checks the pipeline before it is set to PLAYING.
+
+        Links from sometimes pads are only made once the pads appear, so their caps are checked
+        here: the caps of the pad template must intersect the caps of the sink pad. All always
+        sink pads must be linked, since an unlinked sink pad means a branch that never gets
+        data. Raises RuntimeError listing all the problems found.
+
+        :return: None
+        """
+        problems = []
+        for link in self.deferred:
+            if link.template is None or link.sink_pad is None:
+                continue
+            sink_caps = link.sink_pad.query_caps(None)
+            if not link.template.get_caps().can_intersect(sink_caps):
+                problems.append(f"Incompatible caps on {link.describe()}")
+
+        # Sink pads that deferred links will link once the source pads appear
+        pending_pads = [link.sink_pad for link in self.deferred if link.sink_pad]
+        pending_elements = [link.sink for link in self.deferred if not link.sink_pad]
+        for element in self.elements.values():
+            for pad in element.sinkpads:
+                template = pad.get_pad_template()
+                always = template is None or template.presence == Gst.PadPresence.ALWAYS
+                pending = pad in pending_pads or element in pending_elements
+                if (
+                    always
+                    and not pad.is_linked()
+                    and not pending
+                    and not self._is_ghosted(pad)
+                ):
+                    problems.append(
+                        f"Sink pad '{element.get_name()}:{pad.get_name()}' is not linked"
+                    )
+
+        if problems:
+            raise RuntimeError("Invalid pipeline: " + "; ".join(problems))
+
+    def _is_ghosted(self, pad: Gst.Pad) -> bool:
+        for ghost in self.pipeline.pads:
+            if isinstance(ghost, Gst.GhostPad) and ghost.get_target() == pad:
+                return True
+        return False
+
+
+def _parse_endpoint(token: str, built: BuiltPipeline):
+    """Splits 'element.pad' into the element and the pad name, None if no pad is given."""
+    name, _, pad_name = token.partition(".")
+    if name not in built.elements:
+        raise ValueError(f"Link refers to unknown element '{name}'")
+    return built.elements[name], (pad_name or None)
+
+
+def _resolve_pad(
+    element: Gst.Element, pad_name: Optional[str], direction: Gst.PadDirection
+):
+    """
+    Resolves a pad name to a pad.
+
+    :return: (pad, template); pad is None for sometimes pads, which do not exist yet
+    """
+    if pad_name is None:
+        return None, None
+    pad = element.get_static_pad(pad_name)
+    if pad is not None:
+        return pad, pad.get_pad_template()
+
+    template = find_pad_template(element, pad_name, direction)
+    if template is None:
+        raise ValueError(f"Element '{element.get_name()}' has no pad '{pad_name}'")
+    if template.presence == Gst.PadPresence.REQUEST:
+        # 'sink_%u' lets the element choose the pad, 'sink_0' requests that pad
+        name = None if pad_name == template.name_template else pad_name
+        pad = element.request_pad(template, name, None)
+        if pad is None:
+            raise RuntimeError(
+                f"Failed to request pad '{pad_name}' from '{element.get_name()}'"
+            )
+        return pad, template
+    return None, template
+
+
+def _has_sometimes_src(element: Gst.Element) -> bool:
+    return any(
+        t.direction == Gst.PadDirection.SRC and t.presence == Gst.PadPresence.SOMETIMES
+        for t in element.get_pad_template_list()
+    )
+
+
+def _link(built: BuiltPipeline, src_token: str, sink_token: str) -> None:
+    src, src_pad_name = _parse_endpoint(src_token, built)
+    sink, sink_pad_name = _parse_endpoint(sink_token, built)
+    src_pad, src_template = _resolve_pad(src, src_pad_name, Gst.PadDirection.SRC)
+    sink_pad, _ = _resolve_pad(sink, sink_pad_name, Gst.PadDirection.SINK)
+
+    # Sometimes pads are linked when they appear
+    sometimes = src_template is not None and src_pad is None
+    if src_pad_name is None and not src.srcpads and _has_sometimes_src(src):
+        # No pad given, link the first compatible pad the element adds
+        sometimes = True
+    if sometimes:
+        built.deferred.append(_DeferredLink(src, src_template, sink, sink_pad))
+        return
+
+    if src_pad is None and sink_pad is None:
+        if not src.link(sink):
+            raise RuntimeError(f"Failed to link: {src_token} -> {sink_token}")
+        return
+
+    if src_pad is None:
+        src_pad = src.get_compatible_pad(sink_pad, None)
+    if sink_pad is None:
+        sink_pad = sink.get_compatible_pad(src_pad, None)
+    if src_pad is None or sink_pad is None:
+        raise RuntimeError(f"No compatible pads to link: {src_token} -> {sink_token}")
+    ret = src_pad.link(sink_pad)
+    if ret != Gst.PadLinkReturn.OK:
+        raise RuntimeError(
+            f"Failed to link: {src_token} -> {sink_token} ({ret.value_nick})"
+        )
+
+
+def _split_chain(chain) -> List[str]:
+    if isinstance(chain, str):
+        chain = chain.split("!")
+    tokens = [token.strip() for token in chain]
+    if len(tokens) < 2 or not all(tokens):
+        raise ValueError(f"A link needs at least 2 endpoints, given {chain}")
+    return tokens
+
+
+def build_pipeline(spec: dict, pipeline: Optional[Gst.Bin] = None) -> BuiltPipeline:
+    """
+    Creates, configures, adds and links the elements of a declarative pipeline spec in one pass.
+    Gst.init() has to be called before using this function.
+
+    The spec lists the elements and the links between them, e.g.
+
+        {
+            "name": "video-pipeline",
+            "elements": [
+                {"factory": "filesrc", "name": "source", "properties": {"location": "in.mp4"}},
+                {"factory": "qtdemux", "name": "demuxer"},
+                {"factory": "queue", "name": "video-queue"},
+                {"factory": "h264parse", "name": "parser"},
+                {"factory": "nvv4l2decoder", "name": "decoder"},
+                {"factory": "nvstreammux", "name": "muxer", "properties": {"batch-size": 1}},
+                ...
+            ],
+            "links": [
+                "source ! demuxer",
+                "demuxer.video_%u ! video-queue ! parser ! decoder ! muxer.sink_0",
+                ...
+            ],
+            "ghost_pads": {"src": "osd.src"}
+        }
+
+    Links are chains of element names like in gst-launch. An endpoint may name a pad as
+    element.pad: static pads are used as they are, request pads are requested ('sink_%u' lets
+    the element pick the pad, 'sink_0' requests that pad) and sometimes pads, such as demuxer
+    outputs, are linked when the element adds them. Caps strings in a chain, e.g.
+    video/x-raw,format=RGBA, become capsfilters. String property values are converted to the
+    property type, so enums can be given by nick. ghost_pads exposes pads of the elements on
+    the bin, for building reusable per-stream bins.
+
+    :param spec: the pipeline spec
+    :param pipeline: bin to build into, by default a new Gst.Pipeline named spec['name']
+    :return: the built pipeline, with its elements by name and the construction timings
+    """
+    start = time.perf_counter()
+    if pipeline is None:
+        pipeline = Gst.Pipeline.new(spec.get("name", "pipeline"))
+    built = BuiltPipeline(pipeline)
+
+    # Create and configure
+    for idx, entry in enumerate(spec.get("elements", [])):
+        if "factory" not in entry:
+            raise ValueError(f"Element {idx} of the spec has no 'factory'")
+        name = entry.get("name", f"{entry['factory']}{idx}")
+        if name in built.elements:
+            raise ValueError(f"Element name '{name}' is used more than once")
+        element = _make_element(entry["factory"], name)
+        _set_properties(element, entry.get("properties", {}))
+        built.elements[name] = element
+    created = time.perf_counter()
+
+    # Capsfilters for caps given in links
+    chains = []
+    for chain in spec.get("links", []):
+        tokens = _split_chain(chain)
+        for idx, token in enumerate(tokens):
+            if "/" in token.partition(",")[0]:
+                name = f"capsfilter-{len(built.elements)}"
+                capsfilter = _make_element("capsfilter", name)
+                capsfilter.set_property("caps", Gst.Caps.from_string(token))
+                built.elements[name] = capsfilter
+                tokens[idx] = name
+        chains.append(tokens)
+
+    # Add all elements at once
+    pipeline.add(*built.elements.values())
+    added = time.perf_counter()
+
+    # Link
+    for tokens in chains:
+        for src_token, sink_token in zip(tokens[:-1], tokens[1:]):
+            _link(built, src_token, sink_token)
+
+    for ghost_name, target in spec.get("ghost_pads", {}).items():
+        element, pad_name = _parse_endpoint(target, built)
+        direction = (
+            Gst.PadDirection.SRC
+            if ghost_name.startswith("src")
+            else Gst.PadDirection.SINK
+        )
+        pad, _ = _resolve_pad(element, pad_name or ghost_name, direction)
+        if pad is None:
+            raise ValueError(
+                f"Ghost pad '{ghost_name}' needs an existing pad, given {target}"
+            )
+        pipeline.add_pad(Gst.GhostPad.new(ghost_name, pad))
+    linked = time.perf_counter()
+
+    built.validate()
+    validated = time.perf_counter()
+
+    built.timings = {
+        "create_ms": 1000.0 * (created - start),
+        "add_ms": 1000.0 * (added - created),
+        "link_ms": 1000.0 * (linked - added),
+        "validate_ms": 1000.0 * (validated - linked),
+        "total_ms": 1000.0 * (validated - start),
+    }
+    logger.info(
+        f"Built '{pipeline.get_name()}' with {len(built.elements)} elements in "
+        f"{built.timings['total_ms']:.1f} ms"
+    )
+    return built
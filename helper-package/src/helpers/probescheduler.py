@@ -0,0 +1,187 @@
+import logging
+import queue
+import sys
+import threading
+import time
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ProbeScheduler:
+    """
+    Decides on which frames a pad probe does its heavy work, so that analytics are sampled rather
+    than stalling the streaming thread.
+
+    The work runs on every Nth call and, with a time budget, only while the average time spent in
+    the work stays within the budget per call. The budget works like a token bucket: every call
+    adds 'budget' seconds of credit, up to 'burst' calls worth, and running the work spends its
+    duration. Work that overruns the budget makes the following calls skip until the credit is
+    back.
+
+        scheduler = ProbeScheduler(every_n=5, budget=0.001)
+
+        def probe(pad, info, u_data):
+            scheduler.run(print_analytics, info.get_buffer())
+            return Gst.PadProbeReturn.OK
+
+    The scheduler may be shared by probes running in different streaming threads.
+    """
+
+    def __init__(
+        self, every_n: int = 1, budget: Optional[float] = None, burst: int = 10
+    ):
+        """
+        :param every_n: run the work on every Nth call
+        :param budget: average number of seconds the work may take per call, None for no limit
+        :param burst: number of calls worth of budget that can be saved up
+        """
+        assert every_n >= 1, f"'every_n' must be at least 1, given {every_n}"
+        assert (
+            budget is None or budget > 0
+        ), f"'budget' must be positive, given {budget}"
+        assert burst >= 1, f"'burst' must be at least 1, given {burst}"
+
+        self.every_n = every_n
+        self.budget = budget
+        self.burst = burst
+        self.calls = 0
+        self.processed = 0
+        self.skipped = 0
+        self.busy_time = 0.0
+        self._credit = 0.0 if budget is None else budget * burst
+        self._lock = threading.Lock()
+
+    def should_run(self) -> bool:
+        """
+        Registers a call and tells whether the work should run on it. Report the time the work
+        took with done(), or use run() instead.
+
+        :return: True if the work should run
+        """
+        with self._lock:
+            self.calls += 1
+            if self.budget is not None:
+                self._credit = min(self._credit + self.budget, self.budget * self.burst)
+            if self.calls % self.every_n != 0 or (
+                self.budget is not None and self._credit < 0.0
+            ):
+                self.skipped += 1
+                return False
+            return True
+
+    def done(self, duration: float) -> None:
+        """
+        Reports that the work ran.
+
+        :param duration: seconds the work took
+        :return: None
+        """
+        with self._lock:
+            self.processed += 1
+            self.busy_time += duration
+            if self.budget is not None:
+                self._credit -= duration
+
+    def run(self, func, *args, **kwargs):
+        """
+        Calls func(*args, **kwargs) if the work should run on this call.
+
+        :param func: the work
+        :return: return value of func, None if the work was skipped
+        """
+        if not self.should_run():
+            return None
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.done(time.perf_counter() - start)
+
+    def stats(self) -> dict:
+        """
+        Returns the counters.
+
+        :return: dict with calls, processed, skipped and mean_ms, the mean duration of the work
+        """
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "processed": self.processed,
+                "skipped": self.skipped,
+                "mean_ms": 1000.0 * self.busy_time / self.processed
+                if self.processed
+                else 0.0,
+            }
+
+
+class BackgroundLogWriter:
+    """
+    Writes text from a background thread, so that printing from a pad probe does not block the
+    streaming thread on a slow terminal or file.
+
+    Text is passed through a bounded queue. When the queue is full, the text is dropped and counted
+    in 'dropped' rather than blocking the caller.
+    """
+
+    def __init__(self, stream=None, max_queued: int = 1000, name: str = "log-writer"):
+        """
+        :param stream: stream to write to, by default sys.stdout
+        :param max_queued: maximum number of writes waiting in the queue
+        :param name: name of the writer thread
+        """
+        self.stream = stream or sys.stdout
+        self.written = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def write(self, text: str) -> bool:
+        """
+        Queues a line of text.
+
+        :param text: the text, a newline is appended
+        :return: False if the queue was full and the text was dropped
+        """
+        try:
+            self._queue.put_nowait(text + "\n")
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def write_lines(self, lines: Iterable[str]) -> bool:
+        """
+        Queues lines of text as one write.
+
+        :param lines: the lines
+        :return: False if the queue was full and the lines were dropped
+        """
+        text = "\n".join(lines)
+        return self.write(text) if text else True
+
+    def close(self, timeout: float = 1.0) -> None:
+        """
+        Writes the queued text and stops the writer thread.
+
+        :param timeout: maximum number of seconds to wait
+        :return: None
+        """
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning("Log writer queue is full, queued text is lost")
+            return
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            text = self._queue.get()
+            if text is None:
+                break
+            self.stream.write(text)
+            self.written += 1
+            if self._queue.empty():
+                self.stream.flush()
+        self.stream.flush()
@@ -0,0 +1,381 @@
+"""
+A pure-Python stand-in for the parts of the DeepStream Python bindings (pyds) that metadata probes
+use. It makes probes runnable, and measurable, on machines without DeepStream:
+
+    from helpers import osdmeta, pydsstandin
+
+    batch_meta = pydsstandin.make_batch_meta(num_frames=1, objects_per_frame=200)
+    drawer = osdmeta.OSDObjectDrawer(colors, class_names, pyds_module=pydsstandin)
+    drawer.process_batch(batch_meta)
+
+Only the attributes used by the probes in this repository are modelled. Strings are stored as
+Python strings, so get_string() returns its argument.
+"""
+
+import random
+
+MAX_ELEMENTS_IN_DISPLAY_META = 16
+UNTRACKED_OBJECT_ID = 0xFFFFFFFFFFFFFFFF
+
+
+class NvDsMetaType:
+    NVDS_TRACKER_PAST_FRAME_META = 1
+
+
+class _ListOf:
+    """Base of the past-frame metadata containers, iterated with Type.list(container)."""
+
+    def __init__(self, items: list):
+        self.items = items
+
+    @staticmethod
+    def list(container):
+        return iter(container.items)
+
+    @staticmethod
+    def cast(data):
+        return data
+
+
+class NvDsPastFrameObj:
+    def __init__(
+        self, frame_num: int, coords: "NvBbox_Coords", confidence: float, age: int
+    ):
+        self.frameNum = frame_num
+        self.tBbox = coords
+        self.confidence = confidence
+        self.age = age
+
+
+class NvDsPastFrameObjList(_ListOf):
+    def __init__(self, unique_id: int, class_id: int, label: str, objects: list):
+        super().__init__(objects)
+        self.numObj = len(objects)
+        self.uniqueId = unique_id
+        self.classId = class_id
+        self.objLabel = label
+
+
+class NvDsPastFrameObjStream(_ListOf):
+    def __init__(self, stream_id: int, tracks: list):
+        super().__init__(tracks)
+        self.streamID = stream_id
+        self.surfaceStreamID = stream_id
+
+
+class NvDsPastFrameObjBatch(_ListOf):
+    pass
+
+
+class NvDsBaseMeta:
+    def __init__(self, meta_type: int):
+        self.meta_type = meta_type
+
+
+class NvDsUserMeta:
+    def __init__(self, meta_type: int, data):
+        self.base_meta = NvDsBaseMeta(meta_type)
+        self.user_meta_data = data
+
+    @staticmethod
+    def cast(data):
+        return data
+
+
+class GList:
+    """A node of a linked list of metadata, like the GList of the C API."""
+
+    def __init__(self, data, next=None):
+        self.data = data
+        self.next = next
+
+
+class NvOSD_ColorParams:
+    def __init__(self):
+        self.red = 0.0
+        self.green = 0.0
+        self.blue = 0.0
+        self.alpha = 0.0
+
+    def set(self, red: float, green: float, blue: float, alpha: float) -> None:
+        self.red = red
+        self.green = green
+        self.blue = blue
+        self.alpha = alpha
+
+
+class NvOSD_FontParams:
+    def __init__(self):
+        self.font_name = ""
+        self.font_size = 0
+        self.font_color = NvOSD_ColorParams()
+
+
+class NvOSD_TextParams:
+    def __init__(self):
+        self.display_text = ""
+        self.x_offset = 0
+        self.y_offset = 0
+        self.font_params = NvOSD_FontParams()
+        self.set_bg_clr = 0
+        self.text_bg_clr = NvOSD_ColorParams()
+
+
+class NvOSD_RectParams:
+    def __init__(self):
+        self.left = 0.0
+        self.top = 0.0
+        self.width = 0.0
+        self.height = 0.0
+        self.border_width = 0
+        self.border_color = NvOSD_ColorParams()
+        self.has_bg_color = 0
+        self.bg_color = NvOSD_ColorParams()
+
+
+class NvBbox_Coords:
+    def __init__(self, left=0.0, top=0.0, width=0.0, height=0.0):
+        self.left = left
+        self.top = top
+        self.width = width
+        self.height = height
+
+
+class NvDsTrackerBboxInfo:
+    def __init__(self, coords: NvBbox_Coords):
+        self.org_bbox_coords = coords
+
+
+class NvDsObjectMeta:
+    def __init__(
+        self, class_id: int, object_id: int, coords: NvBbox_Coords, label: str
+    ):
+        self.class_id = class_id
+        self.object_id = object_id
+        self.unique_component_id = 1
+        self.confidence = 1.0
+        self.obj_label = label
+        self.tracker_bbox_info = NvDsTrackerBboxInfo(coords)
+        self.detector_bbox_info = NvDsTrackerBboxInfo(
+            NvBbox_Coords(coords.left, coords.top, coords.width, coords.height)
+        )
+        self.rect_params = NvOSD_RectParams()
+        self.rect_params.left = coords.left
+        self.rect_params.top = coords.top
+        self.rect_params.width = coords.width
+        self.rect_params.height = coords.height
+        self.rect_params.border_width = 3
+        self.text_params = NvOSD_TextParams()
+        self.text_params.display_text = label
+        self.text_params.set_bg_clr = 1
+
+    @staticmethod
+    def cast(data):
+        return data
+
+
+class _ParamsArray:
+    """Fixed size array of parameters, created on first access so that acquiring is cheap."""
+
+    def __init__(self, params_type):
+        self.params_type = params_type
+        self.items = [None] * MAX_ELEMENTS_IN_DISPLAY_META
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self.items)))]
+        item = self.items[index]
+        if item is None:
+            item = self.items[index] = self.params_type()
+        return item
+
+
+class NvDsDisplayMeta:
+    def __init__(self):
+        self.num_labels = 0
+        self.num_rects = 0
+        self.num_lines = 0
+        self.text_params = _ParamsArray(NvOSD_TextParams)
+        self.rect_params = _ParamsArray(NvOSD_RectParams)
+
+    @staticmethod
+    def cast(data):
+        return data
+
+
+class NvDsFrameMeta:
+    def __init__(self, frame_num: int, objects: list, source_id: int = 0):
+        self.frame_num = frame_num
+        self.pad_index = source_id
+        self.source_id = source_id
+        self.buf_pts = frame_num
+        self.num_obj_meta = len(objects)
+        self.obj_meta_list = _make_list(objects)
+        self.display_meta = []
+
+    @staticmethod
+    def cast(data):
+        return data
+
+
+class NvDsBatchMeta:
+    def __init__(self, frames: list):
+        self.num_frames_in_batch = len(frames)
+        self.frame_meta_list = _make_list(frames)
+        self.batch_user_meta_list = None
+
+    @staticmethod
+    def cast(data):
+        return data
+
+
+def _make_list(items: list):
+    head = None
+    for item in reversed(items):
+        head = GList(item, head)
+    return head
+
+
+# Batch metadata by buffer address, see register_batch_meta()
+_batch_metas = {}
+
+
+def register_batch_meta(gst_buffer, batch_meta: NvDsBatchMeta) -> None:
+    """Attaches batch metadata to a buffer, for gst_buffer_get_nvds_batch_meta()."""
+    _batch_metas[hash(gst_buffer)] = batch_meta
+
+
+def gst_buffer_get_nvds_batch_meta(buffer_address: int):
+    return _batch_metas.get(buffer_address)
+
+
+# Released display metadata, reused like the display meta pool of DeepStream
+_display_meta_pool = []
+
+
+def nvds_acquire_display_meta_from_pool(batch_meta: NvDsBatchMeta) -> NvDsDisplayMeta:
+    if _display_meta_pool:
+        display_meta = _display_meta_pool.pop()
+        display_meta.num_labels = 0
+        display_meta.num_rects = 0
+        display_meta.num_lines = 0
+        return display_meta
+    return NvDsDisplayMeta()
+
+
+def release_batch_meta(batch_meta: NvDsBatchMeta) -> None:
+    """Returns the display metadata of a batch to the pool, as DeepStream does when the buffer is freed."""
+    l_frame = batch_meta.frame_meta_list
+    while l_frame is not None:
+        _display_meta_pool.extend(l_frame.data.display_meta)
+        l_frame.data.display_meta = []
+        l_frame = l_frame.next
+
+
+def nvds_add_display_meta_to_frame(
+    frame_meta: NvDsFrameMeta, display_meta: NvDsDisplayMeta
+) -> None:
+    frame_meta.display_meta.append(display_meta)
+
+
+def nvds_acquire_obj_meta_from_pool(batch_meta: NvDsBatchMeta) -> NvDsObjectMeta:
+    return NvDsObjectMeta(-1, UNTRACKED_OBJECT_ID, NvBbox_Coords(), "")
+
+
+def nvds_add_obj_meta_to_frame(
+    frame_meta: NvDsFrameMeta, obj_meta: NvDsObjectMeta, obj_parent
+) -> None:
+    frame_meta.obj_meta_list = GList(obj_meta, frame_meta.obj_meta_list)
+    frame_meta.num_obj_meta += 1
+
+
+def nvds_remove_frame_meta_from_batch(
+    batch_meta: NvDsBatchMeta, frame_meta: NvDsFrameMeta
+) -> None:
+    frames = []
+    l_frame = batch_meta.frame_meta_list
+    while l_frame is not None:
+        if l_frame.data is not frame_meta:
+            frames.append(l_frame.data)
+        l_frame = l_frame.next
+    batch_meta.frame_meta_list = _make_list(frames)
+    batch_meta.num_frames_in_batch = len(frames)
+
+
+def get_string(text: str) -> str:
+    return text
+
+
+def make_batch_meta(
+    num_frames: int = 1,
+    objects_per_frame: int = 50,
+    width: int = 1920,
+    height: int = 1080,
+    labels: tuple = ("Car", "Bicycle", "Person", "Roadsign"),
+    seed: int = 0,
+    past_frames: int = 0,
+) -> NvDsBatchMeta:
+    """
+    Creates batch metadata with randomly placed objects, as an object detector and tracker would.
+
+    :param num_frames: number of frames in the batch, frame i comes from source i
+    :param objects_per_frame: number of objects in each frame
+    :param width: frame width in pixels
+    :param height: frame height in pixels
+    :param labels: class labels, the class id of an object is the index of its label
+    :param seed: seed of the random number generator
+    :param past_frames: number of past-frame points attached for each object, as nvtracker does
+        with enable-past-frame
+    :return: the batch metadata
+    """
+    rng = random.Random(seed)
+    frames = []
+    for frame_num in range(num_frames):
+        objects = []
+        for object_id in range(objects_per_frame):
+            box_width = rng.uniform(10.0, width / 8)
+            box_height = rng.uniform(10.0, height / 4)
+            coords = NvBbox_Coords(
+                rng.uniform(-10.0, width - box_width),
+                rng.uniform(-10.0, height - box_height),
+                box_width,
+                box_height,
+            )
+            class_id = rng.randrange(len(labels))
+            objects.append(
+                NvDsObjectMeta(class_id, object_id, coords, labels[class_id])
+            )
+        frames.append(NvDsFrameMeta(frame_num, objects, frame_num))
+    batch_meta = NvDsBatchMeta(frames)
+
+    if past_frames:
+        streams = []
+        for frame_meta in frames:
+            tracks = []
+            l_obj = frame_meta.obj_meta_list
+            while l_obj is not None:
+                obj = l_obj.data
+                coords = obj.tracker_bbox_info.org_bbox_coords
+                points = [
+                    NvDsPastFrameObj(
+                        frame_meta.frame_num - past_frames + i,
+                        NvBbox_Coords(
+                            coords.left, coords.top, coords.width, coords.height
+                        ),
+                        rng.random(),
+                        i + 1,
+                    )
+                    for i in range(past_frames)
+                ]
+                tracks.append(
+                    NvDsPastFrameObjList(
+                        obj.object_id, obj.class_id, obj.obj_label, points
+                    )
+                )
+                l_obj = l_obj.next
+            streams.append(NvDsPastFrameObjStream(frame_meta.source_id, tracks))
+        user_meta = NvDsUserMeta(
+            NvDsMetaType.NVDS_TRACKER_PAST_FRAME_META, NvDsPastFrameObjBatch(streams)
+        )
+        batch_meta.batch_user_meta_list = GList(user_meta)
+    return batch_meta
@@ -0,0 +1,354 @@
+import gi
+import logging
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+gi.require_version("Gst", "1.0")
+from gi.repository import Gst  # noqa: E402
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is only needed by FrameSubscriber
+    np = None
+
+# Shared memory layout:
+#   ring header: magic, version, slot count, slot size (bytes of frame data), published frames
+#   per slot:    slot header (sequence, pts, wall time, width, height, size, format) + frame data
+# A slot's sequence is odd while the slot is being written and 2 * frame number once the frame is
+# complete, so readers can detect frames that were overwritten while being read (a seqlock).
+_MAGIC = b"GSTSHMR1"
+_RING_HEADER = struct.Struct("<8sIIQQ")
+_RING_HEADER_SIZE = 64
+_PUBLISHED_OFFSET = 24
+_SLOT_HEADER = struct.Struct("<QQQIIQ16s")
+_SLOT_HEADER_SIZE = 64
+_SEQ = struct.Struct("<Q")
+
+# Channels of packed video formats; other formats are returned as flat byte arrays
+_CHANNELS = {
+    "GRAY8": 1,
+    "RGB": 3,
+    "BGR": 3,
+    "RGBA": 4,
+    "BGRA": 4,
+    "RGBx": 4,
+    "BGRx": 4,
+    "ARGB": 4,
+    "ABGR": 4,
+}
+
+
+class FrameMeta(NamedTuple):
+    """
+    Metadata published with each frame.
+
+    :param frame_number: 1-based number of the frame in the stream
+    :param pts: buffer presentation timestamp in nanoseconds, Gst.CLOCK_TIME_NONE if unknown
+    :param wall_time_ns: time.time_ns() when the frame was published
+    :param width: frame width in pixels
+    :param height: frame height in pixels
+    :param format: video format, e.g. RGB
+    :param size: size of the frame data in bytes
+    """
+
+    frame_number: int
+    pts: int
+    wall_time_ns: int
+    width: int
+    height: int
+    format: str
+    size: int
+
+
+class SharedFrameRing:
+    """
+    A ring of frame slots in POSIX shared memory, written by one publisher process and read by
+    any number of subscriber processes.
+
+    Writing a frame copies it once into shared memory. Readers map the same memory, so they can
+    wrap a frame without copying and no data passes through sockets. There are no locks: each
+    slot carries a sequence number that readers check before and after reading.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        magic, version, self.slot_count, self.slot_size, _ = _RING_HEADER.unpack_from(
+            shm.buf, 0
+        )
+        assert magic == _MAGIC, f"Shared memory '{shm.name}' is not a frame ring"
+
+    @classmethod
+    def create(cls, name: str, slot_size: int, slot_count: int = 4):
+        """
+        Creates a new frame ring.
+
+        :param name: name of the shared memory block, e.g. camera1
+        :param slot_size: maximum size of a frame in bytes, e.g. width * height * 3 for RGB
+        :param slot_count: number of frames the ring holds
+        :return: the created ring, owned by the caller
+        """
+        assert slot_count >= 2, f"At least 2 slots are needed, given {slot_count}"
+        size = _RING_HEADER_SIZE + slot_count * (_SLOT_HEADER_SIZE + slot_size)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        shm.buf[:size] = bytes(size)
+        _RING_HEADER.pack_into(shm.buf, 0, _MAGIC, 1, slot_count, slot_size, 0)
+        logger.info(
+            f"Created frame ring '{name}': {slot_count} slots of {slot_size} bytes"
+        )
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str):
+        """
+        Attaches to an existing frame ring.
+
+        :param name: name of the shared memory block
+        :return: the attached ring
+        """
+        shm = shared_memory.SharedMemory(name=name)
+        # The resource tracker of Python < 3.13 would unlink the block when this process
+        # exits, removing it from under the publisher and the other subscribers
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return cls(shm, owner=False)
+
+    @property
+    def published(self) -> int:
+        """Number of the most recently published frame, 0 if none."""
+        return _SEQ.unpack_from(self.shm.buf, _PUBLISHED_OFFSET)[0]
+
+    def _slot_offset(self, frame_number: int) -> int:
+        slot = (frame_number - 1) % self.slot_count
+        return _RING_HEADER_SIZE + slot * (_SLOT_HEADER_SIZE + self.slot_size)
+
+    def write(
+        self,
+        data,
+        width: int,
+        height: int,
+        video_format: str,
+        pts: int = Gst.CLOCK_TIME_NONE,
+    ) -> int:
+        """
+        Publishes a frame.
+
+        :param data: frame data, a bytes-like object
+        :param width: frame width in pixels
+        :param height: frame height in pixels
+        :param video_format: video format, e.g. RGB
+        :param pts: buffer presentation timestamp in nanoseconds
+        :return: number of the published frame
+        """
+        size = len(data)
+        if size > self.slot_size:
+            raise ValueError(
+                f"Frame of {size} bytes does not fit the slots of {self.slot_size} bytes"
+            )
+
+        frame_number = self.published + 1
+        offset = self._slot_offset(frame_number)
+        buf = self.shm.buf
+        _SEQ.pack_into(buf, offset, 2 * frame_number - 1)
+        data_offset = offset + _SLOT_HEADER_SIZE
+        buf[data_offset : data_offset + size] = data
+        _SLOT_HEADER.pack_into(
+            buf,
+            offset,
+            2 * frame_number,
+            pts,
+            time.time_ns(),
+            width,
+            height,
+            size,
+            video_format.encode()[:16],
+        )
+        _SEQ.pack_into(buf, _PUBLISHED_OFFSET, frame_number)
+        return frame_number
+
+    def read(
+        self, frame_number: int, copy: bool = True
+    ) -> Optional[Tuple[FrameMeta, memoryview]]:
+        """
+        Reads a frame.
+
+        With copy=False the returned memoryview points into shared memory and is only valid until
+        the publisher wraps around the ring; call is_valid() after using it.
+
+        :param frame_number: number of the frame to read
+        :param copy: return a private copy of the frame data
+        :return: frame metadata and data, or None if the frame has been overwritten or is not
+            published yet
+        """
+        offset = self._slot_offset(frame_number)
+        header = _SLOT_HEADER.unpack_from(self.shm.buf, offset)
+        if header[0] != 2 * frame_number:
+            return None
+        seq, pts, wall_time_ns, width, height, size, video_format = header
+        meta = FrameMeta(
+            frame_number,
+            pts,
+            wall_time_ns,
+            width,
+            height,
+            video_format.rstrip(b"\0").decode(),
+            size,
+        )
+        data_offset = offset + _SLOT_HEADER_SIZE
+        data = self.shm.buf[data_offset : data_offset + size]
+        if copy:
+            data = memoryview(bytes(data))
+            if not self.is_valid(frame_number):
+                return None
+        return meta, data
+
+    def is_valid(self, frame_number: int) -> bool:
+        """
+        Checks that a frame has not been overwritten.
+
+        :param frame_number: number of the frame
+        :return: True if the slot still holds the frame
+        """
+        offset = self._slot_offset(frame_number)
+        return _SEQ.unpack_from(self.shm.buf, offset)[0] == 2 * frame_number
+
+    def close(self) -> None:
+        """Detaches from the ring; the owner also removes the shared memory block."""
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class FramePublisher:
+    """
+    Publishes the decoded frames of a pipeline to a SharedFrameRing.
+
+    The publisher is an appsink that never blocks the pipeline: if publishing falls behind, the
+    oldest frames are dropped. Link it behind a tee to fan decoded frames out to other processes
+    while the pipeline keeps running, e.g. with caps video/x-raw,format=RGB.
+
+        publisher = FramePublisher("camera1", width * height * 3)
+        pipeline.add(publisher.sink)
+        gsthelpers.link_elements([tee_queue, converter, capsfilter, publisher.sink])
+    """
+
+    def __init__(self, name: str, slot_size: int, slot_count: int = 4):
+        """
+        :param name: name of the shared memory block that subscribers attach to
+        :param slot_size: maximum size of a frame in bytes
+        :param slot_count: number of frames the ring holds
+        """
+        self.ring = SharedFrameRing.create(name, slot_size, slot_count)
+        self.published = 0
+        self.sink = Gst.ElementFactory.make("appsink", f"shm-publisher-{name}")
+        assert self.sink is not None, "Failed to create a Gst element 'appsink'"
+        self.sink.set_property("emit-signals", True)
+        self.sink.set_property("sync", False)
+        self.sink.set_property("max-buffers", 2)
+        self.sink.set_property("drop", True)
+        self.sink.connect("new-sample", self._on_new_sample)
+
+    def _on_new_sample(self, sink: Gst.Element) -> Gst.FlowReturn:
+        sample = sink.emit("pull-sample")
+        if sample is None:
+            return Gst.FlowReturn.EOS
+        structure = sample.get_caps().get_structure(0)
+        buffer = sample.get_buffer()
+        success, map_info = buffer.map(Gst.MapFlags.READ)
+        if not success:
+            logger.error("Failed to map buffer")
+            return Gst.FlowReturn.ERROR
+        try:
+            self.published = self.ring.write(
+                map_info.data,
+                structure.get_value("width"),
+                structure.get_value("height"),
+                structure.get_string("format") or "",
+                buffer.pts,
+            )
+        finally:
+            buffer.unmap(map_info)
+        return Gst.FlowReturn.OK
+
+    def close(self) -> None:
+        """Removes the shared memory block."""
+        self.ring.close()
+
+
+class FrameSubscriber:
+    """
+    Reads frames published by a FramePublisher in another process.
+
+        subscriber = FrameSubscriber("camera1", latest_only=True)
+        while True:
+            meta, frame = subscriber.next_frame()
+            detections = model(frame)
+    """
+
+    def __init__(
+        self, name: str, latest_only: bool = True, poll_interval: float = 0.001
+    ):
+        """
+        :param name: name of the shared memory block
+        :param latest_only: skip to the newest frame, rather than reading every frame that is
+            still in the ring
+        :param poll_interval: seconds to sleep while waiting for a new frame
+        """
+        if np is None:
+            raise ImportError("FrameSubscriber requires numpy")
+        self.ring = SharedFrameRing.attach(name)
+        self.latest_only = latest_only
+        self.poll_interval = poll_interval
+        self.last_frame = self.ring.published
+        self.dropped = 0
+
+    def next_frame(self, timeout: Optional[float] = None, copy: bool = True):
+        """
+        Waits for the next frame.
+
+        Packed formats are returned with shape (height, width, channels), other formats as a flat
+        uint8 array. With copy=False the array points into shared memory; check
+        ring.is_valid(meta.frame_number) after using it.
+
+        :param timeout: seconds to wait, None to wait forever
+        :param copy: return a private copy of the frame
+        :return: frame metadata and frame as a numpy array, or None on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            published = self.ring.published
+            if published > self.last_frame:
+                if self.latest_only:
+                    wanted = published
+                else:
+                    # Frames older than the ring size have already been overwritten
+                    wanted = max(
+                        self.last_frame + 1, published - self.ring.slot_count + 1
+                    )
+                frame = self.ring.read(wanted, copy)
+                if frame is not None:
+                    self.dropped += wanted - self.last_frame - 1
+                    self.last_frame = wanted
+                    meta, data = frame
+                    array = np.frombuffer(data, dtype=np.uint8, count=meta.size)
+                    channels = _CHANNELS.get(meta.format)
+                    if (
+                        channels is not None
+                        and meta.size == meta.width * meta.height * channels
+                    ):
+                        array = array.reshape(meta.height, meta.width, channels)
+                    return meta, array
+                continue
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(self.poll_interval)
+
+    def close(self) -> None:
+        """Detaches from the ring."""
+        self.ring.close()
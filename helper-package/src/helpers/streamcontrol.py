@@ -0,0 +1,154 @@
+import gi
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+gi.require_version("GLib", "2.0")
+from gi.repository import GLib  # noqa: E402
+
+
+def call_in_main_loop(func: Callable[[], Any], timeout: Optional[float] = 10.0) -> Any:
+    """
+    Runs a function in the GLib main loop and waits for its result.
+
+    Pipelines are changed from the main loop, which runs in the main thread. Called from the main
+    thread the function runs directly.
+
+    :param func: function without arguments
+    :param timeout: maximum number of seconds to wait, None to wait forever
+    :return: return value of func; exceptions raised by func are raised again
+    """
+    if threading.current_thread() is threading.main_thread():
+        return func()
+
+    done = threading.Event()
+    outcome: Dict[str, Any] = {}
+
+    def run() -> bool:
+        try:
+            outcome["result"] = func()
+        except Exception as e:
+            outcome["error"] = e
+        done.set()
+        return GLib.SOURCE_REMOVE
+
+    GLib.idle_add(run)
+    if not done.wait(timeout):
+        raise TimeoutError("The main loop did not run the call in time")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+class _StreamControlHandler(BaseHTTPRequestHandler):
+    """
+    GET /streams lists the streams, POST /streams adds a stream and DELETE /streams/<id> removes
+    one. POST takes a JSON object with the stream's uri, e.g. {"uri": "file:///videos/cam1.mp4"}.
+    """
+
+    control: "StreamControlServer"
+
+    def _send_json(self, status: int, data: Any) -> None:
+        body = json.dumps(data, indent=2).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length", 0))
+        entry = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(entry, dict):
+            raise ValueError("Request body must be a JSON object")
+        return entry
+
+    def _handle(self, method: str) -> None:
+        path = urlparse(self.path).path.rstrip("/")
+        if not (path == "/streams" or path.startswith("/streams/")):
+            self._send_json(404, {"error": f"Unknown endpoint {path}"})
+            return
+        stream_id = path[len("/streams/") :] if path != "/streams" else None
+        control = self.control
+        try:
+            if method == "GET" and stream_id is None:
+                self._send_json(200, control.list_streams())
+            elif method == "POST" and stream_id is None:
+                entry = self._read_json()
+                if "uri" not in entry:
+                    raise ValueError("'uri' is missing")
+                self._send_json(201, {"id": control.add_stream(entry["uri"])})
+            elif method == "DELETE" and stream_id is not None:
+                control.remove_stream(int(stream_id))
+                self._send_json(200, {"id": int(stream_id)})
+            else:
+                self._send_json(405, {"error": f"{method} not supported on {path}"})
+        except KeyError as e:
+            self._send_json(404, {"error": f"Unknown stream {e}"})
+        except (RuntimeError, ValueError, TimeoutError) as e:
+            self._send_json(400, {"error": str(e)})
+
+    def do_GET(self) -> None:
+        self._handle("GET")
+
+    def do_POST(self) -> None:
+        self._handle("POST")
+
+    def do_DELETE(self) -> None:
+        self._handle("DELETE")
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(format % args)
+
+
+class StreamControlServer:
+    """
+    Local HTTP API for adding and removing the streams of a running pipeline.
+
+        curl localhost:8556/streams
+        curl -X POST localhost:8556/streams -d '{"uri": "file:///videos/cam1.mp4"}'
+        curl -X DELETE localhost:8556/streams/1
+
+    The callbacks are called in the HTTP server's threads; use call_in_main_loop() in them to
+    change the pipeline. add_stream raises ValueError for bad requests and remove_stream raises
+    KeyError for unknown streams.
+    """
+
+    def __init__(
+        self,
+        add_stream: Callable[[str], int],
+        remove_stream: Callable[[int], None],
+        list_streams: Callable[[], Any],
+        port: int = 8556,
+        host: str = "127.0.0.1",
+    ):
+        """
+        :param add_stream: adds a stream given its uri, returns the stream id
+        :param remove_stream: removes a stream given its id
+        :param list_streams: returns the streams, JSON serializable
+        :param port: port to listen to
+        :param host: address to listen to, by default only local connections are accepted
+        """
+        self.add_stream = add_stream
+        self.remove_stream = remove_stream
+        self.list_streams = list_streams
+        handler = type(
+            "StreamControlHandler", (_StreamControlHandler,), {"control": self}
+        )
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self.httpd.serve_forever, name="stream-control", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Stream control API at http://{host}:{port}/streams")
+
+    def stop(self) -> None:
+        """Stops the HTTP server."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
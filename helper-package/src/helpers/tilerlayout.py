@@ -0,0 +1,280 @@
+import gi
+import logging
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+gi.require_version("GLib", "2.0")
+from gi.repository import GLib  # noqa: E402
+
+try:
+    import pyds
+except ImportError:  # pragma: no cover - pyds is only available with DeepStream
+    pyds = None
+
+
+class TilerLayout(NamedTuple):
+    """
+    Layout of nvmultistreamtiler.
+
+    :param rows: number of tile rows
+    :param columns: number of tile columns
+    :param tile_width: width of a tile in pixels
+    :param tile_height: height of a tile in pixels
+    :param width: width of the tiled output in pixels
+    :param height: height of the tiled output in pixels
+    """
+
+    rows: int
+    columns: int
+    tile_width: int
+    tile_height: int
+    width: int
+    height: int
+
+
+def compute_layout(
+    num_tiles: int,
+    display_width: int = 1920,
+    display_height: int = 1080,
+    source_width: int = 1920,
+    source_height: int = 1080,
+    align: int = 2,
+) -> TilerLayout:
+    """
+    Computes the tiler layout that shows num_tiles streams on a display with the largest tiles.
+
+    The tiled output is always the size of the display, only the rows and columns change with the
+    number of tiles. They are chosen so that a stream, scaled to its tile with its aspect ratio
+    kept, is as large as possible: one stream gives one 1920x1080 tile on a 1920x1080 display, and
+    16 streams give 16 tiles of 480x270.
+
+    :param num_tiles: number of tiles, at least one tile is laid out
+    :param display_width: width of the display in pixels
+    :param display_height: height of the display in pixels
+    :param source_width: width of the streams in pixels
+    :param source_height: height of the streams in pixels
+    :param align: tile width and height are rounded down to a multiple of this
+    :return: the layout
+    """
+    assert display_width > 0 and display_height > 0, "Display size must be positive"
+    assert source_width > 0 and source_height > 0, "Source size must be positive"
+    num_tiles = max(num_tiles, 1)
+
+    best = None
+    for columns in range(1, num_tiles + 1):
+        rows = math.ceil(num_tiles / columns)
+        scale = min(
+            display_width / (columns * source_width),
+            display_height / (rows * source_height),
+        )
+        area = int(source_width * scale) * int(source_height * scale)
+        # Largest scaled streams first, then fewest empty tiles, then the widest layout
+        key = (area, -(rows * columns - num_tiles), columns)
+        if best is None or key > best[0]:
+            best = (key, rows, columns)
+
+    _, rows, columns = best
+    tile_width = max(display_width // columns // align * align, align)
+    tile_height = max(display_height // rows // align * align, align)
+    return TilerLayout(
+        rows, columns, tile_width, tile_height, display_width, display_height
+    )
+
+
+class AdaptiveTiler:
+    """
+    Keeps the layout of nvmultistreamtiler fitted to the streams that are worth showing.
+
+    The active streams are set with set_streams() when streams are added or removed. A stream
+    whose frame number has not advanced for frozen_timeout seconds is hidden until it advances
+    again, except that the most recently advanced stream stays visible when every stream is
+    frozen. Visible streams get consecutive tiles in the order of their source ids, and the rows
+    and columns of the tiler follow the number of visible streams, see compute_layout(). The
+    output size of the tiler stays the display size, so a new layout does not renegotiate the
+    caps of the elements after the tiler.
+
+    process_batch() is called from a probe on the sink pad of the tiler. It records the frames,
+    moves each visible frame to its tile by setting its pad_index, which the tiler uses to place
+    the frame, and removes the frames of hidden streams from the batch, so that the tiler and the
+    OSD after it do no work for them. A new layout is applied to the tiler from the GLib main loop,
+    not from the streaming thread:
+
+        adaptive_tiler = AdaptiveTiler(tiler, display_width=1920, display_height=1080)
+        adaptive_tiler.set_streams([0, 1, 2])
+
+        def tiler_sink_pad_buffer_probe(pad, info, u_data):
+            batch_meta = pyds.gst_buffer_get_nvds_batch_meta(hash(info.get_buffer()))
+            u_data.process_batch(batch_meta)
+            return Gst.PadProbeReturn.OK
+
+        tiler.get_static_pad("sink").add_probe(
+            Gst.PadProbeType.BUFFER, tiler_sink_pad_buffer_probe, adaptive_tiler
+        )
+    """
+
+    def __init__(
+        self,
+        tiler,
+        display_width: int = 1920,
+        display_height: int = 1080,
+        source_width: int = 1920,
+        source_height: int = 1080,
+        frozen_timeout: Optional[float] = 2.0,
+        pyds_module=None,
+    ):
+        """
+        :param tiler: the nvmultistreamtiler element
+        :param display_width: width of the display in pixels, the output width of the tiler
+        :param display_height: height of the display in pixels, the output height of the tiler
+        :param source_width: width of the streams in pixels, the nvstreammux output width
+        :param source_height: height of the streams in pixels, the nvstreammux output height
+        :param frozen_timeout: seconds without a new frame after which a stream is hidden, None to
+            never hide streams
+        :param pyds_module: the pyds module to use, by default the DeepStream bindings
+        """
+        assert (
+            frozen_timeout is None or frozen_timeout > 0
+        ), f"'frozen_timeout' must be positive, given {frozen_timeout}"
+
+        self.tiler = tiler
+        self.display_width = display_width
+        self.display_height = display_height
+        self.source_width = source_width
+        self.source_height = source_height
+        self.frozen_timeout = frozen_timeout
+        self.pyds = pyds_module or pyds
+        self.layout: Optional[TilerLayout] = None
+        self.hidden_frames = 0
+
+        # Stream id -> (last frame number, time the frame number last advanced)
+        self._streams: Dict[int, tuple] = {}
+        self._slots: Dict[int, int] = {}
+        # Layout waiting to be applied from the main loop
+        self._pending: Optional[TilerLayout] = None
+        self._lock = threading.Lock()
+
+        self.tiler.set_property("width", display_width)
+        self.tiler.set_property("height", display_height)
+        self._apply([])
+        self._apply_pending()
+
+    def set_streams(self, stream_ids: Iterable[int]) -> None:
+        """
+        Sets the active streams and updates the layout. New streams count as advancing from now.
+
+        :param stream_ids: source ids of the active streams
+        :return: None
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._streams = {
+                stream_id: self._streams.get(stream_id, (None, now))
+                for stream_id in stream_ids
+            }
+            self._update(now)
+
+    def visible(self) -> List[int]:
+        """
+        Returns the streams that are shown.
+
+        :return: source ids in tile order
+        """
+        with self._lock:
+            return sorted(self._slots, key=self._slots.get)
+
+    def _visible_ids(self, now: float) -> List[int]:
+        if self.frozen_timeout is None:
+            return sorted(self._streams)
+        visible = sorted(
+            stream_id
+            for stream_id, (_, advanced) in self._streams.items()
+            if now - advanced <= self.frozen_timeout
+        )
+        if not visible and self._streams:
+            # Keep the stream that advanced last on screen rather than an empty output
+            visible = [max(self._streams, key=lambda i: self._streams[i][1])]
+        return visible
+
+    def _update(self, now: float) -> None:
+        visible = self._visible_ids(now)
+        if visible != sorted(self._slots):
+            self._apply(visible)
+
+    def _apply(self, visible: List[int]) -> None:
+        self._slots = {stream_id: slot for slot, stream_id in enumerate(visible)}
+        layout = compute_layout(
+            len(visible),
+            self.display_width,
+            self.display_height,
+            self.source_width,
+            self.source_height,
+        )
+        current = self._pending or self.layout
+        if current is not None and (current.rows, current.columns) == (
+            layout.rows,
+            layout.columns,
+        ):
+            return
+        if self._pending is None and self.layout is not None:
+            GLib.idle_add(self._apply_pending)
+        self._pending = layout
+        logger.info(
+            f"Tiler layout: {layout.rows} rows x {layout.columns} columns of "
+            f"{layout.tile_width}x{layout.tile_height}, showing streams {visible}"
+        )
+
+    def _apply_pending(self) -> bool:
+        """Sets the rows and columns of the pending layout on the tiler, called in the main loop."""
+        with self._lock:
+            layout, self._pending = self._pending, None
+            if layout is None:
+                return GLib.SOURCE_REMOVE
+            self.layout = layout
+        self.tiler.set_property("rows", layout.rows)
+        self.tiler.set_property("columns", layout.columns)
+        return GLib.SOURCE_REMOVE
+
+    def process_batch(self, batch_meta) -> None:
+        """
+        Records the frames of a batch, places visible frames on their tiles and removes the frames
+        of hidden streams.
+
+        :param batch_meta: NvDsBatchMeta
+        :return: None
+        """
+        pyds_module = self.pyds
+        frames = []
+        l_frame = batch_meta.frame_meta_list
+        while l_frame is not None:
+            try:
+                frames.append(pyds_module.NvDsFrameMeta.cast(l_frame.data))
+            except StopIteration:
+                break
+            try:
+                l_frame = l_frame.next
+            except StopIteration:
+                break
+
+        now = time.monotonic()
+        with self._lock:
+            streams = self._streams
+            for frame_meta in frames:
+                stream = streams.get(frame_meta.source_id)
+                if stream is not None and stream[0] != frame_meta.frame_num:
+                    streams[frame_meta.source_id] = (frame_meta.frame_num, now)
+            self._update(now)
+            slots = self._slots
+
+            for frame_meta in frames:
+                slot = slots.get(frame_meta.source_id)
+                if slot is None:
+                    pyds_module.nvds_remove_frame_meta_from_batch(
+                        batch_meta, frame_meta
+                    )
+                    self.hidden_frames += 1
+                else:
+                    frame_meta.pad_index = slot
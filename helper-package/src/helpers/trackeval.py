@@ -0,0 +1,425 @@
+import logging
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from helpers.tracking import iou_matrix
+
+logger = logging.getLogger(__name__)
+
+
+class Frame(NamedTuple):
+    """
+    Boxes of one frame, ground truth objects, detections or tracker output.
+
+    :param ids: object or track ids, -1 for detections
+    :param boxes: bounding boxes [x, y, width, height], shape (n, 4)
+    :param confidences: detector confidences, 1.0 for ground truth and tracker output
+    """
+
+    ids: np.ndarray
+    boxes: np.ndarray
+    confidences: np.ndarray
+
+
+class TrackingSequence(NamedTuple):
+    """
+    A sequence of ground truth objects and detections.
+
+    :param name: name of the sequence
+    :param ground_truth: ground truth frames
+    :param detections: detection frames, one per ground truth frame
+    :param frame_rate: frames per second
+    """
+
+    name: str
+    ground_truth: List[Frame]
+    detections: List[Frame]
+    frame_rate: float
+
+
+def make_frame(
+    ids: Sequence[int] = (),
+    boxes: Sequence[Sequence[float]] = (),
+    confidences: Optional[Sequence[float]] = None,
+) -> Frame:
+    """
+    Creates a frame from lists.
+
+    :param ids: object or track ids
+    :param boxes: bounding boxes [x, y, width, height]
+    :param confidences: confidences, by default 1.0 for every box
+    :return: the frame
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+    assert len(ids) == len(boxes), "Every box must have an id"
+    if confidences is None:
+        confidences = np.ones(len(boxes))
+    return Frame(ids, boxes, np.asarray(confidences, dtype=np.float64).reshape(-1))
+
+
+def synthetic_sequence(
+    num_frames: int = 300,
+    num_objects: int = 20,
+    width: int = 1920,
+    height: int = 1080,
+    miss_rate: float = 0.05,
+    occlusion_rate: float = 0.01,
+    false_positives: float = 1.0,
+    jitter: float = 2.0,
+    frame_rate: float = 30.0,
+    seed: int = 0,
+    name: Optional[str] = None,
+) -> TrackingSequence:
+    """
+    Generates a sequence of objects moving at constant velocity and bouncing off the frame borders,
+    and noisy detections of them.
+
+    Objects enter and leave the sequence at random frames. Detections jitter around the ground
+    truth boxes, are missed at random, are missed for 3 - 15 frames in a row during occlusions,
+    and false positives with low confidences are added.
+
+    :param num_frames: number of frames
+    :param num_objects: number of objects over the whole sequence
+    :param width: frame width in pixels
+    :param height: frame height in pixels
+    :param miss_rate: probability that a detection is missed
+    :param occlusion_rate: probability per frame that an object starts an occlusion
+    :param false_positives: mean number of false positives per frame
+    :param jitter: standard deviation of the detection noise in pixels
+    :param frame_rate: frames per second
+    :param seed: seed of the random number generator
+    :param name: name of the sequence, by default derived from the seed
+    :return: the sequence
+    """
+    assert num_frames > 0, f"'num_frames' must be positive, given {num_frames}"
+    rng = np.random.default_rng(seed)
+
+    sizes = np.stack(
+        [rng.uniform(40, 200, num_objects), rng.uniform(40, 200, num_objects)], axis=1
+    )
+    positions = rng.uniform(0, 1, (num_objects, 2)) * ([width, height] - sizes)
+    velocities = rng.uniform(-8, 8, (num_objects, 2))
+    starts = rng.integers(0, max(num_frames // 2, 1), num_objects)
+    ends = np.minimum(
+        starts + rng.integers(max(num_frames // 3, 1), num_frames + 1, num_objects),
+        num_frames,
+    )
+    occluded_until = np.full(num_objects, -1)
+    limits = np.array([width, height]) - sizes
+
+    ground_truth, detections = [], []
+    for frame in range(num_frames):
+        alive = np.flatnonzero((starts <= frame) & (frame < ends))
+        gt_boxes = np.concatenate([positions[alive], sizes[alive]], axis=1)
+        ground_truth.append(make_frame(alive + 1, gt_boxes))
+
+        occluded_until[alive] = np.where(
+            rng.random(len(alive)) < occlusion_rate,
+            frame + rng.integers(3, 16, len(alive)),
+            occluded_until[alive],
+        )
+        seen = alive[
+            (occluded_until[alive] < frame) & (rng.random(len(alive)) >= miss_rate)
+        ]
+        det_boxes = np.concatenate([positions[seen], sizes[seen]], axis=1)
+        det_boxes += rng.normal(0, jitter, det_boxes.shape)
+        det_confidences = rng.uniform(0.5, 0.95, len(seen))
+
+        num_false = rng.poisson(false_positives)
+        false_sizes = rng.uniform(40, 200, (num_false, 2))
+        false_boxes = np.concatenate(
+            [
+                rng.uniform(0, 1, (num_false, 2)) * ([width, height] - false_sizes),
+                false_sizes,
+            ],
+            axis=1,
+        )
+        detections.append(
+            make_frame(
+                np.full(len(seen) + num_false, -1),
+                np.concatenate([det_boxes, false_boxes]),
+                np.concatenate([det_confidences, rng.uniform(0.1, 0.6, num_false)]),
+            )
+        )
+
+        positions += velocities
+        bounced = (positions < 0) | (positions > limits)
+        velocities[bounced] *= -1
+        positions = np.clip(positions, 0, limits)
+
+    return TrackingSequence(
+        name or f"synthetic-{seed}", ground_truth, detections, frame_rate
+    )
+
+
+def load_mot(path: str, num_frames: Optional[int] = None) -> List[Frame]:
+    """
+    Loads a MOTChallenge text file, one box per line: frame, id, x, y, width, height, confidence.
+    Frame numbers start from 1 and further columns are ignored.
+
+    :param path: path of the file
+    :param num_frames: number of frames, by default the largest frame number in the file
+    :return: one frame per frame number
+    """
+    data = np.loadtxt(path, delimiter=",", ndmin=2)
+    if data.size == 0:
+        return [make_frame() for _ in range(num_frames or 0)]
+    frame_numbers = data[:, 0].astype(np.int64)
+    if num_frames is None:
+        num_frames = int(frame_numbers.max())
+    confidences = data[:, 6] if data.shape[1] > 6 else np.ones(len(data))
+
+    frames = []
+    order = np.argsort(frame_numbers, kind="stable")
+    bounds = np.searchsorted(frame_numbers[order], np.arange(1, num_frames + 2))
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        rows = order[start:end]
+        frames.append(make_frame(data[rows, 1], data[rows, 2:6], confidences[rows]))
+    return frames
+
+
+def load_mot_sequence(
+    gt_path: str, det_path: str, frame_rate: float = 30.0, name: Optional[str] = None
+) -> TrackingSequence:
+    """
+    Loads a recorded sequence from MOTChallenge ground truth and detection files.
+
+    :param gt_path: path of the ground truth file, lines with a zero 'consider' flag are ignored
+    :param det_path: path of the detection file
+    :param frame_rate: frames per second
+    :param name: name of the sequence, by default the ground truth path
+    :return: the sequence
+    """
+    ground_truth = load_mot(gt_path)
+    detections = load_mot(det_path)
+    num_frames = max(len(ground_truth), len(detections))
+    ground_truth += [make_frame()] * (num_frames - len(ground_truth))
+    detections += [make_frame()] * (num_frames - len(detections))
+    for i, frame in enumerate(ground_truth):
+        keep = frame.confidences != 0
+        ground_truth[i] = make_frame(frame.ids[keep], frame.boxes[keep])
+    detections = [
+        Frame(np.full(len(f.ids), -1), f.boxes, f.confidences) for f in detections
+    ]
+    return TrackingSequence(name or gt_path, ground_truth, detections, frame_rate)
+
+
+def write_mot(path: str, frames: List[Frame]) -> None:
+    """
+    Writes frames to a MOTChallenge text file.
+
+    :param path: path of the file
+    :param frames: frames, the first frame gets frame number 1
+    :return: None
+    """
+    with open(path, "w") as f:
+        for number, frame in enumerate(frames, start=1):
+            for track_id, box, confidence in zip(
+                frame.ids, frame.boxes, frame.confidences
+            ):
+                f.write(
+                    f"{number},{track_id},{box[0]:.2f},{box[1]:.2f},{box[2]:.2f},{box[3]:.2f},"
+                    f"{confidence:.4f},-1,-1,-1\n"
+                )
+
+
+def linear_sum_assignment(cost: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Solves the linear sum assignment problem with the Hungarian algorithm: assigns every row, or
+    every column if there are fewer columns, to a different column, or row, at minimum total cost.
+
+    :param cost: finite cost matrix, shape (n, m)
+    :return: row indices and the column indices assigned to them, sorted by row
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    # Shortest augmenting paths with potentials, index 0 is a virtual column
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    row_of = np.zeros(m + 1, dtype=np.int64)
+    way = np.zeros(m + 1, dtype=np.int64)
+    for i in range(1, n + 1):
+        row_of[0] = i
+        j0 = 0
+        min_v = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = row_of[j0]
+            free = ~used[1:]
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (reduced < min_v[1:])
+            min_v[1:][better] = reduced[better]
+            way[1:][better] = j0
+            candidates = np.where(free, min_v[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+            used_columns = np.flatnonzero(used)
+            u[row_of[used_columns]] += delta
+            v[used_columns] -= delta
+            min_v[1:][free] -= delta
+            j0 = j1
+            if row_of[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            row_of[j0] = row_of[j1]
+            j0 = j1
+
+    columns = np.flatnonzero(row_of[1:])
+    rows = row_of[1:][columns] - 1
+    if transposed:
+        rows, columns = columns, rows
+    order = np.argsort(rows)
+    return rows[order], columns[order]
+
+
+def evaluate(
+    ground_truth: List[Frame], hypotheses: List[Frame], iou_threshold: float = 0.5
+) -> Dict[str, float]:
+    """
+    Computes the CLEAR MOT metrics and the identity metrics of tracker output.
+
+    Ground truth objects and tracks are matched per frame when their IoU is at least
+    iou_threshold. A match of the previous frames is kept while it is valid, the other objects
+    are matched with the Hungarian algorithm on IoU, and an ID switch is counted when an object is
+    matched to a different track than the last time it was matched. IDF1 matches whole ground
+    truth trajectories to whole tracks, one to one, so that they share the most frames.
+
+    :param ground_truth: ground truth frames
+    :param hypotheses: tracker output, one frame per ground truth frame
+    :param iou_threshold: minimum IoU of a match
+    :return: dict with mota, idf1, id_switches, false_positives, misses, matches, ground_truth,
+        hypotheses, idtp, ground_truth_ids, track_ids and motp, the mean IoU of the matches
+    """
+    assert len(ground_truth) == len(
+        hypotheses
+    ), f"{len(ground_truth)} ground truth frames, {len(hypotheses)} tracker frames"
+
+    last_match: Dict[int, int] = {}
+    num_gt = num_hyp = num_matches = id_switches = 0
+    iou_sum = 0.0
+    co_occurrence: Dict[Tuple[int, int], int] = {}
+    gt_ids, hyp_ids = set(), set()
+
+    for gt, hyp in zip(ground_truth, hypotheses):
+        num_gt += len(gt.ids)
+        num_hyp += len(hyp.ids)
+        gt_ids.update(gt.ids.tolist())
+        hyp_ids.update(hyp.ids.tolist())
+        if len(gt.ids) == 0 or len(hyp.ids) == 0:
+            continue
+
+        ious = iou_matrix(gt.boxes, hyp.boxes)
+        valid = ious >= iou_threshold
+        for g, h in zip(*np.nonzero(valid)):
+            key = (int(gt.ids[g]), int(hyp.ids[h]))
+            co_occurrence[key] = co_occurrence.get(key, 0) + 1
+
+        hyp_index = {track_id: h for h, track_id in enumerate(hyp.ids.tolist())}
+        matches = []
+        # Two objects can share their last track after an ID switch, only one keeps it
+        kept = set()
+        for g, gt_id in enumerate(gt.ids.tolist()):
+            h = hyp_index.get(last_match.get(gt_id))
+            if h is not None and h not in kept and valid[g, h]:
+                matches.append((g, h))
+                kept.add(h)
+        kept_g = [g for g, _ in matches]
+        kept_h = [h for _, h in matches]
+        rest_g = np.setdiff1d(np.arange(len(gt.ids)), kept_g)
+        rest_h = np.setdiff1d(np.arange(len(hyp.ids)), kept_h)
+        if len(rest_g) and len(rest_h):
+            sub_valid = valid[np.ix_(rest_g, rest_h)]
+            cost = np.where(
+                sub_valid, 1.0 - ious[np.ix_(rest_g, rest_h)], len(rest_g) + 1.0
+            )
+            rows, columns = linear_sum_assignment(cost)
+            keep = sub_valid[rows, columns]
+            matches.extend(zip(rest_g[rows[keep]], rest_h[columns[keep]]))
+
+        for g, h in matches:
+            gt_id, hyp_id = int(gt.ids[g]), int(hyp.ids[h])
+            previous = last_match.get(gt_id)
+            if previous is not None and previous != hyp_id:
+                id_switches += 1
+            last_match[gt_id] = hyp_id
+            iou_sum += ious[g, h]
+        num_matches += len(matches)
+
+    idtp = 0
+    if co_occurrence:
+        gt_list = sorted({g for g, _ in co_occurrence})
+        hyp_list = sorted({h for _, h in co_occurrence})
+        gt_pos = {g: i for i, g in enumerate(gt_list)}
+        hyp_pos = {h: i for i, h in enumerate(hyp_list)}
+        counts = np.zeros((len(gt_list), len(hyp_list)))
+        for (g, h), count in co_occurrence.items():
+            counts[gt_pos[g], hyp_pos[h]] = count
+        rows, columns = linear_sum_assignment(-counts)
+        idtp = int(counts[rows, columns].sum())
+
+    misses = num_gt - num_matches
+    false_positives = num_hyp - num_matches
+    return {
+        "mota": 1.0 - (misses + false_positives + id_switches) / num_gt
+        if num_gt
+        else 0.0,
+        "motp": iou_sum / num_matches if num_matches else 0.0,
+        "idf1": 2.0 * idtp / (num_gt + num_hyp) if num_gt + num_hyp else 0.0,
+        "id_switches": id_switches,
+        "false_positives": false_positives,
+        "misses": misses,
+        "matches": num_matches,
+        "ground_truth": num_gt,
+        "hypotheses": num_hyp,
+        "idtp": idtp,
+        "ground_truth_ids": len(gt_ids),
+        "track_ids": len(hyp_ids),
+    }
+
+
+def run_tracker(
+    update: Callable[[Frame], Frame], detections: List[Frame]
+) -> Tuple[List[Frame], np.ndarray]:
+    """
+    Runs a tracker over the detections of a sequence and measures each update.
+
+    :param update: function that takes the detections of a frame and returns the tracks of the
+        frame
+    :param detections: detection frames
+    :return: tracker output per frame, and the update times in milliseconds
+    """
+    hypotheses = []
+    latencies = np.zeros(len(detections))
+    for i, frame in enumerate(detections):
+        start = time.perf_counter()
+        hypotheses.append(update(frame))
+        latencies[i] = 1e3 * (time.perf_counter() - start)
+    return hypotheses, latencies
+
+
+def latency_stats(latencies: np.ndarray) -> Dict[str, float]:
+    """
+    Summarizes update times.
+
+    :param latencies: update times in milliseconds
+    :return: dict with latency_mean_ms, latency_p50_ms, latency_p95_ms and latency_max_ms
+    """
+    if len(latencies) == 0:
+        latencies = np.zeros(1)
+    return {
+        "latency_mean_ms": float(np.mean(latencies)),
+        "latency_p50_ms": float(np.percentile(latencies, 50)),
+        "latency_p95_ms": float(np.percentile(latencies, 95)),
+        "latency_max_ms": float(np.max(latencies)),
+    }
@@ -0,0 +1,453 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is only needed by the trackers
+    np = None
+
+
+def compute_iou(boxA: List[float], boxB: List[float]) -> float:
+    """
+    Computes the Intersection over Union (IoU) of two bounding boxes.
+
+    :param boxA: bounding box [x, y, width, height]
+    :param boxB: bounding box [x, y, width, height]
+    :return: IoU in the range [0.0, 1.0], 0.0 if the union area is zero
+    """
+    xA = max(boxA[0], boxB[0])
+    yA = max(boxA[1], boxB[1])
+    xB = min(boxA[0] + boxA[2], boxB[0] + boxB[2])
+    yB = min(boxA[1] + boxA[3], boxB[1] + boxB[3])
+
+    interArea = max(0.0, xB - xA) * max(0.0, yB - yA)
+    boxAArea = boxA[2] * boxA[3]
+    boxBArea = boxB[2] * boxB[3]
+
+    unionArea = boxAArea + boxBArea - interArea
+    if unionArea == 0.0:
+        return 0.0
+    return interArea / unionArea
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """
+    Computes the Intersection over Union (IoU) of every pair of boxes.
+
+    :param boxes_a: bounding boxes [x, y, width, height], shape (n, 4)
+    :param boxes_b: bounding boxes [x, y, width, height], shape (m, 4)
+    :return: IoUs, shape (n, m), 0.0 where the union area is zero
+    """
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    inter_w = np.minimum(a[..., 0] + a[..., 2], b[..., 0] + b[..., 2]) - np.maximum(
+        a[..., 0], b[..., 0]
+    )
+    inter_h = np.minimum(a[..., 1] + a[..., 3], b[..., 1] + b[..., 3]) - np.maximum(
+        a[..., 1], b[..., 1]
+    )
+    inter = np.clip(inter_w, 0, None) * np.clip(inter_h, 0, None)
+    union = a[..., 2] * a[..., 3] + b[..., 2] * b[..., 3] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+# States of the slots of a TrackStore
+FREE = 0
+TENTATIVE = 1
+CONFIRMED = 2
+
+
+class TrackStore:
+    """
+    Struct-of-arrays storage of the tracks of a tracker, shared with the metadata writers.
+
+    Each track occupies a slot, an index into contiguous NumPy arrays:
+
+    - ids (capacity,): track ID, 0 in free slots
+    - boxes (capacity, 4): latest bounding box [x, y, width, height]
+    - ages (capacity,): number of frames since the track started
+    - hits (capacity,): number of frames the track was matched in
+    - misses (capacity,): number of frames since the last match
+    - states (capacity,): FREE, TENTATIVE or CONFIRMED
+    - detections (capacity,): index of the detection matched in the last frame, -1 if none
+
+    and the arrays given by 'columns', e.g. the Kalman filter state of KalmanTracker. The slots of
+    released tracks go on a free list and are reused first, and the arrays double in size when
+    the free list runs out, so that a steady number of tracks creates no per-track objects.
+
+    The trackers return the slots of the tracks of a frame, and the metadata writers read the
+    arrays directly:
+
+        slots = tracker.track(boxes)
+        ids, boxes = tracker.store.ids[slots], tracker.store.boxes[slots]
+    """
+
+    def __init__(
+        self, capacity: int = 64, columns: Optional[Dict[str, Tuple]] = None
+    ) -> None:
+        """
+        :param capacity: initial number of slots
+        :param columns: additional arrays as name: (shape of a track's row, dtype)
+        """
+        if np is None:
+            raise ImportError("TrackStore requires numpy")
+        assert capacity >= 1, f"'capacity' must be at least 1, given {capacity}"
+
+        self._columns: Dict[str, Tuple] = {
+            "ids": ((), np.int64),
+            "boxes": ((4,), np.float64),
+            "ages": ((), np.int64),
+            "hits": ((), np.int64),
+            "misses": ((), np.int64),
+            "states": ((), np.uint8),
+            "detections": ((), np.int64),
+        }
+        self._columns.update(columns or {})
+        for name, (shape, dtype) in self._columns.items():
+            setattr(self, name, np.zeros((0,) + tuple(shape), dtype=dtype))
+        self.capacity = 0
+        self.next_id: int = 1
+        self._free: List[int] = []
+        self._grow(capacity)
+
+    def __len__(self) -> int:
+        return self.capacity - len(self._free)
+
+    def _grow(self, capacity: int) -> None:
+        for name in self._columns:
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[: self.capacity] = old
+            setattr(self, name, new)
+        # The free list is a stack, keep the lowest slots on top
+        self._free[:0] = range(capacity - 1, self.capacity - 1, -1)
+        self.capacity = capacity
+
+    def allocate(self, n: int) -> "np.ndarray":
+        """
+        Starts new tentative tracks, with consecutive new IDs.
+
+        :param n: number of tracks
+        :return: slots of the tracks, in ID order
+        """
+        if n > len(self._free):
+            self._grow(max(2 * self.capacity, len(self) + n))
+        start = len(self._free) - n
+        slots = np.array(self._free[start:][::-1], dtype=np.int64)
+        del self._free[start:]
+        self.ids[slots] = np.arange(self.next_id, self.next_id + n)
+        self.next_id += n
+        self.ages[slots] = 0
+        self.hits[slots] = 0
+        self.misses[slots] = 0
+        self.states[slots] = TENTATIVE
+        self.detections[slots] = -1
+        return slots
+
+    def release(self, slots) -> None:
+        """
+        Ends tracks and puts their slots on the free list.
+
+        :param slots: slots of the tracks
+        """
+        self.ids[slots] = 0
+        self.states[slots] = FREE
+        self.detections[slots] = -1
+        self._free.extend(np.sort(slots)[::-1].tolist())
+
+    def active(self) -> "np.ndarray":
+        """
+        Returns the slots of all tracks.
+
+        :return: slots, in ID order
+        """
+        slots = np.flatnonzero(self.states != FREE)
+        return slots[np.argsort(self.ids[slots], kind="stable")]
+
+
+class SimpleTracker:
+    """
+    A simple Intersection-over-Union (IoU) tracker for bounding boxes.
+
+    Detections are associated with the active tracks of the previous frame by greedy IoU
+    matching. Unmatched tracks are discarded and unmatched detections start new tracks. There is
+    no motion or appearance model, so it suits high frame rates and slowly moving objects.
+
+    The tracks are kept in a TrackStore, store. tracks maps the IDs of the active tracks to their
+    latest bounding box [x, y, width, height].
+    """
+
+    def __init__(self) -> None:
+        if np is None:
+            raise ImportError("SimpleTracker requires numpy")
+        self.store = TrackStore()
+
+    @property
+    def next_id(self) -> int:
+        return self.store.next_id
+
+    @property
+    def tracks(self) -> Dict[int, List[float]]:
+        slots = self.store.active()
+        return dict(
+            zip(self.store.ids[slots].tolist(), self.store.boxes[slots].tolist())
+        )
+
+    def track(self, detections) -> "np.ndarray":
+        """
+        Updates the tracks with the detections of a new frame.
+
+        :param detections: bounding boxes [x, y, width, height] of the frame, shape (n, 4)
+        :return: slots of the active tracks in store, in ID order
+        """
+        store = self.store
+        boxes = np.asarray(detections, dtype=np.float64).reshape(-1, 4)
+        slots = store.active()
+        matches = np.full(len(slots), -1, dtype=np.int64)
+
+        # Try to match existing tracks with new detections, in ID order
+        if len(slots) and len(boxes):
+            ious = iou_matrix(store.boxes[slots], boxes)
+            available = np.ones(len(boxes), dtype=bool)
+            for i, j in enumerate(np.argmax(ious, axis=1).tolist()):
+                if ious[i, j] <= 0.3:  # Threshold
+                    continue
+                if not available[j]:
+                    # The best detection was taken by an earlier track
+                    j = int(np.argmax(np.where(available, ious[i], -1.0)))
+                    if not available[j] or ious[i, j] <= 0.3:
+                        continue
+                matches[i] = j
+                available[j] = False
+
+        matched = matches >= 0
+        store.release(slots[~matched])
+        slots, detection_rows = slots[matched], matches[matched]
+        store.boxes[slots] = boxes[detection_rows]
+        store.detections[slots] = detection_rows
+        store.hits[slots] += 1
+
+        # Assign new IDs to remaining unmatched detections
+        new = np.ones(len(boxes), dtype=bool)
+        new[detection_rows] = False
+        new_rows = np.flatnonzero(new)
+        new_slots = store.allocate(len(new_rows))
+        store.boxes[new_slots] = boxes[new_rows]
+        store.detections[new_slots] = new_rows
+        store.hits[new_slots] = 1
+        store.states[new_slots] = CONFIRMED
+
+        slots = np.concatenate([slots, new_slots])
+        store.ages[slots] += 1
+        return slots
+
+    def update(self, detections: List[List[float]]) -> List[Tuple[int, List[float]]]:
+        """
+        Updates the tracks with the detections of a new frame.
+
+        :param detections: bounding boxes [x, y, width, height] of the frame
+        :return: active tracks as (track ID, bounding box)
+        """
+        slots = self.track(detections)
+        return list(
+            zip(self.store.ids[slots].tolist(), self.store.boxes[slots].tolist())
+        )
+
+
+class KalmanTracker:
+    """
+    An IoU tracker with a constant-velocity Kalman filter per track.
+
+    The state of a track is its box center, width and height, and their velocities. Each frame,
+    all tracks are predicted forward, detections are associated with the predicted boxes by greedy
+    IoU matching, and the matched tracks are corrected with their detections. Unmatched tracks are
+    kept for lost_track_buffer frames, so that a track survives missed detections and short
+    occlusions with the same ID. Unmatched detections start new tracks, which are confirmed once
+    they have been matched in min_hits frames and dropped if they miss a frame before that, so
+    that isolated false detections do not become tracks.
+
+    The tracks are kept in a TrackStore, store, with the Kalman filter state in two additional
+    columns, mean (capacity, 8) and covariance (capacity, 8, 8). Prediction and correction are
+    single vectorized steps over all tracks. The noise model is the one of ByteTrack and DeepSORT,
+    with standard deviations proportional to the box size.
+
+    track() and update() take and return the same values as those of SimpleTracker. Only the
+    confirmed tracks matched in the frame are returned, with their corrected boxes.
+    """
+
+    def __init__(
+        self,
+        lost_track_buffer: int = 30,
+        min_hits: int = 2,
+        iou_threshold: float = 0.3,
+        std_weight_position: float = 1.0 / 20,
+        std_weight_velocity: float = 1.0 / 160,
+    ) -> None:
+        """
+        :param lost_track_buffer: number of frames an unmatched track is kept
+        :param min_hits: number of frames a new track must be matched in to be returned
+        :param iou_threshold: minimum IoU of a detection and a predicted box to match them
+        :param std_weight_position: position noise relative to the box size
+        :param std_weight_velocity: velocity noise relative to the box size
+        """
+        if np is None:
+            raise ImportError("KalmanTracker requires numpy")
+        assert (
+            lost_track_buffer >= 0
+        ), f"'lost_track_buffer' must not be negative, given {lost_track_buffer}"
+
+        assert min_hits >= 1, f"'min_hits' must be at least 1, given {min_hits}"
+
+        self.lost_track_buffer = lost_track_buffer
+        self.min_hits = min_hits
+        self.iou_threshold = iou_threshold
+        self.std_weight_position = std_weight_position
+        self.std_weight_velocity = std_weight_velocity
+        self.store = TrackStore(
+            columns={"mean": ((8,), np.float64), "covariance": ((8, 8), np.float64)}
+        )
+
+        # State transition of (cx, cy, w, h, vcx, vcy, vw, vh) over one frame, and measurement
+        # of (cx, cy, w, h)
+        self._F = np.eye(8) + np.eye(8, k=4)
+        self._H = np.eye(4, 8)
+
+    @property
+    def next_id(self) -> int:
+        return self.store.next_id
+
+    @staticmethod
+    def _diagonal(std):
+        """Diagonal covariances from standard deviations of shape (n, d), shape (n, d, d)."""
+        n, d = std.shape
+        covariance = np.zeros((n, d, d))
+        covariance[:, np.arange(d), np.arange(d)] = std**2
+        return covariance
+
+    def _predict(self, slots) -> None:
+        store = self.store
+        mean = store.mean[slots]
+        # Lost tracks keep their size
+        mean[store.misses[slots] > 0, 6:8] = 0.0
+        mean = mean @ self._F.T
+        size = mean[:, 2:4]
+        position = self.std_weight_position * size
+        velocity = self.std_weight_velocity * size
+        covariance = self._F @ store.covariance[slots] @ self._F.T
+        store.mean[slots] = mean
+        store.covariance[slots] = covariance + self._diagonal(
+            np.concatenate([position, position, velocity, velocity], axis=1)
+        )
+
+    def _correct(self, slots, measurements) -> None:
+        mean = self.store.mean[slots]
+        covariance = self.store.covariance[slots]
+        position = self.std_weight_position * mean[:, 2:4]
+        innovation_cov = self._H @ covariance @ self._H.T + self._diagonal(
+            np.concatenate([position, position], axis=1)
+        )
+        # Kalman gain K = P H^T S^-1, solved as S K^T = H P
+        gain = np.linalg.solve(innovation_cov, self._H @ covariance).transpose(0, 2, 1)
+        innovation = measurements - mean[:, :4]
+        self.store.mean[slots] = mean + (gain @ innovation[:, :, None])[:, :, 0]
+        self.store.covariance[slots] = covariance - gain @ self._H @ covariance
+
+    def _initiate(self, measurements):
+        """Starts a track per measurement, returns their slots."""
+        n = len(measurements)
+        position = 2 * self.std_weight_position * measurements[:, 2:4]
+        velocity = 10 * self.std_weight_velocity * measurements[:, 2:4]
+        slots = self.store.allocate(n)
+        self.store.mean[slots] = np.concatenate(
+            [measurements, np.zeros((n, 4))], axis=1
+        )
+        self.store.covariance[slots] = self._diagonal(
+            np.concatenate([position, position, velocity, velocity], axis=1)
+        )
+        self.store.hits[slots] = 1
+        return slots
+
+    def _boxes(self, slots):
+        """Boxes [x, y, width, height] of the tracks of slots."""
+        center_size = self.store.mean[slots, :4]
+        return np.concatenate(
+            [center_size[:, :2] - center_size[:, 2:] / 2, center_size[:, 2:]], axis=1
+        )
+
+    def track(self, detections) -> "np.ndarray":
+        """
+        Updates the tracks with the detections of a new frame.
+
+        :param detections: bounding boxes [x, y, width, height] of the frame, shape (n, 4)
+        :return: slots in store of the confirmed tracks matched in the frame
+        """
+        store = self.store
+        boxes = np.asarray(detections, dtype=np.float64).reshape(-1, 4)
+        measurements = np.concatenate(
+            [boxes[:, :2] + boxes[:, 2:] / 2, boxes[:, 2:]], axis=1
+        )
+
+        slots = store.active()
+        self._predict(slots)
+        track_rows = np.zeros(0, dtype=np.int64)
+        detection_rows = np.zeros(0, dtype=np.int64)
+        if len(slots) and len(boxes):
+            ious = iou_matrix(self._boxes(slots), boxes)
+            # Greedy matching, highest IoU first
+            candidates = np.argwhere(ious >= self.iou_threshold)
+            order = np.argsort(-ious[candidates[:, 0], candidates[:, 1]], kind="stable")
+            matched_tracks, matched_detections = set(), set()
+            pairs = []
+            for t, d in candidates[order].tolist():
+                if t in matched_tracks or d in matched_detections:
+                    continue
+                matched_tracks.add(t)
+                matched_detections.add(d)
+                pairs.append((t, d))
+            if pairs:
+                track_rows, detection_rows = np.array(pairs, dtype=np.int64).T
+
+        matched = slots[track_rows]
+        store.ages[slots] += 1
+        store.misses[slots] += 1
+        store.detections[slots] = -1
+        store.misses[matched] = 0
+        store.hits[matched] += 1
+        store.detections[matched] = detection_rows
+        if len(matched):
+            self._correct(matched, measurements[detection_rows])
+        store.boxes[slots] = self._boxes(slots)
+
+        # Drop the tracks that have been lost for too long and the unconfirmed tracks that were
+        # not matched, then start the new tracks
+        misses = store.misses[slots]
+        lost = (misses > self.lost_track_buffer) | (
+            (misses > 0) & (store.hits[slots] < self.min_hits)
+        )
+        store.release(slots[lost])
+        new = np.ones(len(boxes), dtype=bool)
+        new[detection_rows] = False
+        new_rows = np.flatnonzero(new)
+        new_slots = self._initiate(measurements[new_rows])
+        store.ages[new_slots] = 1
+        store.boxes[new_slots] = self._boxes(new_slots)
+        store.detections[new_slots] = new_rows
+
+        slots = np.concatenate([matched, new_slots])
+        slots = slots[store.hits[slots] >= self.min_hits]
+        store.states[slots] = CONFIRMED
+        return slots
+
+    def update(self, detections: List[List[float]]) -> List[Tuple[int, List[float]]]:
+        """
+        Updates the tracks with the detections of a new frame.
+
+        :param detections: bounding boxes [x, y, width, height] of the frame
+        :return: tracks matched in the frame as (track ID, bounding box)
+        """
+        slots = self.track(detections)
+        return list(
+            zip(self.store.ids[slots].tolist(), self.store.boxes[slots].tolist())
+        )
@@ -0,0 +1,341 @@
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is only needed by TrajectoryStore
+    np = None
+
+try:
+    import pyds
+except ImportError:  # pragma: no cover - pyds is only available with DeepStream
+    pyds = None
+
+# Columns stored for each point of a trajectory
+COLUMNS = (
+    ("frame_num", "int64"),
+    ("left", "float32"),
+    ("top", "float32"),
+    ("width", "float32"),
+    ("height", "float32"),
+    ("confidence", "float32"),
+    ("age", "int32"),
+)
+
+
+class TrajectoryStore:
+    """
+    Keeps the latest points of object trajectories in columnar NumPy arrays.
+
+    Each track, identified by (stream id, unique id), owns a row of a ring buffer per column that
+    holds its latest 'history' points: frame number, bounding box (left, top, width, height),
+    confidence and age. Tracks can be queried while the pipeline runs, and flush() writes all the
+    points to a .npz file in one go.
+
+    add_past_frame_meta() reads the past-frame metadata that nvtracker attaches to a batch when
+    enable-past-frame is set:
+
+        store = TrajectoryStore(history=64)
+
+        def probe(pad, info, u_data):
+            batch_meta = pyds.gst_buffer_get_nvds_batch_meta(hash(info.get_buffer()))
+            store.add_past_frame_meta(batch_meta)
+            return Gst.PadProbeReturn.OK
+
+        store.trajectory(stream_id=0, unique_id=12)["frame_num"]
+        store.flush("trajectories.npz")
+
+    Probes and queries may run in different threads.
+    """
+
+    def __init__(
+        self, history: int = 64, max_tracks: int = 4096, initial_tracks: int = 64
+    ):
+        """
+        :param history: number of points kept per track
+        :param max_tracks: maximum number of tracks kept, the least recently updated track is
+            dropped to make room for a new one
+        :param initial_tracks: number of tracks the arrays are allocated for, grows as needed
+        """
+        if np is None:
+            raise ImportError("TrajectoryStore requires numpy")
+        assert history >= 1, f"'history' must be at least 1, given {history}"
+        assert max_tracks >= 1, f"'max_tracks' must be at least 1, given {max_tracks}"
+
+        self.history = history
+        self.max_tracks = max_tracks
+        self.evicted = 0
+        self._rows: Dict[Tuple[int, int], int] = {}
+        self._free: List[int] = []
+        self._keys: List[Optional[Tuple[int, int]]] = []
+        self._labels: List[str] = []
+        self._columns = {}
+        self._updates = 0
+        self._lock = threading.Lock()
+        self._allocate(min(initial_tracks, max_tracks))
+
+    def _allocate(self, num_tracks: int) -> None:
+        """Grows the arrays to hold num_tracks tracks."""
+        old = len(self._keys)
+        for name, dtype in COLUMNS:
+            column = np.zeros((num_tracks, self.history), dtype=dtype)
+            if old:
+                column[:old] = self._columns[name]
+            self._columns[name] = column
+        for name, dtype in (
+            ("count", "int64"),
+            ("class_id", "int32"),
+            ("updated", "int64"),
+        ):
+            array = np.zeros(num_tracks, dtype=dtype)
+            if old:
+                array[:old] = getattr(self, "_" + name)
+            setattr(self, "_" + name, array)
+        self._keys.extend([None] * (num_tracks - old))
+        self._labels.extend([""] * (num_tracks - old))
+        self._free.extend(range(num_tracks - 1, old - 1, -1))
+
+    def _row(self, key: Tuple[int, int], class_id: int, label: str) -> int:
+        row = self._rows.get(key)
+        if row is not None:
+            return row
+        if not self._free:
+            if len(self._keys) < self.max_tracks:
+                self._allocate(min(2 * len(self._keys), self.max_tracks))
+            else:
+                # Drop the least recently updated track
+                oldest = int(np.argmin(self._updated))
+                del self._rows[self._keys[oldest]]
+                self._free.append(oldest)
+                self.evicted += 1
+        row = self._free.pop()
+        self._rows[key] = row
+        self._keys[row] = key
+        self._labels[row] = label
+        self._class_id[row] = class_id
+        self._count[row] = 0
+        return row
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def tracks(self) -> List[Tuple[int, int]]:
+        """
+        Returns the tracks in the store.
+
+        :return: list of (stream id, unique id)
+        """
+        with self._lock:
+            return list(self._rows)
+
+    def append(
+        self,
+        stream_id: int,
+        unique_id: int,
+        frame_nums,
+        boxes,
+        confidences,
+        ages,
+        class_id: int = -1,
+        label: str = "",
+    ) -> None:
+        """
+        Appends points to a track, oldest first.
+
+        :param stream_id: stream the track belongs to
+        :param unique_id: unique id of the track
+        :param frame_nums: frame numbers, shape (n,)
+        :param boxes: bounding boxes (left, top, width, height), shape (n, 4)
+        :param confidences: tracker confidences, shape (n,)
+        :param ages: track ages, shape (n,)
+        :param class_id: class id of the object
+        :param label: class label of the object
+        :return: None
+        """
+        frame_nums = np.asarray(frame_nums)
+        n = len(frame_nums)
+        if n == 0:
+            return
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(n, 4)
+        values = [
+            frame_nums,
+            boxes[:, 0],
+            boxes[:, 1],
+            boxes[:, 2],
+            boxes[:, 3],
+            np.asarray(confidences),
+            np.asarray(ages),
+        ]
+        with self._lock:
+            self._write((stream_id, unique_id), class_id, label, values, n)
+
+    def _write(
+        self, key: Tuple[int, int], class_id: int, label: str, values, n: int
+    ) -> None:
+        """Writes n points, one array per column in COLUMNS order, with the lock held."""
+        first = max(n - self.history, 0)
+        row = self._row(key, class_id, label)
+        count = self._count[row]
+        slots = (count + np.arange(first, n)) % self.history
+        for column, value in zip(self._columns.values(), values):
+            column[row, slots] = value[first:]
+        self._count[row] = count + n
+        self._updates += 1
+        self._updated[row] = self._updates
+
+    def trajectory(self, stream_id: int, unique_id: int) -> Optional[dict]:
+        """
+        Returns the stored points of a track, oldest first.
+
+        :param stream_id: stream the track belongs to
+        :param unique_id: unique id of the track
+        :return: dict of column arrays, plus class_id and label, or None if the track is unknown
+        """
+        with self._lock:
+            row = self._rows.get((stream_id, unique_id))
+            if row is None:
+                return None
+            count = int(self._count[row])
+            n = min(count, self.history)
+            slots = (count - n + np.arange(n)) % self.history
+            trajectory = {
+                name: column[row, slots] for name, column in self._columns.items()
+            }
+            trajectory["class_id"] = int(self._class_id[row])
+            trajectory["label"] = self._labels[row]
+            return trajectory
+
+    def snapshot(self, clear: bool = False) -> dict:
+        """
+        Returns all stored points as flat columns.
+
+        The track_* arrays describe the tracks, and 'track' holds the index of the track of every
+        point. Points of a track are consecutive and oldest first.
+
+        :param clear: remove all tracks from the store
+        :return: dict of arrays
+        """
+        with self._lock:
+            rows = np.array(sorted(self._rows.values()), dtype=np.int64)
+            counts = self._count[rows]
+            n = np.minimum(counts, self.history)
+            track = np.repeat(np.arange(len(rows)), n)
+            point_rows = rows[track]
+            offsets = np.arange(int(n.sum())) - np.repeat(np.cumsum(n) - n, n)
+            slots = (np.repeat(counts - n, n) + offsets) % self.history
+            data = {
+                name: column[point_rows, slots]
+                for name, column in self._columns.items()
+            }
+            keys = [self._keys[row] for row in rows.tolist()]
+            data["track"] = track
+            data["track_stream_id"] = np.array([k[0] for k in keys], dtype=np.int64)
+            data["track_unique_id"] = np.array([k[1] for k in keys], dtype=np.uint64)
+            data["track_class_id"] = self._class_id[rows]
+            data["track_label"] = np.array(
+                [self._labels[r] for r in rows.tolist()], dtype=str
+            )
+            if clear:
+                self._free.extend(self._rows.values())
+                for row in self._rows.values():
+                    self._keys[row] = None
+                self._rows.clear()
+            return data
+
+    def flush(self, path: str, clear: bool = True) -> int:
+        """
+        Writes all stored points to a .npz file, with the columns of snapshot().
+
+        :param path: path of the file
+        :param clear: remove all tracks from the store
+        :return: number of points written
+        """
+        data = self.snapshot(clear)
+        np.savez(path, **data)
+        logger.info(
+            f"Wrote {len(data['frame_num'])} points of {len(data['track_label'])} tracks to '{path}'"
+        )
+        return len(data["frame_num"])
+
+    def add_past_frame_meta(self, batch_meta, pyds_module=None) -> int:
+        """
+        Appends the past-frame tracking metadata of a batch.
+
+        :param batch_meta: NvDsBatchMeta
+        :param pyds_module: the pyds module to use, by default the DeepStream bindings
+        :return: number of points added
+        """
+        pyds_module = pyds_module or pyds
+        # The points of the whole batch are collected into one list, converted once and written
+        # under one lock, rather than converted and locked per track
+        points = []
+        tracks = []
+        l_user = batch_meta.batch_user_meta_list
+        while l_user is not None:
+            try:
+                user_meta = pyds_module.NvDsUserMeta.cast(l_user.data)
+            except StopIteration:
+                break
+            if (
+                user_meta
+                and user_meta.base_meta.meta_type
+                == pyds_module.NvDsMetaType.NVDS_TRACKER_PAST_FRAME_META
+            ):
+                try:
+                    past_frame_batch = pyds_module.NvDsPastFrameObjBatch.cast(
+                        user_meta.user_meta_data
+                    )
+                except StopIteration:
+                    break
+                for stream in pyds_module.NvDsPastFrameObjBatch.list(past_frame_batch):
+                    for track in pyds_module.NvDsPastFrameObjStream.list(stream):
+                        start = len(points)
+                        for obj in pyds_module.NvDsPastFrameObjList.list(track):
+                            bbox = obj.tBbox
+                            points.append(
+                                (
+                                    obj.frameNum,
+                                    bbox.left,
+                                    bbox.top,
+                                    bbox.width,
+                                    bbox.height,
+                                    obj.confidence,
+                                    obj.age,
+                                )
+                            )
+                        if len(points) > start:
+                            tracks.append(
+                                (
+                                    (stream.streamID, track.uniqueId),
+                                    track.classId,
+                                    track.objLabel,
+                                    start,
+                                    len(points),
+                                )
+                            )
+            try:
+                l_user = l_user.next
+            except StopIteration:
+                break
+
+        if not points:
+            return 0
+        columns = np.array(points, dtype=np.float64).T
+        with self._lock:
+            for key, class_id, label, start, end in tracks:
+                self._write(key, class_id, label, columns[:, start:end], end - start)
+        return len(points)
+
+
+def load_trajectories(path: str) -> dict:
+    """
+    Reads a file written by TrajectoryStore.flush().
+
+    :param path: path of the file
+    :return: dict of arrays, see TrajectoryStore.snapshot()
+    """
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}